@@ -118,16 +118,33 @@ class WorkspaceSharingAdapterMixin:
         self._share_workspace_with_groups(workspace)
 
     def _share_workspace_with_groups(self, workspace):
-        """Loop over all groups and share the workspace with the specified permission for that group."""
-        for sharing in self.get_share_permissions():
-            self._share_workspace_with_group(workspace, sharing.group_name, sharing.access, sharing.can_compute)
-
-    def _share_workspace_with_group(self, workspace, group_name, access, can_compute):
-        """Share the workspace with a specific group."""
+        """Share the workspace with the specified groups, updating their access on AnVIL in one request.
+
+        Raises:
+            AnVILAPIError: The request to update the workspace access on AnVIL failed.
+            exceptions.AnVILGroupNotFound: A group that the workspace is being shared with does not exist on AnVIL.
+        """
+        sharings = []
+        for permission in self.get_share_permissions():
+            sharing = self._get_sharing_to_update(
+                workspace, permission.group_name, permission.access, permission.can_compute
+            )
+            if sharing is not None:
+                sharings.append(sharing)
+        for result in models.WorkspaceGroupSharing.anvil_bulk_create_or_update(sharings):
+            if not result.succeeded:
+                raise result.error
+
+    def _get_sharing_to_update(self, workspace, group_name, access, can_compute):
+        """Create or update the sharing record for a specific group in the app.
+
+        Returns:
+            WorkspaceGroupSharing: The record, if it was created or changed and needs to be updated on AnVIL, or None.
+        """
         try:
             group = models.ManagedGroup.objects.get(name=group_name)
         except models.ManagedGroup.DoesNotExist:
-            return
+            return None
         try:
             sharing = models.WorkspaceGroupSharing.objects.get(
                 workspace=workspace,
@@ -142,12 +159,12 @@ class WorkspaceSharingAdapterMixin:
             )
             sharing.full_clean()
             sharing.save()
-            sharing.anvil_create_or_update()
-        else:
-            # If the existing sharing record exists, make sure it has the correct permissions.
-            if sharing.can_compute != can_compute or sharing.access != access:
-                sharing.can_compute = can_compute
-                sharing.access = access
-                sharing.full_clean()
-                sharing.save()
-                sharing.anvil_create_or_update()
+            return sharing
+        # If the existing sharing record exists, make sure it has the correct permissions.
+        if sharing.can_compute != can_compute or sharing.access != access:
+            sharing.can_compute = can_compute
+            sharing.access = access
+            sharing.full_clean()
+            sharing.save()
+            return sharing
+        return None
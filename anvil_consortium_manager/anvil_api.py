@@ -10,11 +10,25 @@ See API documentation for more information about each method: https://api.firecl
 # These don't work with python3.10, don't allow us to do everything we need,
 # and have some dependency resolution issues with this project. Therefore, we'll
 # have to reproduce some of the API to make the calls we would like to make. Alas.
+import asyncio
+import datetime
+import functools
+import hashlib
 import json
 import logging
-
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from django.core.cache import caches
+from django.utils.module_loading import import_string
 from google.auth.transport.requests import AuthorizedSession
 from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
 
 from . import app_settings
 
@@ -28,6 +42,8 @@ class AnVILAPIClient:
 
     Attributes:
         auth_session: An ``AnVILAPISession`` instance.
+        response_cache: A ``ResponseCache`` instance, or ``None`` if responses are not cached.
+        use_cache (bool): Whether to return cached responses for read-only calls.
         firecloud_entry_point (str): The entry point for the Firecloud API.
         rawls_entry_point (str): The entry point for the Rawls API.
         sam_entry_point (str): The entry point for the SAM API.
@@ -40,13 +56,19 @@ class AnVILAPIClient:
     rawls_entry_point = "https://rawls.dsde-prod.broadinstitute.org"
     sam_entry_point = "https://sam.dsde-prod.broadinstitute.org"
 
-    def __init__(self):
+    def __init__(self, use_cache=True):
         """Initialize a new AnVILAPIClient instance.
 
         If the ``auth_session`` attribute is ``None``, create a new ``AnVILAPISession`` using the crendetials file in
         ``settings.ANVIL_API_SERVICE_ACCOUNT_FILE. Store the ``AnVILAPISession`` in the ``auth_session`` class variable.
         This way, all instances should share the same authorized session.
+
+        Args:
+            use_cache (bool): Whether to return cached responses for read-only calls if ``ANVIL_API_RESPONSE_CACHE``
+                is set. Calls that change data on AnVIL invalidate cached responses either way.
         """
+        self.use_cache = use_cache
+        self.response_cache = ResponseCache.from_settings()
         if AnVILAPIClient.auth_session is None:
             credentials = service_account.Credentials.from_service_account_file(app_settings.API_SERVICE_ACCOUNT_FILE)
             scoped_credentials = credentials.with_scopes(
@@ -55,7 +77,68 @@ class AnVILAPIClient:
                     "https://www.googleapis.com/auth/userinfo.email",
                 ]
             )
-            AnVILAPIClient.auth_session = AnVILAPISession(scoped_credentials)
+            auth_session = AnVILAPISession(
+                scoped_credentials,
+                timeout=(app_settings.API_CONNECT_TIMEOUT, app_settings.API_READ_TIMEOUT),
+                retry_policy=RetryPolicy.from_settings(),
+            )
+            pool_sizes = app_settings.API_POOL_SIZES
+            rate_limits = app_settings.API_RATE_LIMITS
+            for name, url in self.get_entry_points().items():
+                auth_session.mount_entry_point(
+                    name,
+                    url,
+                    pool_sizes[name],
+                    pool_block=app_settings.API_POOL_BLOCK,
+                    rate_limiter=self._get_rate_limiter(name, rate_limits.get(name)),
+                )
+            AnVILAPIClient.auth_session = auth_session
+
+    def _get_rate_limiter(self, name, options):
+        """Create the rate limiter for an entry point from its ``ANVIL_API_RATE_LIMITS`` options."""
+        if not options:
+            return None
+        options = options.copy()
+        cache_alias = options.pop("cache", None)
+        if cache_alias:
+            return CacheRateLimiter(cache_alias=cache_alias, key="anvil_api_rate_limit:" + name, **options)
+        return TokenBucketRateLimiter(**options)
+
+    def get_entry_points(self):
+        """Get the entry points used by the client.
+
+        Returns:
+            dict: The URL of each entry point, keyed by name ("firecloud", "rawls", or "sam").
+        """
+        return {
+            "firecloud": self.firecloud_entry_point,
+            "rawls": self.rawls_entry_point,
+            "sam": self.sam_entry_point,
+        }
+
+    def get_pool_stats(self):
+        """Get statistics about the connection pool for each entry point.
+
+        Returns:
+            dict: See ``AnVILAPISession.get_pool_stats``.
+        """
+        return self.auth_session.get_pool_stats()
+
+    def _get(self, method_name, url, success_code, **kwargs):
+        """Make a GET request, using ``response_cache`` if caching is enabled for ``method_name``."""
+        if not self.use_cache or self.response_cache is None or not self.response_cache.is_cached(method_name):
+            return self.auth_session.get(url, success_code, **kwargs)
+        params = kwargs.get("params")
+        response = self.response_cache.get(method_name, url, params=params)
+        if response is None:
+            response = self.auth_session.get(url, success_code, **kwargs)
+            self.response_cache.set(method_name, url, response, params=params)
+        return response
+
+    def _invalidate_cache(self, *method_names):
+        """Invalidate cached responses for ``method_names`` after a request that changes data on AnVIL."""
+        if self.response_cache is not None:
+            self.response_cache.invalidate(*method_names)
 
     def status(self):
         """Get the current AnVIL status.
@@ -91,7 +174,7 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.sam_entry_point + "/api/users/v1/" + email
-        return self.auth_session.get(url, 200)
+        return self._get("get_user", url, 200)
 
     def get_billing_project(self, billing_project):
         """Get information about the specified billing project.
@@ -105,7 +188,7 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.rawls_entry_point + "/api/billing/v2/" + billing_project
-        return self.auth_session.get(url, 200)
+        return self._get("get_billing_project", url, 200)
 
     def get_billing_projects(self):
         """Get a list of available billing projects.
@@ -116,7 +199,7 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.rawls_entry_point + "/api/billing/v2"
-        return self.auth_session.get(url, 200)
+        return self._get("get_billing_projects", url, 200)
 
     def get_groups(self):
         """Get a list of groups that the authenticated account is part of.
@@ -127,7 +210,7 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.sam_entry_point + "/api/groups/v1"
-        return self.auth_session.get(url, 200)
+        return self._get("get_groups", url, 200)
 
     def get_group_members(self, group_name):
         """Get group members on AnVIL.
@@ -141,7 +224,7 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.sam_entry_point + "/api/groups/v1/" + group_name + "/member"
-        return self.auth_session.get(url, 200)
+        return self._get("get_group_members", url, 200)
 
     def get_group_admins(self, group_name):
         """Get group admins on AnVIL.
@@ -155,7 +238,7 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.sam_entry_point + "/api/groups/v1/" + group_name + "/admin"
-        return self.auth_session.get(url, 200)
+        return self._get("get_group_admins", url, 200)
 
     def get_group_email(self, group_name):
         """Get the email of a group on AnVIL.
@@ -169,7 +252,7 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.sam_entry_point + "/api/groups/v1/" + group_name
-        return self.auth_session.get(url, 200)
+        return self._get("get_group_email", url, 200)
 
     def create_group(self, group_name):
         """Create a new group on AnVIL.
@@ -183,7 +266,10 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.sam_entry_point + "/api/groups/v1/" + group_name
-        return self.auth_session.post(url, 201)
+        try:
+            return self.auth_session.post(url, 201)
+        finally:
+            self._invalidate_cache("get_groups")
 
     def delete_group(self, group_name):
         """Delete a group on AnVIL.
@@ -197,7 +283,10 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.sam_entry_point + "/api/groups/v1/" + group_name
-        return self.auth_session.delete(url, 204)
+        try:
+            return self.auth_session.delete(url, 204)
+        finally:
+            self._invalidate_cache("get_groups", "get_group_email", "get_group_members", "get_group_admins")
 
     def add_user_to_group(self, group_name, role, user_email):
         """Add a user to a group on AnVIL. You must be an admin of the group to use this method.
@@ -213,7 +302,11 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.sam_entry_point + "/api/groups/v1/" + group_name + "/" + role + "/" + user_email
-        return self.auth_session.put(url, 204)
+        # Adding a user who is already in the group has no effect, so this request can be retried.
+        try:
+            return self.auth_session.put(url, 204, retry=True)
+        finally:
+            self._invalidate_cache("get_groups", "get_group_members", "get_group_admins")
 
     def remove_user_from_group(self, group_name, role, user_email):
         """Remove a user from a group on AnVIL. You must be an admin of the group to use this method.
@@ -229,7 +322,11 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.sam_entry_point + "/api/groups/v1/" + group_name + "/" + role + "/" + user_email
-        return self.auth_session.delete(url, 204)
+        # Removing a user who is not in the group has no effect, so this request can be retried.
+        try:
+            return self.auth_session.delete(url, 204, retry=True)
+        finally:
+            self._invalidate_cache("get_groups", "get_group_members", "get_group_admins")
 
     def list_workspaces(self, fields=None):
         """Get a list of workspaces that you have access to on AnVIL.
@@ -245,9 +342,9 @@ class AnVILAPIClient:
         """
         url = self.rawls_entry_point + "/api/workspaces"
         if fields:
-            return self.auth_session.get(url, 200, params={"fields": fields})
+            return self._get("list_workspaces", url, 200, params={"fields": fields})
         else:
-            return self.auth_session.get(url, 200)
+            return self._get("list_workspaces", url, 200)
 
     def get_workspace(self, workspace_namespace, workspace_name, fields=None):
         """Get information about a specific workspace on AnVIL.
@@ -263,9 +360,9 @@ class AnVILAPIClient:
         """
         url = self.rawls_entry_point + "/api/workspaces/" + workspace_namespace + "/" + workspace_name
         if fields:
-            return self.auth_session.get(url, 200, params={"fields": fields})
+            return self._get("get_workspace", url, 200, params={"fields": fields})
         else:
-            return self.auth_session.get(url, 200)
+            return self._get("get_workspace", url, 200)
 
     def get_workspace_settings(self, workspace_namespace, workspace_name):
         """Get information about a specific workspace on AnVIL.
@@ -280,7 +377,7 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.rawls_entry_point + "/api/workspaces/v2/" + workspace_namespace + "/" + workspace_name + "/settings"
-        return self.auth_session.get(url, 200)
+        return self._get("get_workspace_settings", url, 200)
 
     def create_workspace(self, workspace_namespace, workspace_name, authorization_domains=[]):
         """Create a workspace on AnVIL.
@@ -310,7 +407,10 @@ class AnVILAPIClient:
             auth_domain = [{"membersGroupName": g} for g in authorization_domains]
             body["authorizationDomain"] = auth_domain
 
-        return self.auth_session.post(url, 201, json=body)
+        try:
+            return self.auth_session.post(url, 201, json=body)
+        finally:
+            self._invalidate_cache("list_workspaces", "get_workspace")
 
     def clone_workspace(
         self,
@@ -359,7 +459,10 @@ class AnVILAPIClient:
             auth_domain = [{"membersGroupName": g} for g in authorization_domains]
             body["authorizationDomain"] = auth_domain
 
-        return self.auth_session.post(url, 201, json=body)
+        try:
+            return self.auth_session.post(url, 201, json=body)
+        finally:
+            self._invalidate_cache("list_workspaces", "get_workspace")
 
     def delete_workspace(self, workspace_namespace, workspace_name):
         """Delete a workspace on AnVIL. You must be an owner of the workspace to use this method.
@@ -374,7 +477,10 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.rawls_entry_point + "/api/workspaces/" + workspace_namespace + "/" + workspace_name
-        return self.auth_session.delete(url, 202)
+        try:
+            return self.auth_session.delete(url, 202)
+        finally:
+            self._invalidate_cache("list_workspaces", "get_workspace", "get_workspace_acl", "get_workspace_settings")
 
     def get_workspace_acl(self, workspace_namespace, workspace_name):
         """Get the list of access controls for the workspace.
@@ -391,7 +497,7 @@ class AnVILAPIClient:
             requests.Response
         """
         url = self.rawls_entry_point + "/api/workspaces/" + workspace_namespace + "/" + workspace_name + "/acl"
-        return self.auth_session.get(url, 200)
+        return self._get("get_workspace_acl", url, 200)
 
     def update_workspace_acl(self, workspace_namespace, workspace_name, acl_updates):
         """Update the access controls for a workspace for a set of users and/or groups.
@@ -413,7 +519,13 @@ class AnVILAPIClient:
         )
         # False here means do not invite unregistered users.
         updates = json.dumps(acl_updates)
-        return self.auth_session.patch(url, 200, headers={"Content-type": "application/json"}, data=updates)
+        # The same ACL updates can be applied more than once, so this request can be retried.
+        try:
+            return self.auth_session.patch(
+                url, 200, headers={"Content-type": "application/json"}, data=updates, retry=True
+            )
+        finally:
+            self._invalidate_cache("list_workspaces", "get_workspace", "get_workspace_acl")
 
     def update_workspace_requester_pays(self, workspace_namespace, workspace_name, requester_pays):
         """Update the requester pays setting for a workspace.
@@ -430,21 +542,569 @@ class AnVILAPIClient:
         """
         url = self.rawls_entry_point + "/api/workspaces/v2/{}/{}/settings".format(workspace_namespace, workspace_name)
         setting = [{"config": {"enabled": requester_pays}, "settingType": "GcpBucketRequesterPays"}]
-        return self.auth_session.put(url, 200, headers={"Content-type": "application/json"}, data=json.dumps(setting))
+        try:
+            return self.auth_session.put(
+                url, 200, headers={"Content-type": "application/json"}, data=json.dumps(setting), retry=True
+            )
+        finally:
+            self._invalidate_cache("get_workspace_settings")
+
+
+class AsyncAnVILAPIClient:
+    """Asynchronous client for calling the AnVIL API.
+
+    This client has the same methods as ``AnVILAPIClient``, but each method is a coroutine. Requests are made with the
+    shared ``AnVILAPISession`` of ``AnVILAPIClient`` in a pool of worker threads, so they use the same credentials,
+    connection pool, logging, and ``AnVILAPIError`` exceptions as synchronous calls. This allows many requests to be
+    made concurrently from one process, e.g.:
+
+        async with AsyncAnVILAPIClient(max_concurrency=20) as client:
+            responses = await asyncio.gather(*[client.get_group_members(name) for name in group_names])
+
+    Attributes:
+        client: The ``AnVILAPIClient`` instance used to make requests.
+        max_concurrency (int): The maximum number of requests that can be in progress at the same time.
+    """
+
+    def __init__(self, max_concurrency=10):
+        """Initialize a new AsyncAnVILAPIClient instance.
+
+        Args:
+            max_concurrency (int): The maximum number of requests that can be in progress at the same time. Additional
+                requests wait until an earlier request has finished.
+        """
+        if not isinstance(max_concurrency, int) or max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive integer.")
+        self.client = AnVILAPIClient()
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="anvil_api")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    def close(self):
+        """Shut down the worker threads after any pending requests have finished.
+
+        This blocks until pending requests have finished, so use ``aclose`` from within an event loop.
+        """
+        self._executor.shutdown(wait=True)
+
+    async def aclose(self):
+        """Shut down the worker threads after any pending requests have finished, without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+
+    async def _call(self, method, *args, **kwargs):
+        """Call a method of ``AnVILAPIClient`` in a worker thread and return its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    async def status(self):
+        """See ``AnVILAPIClient.status``."""
+        return await self._call(self.client.status)
+
+    async def me(self):
+        """See ``AnVILAPIClient.me``."""
+        return await self._call(self.client.me)
+
+    async def get_user(self, email):
+        """See ``AnVILAPIClient.get_user``."""
+        return await self._call(self.client.get_user, email)
+
+    async def get_billing_project(self, billing_project):
+        """See ``AnVILAPIClient.get_billing_project``."""
+        return await self._call(self.client.get_billing_project, billing_project)
+
+    async def get_billing_projects(self):
+        """See ``AnVILAPIClient.get_billing_projects``."""
+        return await self._call(self.client.get_billing_projects)
+
+    async def get_groups(self):
+        """See ``AnVILAPIClient.get_groups``."""
+        return await self._call(self.client.get_groups)
+
+    async def get_group_members(self, group_name):
+        """See ``AnVILAPIClient.get_group_members``."""
+        return await self._call(self.client.get_group_members, group_name)
+
+    async def get_group_admins(self, group_name):
+        """See ``AnVILAPIClient.get_group_admins``."""
+        return await self._call(self.client.get_group_admins, group_name)
+
+    async def get_group_email(self, group_name):
+        """See ``AnVILAPIClient.get_group_email``."""
+        return await self._call(self.client.get_group_email, group_name)
+
+    async def create_group(self, group_name):
+        """See ``AnVILAPIClient.create_group``."""
+        return await self._call(self.client.create_group, group_name)
+
+    async def delete_group(self, group_name):
+        """See ``AnVILAPIClient.delete_group``."""
+        return await self._call(self.client.delete_group, group_name)
+
+    async def add_user_to_group(self, group_name, role, user_email):
+        """See ``AnVILAPIClient.add_user_to_group``."""
+        return await self._call(self.client.add_user_to_group, group_name, role, user_email)
+
+    async def remove_user_from_group(self, group_name, role, user_email):
+        """See ``AnVILAPIClient.remove_user_from_group``."""
+        return await self._call(self.client.remove_user_from_group, group_name, role, user_email)
+
+    async def list_workspaces(self, fields=None):
+        """See ``AnVILAPIClient.list_workspaces``."""
+        return await self._call(self.client.list_workspaces, fields=fields)
+
+    async def get_workspace(self, workspace_namespace, workspace_name, fields=None):
+        """See ``AnVILAPIClient.get_workspace``."""
+        return await self._call(self.client.get_workspace, workspace_namespace, workspace_name, fields=fields)
+
+    async def get_workspace_settings(self, workspace_namespace, workspace_name):
+        """See ``AnVILAPIClient.get_workspace_settings``."""
+        return await self._call(self.client.get_workspace_settings, workspace_namespace, workspace_name)
+
+    async def create_workspace(self, workspace_namespace, workspace_name, authorization_domains=[]):
+        """See ``AnVILAPIClient.create_workspace``."""
+        return await self._call(
+            self.client.create_workspace,
+            workspace_namespace,
+            workspace_name,
+            authorization_domains=authorization_domains,
+        )
+
+    async def clone_workspace(
+        self,
+        existing_workspace_namespace,
+        existing_workspace_name,
+        cloned_workspace_namespace,
+        cloned_workspace_name,
+        authorization_domains=[],
+        copy_files_with_prefix=None,
+    ):
+        """See ``AnVILAPIClient.clone_workspace``."""
+        return await self._call(
+            self.client.clone_workspace,
+            existing_workspace_namespace,
+            existing_workspace_name,
+            cloned_workspace_namespace,
+            cloned_workspace_name,
+            authorization_domains=authorization_domains,
+            copy_files_with_prefix=copy_files_with_prefix,
+        )
+
+    async def delete_workspace(self, workspace_namespace, workspace_name):
+        """See ``AnVILAPIClient.delete_workspace``."""
+        return await self._call(self.client.delete_workspace, workspace_namespace, workspace_name)
+
+    async def get_workspace_acl(self, workspace_namespace, workspace_name):
+        """See ``AnVILAPIClient.get_workspace_acl``."""
+        return await self._call(self.client.get_workspace_acl, workspace_namespace, workspace_name)
+
+    async def update_workspace_acl(self, workspace_namespace, workspace_name, acl_updates):
+        """See ``AnVILAPIClient.update_workspace_acl``."""
+        return await self._call(self.client.update_workspace_acl, workspace_namespace, workspace_name, acl_updates)
+
+    async def update_workspace_requester_pays(self, workspace_namespace, workspace_name, requester_pays):
+        """See ``AnVILAPIClient.update_workspace_requester_pays``."""
+        return await self._call(
+            self.client.update_workspace_requester_pays, workspace_namespace, workspace_name, requester_pays
+        )
+
+
+class RetryPolicy:
+    """Policy for retrying AnVIL API requests that fail with a transient error.
+
+    A request is retried if the response has one of ``status_codes`` or if the connection fails or times out. The
+    delay before each retry grows exponentially with "full jitter" (a random delay between zero and
+    ``backoff_factor * 2 ** (retry - 1)`` seconds, capped at ``max_backoff``). If the response has a ``Retry-After``
+    header, that delay is used instead, also capped at ``max_backoff``. Requests are not retried once ``max_retries``
+    retries have been made or if the next retry would start more than ``max_elapsed_time`` seconds after the first
+    attempt. The defaults keep the total wait short, since requests are often made while handling a web request; use
+    longer limits in ``ANVIL_API_RETRY`` for sites that mostly make requests from management commands or audits.
+
+    Attributes:
+        max_retries (int): The maximum number of times to retry a request.
+        status_codes (tuple): Response status codes that should be retried.
+        methods (tuple): HTTP methods that are retried by default. Other requests are only retried if they are made
+            with ``retry=True``.
+        backoff_factor (float): The base delay in seconds for exponential backoff.
+        max_backoff (float): The maximum delay in seconds before a retry.
+        max_elapsed_time (float): The maximum time in seconds from the first attempt to the start of a retry.
+        on_retry (callable): If set, called with a dictionary describing each retry, e.g. to record metrics.
+    """
+
+    def __init__(
+        self,
+        max_retries=3,
+        status_codes=(429, 500, 502, 503, 504),
+        methods=("GET",),
+        backoff_factor=1,
+        max_backoff=10,
+        max_elapsed_time=30,
+        on_retry=None,
+    ):
+        if not isinstance(max_retries, int) or max_retries < 0:
+            raise ValueError("max_retries must be a non-negative integer.")
+        self.max_retries = max_retries
+        self.status_codes = tuple(status_codes)
+        self.methods = tuple(method.upper() for method in methods)
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_elapsed_time = max_elapsed_time
+        if isinstance(on_retry, str):
+            on_retry = import_string(on_retry)
+        self.on_retry = on_retry
+
+    @classmethod
+    def from_settings(cls):
+        """Create a ``RetryPolicy`` using the ``ANVIL_API_RETRY`` setting."""
+        return cls(**app_settings.API_RETRY)
+
+    def get_delay(self, retry, response=None):
+        """Get the number of seconds to wait before a retry.
+
+        Args:
+            retry (int): The number of the retry, starting from 1.
+            response (requests.Response, optional): The response that failed, if any.
+
+        Returns:
+            float
+        """
+        if response is not None:
+            retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(self.max_backoff, retry_after)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** (retry - 1)))
+
+    def _parse_retry_after(self, value):
+        """Parse a ``Retry-After`` header, which is either a number of seconds or an HTTP date."""
+        if not value:
+            return None
+        try:
+            return max(0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        # Dates with a "-0000" zone are parsed as naive datetimes, but HTTP dates are always in UTC.
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+        return max(0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class ResponseCache:
+    """Cache for responses from read-only AnVIL API calls, stored in a Django cache.
+
+    Responses are cached by client method name, URL, and query parameters. Each method has its own time to live.
+    Instead of deleting individual keys, ``invalidate`` increments a version number for a method that is part of its
+    cache keys, so that all cached responses for that method are invalidated at once, whatever their arguments.
+    Version numbers start from the current time, so if a version key is evicted from the cache, the new version is
+    still later than any version that responses were cached under before.
+
+    Only the status code, headers, content, URL, and encoding of a response are cached. The request is not cached,
+    since it includes the ``Authorization`` header with the service account's access token.
+
+    Attributes:
+        cache_alias (str): The name of the Django cache to use.
+        ttls (dict): The number of seconds to cache responses for, keyed by ``AnVILAPIClient`` method name. Methods
+            that are not included are not cached.
+    """
+
+    key_prefix = "anvil_api_response"
+
+    def __init__(self, cache_alias, ttls):
+        self.cache_alias = cache_alias
+        self.ttls = ttls
+
+    @classmethod
+    def from_settings(cls):
+        """Create a ``ResponseCache`` using the ``ANVIL_API_RESPONSE_CACHE`` settings, or return ``None`` if it is not
+        set."""
+        cache_alias = app_settings.API_RESPONSE_CACHE
+        if not cache_alias:
+            return None
+        return cls(cache_alias, app_settings.API_RESPONSE_CACHE_TTLS)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def is_cached(self, method_name):
+        """Check whether responses for ``method_name`` are cached."""
+        return method_name in self.ttls
+
+    def _get_version_key(self, method_name):
+        return "{}_version:{}".format(self.key_prefix, method_name)
+
+    def _get_version(self, method_name):
+        version_key = self._get_version_key(method_name)
+        version = self.cache.get(version_key)
+        if version is None:
+            # Use add so that a version set by another process at the same time is not overwritten.
+            self.cache.add(version_key, time.time_ns(), timeout=None)
+            version = self.cache.get(version_key)
+        return version
+
+    def _get_key(self, method_name, url, params=None):
+        version = self._get_version(method_name)
+        url_hash = hashlib.sha256(json.dumps([url, params], sort_keys=True).encode()).hexdigest()
+        return "{}:{}:{}:{}".format(self.key_prefix, method_name, version, url_hash)
+
+    def get(self, method_name, url, params=None):
+        """Get a cached response, or ``None`` if there is no cached response."""
+        data = self.cache.get(self._get_key(method_name, url, params=params))
+        if data is None:
+            return None
+        logger.debug("Using cached response for {} {}".format(method_name, url))
+        response = requests.Response()
+        response.status_code = data["status_code"]
+        response.headers.update(data["headers"])
+        response._content = data["content"]
+        response.url = data["url"]
+        response.encoding = data["encoding"]
+        return response
+
+    def set(self, method_name, url, response, params=None):
+        """Cache a response, without the request that it was made with."""
+        data = {
+            "status_code": response.status_code,
+            "headers": dict(response.headers),
+            "content": response.content,
+            "url": response.url,
+            "encoding": response.encoding,
+        }
+        self.cache.set(self._get_key(method_name, url, params=params), data, timeout=self.ttls[method_name])
+
+    def invalidate(self, *method_names):
+        """Invalidate all cached responses for ``method_names``."""
+        for method_name in method_names:
+            version_key = self._get_version_key(method_name)
+            try:
+                self.cache.incr(version_key)
+            except ValueError:
+                # The version key does not exist yet or was evicted.
+                self.cache.set(version_key, time.time_ns(), timeout=None)
+
+
+class TokenBucketRateLimiter:
+    """Thread-safe token bucket rate limiter.
+
+    The bucket holds up to ``burst`` tokens and is refilled at ``rate`` tokens per second. Each request takes one
+    token, waiting until a token is available if the bucket is empty. One instance can be shared by all threads in a
+    process.
+
+    Attributes:
+        rate (float): The average number of requests allowed per second.
+        burst (int): The maximum number of requests that can be made at once after a period of no requests.
+    """
+
+    def __init__(self, rate, burst=None):
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            raise ValueError("rate must be a positive number.")
+        if burst is None:
+            burst = max(1, math.ceil(rate))
+        if not isinstance(burst, int) or burst < 1:
+            raise ValueError("burst must be a positive integer.")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting until one is available.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve a token now, so that waiting threads are served in the order they arrived.
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class CacheRateLimiter:
+    """Rate limiter that stores request counts in a Django cache, so that the limit is shared by all processes.
+
+    Time is split into windows of ``burst / rate`` seconds, and at most ``burst`` requests can be made in each window.
+    Requests over the limit wait until the next window starts. The cache must support atomic ``add`` and ``incr``
+    (e.g., Redis or Memcached) for the limit to be enforced exactly across processes.
+
+    Attributes:
+        rate (float): The average number of requests allowed per second.
+        burst (int): The maximum number of requests that can be made in one window.
+        cache_alias (str): The name of the cache to use.
+        key (str): The prefix for cache keys used by this rate limiter.
+    """
+
+    def __init__(self, rate, burst=None, cache_alias="default", key="anvil_api_rate_limit"):
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            raise ValueError("rate must be a positive number.")
+        if burst is None:
+            burst = max(1, math.ceil(rate))
+        if not isinstance(burst, int) or burst < 1:
+            raise ValueError("burst must be a positive integer.")
+        self.rate = rate
+        self.burst = burst
+        self.cache_alias = cache_alias
+        self.key = key
+        self.window = burst / rate
+
+    def acquire(self):
+        """Count a request in the current window, waiting for a later window if the current one is full.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        cache = caches[self.cache_alias]
+        timeout = math.ceil(self.window) + 1
+        waited = 0
+        while True:
+            # Use wall clock time, since it is shared by all processes.
+            now = time.time()
+            window_index = int(now // self.window)
+            key = "{}:{}".format(self.key, window_index)
+            cache.add(key, 0, timeout=timeout)
+            try:
+                count = cache.incr(key)
+            except ValueError:
+                # The key expired between add and incr.
+                cache.add(key, 1, timeout=timeout)
+                count = 1
+            if count <= self.burst:
+                return waited
+            delay = (window_index + 1) * self.window - now
+            time.sleep(delay)
+            waited += delay
 
 
 class AnVILAPISession(AuthorizedSession):
     """An authorized session for use with the AnVIL API.
 
     Attributes:
-        entry_point (str): The API entry point.
+        timeout (tuple): The default (connect, read) timeout in seconds for requests that do not specify one.
+        retry_policy (RetryPolicy): The policy for retrying requests that fail with a transient error.
+        entry_point_adapters (dict): The ``HTTPAdapter`` mounted for each entry point, keyed by entry point name.
+        entry_point_pool_sizes (dict): The maximum number of pooled connections for each entry point, keyed by entry
+            point name.
+        entry_point_rate_limiters (dict): The rate limiter for each entry point that has one, keyed by entry point
+            name.
     """
 
+    def __init__(self, credentials, timeout=None, retry_policy=None, **kwargs):
+        """Create a new ``AnVILAPISession``.
+
+        Args:
+            credentials: The credentials to use for authorizing requests.
+            timeout (float or tuple, optional): The default timeout for requests, passed to
+                ``AuthorizedSession.request``. If not provided, the ``AuthorizedSession`` default is used.
+            retry_policy (RetryPolicy, optional): The policy for retrying requests. If not provided, requests are not
+                retried.
+            **kwargs: Passed to ``AuthorizedSession``.
+        """
+        super().__init__(credentials, **kwargs)
+        self.timeout = timeout
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy(max_retries=0)
+        self.entry_point_adapters = {}
+        self.entry_point_pool_sizes = {}
+        self.entry_point_rate_limiters = {}
+        self._entry_point_prefixes = {}
+
+    def request(self, method, url, *args, **kwargs):
+        """Make a request, using the default ``timeout`` if one is not provided.
+
+        If the entry point for ``url`` has a rate limiter, wait until the rate limiter allows the request."""
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        rate_limiter = self._get_rate_limiter(url)
+        if rate_limiter is not None:
+            waited = rate_limiter.acquire()
+            if waited:
+                logger.debug("Waited {:.3f}s for rate limiter before {} {}".format(waited, method, url))
+        return super().request(method, url, *args, **kwargs)
+
+    def _get_rate_limiter(self, url):
+        """Get the rate limiter for the entry point of ``url``, if any."""
+        for name, rate_limiter in self.entry_point_rate_limiters.items():
+            if url.startswith(self._entry_point_prefixes[name]):
+                return rate_limiter
+        return None
+
+    def mount_entry_point(self, name, url, pool_maxsize, pool_block=False, rate_limiter=None):
+        """Mount an ``HTTPAdapter`` with its own connection pool for requests to an entry point.
+
+        Args:
+            name (str): A name for the entry point, used in ``get_pool_stats``.
+            url (str): The URL of the entry point.
+            pool_maxsize (int): The maximum number of connections to keep in the pool.
+            pool_block (bool): Whether to wait for a free connection when all connections in the pool are in use.
+            rate_limiter (optional): A ``TokenBucketRateLimiter`` or ``CacheRateLimiter`` to limit the rate of
+                requests to the entry point.
+        """
+        prefix = url.rstrip("/") + "/"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.mount(prefix, adapter)
+        self.entry_point_adapters[name] = adapter
+        self.entry_point_pool_sizes[name] = pool_maxsize
+        self._entry_point_prefixes[name] = prefix
+        if rate_limiter is not None:
+            self.entry_point_rate_limiters[name] = rate_limiter
+
+    def get_pool_stats(self):
+        """Get statistics about the connection pool for each entry point.
+
+        Returns:
+            dict: A dictionary keyed by entry point name. Each value is a dictionary with the keys:
+                ``pool_maxsize``: the maximum number of connections kept in the pool;
+                ``num_connections``: the number of connections that have been opened;
+                ``num_requests``: the number of requests that have been made;
+                ``idle_connections``: the number of open connections that are waiting in the pool to be reused.
+
+            The connection counts are read from the urllib3 connection pools, and are 0 if they are not available in
+            the installed version of urllib3.
+        """
+        stats = {}
+        for name, adapter in self.entry_point_adapters.items():
+            entry_point_stats = {
+                "pool_maxsize": self.entry_point_pool_sizes[name],
+                "num_connections": 0,
+                "num_requests": 0,
+                "idle_connections": 0,
+            }
+            pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+            keys = pools.keys() if pools is not None else []
+            for key in keys:
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                entry_point_stats["num_connections"] += getattr(pool, "num_connections", 0)
+                entry_point_stats["num_requests"] += getattr(pool, "num_requests", 0)
+                # The pool queue is filled with None placeholders for connections that have not been opened yet.
+                queue = getattr(getattr(pool, "pool", None), "queue", None)
+                if queue is not None:
+                    entry_point_stats["idle_connections"] += len([x for x in list(queue) if x is not None])
+            stats[name] = entry_point_stats
+        return stats
+
     def get(self, url, success_code=None, *args, **kwargs):
         """Make a get request to the specified method after prepending ``entry_point``.
 
         Add the request and the response to the log.
 
+        If the request fails with a transient error, retry it as allowed by ``retry_policy``. Pass ``retry=True`` or
+        ``retry=False`` to override whether the policy allows this request to be retried.
+
         If ``success_code`` is not ``None``, check that the response code matches ``success_code``. If they do not
         match, raise an ``AnVILAPIError`` exception (or one of its subclasses).
 
@@ -461,18 +1121,16 @@ class AnVILAPISession(AuthorizedSession):
             AnVILAPIError: If the response code is not the expected ``success_code``. May be a subclass based on the
             response code (e.g., ``AnVILAPIError404``).
         """
-        self._log_request("GET", url, *args, **kwargs)
-        response = super().get(url, *args, **kwargs)
-        self._log_response(response)
-        if success_code is not None:
-            self._handle_response(success_code, response)
-        return response
+        return self._request_with_retries("GET", super().get, url, success_code, *args, **kwargs)
 
     def post(self, url, success_code=None, *args, **kwargs):
         """Make a post request to the specified method after prepending ``entry_point``.
 
         Add the request and the response to the log.
 
+        If the request fails with a transient error, retry it as allowed by ``retry_policy``. Pass ``retry=True`` or
+        ``retry=False`` to override whether the policy allows this request to be retried.
+
         If ``success_code`` is not ``None``, check that the response code matches ``success_code``. If they do not
         match, raise an ``AnVILAPIError`` exception (or one of its subclasses).
 
@@ -489,18 +1147,16 @@ class AnVILAPISession(AuthorizedSession):
             AnVILAPIError: If the response code is not the expected ``success_code``. May be a subclass based on the
             response code (e.g., ``AnVILAPIError404``).
         """
-        self._log_request("POST", url, *args, **kwargs)
-        response = super().post(url, *args, **kwargs)
-        self._log_response(response)
-        if success_code is not None:
-            self._handle_response(success_code, response)
-        return response
+        return self._request_with_retries("POST", super().post, url, success_code, *args, **kwargs)
 
     def delete(self, url, success_code=None, *args, **kwargs):
         """Make a delete request to the specified method after prepending ``entry_point``.
 
         Add the request and the response to the log.
 
+        If the request fails with a transient error, retry it as allowed by ``retry_policy``. Pass ``retry=True`` or
+        ``retry=False`` to override whether the policy allows this request to be retried.
+
         If ``success_code`` is not ``None``, check that the response code matches ``success_code``. If they do not
         match, raise an ``AnVILAPIError`` exception (or one of its subclasses).
 
@@ -517,18 +1173,16 @@ class AnVILAPISession(AuthorizedSession):
             AnVILAPIError: If the response code is not the expected ``success_code``. May be a subclass based on the
             response code (e.g., ``AnVILAPIError404``).
         """
-        self._log_request("DELETE", url, *args, **kwargs)
-        response = super().delete(url, *args, **kwargs)
-        self._log_response(response)
-        if success_code is not None:
-            self._handle_response(success_code, response)
-        return response
+        return self._request_with_retries("DELETE", super().delete, url, success_code, *args, **kwargs)
 
     def patch(self, url, success_code=None, *args, **kwargs):
         """Make a patch request to the specified method after prepending ``entry_point``.
 
         Add the request and the response to the log.
 
+        If the request fails with a transient error, retry it as allowed by ``retry_policy``. Pass ``retry=True`` or
+        ``retry=False`` to override whether the policy allows this request to be retried.
+
         If ``success_code`` is not ``None``, check that the response code matches ``success_code``. If they do not
         match, raise an ``AnVILAPIError`` exception (or one of its subclasses).
 
@@ -545,16 +1199,14 @@ class AnVILAPISession(AuthorizedSession):
             AnVILAPIError: If the response code is not the expected ``success_code``. May be a subclass based on the
             response code (e.g., ``AnVILAPIError404``).
         """
-        self._log_request("PATCH", url, *args, **kwargs)
-        response = super().patch(url, *args, **kwargs)
-        self._log_response(response)
-        if success_code is not None:
-            self._handle_response(success_code, response)
-        return response
+        return self._request_with_retries("PATCH", super().patch, url, success_code, *args, **kwargs)
 
     def put(self, url, success_code=None, *args, **kwargs):
         """Make a put request to the specified method after prepending ``entry_point``.
 
+        If the request fails with a transient error, retry it as allowed by ``retry_policy``. Pass ``retry=True`` or
+        ``retry=False`` to override whether the policy allows this request to be retried.
+
         If ``success_code`` is not ``None``, check that the response code matches ``success_code``. If they do not
         match, raise an ``AnVILAPIError`` exception (or one of its subclasses).
 
@@ -571,13 +1223,58 @@ class AnVILAPISession(AuthorizedSession):
             AnVILAPIError: If the response code is not the expected ``success_code``. May be a subclass based on the
             response code (e.g., ``AnVILAPIError404``).
         """
-        self._log_request("PUT", url, *args, **kwargs)
-        response = super().put(url, *args, **kwargs)
-        self._log_response(response)
+        return self._request_with_retries("PUT", super().put, url, success_code, *args, **kwargs)
+
+    def _request_with_retries(self, request_type, send, url, success_code, *args, retry=None, **kwargs):
+        """Send a request, retrying it as allowed by ``retry_policy``, and check the response code."""
+        policy = self.retry_policy
+        if retry is None:
+            retry = request_type in policy.methods
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            self._log_request(request_type, url, *args, **kwargs)
+            try:
+                response = send(url, *args, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not retry or not self._retry(request_type, url, attempt, start, exception=e):
+                    raise
+                continue
+            self._log_response(response)
+            if retry and response.status_code in policy.status_codes and response.status_code != success_code:
+                if self._retry(request_type, url, attempt, start, response=response):
+                    continue
+            break
         if success_code is not None:
             self._handle_response(success_code, response)
         return response
 
+    def _retry(self, request_type, url, attempt, start, response=None, exception=None):
+        """Wait before retrying a failed request. Returns ``False`` if the request should not be retried."""
+        policy = self.retry_policy
+        if attempt > policy.max_retries:
+            return False
+        delay = policy.get_delay(attempt, response=response)
+        elapsed = time.monotonic() - start
+        if elapsed + delay > policy.max_elapsed_time:
+            return False
+        retry_info = {
+            "method": request_type,
+            "url": url,
+            "retry": attempt,
+            "status_code": response.status_code if response is not None else None,
+            "error": repr(exception) if exception is not None else None,
+            "delay": delay,
+            "elapsed": elapsed,
+        }
+        msg = "Retrying {method} {url} in {delay:.1f}s (retry {retry}, status_code: {status_code}, error: {error})"
+        logger.warning(msg.format(**retry_info), extra={"anvil_api_retry": retry_info})
+        if policy.on_retry is not None:
+            policy.on_retry(retry_info)
+        time.sleep(delay)
+        return True
+
     def _log_request(self, request_type, url, *args, **kwargs):
         """Log info about the request."""
         msg = "Starting request...\n  {request_type}: {url}\n  args: {args}\n  kwargs: {kwargs}".format(
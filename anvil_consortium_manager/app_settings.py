@@ -55,6 +55,188 @@ class AppSettings(object):
             raise ImproperlyConfigured("ANVIL_AUDIT_CACHE is required in settings.py")
         return x
 
+    @property
+    def AUDIT_WORKERS(self):
+        """Number of threads to use for making concurrent AnVIL API calls during audits. Default: 1 (serial)."""
+        x = self._setting("AUDIT_WORKERS", 1)
+        if not isinstance(x, int) or x < 1:
+            raise ImproperlyConfigured("ANVIL_AUDIT_WORKERS must be a positive integer.")
+        return x
+
+    @property
+    def BULK_WORKERS(self):
+        """Number of threads to use for making concurrent AnVIL API calls in bulk operations. Default: 1 (serial)."""
+        x = self._setting("BULK_WORKERS", 1)
+        if not isinstance(x, int) or x < 1:
+            raise ImproperlyConfigured("ANVIL_BULK_WORKERS must be a positive integer.")
+        return x
+
+    @property
+    def API_POOL_SIZES(self):
+        """Maximum number of pooled connections to keep open to each AnVIL API entry point.
+
+        A dictionary keyed by entry point ("firecloud", "rawls", or "sam"). Entry points that are not specified use
+        the default. Set these to at least the number of threads making concurrent API calls (e.g.,
+        ``ANVIL_AUDIT_WORKERS``) so that connections are reused instead of being opened for each request.
+        Default: 10 for each entry point.
+        """
+        x = self._setting("API_POOL_SIZES", {})
+        if not isinstance(x, dict):
+            raise ImproperlyConfigured("ANVIL_API_POOL_SIZES must be a dictionary.")
+        pool_sizes = {"firecloud": 10, "rawls": 10, "sam": 10}
+        for key, value in x.items():
+            if key not in pool_sizes:
+                raise ImproperlyConfigured(
+                    "ANVIL_API_POOL_SIZES keys must be one of: {}.".format(", ".join(sorted(pool_sizes)))
+                )
+            if not isinstance(value, int) or value < 1:
+                raise ImproperlyConfigured("ANVIL_API_POOL_SIZES values must be positive integers.")
+            pool_sizes[key] = value
+        return pool_sizes
+
+    @property
+    def API_POOL_BLOCK(self):
+        """Whether to wait for a pooled connection when all connections to an entry point are in use, instead of
+        opening a new connection that is discarded afterwards. Default: False."""
+        return self._setting("API_POOL_BLOCK", False)
+
+    @property
+    def API_CONNECT_TIMEOUT(self):
+        """Number of seconds to wait when connecting to the AnVIL API. Default: 10."""
+        x = self._setting("API_CONNECT_TIMEOUT", 10)
+        if not isinstance(x, (int, float)) or x <= 0:
+            raise ImproperlyConfigured("ANVIL_API_CONNECT_TIMEOUT must be a positive number.")
+        return x
+
+    @property
+    def API_READ_TIMEOUT(self):
+        """Number of seconds to wait for the AnVIL API to send a response. Default: 120."""
+        x = self._setting("API_READ_TIMEOUT", 120)
+        if not isinstance(x, (int, float)) or x <= 0:
+            raise ImproperlyConfigured("ANVIL_API_READ_TIMEOUT must be a positive number.")
+        return x
+
+    @property
+    def API_RETRY(self):
+        """Options for retrying AnVIL API requests that fail with a transient error.
+
+        A dictionary of keyword arguments for ``anvil_consortium_manager.anvil_api.RetryPolicy``: ``max_retries``,
+        ``status_codes``, ``methods``, ``backoff_factor``, ``max_backoff``, ``max_elapsed_time``, and ``on_retry``
+        (a callable or its dotted path). Options that are not specified use the ``RetryPolicy`` defaults.
+        Default: {}.
+        """
+        x = self._setting("API_RETRY", {})
+        if not isinstance(x, dict):
+            raise ImproperlyConfigured("ANVIL_API_RETRY must be a dictionary.")
+        allowed_keys = {
+            "max_retries",
+            "status_codes",
+            "methods",
+            "backoff_factor",
+            "max_backoff",
+            "max_elapsed_time",
+            "on_retry",
+        }
+        unknown_keys = set(x) - allowed_keys
+        if unknown_keys:
+            raise ImproperlyConfigured("ANVIL_API_RETRY has unknown keys: {}.".format(", ".join(sorted(unknown_keys))))
+        return x
+
+    @property
+    def API_RATE_LIMITS(self):
+        """Client-side rate limits for requests to each AnVIL API entry point.
+
+        A dictionary keyed by entry point ("firecloud", "rawls", or "sam"). Each value is a dictionary with the keys
+        ``rate`` (average requests per second; required), ``burst`` (maximum requests at once; optional), and
+        ``cache`` (optional). If ``cache`` is set to the name of a cache, the limit is shared by all processes using
+        that cache; otherwise it is shared by all threads in a process. Entry points that are not specified are not
+        rate limited. Default: {}.
+        """
+        x = self._setting("API_RATE_LIMITS", {})
+        if not isinstance(x, dict):
+            raise ImproperlyConfigured("ANVIL_API_RATE_LIMITS must be a dictionary.")
+        for key, value in x.items():
+            if key not in ("firecloud", "rawls", "sam"):
+                raise ImproperlyConfigured("ANVIL_API_RATE_LIMITS keys must be one of: firecloud, rawls, sam.")
+            if not isinstance(value, dict) or "rate" not in value:
+                raise ImproperlyConfigured("ANVIL_API_RATE_LIMITS values must be dictionaries with a rate key.")
+            unknown_keys = set(value) - {"rate", "burst", "cache"}
+            if unknown_keys:
+                raise ImproperlyConfigured(
+                    "ANVIL_API_RATE_LIMITS has unknown keys: {}.".format(", ".join(sorted(unknown_keys)))
+                )
+        return x
+
+    @property
+    def API_RESPONSE_CACHE(self):
+        """Name of the cache to use for caching responses from read-only AnVIL API calls. If not set, responses are
+        not cached. Default: None."""
+        return self._setting("API_RESPONSE_CACHE", None)
+
+    @property
+    def API_RESPONSE_CACHE_TTLS(self):
+        """Number of seconds to cache responses for, keyed by ``AnVILAPIClient`` method name.
+
+        Only read-only methods can be cached. Methods that are not included are not cached. Default:
+        ``{"get_billing_projects": 60, "get_groups": 60, "list_workspaces": 60}``.
+        """
+        x = self._setting(
+            "API_RESPONSE_CACHE_TTLS", {"get_billing_projects": 60, "get_groups": 60, "list_workspaces": 60}
+        )
+        if not isinstance(x, dict):
+            raise ImproperlyConfigured("ANVIL_API_RESPONSE_CACHE_TTLS must be a dictionary.")
+        cacheable_methods = {
+            "get_user",
+            "get_billing_project",
+            "get_billing_projects",
+            "get_groups",
+            "get_group_members",
+            "get_group_admins",
+            "get_group_email",
+            "list_workspaces",
+            "get_workspace",
+            "get_workspace_settings",
+            "get_workspace_acl",
+        }
+        unknown_keys = set(x) - cacheable_methods
+        if unknown_keys:
+            raise ImproperlyConfigured(
+                "ANVIL_API_RESPONSE_CACHE_TTLS has methods that cannot be cached: {}.".format(
+                    ", ".join(sorted(unknown_keys))
+                )
+            )
+        return x
+
+    @property
+    def GROUP_HIERARCHY_BACKEND(self):
+        """How to look up all direct and indirect parents or children of a ManagedGroup.
+
+        ``"closure"`` reads the ManagedGroupClosure table. ``"cte"`` walks the GroupGroupMembership table with a
+        recursive common table expression (``WITH RECURSIVE``) instead, which requires PostgreSQL, SQLite, MySQL 8.0+,
+        or MariaDB 10.2+. This is also used by WorkspaceAccessEvaluator. Default: ``"closure"``.
+        """
+        x = self._setting("GROUP_HIERARCHY_BACKEND", "closure")
+        if x not in ("closure", "cte"):
+            raise ImproperlyConfigured('ANVIL_GROUP_HIERARCHY_BACKEND must be "closure" or "cte".')
+        return x
+
+    @property
+    def GRAPH_LAYOUT_CACHE(self):
+        """Name of the cache to use for layouts of group graphs. If None, layouts are computed on every request.
+        This should be a separate cache from ANVIL_AUDIT_CACHE, so that layouts do not evict audit results.
+        Default: None."""
+        return self._setting("GRAPH_LAYOUT_CACHE", None)
+
+    @property
+    def GROUP_VISUALIZATION_MAX_GROUPS(self):
+        """Maximum number of groups to show at once in the ManagedGroupVisualization view. If there are more groups
+        than this, a group must be selected to show the groups around it. If None, all groups are always shown.
+        Default: 1000."""
+        x = self._setting("GROUP_VISUALIZATION_MAX_GROUPS", 1000)
+        if x is not None and (not isinstance(x, int) or x < 1):
+            raise ImproperlyConfigured("ANVIL_GROUP_VISUALIZATION_MAX_GROUPS must be a positive integer or None.")
+        return x
+
 
 _app_settings = AppSettings("ANVIL_")
 
@@ -15,3 +15,5 @@ class AnVILConsortiumManagerConfig(AppConfig):
         from anvil_consortium_manager.adapters.workspace import workspace_adapter_registry
 
         workspace_adapter_registry.populate_from_settings()
+        # Connect signal receivers.
+        from . import signals  # noqa: F401
@@ -1,5 +1,8 @@
 import logging
+import time
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 import django_tables2 as tables
 from django.conf import settings
@@ -13,6 +16,34 @@ from ... import app_settings, models
 logger = logging.getLogger(__name__)
 
 
+def map_concurrently(func, items, workers=1):
+    """Call ``func`` on each item in ``items``, using up to ``workers`` threads.
+
+    Results are returned in the same order as ``items``. If any call raises an exception, the exception for the
+    first such item is re-raised and any calls that have not started yet are cancelled. ``func`` should only make
+    AnVIL API calls; database access should stay on the calling thread.
+
+    Args:
+        func (callable): The function to call on each item.
+        items (iterable): The items to pass to ``func``.
+        workers (int): The maximum number of threads to use. If 1, ``func`` is called serially in this thread.
+
+    Returns:
+        list: The return values of ``func`` for each item.
+    """
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        futures = [executor.submit(func, item) for item in items]
+        try:
+            return [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+
 # Audit classes for individual model instances:
 class ModelInstanceResult:
     """Class to hold an audit result for a specific instance of a model."""
@@ -111,7 +142,34 @@ class AnVILAudit(ABC):
         self._model_instance_results = []
         self._not_in_app_results = []
         self._ignored_results = []
+        self._build_result_indexes()
         self.timestamp = timezone.now()
+        # Time in seconds spent in each phase of the audit, keyed by phase name.
+        self.timings = {}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Audit results cached before the indexes were added do not have them, so rebuild them if necessary.
+        if "_model_instance_results_by_instance" not in state:
+            self._build_result_indexes()
+
+    def _build_result_indexes(self):
+        """Build the indexes used to look up results without scanning the result lists."""
+        # Model instances hash and compare by model and pk, so they can be used directly as keys.
+        self._model_instance_results_by_instance = {x.model_instance: x for x in self._model_instance_results}
+        self._not_in_app_records = set(x.record for x in self._not_in_app_results)
+        self._ignored_model_instances = set(x.model_instance for x in self._ignored_results)
+
+    @contextmanager
+    def time_phase(self, phase):
+        """Context manager to record the time spent in a phase of the audit in ``timings``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[phase] = self.timings.get(phase, 0) + elapsed
+            logger.debug("{}: {} took {:.3f}s".format(self.__class__.__name__, phase, elapsed))
 
     def _check_cache_type(self):
         """Check that the cache setting is correctly set."""
@@ -192,28 +250,28 @@ class AnVILAudit(ABC):
 
     def _add_not_in_app_result(self, result):
         # Check that it hasn't been added yet.
-        check = [x for x in self._not_in_app_results if x == result]
-        if len(check) > 0:
+        if result.record in self._not_in_app_records:
             raise ValueError("Already added a result for {}.".format(result.record))
+        self._not_in_app_records.add(result.record)
         self._not_in_app_results.append(result)
 
     def _add_model_instance_result(self, result):
-        check = [x for x in self._model_instance_results if x.model_instance == result.model_instance]
-        if len(check) > 0:
+        if result.model_instance in self._model_instance_results_by_instance:
             raise ValueError("Already added a result for {}.".format(result.model_instance))
+        self._model_instance_results_by_instance[result.model_instance] = result
         self._model_instance_results.append(result)
 
     def _add_ignored_result(self, result):
-        check = [x for x in self._ignored_results if x.model_instance == result.model_instance]
-        if len(check) > 0:
+        if result.model_instance in self._ignored_model_instances:
             raise ValueError("Already added a result for {}.".format(result.model_instance))
+        self._ignored_model_instances.add(result.model_instance)
         self._ignored_results.append(result)
 
     def get_result_for_model_instance(self, model_instance):
-        results = [x for x in self._model_instance_results if x.model_instance == model_instance]
-        if len(results) != 1:
+        try:
+            return self._model_instance_results_by_instance[model_instance]
+        except KeyError:
             raise ValueError("model_instance is not in the results.")
-        return results[0]
 
     def get_verified_results(self):
         return [x for x in self._model_instance_results if x.ok()]
@@ -0,0 +1,125 @@
+"""Classes to load the app records needed for an audit in a fixed number of queries.
+
+Each class loads the relevant rows for a set of model instances once, and stores them in dictionaries so that the
+per-instance checks in an audit do not need to make any additional queries.
+"""
+
+from collections import defaultdict
+
+from anvil_consortium_manager.models import (
+    GroupAccountMembership,
+    GroupGroupMembership,
+    ManagedGroup,
+    Workspace,
+    WorkspaceAuthorizationDomain,
+    WorkspaceGroupSharing,
+)
+
+from .. import models
+
+
+class ManagedGroupAuditData:
+    """App records needed to audit ManagedGroups and their membership.
+
+    Attributes:
+        groups (list): The ManagedGroups being audited, in the default queryset order.
+        groups_by_pk (dict): ManagedGroups keyed by pk.
+        groups_by_name (dict): ManagedGroups keyed by name.
+        groups_by_email (dict): ManagedGroups keyed by lowercase email.
+        account_memberships (dict): GroupAccountMemberships keyed by the pk of the group, with the account loaded.
+        group_memberships (dict): GroupGroupMemberships keyed by the pk of the parent group, with the child group
+            loaded.
+        ignored_memberships (dict): IgnoredManagedGroupMembership records keyed by the pk of the group, ordered by
+            ``ignored_email``.
+    """
+
+    def __init__(self, groups=None):
+        """Load the data.
+
+        Args:
+            groups (QuerySet, optional): The ManagedGroups to load data for. If not provided, all ManagedGroups are
+                loaded.
+        """
+        if groups is None:
+            groups = ManagedGroup.objects.all()
+        self.groups = list(groups)
+        self.groups_by_pk = {group.pk: group for group in self.groups}
+        self.groups_by_name = {group.name: group for group in self.groups}
+        self.groups_by_email = {group.email.lower(): group for group in self.groups}
+
+        self.account_memberships = defaultdict(list)
+        for membership in self._filter(GroupAccountMembership.objects.select_related("account"), "group", groups):
+            membership.group = self.groups_by_pk[membership.group_id]
+            self.account_memberships[membership.group_id].append(membership)
+
+        self.group_memberships = defaultdict(list)
+        for membership in self._filter(
+            GroupGroupMembership.objects.select_related("child_group"), "parent_group", groups
+        ):
+            membership.parent_group = self.groups_by_pk[membership.parent_group_id]
+            self.group_memberships[membership.parent_group_id].append(membership)
+
+        self.ignored_memberships = defaultdict(list)
+        ignored_qs = models.IgnoredManagedGroupMembership.objects.order_by("ignored_email")
+        for obj in self._filter(ignored_qs, "group", groups):
+            obj.group = self.groups_by_pk[obj.group_id]
+            self.ignored_memberships[obj.group_id].append(obj)
+
+    @staticmethod
+    def _filter(queryset, field, groups):
+        """Restrict ``queryset`` to records related to ``groups``, using a subquery if ``groups`` is filtered."""
+        if groups.query.where:
+            return queryset.filter(**{field + "__in": groups})
+        return queryset
+
+
+class WorkspaceAuditData:
+    """App records needed to audit Workspaces and their sharing.
+
+    Attributes:
+        workspaces (list): The Workspaces being audited, in the default queryset order, with billing projects loaded.
+        workspaces_by_pk (dict): Workspaces keyed by pk.
+        workspaces_by_name (dict): Workspaces keyed by a tuple of (billing project name, workspace name).
+        authorization_domains (dict): ManagedGroups used as authorization domains keyed by the pk of the workspace.
+        sharing (dict): WorkspaceGroupSharing records keyed by the pk of the workspace, with the group loaded.
+        ignored_sharing (dict): IgnoredWorkspaceSharing records keyed by the pk of the workspace, ordered by
+            ``ignored_email``.
+    """
+
+    def __init__(self, workspaces=None):
+        """Load the data.
+
+        Args:
+            workspaces (QuerySet, optional): The Workspaces to load data for. If not provided, all Workspaces are
+                loaded.
+        """
+        if workspaces is None:
+            workspaces = Workspace.objects.all()
+        self.workspaces = list(workspaces.select_related("billing_project"))
+        self.workspaces_by_pk = {workspace.pk: workspace for workspace in self.workspaces}
+        self.workspaces_by_name = {
+            (workspace.billing_project.name, workspace.name): workspace for workspace in self.workspaces
+        }
+
+        self.authorization_domains = defaultdict(list)
+        auth_domain_qs = WorkspaceAuthorizationDomain.objects.select_related("group")
+        for auth_domain in self._filter(auth_domain_qs, workspaces):
+            self.authorization_domains[auth_domain.workspace_id].append(auth_domain.group)
+
+        self.sharing = defaultdict(list)
+        for sharing in self._filter(WorkspaceGroupSharing.objects.select_related("group"), workspaces):
+            sharing.workspace = self.workspaces_by_pk[sharing.workspace_id]
+            self.sharing[sharing.workspace_id].append(sharing)
+
+        self.ignored_sharing = defaultdict(list)
+        ignored_qs = models.IgnoredWorkspaceSharing.objects.order_by("ignored_email")
+        for obj in self._filter(ignored_qs, workspaces):
+            obj.workspace = self.workspaces_by_pk[obj.workspace_id]
+            self.ignored_sharing[obj.workspace_id].append(obj)
+
+    @staticmethod
+    def _filter(queryset, workspaces):
+        """Restrict ``queryset`` to records related to ``workspaces``, using a subquery if it is filtered."""
+        if workspaces.query.where:
+            return queryset.filter(workspace__in=workspaces)
+        return queryset
@@ -4,8 +4,8 @@ from anvil_consortium_manager.anvil_api import AnVILAPIClient, AnVILAPIError404
 from anvil_consortium_manager.exceptions import AnVILNotGroupAdminError
 from anvil_consortium_manager.models import Account, GroupAccountMembership, GroupGroupMembership, ManagedGroup
 
-from .. import models
-from . import base
+from ... import app_settings
+from . import base, data
 
 
 class ManagedGroupAudit(base.AnVILAudit):
@@ -22,10 +22,22 @@ class ManagedGroupAudit(base.AnVILAudit):
 
     cache_key = "managed_group_audit_results"
 
+    def __init__(self, *args, workers=None, **kwargs):
+        """Initialize the audit.
+
+        Args:
+            workers (int, optional): Number of threads to use when fetching group membership from AnVIL.
+                If not provided, ``ANVIL_AUDIT_WORKERS`` is used.
+        """
+        super().__init__(*args, **kwargs)
+        self.workers = workers if workers is not None else app_settings.AUDIT_WORKERS
+
     def audit(self, cache=False):
         """Run an audit on managed groups in the app."""
         # Check the list of groups.
-        response = AnVILAPIClient().get_groups()
+        with self.time_phase("get_groups"):
+            # Audits always check the current state on AnVIL, so do not use cached responses.
+            response = AnVILAPIClient(use_cache=False).get_groups()
         # Change from list of group dictionaries to dictionary of roles. That way we can handle being both
         # a member and an admin of a group.
         groups_on_anvil = {}
@@ -37,7 +49,11 @@ class ManagedGroupAudit(base.AnVILAudit):
             except KeyError:
                 groups_on_anvil[group_name] = [role]
         # Audit groups that exist in the app.
-        for group in ManagedGroup.objects.all():
+        model_instance_results = []
+        membership_audits = []
+        # Load all app records needed for the audit up front.
+        audit_data = data.ManagedGroupAuditData()
+        for group in audit_data.groups:
             model_instance_result = base.ModelInstanceResult(group)
             try:
                 group_roles = groups_on_anvil.pop(group.name)
@@ -45,7 +61,7 @@ class ManagedGroupAudit(base.AnVILAudit):
                 # Check if the group actually does exist but we're not a member of it.
                 try:
                     # If this returns a 404 error, then the group actually does not exist.
-                    response = AnVILAPIClient().get_group_email(group.name)
+                    response = AnVILAPIClient(use_cache=False).get_group_email(group.name)
                     if group.is_managed_by_app:
                         model_instance_result.add_error(self.ERROR_DIFFERENT_ROLE)
 
@@ -58,13 +74,27 @@ class ManagedGroupAudit(base.AnVILAudit):
                     if "admin" not in group_roles:
                         model_instance_result.add_error(self.ERROR_DIFFERENT_ROLE)
                     else:
-                        membership_audit = ManagedGroupMembershipAudit(group)
-                        membership_audit.run_audit(cache=cache)
-                        if not membership_audit.ok():
-                            model_instance_result.add_error(self.ERROR_GROUP_MEMBERSHIP)
+                        # Membership is audited below, once membership for all groups has been fetched.
+                        membership_audits.append((model_instance_result, ManagedGroupMembershipAudit(group)))
                 elif not group.is_managed_by_app and "admin" in group_roles:
                     model_instance_result.add_error(self.ERROR_DIFFERENT_ROLE)
-            # Add the final result for this group to the class results.
+            model_instance_results.append(model_instance_result)
+
+        # Fetch membership from AnVIL, possibly in parallel, and then compare against the app on this thread.
+        with self.time_phase("fetch_membership"):
+            anvil_memberships = base.map_concurrently(
+                lambda x: x[1].get_anvil_membership(), membership_audits, workers=self.workers
+            )
+        with self.time_phase("check_membership"):
+            for (model_instance_result, membership_audit), anvil_membership in zip(
+                membership_audits, anvil_memberships
+            ):
+                membership_audit.run_audit(cache=cache, anvil_membership=anvil_membership, audit_data=audit_data)
+                if not membership_audit.ok():
+                    model_instance_result.add_error(self.ERROR_GROUP_MEMBERSHIP)
+
+        # Add the final result for each group to the class results.
+        for model_instance_result in model_instance_results:
             self.add_result(model_instance_result)
 
         # Check for groups that exist on AnVIL but not the app.
@@ -162,10 +192,16 @@ class ManagedGroupMembershipAudit(base.AnVILAudit):
     def get_cache_key(self):
         return f"managed_group_membership_{self.managed_group.pk}"
 
-    def run_audit(self, cache=False):
-        """Run an audit on all membership of the managed group."""
-        # Get the list of members on AnVIL.
-        api_client = AnVILAPIClient()
+    def get_anvil_membership(self):
+        """Get the members and admins of the managed group on AnVIL.
+
+        This method only makes AnVIL API calls and does not query the database, so it is safe to call from a
+        worker thread.
+
+        Returns:
+            tuple: A tuple of (members, admins), each a list of lowercase emails, not including the service account.
+        """
+        api_client = AnVILAPIClient(use_cache=False)
         # --- Members ---
         response = api_client.get_group_members(self.managed_group.name)
         # Convert to case insensitive emails.
@@ -186,9 +222,27 @@ class ManagedGroupMembershipAudit(base.AnVILAudit):
         except ValueError:
             # Not listed as an admin -- this is ok because it could be via group membership.
             pass
+        return members_in_anvil, admins_in_anvil
+
+    def run_audit(self, cache=False, anvil_membership=None, audit_data=None):
+        """Run an audit on all membership of the managed group.
+
+        Args:
+            cache (bool): Whether to cache the results.
+            anvil_membership (tuple, optional): The (members, admins) tuple returned by ``get_anvil_membership``.
+                If not provided, membership is fetched from AnVIL.
+            audit_data (ManagedGroupAuditData, optional): Previously loaded app records that include this group.
+                If not provided, the records for this group are loaded from the database.
+        """
+        if anvil_membership is None:
+            anvil_membership = self.get_anvil_membership()
+        if audit_data is None:
+            audit_data = data.ManagedGroupAuditData(ManagedGroup.objects.filter(pk=self.managed_group.pk))
+        # Copy the lists, since records are removed from them as they are matched.
+        members_in_anvil, admins_in_anvil = (list(x) for x in anvil_membership)
 
         # Check group-account membership.
-        for membership in self.managed_group.groupaccountmembership_set.all():
+        for membership in audit_data.account_memberships[self.managed_group.pk]:
             # Create an audit result instance for this model.
             model_instance_result = base.ModelInstanceResult(membership)
             # Check for deactivated account memberships.
@@ -210,7 +264,7 @@ class ManagedGroupMembershipAudit(base.AnVILAudit):
             self.add_result(model_instance_result)
 
         # Check group-group membership.
-        for membership in self.managed_group.child_memberships.all():
+        for membership in audit_data.group_memberships[self.managed_group.pk]:
             model_instance_result = base.ModelInstanceResult(membership)
             if membership.role == GroupGroupMembership.RoleChoices.ADMIN:
                 try:
@@ -234,8 +288,7 @@ class ManagedGroupMembershipAudit(base.AnVILAudit):
             self.add_result(model_instance_result)
 
         # Add any admin that the app doesn't know about.
-        ignored_qs = models.IgnoredManagedGroupMembership.objects.filter(group=self.managed_group)
-        for obj in ignored_qs.order_by("ignored_email"):
+        for obj in audit_data.ignored_memberships[self.managed_group.pk]:
             try:
                 admins_in_anvil.remove(obj.ignored_email)
                 record = "{}: {}".format(GroupAccountMembership.RoleChoices.ADMIN, obj.ignored_email)
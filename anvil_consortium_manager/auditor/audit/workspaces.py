@@ -4,8 +4,8 @@ from anvil_consortium_manager.anvil_api import AnVILAPIClient, AnVILAPIError403,
 from anvil_consortium_manager.exceptions import AnVILNotWorkspaceOwnerError
 from anvil_consortium_manager.models import Workspace
 
-from .. import models
-from . import base
+from ... import app_settings
+from . import base, data
 
 
 class WorkspaceAudit(base.AnVILAudit):
@@ -34,6 +34,16 @@ class WorkspaceAudit(base.AnVILAudit):
 
     cache_key = "workspace_audit_results"
 
+    def __init__(self, *args, workers=None, **kwargs):
+        """Initialize the audit.
+
+        Args:
+            workers (int, optional): Number of threads to use when fetching workspace sharing and settings from
+                AnVIL. If not provided, ``ANVIL_AUDIT_WORKERS`` is used.
+        """
+        super().__init__(*args, **kwargs)
+        self.workers = workers if workers is not None else app_settings.AUDIT_WORKERS
+
     def _check_workspace_ownership_on_anvil(self, workspace_details):
         """Check if the service account is an owner of the workspace.
 
@@ -45,7 +55,7 @@ class WorkspaceAudit(base.AnVILAudit):
         elif workspace_details["accessLevel"] == "NO ACCESS":
             # extra acl checks
             try:
-                AnVILAPIClient().get_workspace_acl(
+                AnVILAPIClient(use_cache=False).get_workspace_acl(
                     workspace_details["workspace"]["namespace"],
                     workspace_details["workspace"]["name"],
                 )
@@ -58,6 +68,27 @@ class WorkspaceAudit(base.AnVILAudit):
         else:
             return False
 
+    def _get_requester_pays_on_anvil(self, workspace):
+        """Get the requester pays status of the workspace bucket on AnVIL.
+
+        This method only makes AnVIL API calls, so it is safe to call from a worker thread as long as
+        ``workspace.billing_project`` has already been loaded.
+        """
+        # Unfortunately we have to make a separate API call.
+        response = AnVILAPIClient(use_cache=False).get_workspace_settings(
+            workspace.billing_project.name,
+            workspace.name,
+        )
+        tmp = [x for x in response.json() if x["settingType"] == "GcpBucketRequesterPays"]
+        if len(tmp) == 0:
+            return False
+        else:
+            return tmp[0]["config"]["enabled"]
+
+    def _get_workspace_details_on_anvil(self, sharing_audit):
+        """Get the ACL and requester pays status for the workspace being audited by ``sharing_audit``."""
+        return sharing_audit.get_anvil_acl(), self._get_requester_pays_on_anvil(sharing_audit.workspace)
+
     def audit(self, cache=False):
         """Run an audit on Workspaces in the app."""
         # Check the list of workspaces.
@@ -68,35 +99,35 @@ class WorkspaceAudit(base.AnVILAudit):
             "workspace.isLocked",
             "accessLevel",
         ]
-        response = AnVILAPIClient().list_workspaces(fields=",".join(fields))
-        workspaces_on_anvil = response.json()
-        for workspace in Workspace.objects.filter():
-            model_instance_result = base.ModelInstanceResult(workspace)
-            try:
+        with self.time_phase("list_workspaces"):
+            # Audits always check the current state on AnVIL, so do not use cached responses.
+            response = AnVILAPIClient(use_cache=False).list_workspaces(fields=",".join(fields))
+            # Index the workspaces on AnVIL by (namespace, name) so each app workspace can be matched in O(1).
+            workspaces_on_anvil = {(x["workspace"]["namespace"], x["workspace"]["name"]): x for x in response.json()}
+        model_instance_results = []
+        sharing_audits = []
+        with self.time_phase("check_workspaces"):
+            # Load all app records needed for the audit up front. This also means that billing projects can
+            # be accessed from worker threads below.
+            audit_data = data.WorkspaceAuditData()
+            for workspace in audit_data.workspaces:
+                model_instance_result = base.ModelInstanceResult(workspace)
+                model_instance_results.append(model_instance_result)
                 # Check if the workspace exists in the list of workspaces from AnVIL.
-                i = next(
-                    idx
-                    for idx, x in enumerate(workspaces_on_anvil)
-                    if (
-                        x["workspace"]["name"] == workspace.name
-                        and x["workspace"]["namespace"] == workspace.billing_project.name
-                    )
-                )
-            except StopIteration:
-                # The workspace is not in the list of workspaces on AnVIL.
-                # This means that either the app thinks this workspace ahs NO_ACCESS access, or there is an audit error.
-                if workspace.has_access:
-                    model_instance_result.add_error(self.ERROR_NOT_IN_ANVIL)
-                next
-            else:
-                # Get information about the workspace from AnVIL.
-                workspace_details = workspaces_on_anvil.pop(i)
+                workspace_details = workspaces_on_anvil.pop((workspace.billing_project.name, workspace.name), None)
+                if workspace_details is None:
+                    # The workspace is not in the list of workspaces on AnVIL.
+                    # This means that either the app thinks this workspace has NO_ACCESS access, or there is an
+                    # audit error.
+                    if workspace.has_access:
+                        model_instance_result.add_error(self.ERROR_NOT_IN_ANVIL)
+                    continue
 
                 # Check auth domains.
                 auth_domains_on_anvil = [
                     x["membersGroupName"] for x in workspace_details["workspace"]["authorizationDomain"]
                 ]
-                auth_domains_in_app = workspace.authorization_domains.all().values_list("name", flat=True)
+                auth_domains_in_app = [x.name for x in audit_data.authorization_domains[workspace.pk]]
                 if set(auth_domains_on_anvil) != set(auth_domains_in_app):
                     model_instance_result.add_error(self.ERROR_DIFFERENT_AUTH_DOMAINS)
                 # Check lock status.
@@ -124,34 +155,37 @@ class WorkspaceAudit(base.AnVILAudit):
                     pass
                 else:
                     # The workspace is managed by the app and we are owners - need to perform other checks.
-                    # Since we're the owner, check workspace access.
-                    sharing_audit = WorkspaceSharingAudit(workspace)
-                    sharing_audit.run_audit(cache=cache)
-                    if not sharing_audit.ok():
-                        model_instance_result.add_error(self.ERROR_WORKSPACE_SHARING)
-                    # Check is_requester_pays status. Unfortunately we have to make a separate API call.
-                    response = AnVILAPIClient().get_workspace_settings(
-                        workspace.billing_project.name,
-                        workspace.name,
-                    )
-                    tmp = [x for x in response.json() if x["settingType"] == "GcpBucketRequesterPays"]
-                    if len(tmp) == 0:
-                        is_requester_pays_on_anvil = False
-                    else:
-                        is_requester_pays_on_anvil = tmp[0]["config"]["enabled"]
-                    if workspace.is_requester_pays != is_requester_pays_on_anvil:
-                        model_instance_result.add_error(self.ERROR_DIFFERENT_REQUESTER_PAYS)
-
+                    # Sharing and requester pays status are checked below, once details for all workspaces
+                    # have been fetched.
+                    sharing_audits.append((model_instance_result, WorkspaceSharingAudit(workspace)))
+
+        # Fetch ACLs and settings from AnVIL, possibly in parallel, and then compare against the app on this thread.
+        with self.time_phase("fetch_sharing_and_settings"):
+            workspace_details_on_anvil = base.map_concurrently(
+                lambda x: self._get_workspace_details_on_anvil(x[1]), sharing_audits, workers=self.workers
+            )
+        with self.time_phase("check_sharing_and_settings"):
+            for (model_instance_result, sharing_audit), (acl, is_requester_pays_on_anvil) in zip(
+                sharing_audits, workspace_details_on_anvil
+            ):
+                sharing_audit.run_audit(cache=cache, anvil_acl=acl, audit_data=audit_data)
+                if not sharing_audit.ok():
+                    model_instance_result.add_error(self.ERROR_WORKSPACE_SHARING)
+                if sharing_audit.workspace.is_requester_pays != is_requester_pays_on_anvil:
+                    model_instance_result.add_error(self.ERROR_DIFFERENT_REQUESTER_PAYS)
+
+        for model_instance_result in model_instance_results:
             self.add_result(model_instance_result)
 
         # Check for remaining workspaces on AnVIL where we are OWNER.
-        for workspace_details in workspaces_on_anvil:
-            if self._check_workspace_ownership_on_anvil(workspace_details):
-                # The service account is an owner of the workspace.
-                workspace_name = "{}/{}".format(
-                    workspace_details["workspace"]["namespace"], workspace_details["workspace"]["name"]
-                )
-                self.add_result(base.NotInAppResult(workspace_name))
+        with self.time_phase("check_not_in_app"):
+            for workspace_details in workspaces_on_anvil.values():
+                if self._check_workspace_ownership_on_anvil(workspace_details):
+                    # The service account is an owner of the workspace.
+                    workspace_name = "{}/{}".format(
+                        workspace_details["workspace"]["namespace"], workspace_details["workspace"]["name"]
+                    )
+                    self.add_result(base.NotInAppResult(workspace_name))
 
 
 class WorkspaceSharingNotInAppResult(base.NotInAppResult):
@@ -250,9 +284,18 @@ class WorkspaceSharingAudit(base.AnVILAudit):
     def get_cache_key(self):
         return f"workspace_sharing_{self.workspace.pk}"
 
-    def run_audit(self, cache=False):
-        """Run the audit for all workspace instances."""
-        response = AnVILAPIClient().get_workspace_acl(self.workspace.billing_project.name, self.workspace.name)
+    def get_anvil_acl(self):
+        """Get the ACL for the workspace on AnVIL.
+
+        This method only makes AnVIL API calls, so it is safe to call from a worker thread as long as
+        ``workspace.billing_project`` has already been loaded.
+
+        Returns:
+            dict: The ACL keyed by lowercase email, not including the service account.
+        """
+        response = AnVILAPIClient(use_cache=False).get_workspace_acl(
+            self.workspace.billing_project.name, self.workspace.name
+        )
         acl_in_anvil = {k.lower(): v for k, v in response.json()["acl"].items()}
         # Remove the service account.
         try:
@@ -260,7 +303,25 @@ class WorkspaceSharingAudit(base.AnVILAudit):
         except KeyError:
             # In some cases, the workspace is shared with a group we are part of instead of directly with us.
             pass
-        for access in self.workspace.workspacegroupsharing_set.all():
+        return acl_in_anvil
+
+    def run_audit(self, cache=False, anvil_acl=None, audit_data=None):
+        """Run the audit for all workspace instances.
+
+        Args:
+            cache (bool): Whether to cache the results.
+            anvil_acl (dict, optional): The ACL returned by ``get_anvil_acl``. If not provided, the ACL is fetched
+                from AnVIL.
+            audit_data (WorkspaceAuditData, optional): Previously loaded app records that include this workspace.
+                If not provided, the records for this workspace are loaded from the database.
+        """
+        if anvil_acl is None:
+            anvil_acl = self.get_anvil_acl()
+        if audit_data is None:
+            audit_data = data.WorkspaceAuditData(Workspace.objects.filter(pk=self.workspace.pk))
+        # Copy the ACL, since records are removed from it as they are matched.
+        acl_in_anvil = dict(anvil_acl)
+        for access in audit_data.sharing[self.workspace.pk]:
             # Create an audit result instance for this model.
             model_instance_result = base.ModelInstanceResult(access)
             try:
@@ -283,7 +344,7 @@ class WorkspaceSharingAudit(base.AnVILAudit):
             self.add_result(model_instance_result)
 
         # Handle ignored records.
-        for obj in models.IgnoredWorkspaceSharing.objects.filter(workspace=self.workspace).order_by("ignored_email"):
+        for obj in audit_data.ignored_sharing[self.workspace.pk]:
             try:
                 acl = acl_in_anvil.pop(obj.ignored_email)
                 record = "{}: {}".format(acl["accessLevel"], obj.ignored_email)
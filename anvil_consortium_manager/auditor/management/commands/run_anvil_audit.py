@@ -57,6 +57,12 @@ class Command(BaseCommand):
             action="store_true",
             help="Cache the results of the audit to enable faster reviewing in the app.",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="""Number of threads to use for concurrent AnVIL API calls.
+            If not specified, the ANVIL_AUDIT_WORKERS setting is used.""",
+        )
 
     def _run_audit(self, audit_results, ignore_model=None, **options):
         """Run the audit for a specific model class."""
@@ -86,6 +92,11 @@ class Command(BaseCommand):
                     msg += " (ignoring {n_ignored} records)".format(n_ignored=n_ignored)
             self.stdout.write(self.style.SUCCESS(msg))
 
+        # Report the time spent in each phase of the audit if requested.
+        if options["verbosity"] > 1:
+            for phase, elapsed in audit_results.timings.items():
+                self.stdout.write("  {}: {:.2f}s".format(phase, elapsed))
+
         if email and (not errors_only) or (errors_only and not audit_results.ok()):
             # Set up the email message.
             subject = "AnVIL audit {} -- {}".format(audit_name, "ok" if audit_results.ok() else "errors!")
@@ -110,6 +121,10 @@ class Command(BaseCommand):
             )
 
     def handle(self, *args, **options):
+        workers = options.get("workers")
+        if workers is not None and workers < 1:
+            raise CommandError("--workers must be a positive integer.")
+
         if options["models"]:
             models_to_audit = options["models"]
         else:
@@ -123,8 +138,14 @@ class Command(BaseCommand):
 
         if "ManagedGroup" in models_to_audit:
             self._run_audit(
-                managed_group_audit.ManagedGroupAudit(), ignore_model=models.IgnoredManagedGroupMembership, **options
+                managed_group_audit.ManagedGroupAudit(workers=workers),
+                ignore_model=models.IgnoredManagedGroupMembership,
+                **options,
             )
 
         if "Workspace" in models_to_audit:
-            self._run_audit(workspace_audit.WorkspaceAudit(), ignore_model=models.IgnoredWorkspaceSharing, **options)
+            self._run_audit(
+                workspace_audit.WorkspaceAudit(workers=workers),
+                ignore_model=models.IgnoredWorkspaceSharing,
+                **options,
+            )
@@ -0,0 +1,115 @@
+"""Benchmarks for the audit classes.
+
+These are not run as part of the regular test suite. To run them, pass this file to pytest directly, e.g.:
+
+    pytest anvil_consortium_manager/auditor/tests/benchmark_audits.py -s
+
+The size of the synthetic data can be set with the ``ANVIL_BENCHMARK_SIZE`` environment variable.
+"""
+
+import os
+import time
+
+import responses
+from django.test import TestCase
+
+from anvil_consortium_manager.models import Account, BillingProject, Workspace
+from anvil_consortium_manager.tests.utils import AnVILAPIMockTestMixin
+
+from ..audit import base, workspaces
+
+BENCHMARK_SIZE = int(os.environ.get("ANVIL_BENCHMARK_SIZE", 50000))
+
+
+class AuditResultsBenchmark(TestCase):
+    """Benchmark adding and looking up results in an audit."""
+
+    class TestAudit(base.AnVILAudit):
+        def audit(self, cache=False):
+            pass
+
+    def add_results(self, n):
+        # Unsaved instances with a pk set hash and compare like saved instances, without touching the database.
+        instances = [Account(pk=i + 1, email="{}@example.com".format(i)) for i in range(n)]
+        audit_results = self.TestAudit()
+        start = time.perf_counter()
+        for instance in instances:
+            audit_results.add_result(base.ModelInstanceResult(instance))
+            audit_results.add_result(base.NotInAppResult(instance.email))
+        for instance in instances:
+            audit_results.get_result_for_model_instance(instance)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(audit_results.get_verified_results()), n)
+        print("\nAdding and looking up {} results: {:.2f}s".format(n, elapsed))
+        return elapsed
+
+    def test_add_results_scales_linearly(self):
+        """Time to add and look up results grows roughly linearly with the number of results."""
+        small = self.add_results(BENCHMARK_SIZE // 10)
+        large = self.add_results(BENCHMARK_SIZE)
+        # A linear scan per result would take ~100x longer for 10x as many results.
+        self.assertLess(large, small * 30)
+
+
+class WorkspaceAuditBenchmark(AnVILAPIMockTestMixin, TestCase):
+    """Benchmark matching app workspaces against the AnVIL workspace list."""
+
+    def setUp(self):
+        super().setUp()
+        self.anvil_response_mock.assert_all_requests_are_fired = False
+
+    def create_workspaces(self, n):
+        """Create ``n`` workspaces where the app has limited access, so no additional API calls are made."""
+        billing_projects = BillingProject.objects.bulk_create(
+            [BillingProject(name="bp-{}-{}".format(n, i), has_app_as_user=True) for i in range(100)]
+        )
+        Workspace.objects.bulk_create(
+            [
+                Workspace(
+                    billing_project=billing_projects[i % 100],
+                    name="ws-{}".format(i),
+                    workspace_type="workspace",
+                    app_access=Workspace.AppAccessChoices.LIMITED,
+                    app_access_reason="benchmark",
+                )
+                for i in range(n)
+            ]
+        )
+        return [
+            {
+                "accessLevel": "READER",
+                "workspace": {
+                    "namespace": billing_projects[i % 100].name,
+                    "name": "ws-{}".format(i),
+                    "authorizationDomain": [],
+                    "isLocked": False,
+                },
+            }
+            # Reverse the order so that matching cannot rely on the app and AnVIL order being the same.
+            for i in reversed(range(n))
+        ]
+
+    def run_audit(self, n):
+        api_json = self.create_workspaces(n)
+        self.anvil_response_mock.replace(
+            responses.GET, self.api_client.rawls_entry_point + "/api/workspaces", status=200, json=api_json
+        )
+        audit_results = workspaces.WorkspaceAudit()
+        start = time.perf_counter()
+        audit_results.run_audit()
+        elapsed = time.perf_counter() - start
+        self.assertTrue(audit_results.ok())
+        self.assertEqual(len(audit_results.get_verified_results()), n)
+        print("\nWorkspaceAudit with {} workspaces: {:.2f}s".format(n, elapsed))
+        for phase, phase_elapsed in audit_results.timings.items():
+            print("  {}: {:.2f}s".format(phase, phase_elapsed))
+        return audit_results.timings["check_workspaces"]
+
+    def test_workspace_matching_scales_linearly(self):
+        """Matching time grows roughly linearly with the number of workspaces."""
+        self.anvil_response_mock.add(responses.GET, self.api_client.rawls_entry_point + "/api/workspaces", json=[])
+        small = self.run_audit(BENCHMARK_SIZE // 10)
+        Workspace.objects.all().delete()
+        large = self.run_audit(BENCHMARK_SIZE)
+        # A quadratic algorithm would take ~100x longer for 10x as many workspaces.
+        self.assertLess(large, small * 30)
@@ -57,6 +57,21 @@ class AccountAuditTest(AnVILAPIMockTestMixin, AuditCacheClearTestMixin, TestCase
         record_result = audit_results.get_result_for_model_instance(account)
         self.assertTrue(record_result.ok())
 
+    def test_num_queries(self):
+        """The number of queries does not depend on the number of accounts."""
+        account_list = AccountFactory.create_batch(3)
+        for account in account_list:
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_url(account.email),
+                status=200,
+                json=self.get_api_json_response(account.email),
+            )
+        audit_results = accounts.AccountAudit()
+        with self.assertNumQueries(1):
+            audit_results.run_audit()
+        self.assertTrue(audit_results.ok())
+
     def test_anvil_audit_one_account_not_on_anvil(self):
         """anvil_audit raises exception if one billing project exists in the app but not on AnVIL."""
         account = AccountFactory.create()
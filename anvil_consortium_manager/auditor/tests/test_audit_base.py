@@ -1,9 +1,12 @@
+import pickle
+
 from django.core.exceptions import ImproperlyConfigured
 from django.test import TestCase, override_settings
 from django.utils import timezone
 from django_tables2 import Table
 from faker import Faker
 
+from anvil_consortium_manager.models import Account
 from anvil_consortium_manager.tests.factories import (
     AccountFactory,
     BillingProjectFactory,
@@ -27,6 +30,32 @@ class TestAudit(base.AnVILAudit):
         pass
 
 
+class MapConcurrentlyTest(TestCase):
+    def test_serial(self):
+        """Items are processed in order with one worker."""
+        self.assertEqual(base.map_concurrently(lambda x: x * 2, [1, 2, 3]), [2, 4, 6])
+
+    def test_multiple_workers(self):
+        """Results are returned in the same order as the input with multiple workers."""
+        items = list(range(50))
+        self.assertEqual(base.map_concurrently(lambda x: x * 2, items, workers=8), [x * 2 for x in items])
+
+    def test_no_items(self):
+        """An empty list is returned if there are no items."""
+        self.assertEqual(base.map_concurrently(lambda x: x, [], workers=4), [])
+
+    def test_exception(self):
+        """Exceptions raised by the function are re-raised."""
+
+        def func(x):
+            if x == 3:
+                raise ValueError("bad item")
+            return x
+
+        with self.assertRaisesMessage(ValueError, "bad item"):
+            base.map_concurrently(func, range(10), workers=4)
+
+
 class ModelInstanceResultTest(TestCase):
     def test_init(self):
         """Constructor works as expected."""
@@ -196,6 +225,20 @@ class AnVILAuditTest(TestCase):
         # It doesn't matter what model we use at this point, so just pick Account.
         self.model_factory = AccountFactory
 
+    def test_time_phase(self):
+        """time_phase records the time spent in a phase."""
+        audit_results = TestAudit()
+        self.assertEqual(audit_results.timings, {})
+        with audit_results.time_phase("foo"):
+            pass
+        self.assertIn("foo", audit_results.timings)
+        first = audit_results.timings["foo"]
+        self.assertGreaterEqual(first, 0)
+        # Time is accumulated if a phase is run more than once.
+        with audit_results.time_phase("foo"):
+            pass
+        self.assertGreaterEqual(audit_results.timings["foo"], first)
+
     def test_init(self):
         """Init method works as expected."""
         self.assertEqual(len(self.audit_results._model_instance_results), 0)
@@ -352,6 +395,75 @@ class AnVILAuditTest(TestCase):
         result = self.audit_results.get_result_for_model_instance(obj)
         self.assertIs(result, model_instance_result)
 
+    def test_get_result_for_model_instance_equal_instance(self):
+        """A result can be found using a different Python object for the same database record."""
+        obj = self.model_factory()
+        model_instance_result = base.ModelInstanceResult(obj)
+        self.audit_results.add_result(model_instance_result)
+        result = self.audit_results.get_result_for_model_instance(Account.objects.get(pk=obj.pk))
+        self.assertIs(result, model_instance_result)
+
+    def test_get_result_for_model_instance_different_model_same_pk(self):
+        """Results for instances of different models with the same pk are kept separate."""
+        account = self.model_factory()
+        group = ManagedGroupFactory.create(pk=account.pk)
+        account_result = base.ModelInstanceResult(account)
+        group_result = base.ModelInstanceResult(group)
+        self.audit_results.add_result(account_result)
+        self.audit_results.add_result(group_result)
+        self.assertIs(self.audit_results.get_result_for_model_instance(account), account_result)
+        self.assertIs(self.audit_results.get_result_for_model_instance(group), group_result)
+
+    def test_pickle(self):
+        """Results and indexes are restored after pickling."""
+        obj = self.model_factory()
+        model_instance_result = base.ModelInstanceResult(obj)
+        self.audit_results.add_result(model_instance_result)
+        self.audit_results.add_result(base.NotInAppResult("foo"))
+        audit_results = pickle.loads(pickle.dumps(self.audit_results))
+        self.assertEqual(audit_results.get_result_for_model_instance(obj), model_instance_result)
+        with self.assertRaises(ValueError):
+            audit_results.add_result(base.NotInAppResult("foo"))
+
+    def test_unpickle_without_indexes(self):
+        """Indexes are rebuilt for results pickled before the indexes existed."""
+        obj = self.model_factory()
+        model_instance_result = base.ModelInstanceResult(obj)
+        self.audit_results.add_result(model_instance_result)
+        self.audit_results.add_result(base.NotInAppResult("foo"))
+        ignored_obj = factories.IgnoredManagedGroupMembershipFactory.create()
+        self.audit_results.add_result(base.IgnoredResult(ignored_obj, record="bar"))
+        del self.audit_results._model_instance_results_by_instance
+        del self.audit_results._not_in_app_records
+        del self.audit_results._ignored_model_instances
+        audit_results = pickle.loads(pickle.dumps(self.audit_results))
+        self.assertEqual(audit_results.get_result_for_model_instance(obj), model_instance_result)
+        with self.assertRaises(ValueError):
+            audit_results.add_result(base.ModelInstanceResult(obj))
+        with self.assertRaises(ValueError):
+            audit_results.add_result(base.NotInAppResult("foo"))
+        with self.assertRaises(ValueError):
+            audit_results.add_result(base.IgnoredResult(ignored_obj, record="bar"))
+
+    def test_add_many_results(self):
+        """Many results can be added and looked up."""
+        n = 1000
+        # Unsaved instances with a pk set hash and compare like saved instances, without touching the database.
+        instances = [Account(pk=i + 1, email="{}@example.com".format(i)) for i in range(n)]
+        for instance in instances:
+            self.audit_results.add_result(base.ModelInstanceResult(instance))
+            self.audit_results.add_result(base.NotInAppResult(instance.email))
+        for instance in instances:
+            self.assertEqual(self.audit_results.get_result_for_model_instance(instance).model_instance, instance)
+        self.assertEqual(len(self.audit_results.get_verified_results()), n)
+        self.assertEqual(len(self.audit_results.get_not_in_app_results()), n)
+        # The results are returned in the order they were added.
+        self.assertEqual([x.model_instance for x in self.audit_results.get_verified_results()], instances)
+        self.assertEqual(
+            [x.record for x in self.audit_results.get_not_in_app_results()][:3],
+            ["0@example.com", "1@example.com", "2@example.com"],
+        )
+
     def test_get_verified_results_no_results(self):
         """get_verified_results returns an empty list when there are no results."""
         self.assertEqual(len(self.audit_results.get_verified_results()), 0)
@@ -35,6 +35,21 @@ class BillingProjectAuditTest(AnVILAPIMockTestMixin, AuditCacheClearTestMixin, T
         self.assertEqual(len(audit_results.get_error_results()), 0)
         self.assertEqual(len(audit_results.get_not_in_app_results()), 0)
 
+    def test_num_queries(self):
+        """The number of queries does not depend on the number of billing projects."""
+        billing_project_list = BillingProjectFactory.create_batch(3, has_app_as_user=True)
+        for billing_project in billing_project_list:
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_url(billing_project.name),
+                status=200,
+                json=self.get_api_json_response(),
+            )
+        audit_results = billing_projects.BillingProjectAudit()
+        with self.assertNumQueries(1):
+            audit_results.run_audit()
+        self.assertTrue(audit_results.ok())
+
     def test_anvil_audit_one_billing_project_no_errors(self):
         """anvil_audit works correct if one billing project exists in the app and in AnVIL."""
         billing_project = BillingProjectFactory.create(has_app_as_user=True)
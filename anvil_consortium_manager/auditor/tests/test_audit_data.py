@@ -0,0 +1,119 @@
+from django.test import TestCase
+
+from anvil_consortium_manager.models import ManagedGroup, Workspace
+from anvil_consortium_manager.tests.factories import (
+    GroupAccountMembershipFactory,
+    GroupGroupMembershipFactory,
+    ManagedGroupFactory,
+    WorkspaceAuthorizationDomainFactory,
+    WorkspaceFactory,
+    WorkspaceGroupSharingFactory,
+)
+
+from ..audit import data
+from . import factories
+
+
+class ManagedGroupAuditDataTest(TestCase):
+    """Tests for the ManagedGroupAuditData class."""
+
+    def test_no_groups(self):
+        audit_data = data.ManagedGroupAuditData()
+        self.assertEqual(audit_data.groups, [])
+        self.assertEqual(audit_data.groups_by_pk, {})
+        self.assertEqual(audit_data.account_memberships, {})
+
+    def test_groups(self):
+        group = ManagedGroupFactory.create(email="Foo@firecloud.org")
+        audit_data = data.ManagedGroupAuditData()
+        self.assertEqual(audit_data.groups, [group])
+        self.assertEqual(audit_data.groups_by_pk, {group.pk: group})
+        self.assertEqual(audit_data.groups_by_name, {group.name: group})
+        self.assertEqual(audit_data.groups_by_email, {"foo@firecloud.org": group})
+
+    def test_memberships(self):
+        group = ManagedGroupFactory.create()
+        account_membership = GroupAccountMembershipFactory.create(group=group)
+        group_membership = GroupGroupMembershipFactory.create(parent_group=group)
+        ignored = factories.IgnoredManagedGroupMembershipFactory.create(group=group)
+        with self.assertNumQueries(4):
+            audit_data = data.ManagedGroupAuditData()
+        self.assertEqual(audit_data.account_memberships[group.pk], [account_membership])
+        self.assertEqual(audit_data.group_memberships[group.pk], [group_membership])
+        self.assertEqual(audit_data.ignored_memberships[group.pk], [ignored])
+        # The child group has no memberships.
+        self.assertEqual(audit_data.group_memberships[group_membership.child_group.pk], [])
+        # Related objects are loaded without additional queries.
+        with self.assertNumQueries(0):
+            audit_data.account_memberships[group.pk][0].account.email
+            audit_data.account_memberships[group.pk][0].group.name
+            audit_data.group_memberships[group.pk][0].child_group.email
+            audit_data.group_memberships[group.pk][0].parent_group.name
+            audit_data.ignored_memberships[group.pk][0].group.name
+
+    def test_ignored_memberships_order(self):
+        group = ManagedGroupFactory.create()
+        ignored_2 = factories.IgnoredManagedGroupMembershipFactory.create(group=group, ignored_email="b@example.com")
+        ignored_1 = factories.IgnoredManagedGroupMembershipFactory.create(group=group, ignored_email="a@example.com")
+        audit_data = data.ManagedGroupAuditData()
+        self.assertEqual(audit_data.ignored_memberships[group.pk], [ignored_1, ignored_2])
+
+    def test_filtered_groups(self):
+        group = ManagedGroupFactory.create()
+        other_group = ManagedGroupFactory.create()
+        GroupAccountMembershipFactory.create(group=group)
+        GroupAccountMembershipFactory.create(group=other_group)
+        GroupGroupMembershipFactory.create(parent_group=other_group)
+        factories.IgnoredManagedGroupMembershipFactory.create(group=other_group)
+        audit_data = data.ManagedGroupAuditData(ManagedGroup.objects.filter(pk=group.pk))
+        self.assertEqual(audit_data.groups, [group])
+        self.assertEqual(len(audit_data.account_memberships[group.pk]), 1)
+        self.assertNotIn(other_group.pk, audit_data.account_memberships)
+        self.assertNotIn(other_group.pk, audit_data.group_memberships)
+        self.assertNotIn(other_group.pk, audit_data.ignored_memberships)
+
+
+class WorkspaceAuditDataTest(TestCase):
+    """Tests for the WorkspaceAuditData class."""
+
+    def test_no_workspaces(self):
+        audit_data = data.WorkspaceAuditData()
+        self.assertEqual(audit_data.workspaces, [])
+        self.assertEqual(audit_data.workspaces_by_pk, {})
+        self.assertEqual(audit_data.sharing, {})
+
+    def test_workspaces(self):
+        workspace = WorkspaceFactory.create()
+        audit_data = data.WorkspaceAuditData()
+        self.assertEqual(audit_data.workspaces, [workspace])
+        self.assertEqual(audit_data.workspaces_by_pk, {workspace.pk: workspace})
+        self.assertEqual(audit_data.workspaces_by_name, {(workspace.billing_project.name, workspace.name): workspace})
+
+    def test_related_records(self):
+        workspace = WorkspaceFactory.create()
+        auth_domain = WorkspaceAuthorizationDomainFactory.create(workspace=workspace)
+        sharing = WorkspaceGroupSharingFactory.create(workspace=workspace)
+        ignored = factories.IgnoredWorkspaceSharingFactory.create(workspace=workspace)
+        with self.assertNumQueries(4):
+            audit_data = data.WorkspaceAuditData()
+        self.assertEqual(audit_data.authorization_domains[workspace.pk], [auth_domain.group])
+        self.assertEqual(audit_data.sharing[workspace.pk], [sharing])
+        self.assertEqual(audit_data.ignored_sharing[workspace.pk], [ignored])
+        # Related objects are loaded without additional queries.
+        with self.assertNumQueries(0):
+            audit_data.workspaces[0].billing_project.name
+            audit_data.sharing[workspace.pk][0].group.email
+            audit_data.sharing[workspace.pk][0].workspace.name
+            audit_data.ignored_sharing[workspace.pk][0].workspace.name
+
+    def test_filtered_workspaces(self):
+        workspace = WorkspaceFactory.create()
+        other_workspace = WorkspaceFactory.create()
+        WorkspaceAuthorizationDomainFactory.create(workspace=other_workspace)
+        WorkspaceGroupSharingFactory.create(workspace=other_workspace)
+        factories.IgnoredWorkspaceSharingFactory.create(workspace=other_workspace)
+        audit_data = data.WorkspaceAuditData(Workspace.objects.filter(pk=workspace.pk))
+        self.assertEqual(audit_data.workspaces, [workspace])
+        self.assertNotIn(other_workspace.pk, audit_data.authorization_domains)
+        self.assertNotIn(other_workspace.pk, audit_data.sharing)
+        self.assertNotIn(other_workspace.pk, audit_data.ignored_sharing)
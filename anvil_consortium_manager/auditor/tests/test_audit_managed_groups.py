@@ -1,15 +1,18 @@
 import responses
+from django.conf import settings
 from django.core.cache import caches
 from django.test import TestCase
 from django.utils import timezone
 from faker import Faker
 from freezegun import freeze_time
 
+from anvil_consortium_manager.anvil_api import AnVILAPIClient, AnVILAPIError500
 from anvil_consortium_manager.exceptions import AnVILNotGroupAdminError
 from anvil_consortium_manager.models import (
     Account,
     GroupAccountMembership,
     GroupGroupMembership,
+    ManagedGroup,
 )
 from anvil_consortium_manager.tests.api_factories import (
     ErrorResponseFactory,
@@ -50,6 +53,28 @@ class ManagedGroupAuditTest(AnVILAPIMockTestMixin, AuditCacheClearTestMixin, Tes
         """Return the API url being called by the method."""
         return self.api_client.sam_entry_point + "/api/groups/v1/" + group_name + "/admin"
 
+    def test_does_not_use_cached_responses(self):
+        """The audit fetches the list of groups from AnVIL even if a response is cached."""
+        self.anvil_response_mock.add(
+            responses.GET,
+            self.get_api_groups_url(),
+            status=200,
+            json=GetGroupsResponseFactory().response,
+        )
+        cache_settings = {
+            "CACHES": {
+                "default": settings.CACHES["default"],
+                "api_responses": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            },
+            "ANVIL_API_RESPONSE_CACHE": "api_responses",
+        }
+        with self.settings(**cache_settings):
+            AnVILAPIClient().get_groups()
+            audit_results = managed_groups.ManagedGroupAudit()
+            audit_results.run_audit()
+            caches["api_responses"].clear()
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
     def test_anvil_audit_no_groups(self):
         """anvil_audit works correct if there are no ManagedGroups in the app."""
         api_url = self.get_api_groups_url()
@@ -781,6 +806,128 @@ class ManagedGroupAuditTest(AnVILAPIMockTestMixin, AuditCacheClearTestMixin, Tes
         cached_audit_result = caches[app_settings.AUDIT_CACHE].get("managed_group_membership_{}".format(group.pk))
         self.assertIsNone(cached_audit_result)
 
+    def test_workers_default(self):
+        """workers is set from the ANVIL_AUDIT_WORKERS setting by default."""
+        audit_results = managed_groups.ManagedGroupAudit()
+        self.assertEqual(audit_results.workers, 1)
+        with self.settings(ANVIL_AUDIT_WORKERS=4):
+            audit_results = managed_groups.ManagedGroupAudit()
+        self.assertEqual(audit_results.workers, 4)
+
+    def test_workers_argument(self):
+        """workers can be set when initializing the audit."""
+        with self.settings(ANVIL_AUDIT_WORKERS=4):
+            audit_results = managed_groups.ManagedGroupAudit(workers=2)
+        self.assertEqual(audit_results.workers, 2)
+
+    def test_concurrent_results_match_serial(self):
+        """Results are the same when membership is fetched with multiple workers."""
+        groups = ManagedGroupFactory.create_batch(6)
+        not_managed_group = ManagedGroupFactory.create(is_managed_by_app=False)
+        group_details = [GroupDetailsAdminFactory(groupName=group.name) for group in groups]
+        group_details.append(GroupDetailsMemberFactory(groupName=not_managed_group.name))
+        group_details.append(GroupDetailsAdminFactory(groupName="not-in-app"))
+        self.anvil_response_mock.add(
+            responses.GET,
+            self.get_api_groups_url(),
+            status=200,
+            json=GetGroupsResponseFactory(response=group_details).response,
+        )
+        for i, group in enumerate(groups):
+            membership = GroupAccountMembershipFactory.create(group=group)
+            # Every other group has a membership error.
+            members = [membership.account.email] if i % 2 == 0 else []
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_url_members(group.name),
+                status=200,
+                json=GetGroupMembershipResponseFactory(response=members).response,
+            )
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_url_admins(group.name),
+                status=200,
+                json=GetGroupMembershipAdminResponseFactory().response,
+            )
+        serial_results = managed_groups.ManagedGroupAudit(workers=1)
+        serial_results.run_audit()
+        concurrent_results = managed_groups.ManagedGroupAudit(workers=4)
+        concurrent_results.run_audit()
+        self.assertFalse(concurrent_results.ok())
+        self.assertEqual(len(concurrent_results.get_error_results()), 3)
+        self.assertEqual(concurrent_results.get_verified_results(), serial_results.get_verified_results())
+        self.assertEqual(concurrent_results.get_error_results(), serial_results.get_error_results())
+        self.assertEqual(concurrent_results.get_not_in_app_results(), serial_results.get_not_in_app_results())
+        self.assertEqual(concurrent_results.export(), serial_results.export())
+
+    def test_num_queries(self):
+        """The number of queries does not depend on the number of groups or membership records."""
+        groups = ManagedGroupFactory.create_batch(5)
+        for group in groups:
+            account_membership = GroupAccountMembershipFactory.create(group=group)
+            group_membership = GroupGroupMembershipFactory.create(parent_group=group)
+            factories.IgnoredManagedGroupMembershipFactory.create(group=group)
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_url_members(group.name),
+                status=200,
+                json=GetGroupMembershipResponseFactory(
+                    response=[account_membership.account.email, group_membership.child_group.email]
+                ).response,
+            )
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_url_admins(group.name),
+                status=200,
+                json=GetGroupMembershipAdminResponseFactory().response,
+            )
+        # Child groups are not managed by the app on AnVIL.
+        all_groups = ManagedGroup.objects.all()
+        self.anvil_response_mock.add(
+            responses.GET,
+            self.get_api_groups_url(),
+            status=200,
+            json=GetGroupsResponseFactory(
+                response=[
+                    GroupDetailsAdminFactory(groupName=group.name)
+                    if group in groups
+                    else GroupDetailsMemberFactory(groupName=group.name)
+                    for group in all_groups
+                ]
+            ).response,
+        )
+        ManagedGroup.objects.exclude(pk__in=[group.pk for group in groups]).update(is_managed_by_app=False)
+        audit_results = managed_groups.ManagedGroupAudit()
+        # One query each for groups, account memberships, group memberships, and ignored memberships.
+        with self.assertNumQueries(4):
+            audit_results.run_audit()
+        self.assertTrue(audit_results.ok())
+        self.assertEqual(len(audit_results.get_verified_results()), 10)
+
+    def test_concurrent_api_error(self):
+        """An API error when fetching membership with multiple workers is raised."""
+        groups = ManagedGroupFactory.create_batch(3)
+        self.anvil_response_mock.add(
+            responses.GET,
+            self.get_api_groups_url(),
+            status=200,
+            json=GetGroupsResponseFactory(
+                response=[GroupDetailsAdminFactory(groupName=group.name) for group in groups]
+            ).response,
+        )
+        for group in groups:
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_url_members(group.name),
+                status=500,
+                json=ErrorResponseFactory().response,
+            )
+        # Not all requests will necessarily be made before the error is raised.
+        self.anvil_response_mock.assert_all_requests_are_fired = False
+        audit_results = managed_groups.ManagedGroupAudit(workers=3)
+        with self.assertRaises(AnVILAPIError500):
+            audit_results.run_audit()
+
 
 class ManagedGroupMembershipAuditTest(AnVILAPIMockTestMixin, AuditCacheClearTestMixin, TestCase):
     """Tests forthe ManagedGroupMembershipAudit class."""
@@ -798,6 +945,51 @@ class ManagedGroupMembershipAuditTest(AnVILAPIMockTestMixin, AuditCacheClearTest
         with self.assertRaises(AnVILNotGroupAdminError):
             managed_groups.ManagedGroupMembershipAudit(group)
 
+    def test_get_anvil_membership(self):
+        """get_anvil_membership returns lowercase members and admins without the service account."""
+        group = ManagedGroupFactory.create()
+        self.anvil_response_mock.add(
+            responses.GET,
+            self.get_api_url_members(group.name),
+            status=200,
+            json=["Foo@example.com", self.service_account_email],
+        )
+        self.anvil_response_mock.add(
+            responses.GET,
+            self.get_api_url_admins(group.name),
+            status=200,
+            json=["Bar@example.com", self.service_account_email],
+        )
+        audit_results = managed_groups.ManagedGroupMembershipAudit(group)
+        members, admins = audit_results.get_anvil_membership()
+        self.assertEqual(members, ["foo@example.com"])
+        self.assertEqual(admins, ["bar@example.com"])
+
+    def test_run_audit_with_anvil_membership(self):
+        """run_audit does not make API calls when anvil_membership is provided."""
+        group = ManagedGroupFactory.create()
+        membership = GroupAccountMembershipFactory.create(group=group)
+        anvil_membership = ([membership.account.email, "foo@example.com"], [])
+        audit_results = managed_groups.ManagedGroupMembershipAudit(group)
+        audit_results.run_audit(anvil_membership=anvil_membership)
+        self.assertFalse(audit_results.ok())
+        self.assertEqual(len(audit_results.get_verified_results()), 1)
+        self.assertEqual(len(audit_results.get_not_in_app_results()), 1)
+        # The provided lists are not modified.
+        self.assertEqual(anvil_membership, ([membership.account.email, "foo@example.com"], []))
+
+    def test_num_queries(self):
+        """The number of queries does not depend on the number of membership records."""
+        group = ManagedGroupFactory.create()
+        account_memberships = GroupAccountMembershipFactory.create_batch(3, group=group)
+        group_memberships = GroupGroupMembershipFactory.create_batch(3, parent_group=group)
+        factories.IgnoredManagedGroupMembershipFactory.create_batch(2, group=group)
+        members = [x.account.email for x in account_memberships] + [x.child_group.email for x in group_memberships]
+        audit_results = managed_groups.ManagedGroupMembershipAudit(group)
+        with self.assertNumQueries(4):
+            audit_results.run_audit(anvil_membership=(members, []))
+        self.assertEqual(len(audit_results.get_verified_results()), 6)
+
     def test_no_members(self):
         """audit works correctly if this group has no members."""
         group = ManagedGroupFactory.create()
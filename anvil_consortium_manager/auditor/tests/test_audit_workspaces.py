@@ -5,6 +5,7 @@ from django.utils import timezone
 from faker import Faker
 from freezegun import freeze_time
 
+from anvil_consortium_manager.anvil_api import AnVILAPIError500
 from anvil_consortium_manager.exceptions import AnVILNotWorkspaceOwnerError
 from anvil_consortium_manager.models import Workspace, WorkspaceGroupSharing
 from anvil_consortium_manager.tests.factories import (
@@ -1809,6 +1810,170 @@ class WorkspaceAuditTest(AnVILAPIMockTestMixin, AuditCacheClearTestMixin, TestCa
         self.assertFalse(record_result.ok())
         self.assertEqual(record_result.errors, set([audit_results.ERROR_DIFFERENT_AUTH_DOMAINS]))
 
+    def test_workers_default(self):
+        """workers is set from the ANVIL_AUDIT_WORKERS setting by default."""
+        audit_results = workspaces.WorkspaceAudit()
+        self.assertEqual(audit_results.workers, 1)
+        with self.settings(ANVIL_AUDIT_WORKERS=4):
+            audit_results = workspaces.WorkspaceAudit()
+        self.assertEqual(audit_results.workers, 4)
+
+    def test_workers_argument(self):
+        """workers can be set when initializing the audit."""
+        with self.settings(ANVIL_AUDIT_WORKERS=4):
+            audit_results = workspaces.WorkspaceAudit(workers=2)
+        self.assertEqual(audit_results.workers, 2)
+
+    def test_concurrent_results_match_serial(self):
+        """Results are the same when sharing and settings are fetched with multiple workers."""
+        workspace_list = WorkspaceFactory.create_batch(6)
+        missing_workspace = WorkspaceFactory.create()
+        api_json = [self.get_api_workspace_json(x.billing_project.name, x.name, "OWNER") for x in workspace_list]
+        api_json.append(self.get_api_workspace_json("foo", "not-in-app", "OWNER"))
+        self.anvil_response_mock.add(responses.GET, self.get_api_url(), status=200, json=api_json)
+        for i, workspace in enumerate(workspace_list):
+            sharing = WorkspaceGroupSharingFactory.create(workspace=workspace)
+            acl_response = self.get_api_workspace_acl_response()
+            # Every third workspace has a sharing error.
+            if i % 3 != 0:
+                acl_response["acl"][sharing.group.email] = {
+                    "accessLevel": sharing.access,
+                    "canCompute": sharing.can_compute,
+                    "canShare": False,
+                    "pending": False,
+                }
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_workspace_acl_url(workspace.billing_project.name, workspace.name),
+                status=200,
+                json=acl_response,
+            )
+            # Every other workspace has a requester pays error.
+            settings_response = (
+                [{"settingType": "GcpBucketRequesterPays", "config": {"enabled": True}}] if i % 2 == 0 else []
+            )
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_workspace_settings_url(workspace.billing_project.name, workspace.name),
+                status=200,
+                json=settings_response,
+            )
+        serial_results = workspaces.WorkspaceAudit(workers=1)
+        serial_results.run_audit()
+        concurrent_results = workspaces.WorkspaceAudit(workers=4)
+        concurrent_results.run_audit()
+        self.assertFalse(concurrent_results.ok())
+        self.assertEqual(len(concurrent_results.get_verified_results()), 2)
+        self.assertEqual(len(concurrent_results.get_error_results()), 5)
+        self.assertIn(missing_workspace, [x.model_instance for x in concurrent_results.get_error_results()])
+        self.assertEqual(concurrent_results.get_verified_results(), serial_results.get_verified_results())
+        self.assertEqual(concurrent_results.get_error_results(), serial_results.get_error_results())
+        self.assertEqual(concurrent_results.get_not_in_app_results(), serial_results.get_not_in_app_results())
+        self.assertEqual(concurrent_results.export(), serial_results.export())
+
+    def test_concurrent_api_error(self):
+        """An API error when fetching ACLs with multiple workers is raised."""
+        workspace_list = WorkspaceFactory.create_batch(3)
+        api_json = [self.get_api_workspace_json(x.billing_project.name, x.name, "OWNER") for x in workspace_list]
+        self.anvil_response_mock.add(responses.GET, self.get_api_url(), status=200, json=api_json)
+        for workspace in workspace_list:
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_workspace_acl_url(workspace.billing_project.name, workspace.name),
+                status=500,
+                json={"message": "error"},
+            )
+        # Not all requests will necessarily be made before the error is raised.
+        self.anvil_response_mock.assert_all_requests_are_fired = False
+        audit_results = workspaces.WorkspaceAudit(workers=3)
+        with self.assertRaises(AnVILAPIError500):
+            audit_results.run_audit()
+
+    def test_num_queries(self):
+        """The number of queries used to match workspaces does not depend on the number of workspaces."""
+        workspace_list = WorkspaceFactory.create_batch(5, app_access=Workspace.AppAccessChoices.LIMITED)
+        api_json = []
+        for workspace in workspace_list:
+            auth_domain = WorkspaceAuthorizationDomainFactory.create(workspace=workspace)
+            WorkspaceGroupSharingFactory.create(workspace=workspace)
+            api_json.append(
+                self.get_api_workspace_json(
+                    workspace.billing_project.name, workspace.name, "READER", auth_domains=[auth_domain.group.name]
+                )
+            )
+        self.anvil_response_mock.add(responses.GET, self.get_api_url(), status=200, json=api_json)
+        audit_results = workspaces.WorkspaceAudit()
+        # One query each for workspaces with billing projects, auth domains, sharing, and ignored sharing.
+        with self.assertNumQueries(4):
+            audit_results.run_audit()
+        self.assertTrue(audit_results.ok())
+        self.assertEqual(len(audit_results.get_verified_results()), 5)
+
+    def test_num_queries_owner(self):
+        """The number of queries does not depend on the number of owned workspaces or sharing records."""
+        workspace_list = WorkspaceFactory.create_batch(5)
+        api_json = []
+        for workspace in workspace_list:
+            auth_domain = WorkspaceAuthorizationDomainFactory.create(workspace=workspace)
+            sharing = WorkspaceGroupSharingFactory.create(workspace=workspace)
+            factories.IgnoredWorkspaceSharingFactory.create(workspace=workspace)
+            api_json.append(
+                self.get_api_workspace_json(
+                    workspace.billing_project.name, workspace.name, "OWNER", auth_domains=[auth_domain.group.name]
+                )
+            )
+            acl_response = self.get_api_workspace_acl_response()
+            acl_response["acl"][sharing.group.email] = {
+                "accessLevel": sharing.access,
+                "canCompute": sharing.can_compute,
+                "canShare": False,
+                "pending": False,
+            }
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_workspace_acl_url(workspace.billing_project.name, workspace.name),
+                status=200,
+                json=acl_response,
+            )
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.get_api_workspace_settings_url(workspace.billing_project.name, workspace.name),
+                status=200,
+                json=[],
+            )
+        self.anvil_response_mock.add(responses.GET, self.get_api_url(), status=200, json=api_json)
+        audit_results = workspaces.WorkspaceAudit()
+        with self.assertNumQueries(4):
+            audit_results.run_audit()
+        self.assertTrue(audit_results.ok())
+        self.assertEqual(len(audit_results.get_verified_results()), 5)
+
+    def test_not_in_app_order(self):
+        """Workspaces that are not in the app are reported in the order returned by AnVIL."""
+        api_json = [self.get_api_workspace_json("foo", "ws-{}".format(i), "OWNER") for i in [3, 1, 2]]
+        self.anvil_response_mock.add(responses.GET, self.get_api_url(), status=200, json=api_json)
+        audit_results = workspaces.WorkspaceAudit()
+        audit_results.run_audit()
+        self.assertEqual(
+            [x.record for x in audit_results.get_not_in_app_results()], ["foo/ws-3", "foo/ws-1", "foo/ws-2"]
+        )
+
+    def test_timings(self):
+        """The time spent in each phase of the audit is recorded."""
+        self.anvil_response_mock.add(responses.GET, self.get_api_url(), status=200, json=[])
+        audit_results = workspaces.WorkspaceAudit()
+        audit_results.run_audit()
+        self.assertEqual(
+            set(audit_results.timings.keys()),
+            {
+                "list_workspaces",
+                "check_workspaces",
+                "fetch_sharing_and_settings",
+                "check_sharing_and_settings",
+                "check_not_in_app",
+            },
+        )
+
 
 class WorkspaceSharingAuditTest(AnVILAPIMockTestMixin, AuditCacheClearTestMixin, TestCase):
     """Tests for the WorkspaceSharingAudit class."""
@@ -1842,6 +2007,36 @@ class WorkspaceSharingAuditTest(AnVILAPIMockTestMixin, AuditCacheClearTestMixin,
             }
         )
 
+    def test_get_anvil_acl(self):
+        """get_anvil_acl returns the ACL with lowercase emails and without the service account."""
+        self.update_api_response(self.service_account_email, "OWNER", can_compute=True, can_share=True)
+        self.update_api_response("Foo@example.com", "READER")
+        self.anvil_response_mock.add(
+            responses.GET,
+            self.api_url,
+            status=200,
+            json=self.api_response,
+        )
+        audit_results = workspaces.WorkspaceSharingAudit(self.workspace)
+        acl = audit_results.get_anvil_acl()
+        self.assertEqual(list(acl.keys()), ["foo@example.com"])
+        self.assertEqual(acl["foo@example.com"]["accessLevel"], "READER")
+
+    def test_run_audit_with_anvil_acl(self):
+        """run_audit does not make API calls when anvil_acl is provided."""
+        access = WorkspaceGroupSharingFactory.create(workspace=self.workspace, access=WorkspaceGroupSharing.READER)
+        anvil_acl = {
+            access.group.email: {"accessLevel": "READER", "canCompute": False, "canShare": False, "pending": False},
+            "foo@example.com": {"accessLevel": "READER", "canCompute": False, "canShare": False, "pending": False},
+        }
+        audit_results = workspaces.WorkspaceSharingAudit(self.workspace)
+        audit_results.run_audit(anvil_acl=anvil_acl)
+        self.assertFalse(audit_results.ok())
+        self.assertEqual(len(audit_results.get_verified_results()), 1)
+        self.assertEqual(len(audit_results.get_not_in_app_results()), 1)
+        # The provided ACL is not modified.
+        self.assertEqual(len(anvil_acl), 2)
+
     def test_not_shared(self):
         """anvil_audit works correctly if this workspace is not shared with any groups."""
         self.anvil_response_mock.add(
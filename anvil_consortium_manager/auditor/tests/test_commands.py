@@ -17,7 +17,7 @@ from anvil_consortium_manager.tests.api_factories import (
     GetGroupsResponseFactory,
     GroupDetailsAdminFactory,
 )
-from anvil_consortium_manager.tests.factories import AccountFactory, BillingProjectFactory
+from anvil_consortium_manager.tests.factories import AccountFactory, BillingProjectFactory, ManagedGroupFactory
 from anvil_consortium_manager.tests.utils import AnVILAPIMockTestMixin
 
 from ... import app_settings
@@ -171,6 +171,66 @@ class RunAnvilAuditTest(AnVILAPIMockTestMixin, TestCase):
         call_command("run_anvil_audit", "--no-color", models=["ManagedGroup"], stdout=out)
         self.assertIn("ManagedGroupAudit... ok!", out.getvalue())
 
+    def test_command_output_managed_group_workers(self):
+        """The --workers option can be used to fetch group membership concurrently."""
+        groups = ManagedGroupFactory.create_batch(3)
+        self.anvil_response_mock.add(
+            responses.GET,
+            self.api_client.sam_entry_point + "/api/groups/v1",
+            status=200,
+            json=GetGroupsResponseFactory(
+                response=[GroupDetailsAdminFactory(groupName=group.name) for group in groups]
+            ).response,
+        )
+        for group in groups:
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.api_client.sam_entry_point + "/api/groups/v1/" + group.name + "/member",
+                status=200,
+                json=GetGroupMembershipResponseFactory().response,
+            )
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.api_client.sam_entry_point + "/api/groups/v1/" + group.name + "/admin",
+                status=200,
+                json=GetGroupMembershipAdminResponseFactory().response,
+            )
+        out = StringIO()
+        call_command("run_anvil_audit", "--no-color", "--workers=3", models=["ManagedGroup"], stdout=out)
+        self.assertIn("ManagedGroupAudit... ok!", out.getvalue())
+
+    def test_command_output_timings(self):
+        """Phase timings are reported with increased verbosity."""
+        self.anvil_response_mock.add(
+            responses.GET,
+            self.api_client.rawls_entry_point + "/api/workspaces",
+            status=200,
+            json=[],
+        )
+        out = StringIO()
+        call_command("run_anvil_audit", "--no-color", "--verbosity=2", models=["Workspace"], stdout=out)
+        self.assertIn("WorkspaceAudit... ok!", out.getvalue())
+        self.assertIn("list_workspaces:", out.getvalue())
+        self.assertIn("fetch_sharing_and_settings:", out.getvalue())
+
+    def test_command_output_no_timings_by_default(self):
+        """Phase timings are not reported with the default verbosity."""
+        self.anvil_response_mock.add(
+            responses.GET,
+            self.api_client.rawls_entry_point + "/api/workspaces",
+            status=200,
+            json=[],
+        )
+        out = StringIO()
+        call_command("run_anvil_audit", "--no-color", models=["Workspace"], stdout=out)
+        self.assertNotIn("list_workspaces:", out.getvalue())
+
+    def test_command_invalid_workers(self):
+        """An error is raised when --workers is not positive."""
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "--workers must be a positive integer."):
+            call_command("run_anvil_audit", "--no-color", "--workers=0", models=["ManagedGroup"], stdout=out)
+
     def test_command_output_workspace_no_instances(self):
         """Test command output."""
         self.anvil_response_mock.add(
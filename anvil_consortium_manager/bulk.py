@@ -0,0 +1,96 @@
+"""Helpers for making AnVIL API calls for many records at once."""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from . import app_settings
+from .anvil_api import AnVILAPIError
+
+logger = logging.getLogger(__name__)
+
+
+class BulkResult:
+    """The outcome of an AnVIL API call for one record in a bulk operation."""
+
+    def __init__(self, instance, error=None, value=None):
+        """
+        Args:
+            instance: The record that the API call was made for.
+            error (Exception, optional): The error raised by the API call, or None if it succeeded.
+            value (optional): The value returned by the API call, if it succeeded.
+        """
+        self.instance = instance
+        self.error = error
+        self.value = value
+
+    def __repr__(self):
+        return "BulkResult({!r}, error={!r})".format(self.instance, self.error)
+
+    @property
+    def succeeded(self):
+        """Whether the API call succeeded."""
+        return self.error is None
+
+
+def call_concurrently(func, instances, workers=None):
+    """Call ``func`` on each instance, using up to ``workers`` threads, and record whether each call succeeded.
+
+    Unlike a plain loop, an ``AnVILAPIError`` raised for one instance does not stop the calls for the remaining
+    instances; it is stored on the ``BulkResult`` for that instance instead. Other exceptions are re-raised. ``func``
+    should only make AnVIL API calls; database access should stay on the calling thread.
+
+    Args:
+        func (callable): The function to call on each instance.
+        instances (iterable): The instances to pass to ``func``.
+        workers (int, optional): The maximum number of threads to use. If not provided, ``ANVIL_BULK_WORKERS`` is
+            used. If 1, ``func`` is called serially in this thread.
+
+    Returns:
+        list: A ``BulkResult`` for each instance, in the same order as ``instances``, with the value returned by
+            ``func`` for instances where it succeeded.
+    """
+    if workers is None:
+        workers = app_settings.BULK_WORKERS
+    instances = list(instances)
+
+    def call(instance):
+        try:
+            value = func(instance)
+        except AnVILAPIError as e:
+            logger.warning("AnVIL API call failed for %s: %s", instance, e)
+            return BulkResult(instance, error=e)
+        return BulkResult(instance, value=value)
+
+    if workers <= 1 or len(instances) <= 1:
+        return [call(instance) for instance in instances]
+    with ThreadPoolExecutor(max_workers=min(workers, len(instances))) as executor:
+        return list(executor.map(call, instances))
+
+
+class AccountDeactivationReport:
+    """The outcome of deactivating many Accounts at once with ``Account.bulk_deactivate``."""
+
+    def __init__(self):
+        self.deactivated = []
+        """Accounts that were removed from all groups and set to inactive."""
+        self.not_deactivated = []
+        """Accounts that could not be removed from at least one group, and are still active."""
+        self.skipped = []
+        """Accounts that were already inactive."""
+        self.membership_results = []
+        """A ``BulkResult`` for each GroupAccountMembership that the Accounts were removed from."""
+
+    @property
+    def removed_memberships(self):
+        """GroupAccountMemberships that were removed on AnVIL and deleted from the app."""
+        return [result.instance for result in self.membership_results if result.succeeded]
+
+    @property
+    def failed_memberships(self):
+        """``BulkResult`` instances for GroupAccountMemberships that could not be removed on AnVIL."""
+        return [result for result in self.membership_results if not result.succeeded]
+
+    @property
+    def succeeded(self):
+        """Whether all Accounts that were not skipped were deactivated."""
+        return not self.not_deactivated
@@ -1,5 +1,7 @@
 """Forms classes for the anvil_consortium_manager app."""
 
+import csv
+
 from crispy_bootstrap5.bootstrap5 import FloatingField
 from crispy_forms import layout
 from crispy_forms.helper import FormHelper
@@ -131,6 +133,41 @@ class AccountUpdateForm(forms.ModelForm):
         fields = ("note",)
 
 
+def _get_accounts_by_email(emails):
+    """Return the Accounts with the given emails, in the same order.
+
+    Blank and repeated emails are ignored, and emails are not case-sensitive.
+
+    Raises:
+        ValidationError: No emails were given, or some emails do not match an Account.
+    """
+    unique_emails = []
+    for email in emails:
+        email = email.strip().lower()
+        if email and email not in unique_emails:
+            unique_emails.append(email)
+    if not unique_emails:
+        raise ValidationError("Enter at least one email.")
+    accounts = {account.email: account for account in models.Account.objects.filter(email__in=unique_emails)}
+    missing = [email for email in unique_emails if email not in accounts]
+    if missing:
+        raise ValidationError("No Account found with email: {}".format(", ".join(missing)))
+    return [accounts[email] for email in unique_emails]
+
+
+class AccountBulkDeactivateForm(forms.Form):
+    """Form to select many Accounts to deactivate by email."""
+
+    emails = forms.CharField(
+        widget=forms.Textarea,
+        help_text="Emails of the Accounts to deactivate, one per line.",
+    )
+
+    def clean_emails(self):
+        """Return the Accounts with the entered emails, in the order they were entered."""
+        return _get_accounts_by_email(self.cleaned_data["emails"].splitlines())
+
+
 class UserEmailEntryForm(forms.Form):
     """Form for user to enter their email attempting to link their AnVIL account."""
 
@@ -164,6 +201,24 @@ class ManagedGroupCreateForm(forms.ModelForm):
         return value
 
 
+class ManagedGroupVisualizationForm(Bootstrap5MediaFormMixin, forms.Form):
+    """Form to select the part of the group hierarchy to show in the ManagedGroupVisualization view."""
+
+    group = forms.ModelChoiceField(
+        queryset=models.ManagedGroup.objects.all(),
+        widget=autocomplete.ModelSelect2(
+            url="anvil_consortium_manager:managed_groups:autocomplete",
+            attrs={"data-theme": "bootstrap-5"},
+        ),
+        help_text="Show the groups that this group is a member of and the groups that are members of it.",
+    )
+    depth = forms.IntegerField(
+        min_value=1,
+        required=False,
+        help_text="Number of levels of parent and child groups to show. Leave blank to show all levels.",
+    )
+
+
 class ManagedGroupUpdateForm(forms.ModelForm):
     """Form to update information about a ManagedGroup."""
 
@@ -359,6 +414,93 @@ class GroupAccountMembershipForm(Bootstrap5MediaFormMixin, forms.ModelForm):
         }
 
 
+class GroupAccountMembershipBulkForm(Bootstrap5MediaFormMixin, forms.Form):
+    """Form to add many Accounts to or remove many Accounts from one or more ManagedGroups."""
+
+    ADD = "add"
+    REMOVE = "remove"
+
+    action = forms.ChoiceField(
+        choices=[(ADD, "Add accounts to groups"), (REMOVE, "Remove accounts from groups")],
+        initial=ADD,
+    )
+    groups = forms.ModelMultipleChoiceField(
+        queryset=models.ManagedGroup.objects.filter(is_managed_by_app=True),
+        help_text="Only groups managed by this app can be selected.",
+        widget=autocomplete.ModelSelect2Multiple(
+            url="anvil_consortium_manager:managed_groups:autocomplete",
+            attrs={"data-theme": "bootstrap-5"},
+            forward=(forward.Const(True, "only_managed_by_app"),),
+        ),
+    )
+    role = forms.ChoiceField(
+        choices=models.GroupAccountMembership.RoleChoices.choices,
+        initial=models.GroupAccountMembership.RoleChoices.MEMBER,
+        help_text="Role that the accounts should have in the groups. Only used when adding accounts.",
+    )
+    emails = forms.CharField(
+        widget=forms.Textarea,
+        required=False,
+        help_text="Emails of the accounts, one per line.",
+    )
+    csv_file = forms.FileField(
+        required=False,
+        label="CSV file",
+        help_text='A CSV file with the emails of the accounts in an "email" column.',
+    )
+
+    def clean_csv_file(self):
+        """Return the emails in the "email" column of the CSV file."""
+        csv_file = self.cleaned_data["csv_file"]
+        if not csv_file:
+            return []
+        try:
+            reader = csv.DictReader(csv_file.read().decode("utf-8-sig").splitlines())
+            fieldnames = reader.fieldnames or []
+        except (UnicodeDecodeError, csv.Error):
+            raise ValidationError("Could not read the CSV file.")
+        if "email" not in fieldnames:
+            raise ValidationError('The CSV file must have an "email" column.')
+        return [row["email"] or "" for row in reader]
+
+    def clean(self):
+        """Check that every membership can be added or removed, and set ``memberships`` in ``cleaned_data``."""
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        try:
+            accounts = _get_accounts_by_email(cleaned_data["emails"].splitlines() + cleaned_data["csv_file"])
+        except ValidationError as e:
+            self.add_error("emails", e)
+            return cleaned_data
+        groups = cleaned_data["groups"]
+        if cleaned_data["action"] == self.ADD:
+            memberships = [
+                models.GroupAccountMembership(account=account, group=group, role=cleaned_data["role"])
+                for group in groups
+                for account in accounts
+            ]
+            models.GroupAccountMembership.validate_bulk_create(memberships)
+        else:
+            existing = {
+                (membership.account_id, membership.group_id): membership
+                for membership in models.GroupAccountMembership.objects.filter(
+                    account__in=accounts, group__in=groups
+                ).select_related("account", "group")
+            }
+            missing = [
+                "{} is not a member of {}.".format(account, group)
+                for group in groups
+                for account in accounts
+                if (account.pk, group.pk) not in existing
+            ]
+            if missing:
+                raise ValidationError(missing)
+            memberships = [existing[(account.pk, group.pk)] for group in groups for account in accounts]
+        cleaned_data["memberships"] = memberships
+        return cleaned_data
+
+
 class WorkspaceGroupSharingForm(Bootstrap5MediaFormMixin, forms.ModelForm):
     """Form for the WorkspaceGroupSharing model."""
 
@@ -0,0 +1,172 @@
+"""Compute and cache layouts of ManagedGroup graphs for plotting."""
+
+import hashlib
+
+import networkx as nx
+import numpy as np
+from django.core.cache import caches
+
+from . import app_settings
+
+CACHE_KEY_PREFIX = "anvil_graph_layout"
+"""Prefix for the cache keys of graph layouts."""
+
+FULL_GRAPH_LAYOUT_NAME = "all"
+"""Name under which the last layout of the graph of all groups is stored."""
+
+INCREMENTAL_ITERATIONS = 20
+"""Maximum number of iterations used when updating a previous layout, instead of the spring layout default of 50."""
+
+CACHE_TIMEOUT = 7 * 24 * 60 * 60
+"""Number of seconds to keep cached layouts. Layouts of graphs that are no longer requested expire after this time."""
+
+
+def get_group_layout_name(group, depth=None):
+    """Return the name under which the last layout of the graph for a ManagedGroup is stored.
+
+    Args:
+        group (ManagedGroup): The group that the graph was built for.
+        depth (int, optional): The number of levels of parents and children in the graph, or None for all levels.
+    """
+    if depth is None:
+        return "group-{}".format(group.pk)
+    return "group-{}-depth-{}".format(group.pk, depth)
+
+
+def get_graph_fingerprint(G):
+    """Return a string that identifies the nodes and edges of a graph.
+
+    The fingerprint only depends on the names of the nodes and the edges between them, so graphs with the same
+    structure have the same fingerprint regardless of the order in which nodes and edges were added.
+    """
+    digest = hashlib.sha256()
+    for node in sorted(G.nodes):
+        digest.update(node.encode())
+        digest.update(b"\0")
+    digest.update(b"\1")
+    for u, v in sorted(G.edges):
+        digest.update(u.encode())
+        digest.update(b"\0")
+        digest.update(v.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def compute_layout(G):
+    """Compute the positions of the nodes in a graph.
+
+    Returns:
+        dict: The (x, y) position of each node, keyed by node name.
+    """
+    # Networkx layout that requires graphviz:
+    # layout = nx.drawing.nx_agraph.graphviz_layout(G, prog="neato")
+    # Networkx layout that requires scipy:
+    # layout = nx.kamada_kawai_layout(G)
+    layout = nx.spring_layout(G)
+    return {node: (float(x), float(y)) for node, (x, y) in layout.items()}
+
+
+def get_affected_nodes(G, previous_edges):
+    """Return the nodes whose position should be updated after a graph changes.
+
+    These are the nodes with an edge that was added or removed, and their neighbors in the current graph.
+
+    Args:
+        G (networkx.DiGraph): The current graph.
+        previous_edges (iterable): The (u, v) edges of the graph when it was last laid out.
+    """
+    changed_edges = set(G.edges).symmetric_difference(tuple(edge) for edge in previous_edges)
+    changed = set(node for edge in changed_edges for node in edge if node in G)
+    affected = set(changed)
+    for node in changed:
+        affected.update(G.predecessors(node))
+        affected.update(G.successors(node))
+    return affected
+
+
+def compute_incremental_layout(G, previous_layout, previous_edges, seed=None):
+    """Compute the positions of the nodes in a graph, starting from a previous layout of the graph.
+
+    Nodes that are not affected by the changes to the graph keep their previous positions. Other nodes start from
+    their previous position or, for new nodes, near their neighbors, and are moved for at most
+    ``INCREMENTAL_ITERATIONS`` iterations. If none of the nodes were in the previous layout, the full layout is
+    computed instead.
+
+    Args:
+        G (networkx.DiGraph): The graph to lay out.
+        previous_layout (dict): The (x, y) position of each node in the previous layout.
+        previous_edges (iterable): The (u, v) edges of the graph when it was last laid out.
+        seed (int, optional): Seed for the random offsets of new nodes and for ``networkx.spring_layout``.
+
+    Returns:
+        dict: The (x, y) position of each node, keyed by node name.
+    """
+    pos = {node: np.array(previous_layout[node], dtype=float) for node in G if node in previous_layout}
+    if not pos:
+        return compute_layout(G)
+    affected = get_affected_nodes(G, previous_edges)
+    rng = np.random.default_rng(seed)
+    # Place each new node at the center of its neighbors that already have a position, with a small offset so that
+    # new nodes with the same neighbors do not overlap.
+    new_nodes = [node for node in G if node not in pos]
+    center = np.mean(list(pos.values()), axis=0)
+    for node in new_nodes:
+        neighbors = [n for n in nx.all_neighbors(G, node) if n in pos]
+        start = np.mean([pos[n] for n in neighbors], axis=0) if neighbors else center
+        pos[node] = start + rng.uniform(-0.05, 0.05, size=2)
+        affected.add(node)
+    fixed = [node for node in G if node not in affected]
+    if not fixed:
+        layout = nx.spring_layout(G, pos=pos, seed=seed)
+    else:
+        layout = nx.spring_layout(G, pos=pos, fixed=fixed, iterations=INCREMENTAL_ITERATIONS, seed=seed)
+    return {node: (float(x), float(y)) for node, (x, y) in layout.items()}
+
+
+def get_layout(G, name=None):
+    """Return the positions of the nodes in a graph, using a cached layout for graphs with the same structure.
+
+    Layouts are cached in the cache set by the ``ANVIL_GRAPH_LAYOUT_CACHE`` setting, keyed by the fingerprint of the
+    graph, so a new layout is only computed when groups or group memberships change. Cached layouts expire after
+    ``CACHE_TIMEOUT`` seconds. If the setting is None, layouts are not cached.
+
+    If ``name`` is provided, the most recently computed layout for that name is also stored, and a new layout for a
+    changed graph is computed by updating the positions of the affected nodes in that layout (see
+    ``compute_incremental_layout``). This keeps nodes that were not affected by a change in the same place. The
+    cached layout of the previous graph for that name is deleted, since it is no longer current.
+
+    Args:
+        G (networkx.DiGraph): The graph to lay out.
+        name (str, optional): The name under which to store the most recently computed layout, e.g.,
+            ``FULL_GRAPH_LAYOUT_NAME`` or the name returned by ``get_group_layout_name``.
+
+    Returns:
+        dict: The (x, y) position of each node, keyed by node name.
+    """
+    cache_alias = app_settings.GRAPH_LAYOUT_CACHE
+    if cache_alias is None:
+        return compute_layout(G)
+    cache = caches[cache_alias]
+    key = "{}:{}".format(CACHE_KEY_PREFIX, get_graph_fingerprint(G))
+    layout = cache.get(key)
+    if layout is None:
+        previous = cache.get(_get_last_layout_key(name)) if name is not None else None
+        if previous is None:
+            layout = compute_layout(G)
+        else:
+            layout = compute_incremental_layout(G, previous["layout"], previous["edges"])
+            # Each change to the graph gives a new key, so remove the layout that this one replaces.
+            if previous.get("key") not in (None, key):
+                cache.delete(previous["key"])
+        cache.set(key, layout, timeout=CACHE_TIMEOUT)
+        if name is not None:
+            cache.set(
+                _get_last_layout_key(name),
+                {"layout": layout, "edges": list(G.edges), "key": key},
+                timeout=CACHE_TIMEOUT,
+            )
+    return layout
+
+
+def _get_last_layout_key(name):
+    return "{}:last:{}".format(CACHE_KEY_PREFIX, name)
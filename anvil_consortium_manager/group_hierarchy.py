@@ -0,0 +1,84 @@
+"""Recursive common table expression (CTE) queries for the ManagedGroup hierarchy.
+
+These queries walk the GroupGroupMembership table with ``WITH RECURSIVE``, which is supported by PostgreSQL, SQLite,
+MySQL 8.0+ and MariaDB 10.2+, so that the full set of ancestors or descendants is found in one round trip. The
+recursive step uses ``UNION`` rather than ``UNION ALL``, so rows that have already been found are discarded and the
+queries terminate even if the hierarchy contains a cycle.
+
+Each function returns the SQL for a subquery that selects group pks, for use with
+``django.db.models.expressions.RawSQL``, except ``get_ancestor_pairs_sql``, which selects pairs of group pks.
+"""
+
+from django.db import connection
+
+
+def _get_membership_columns(membership_model):
+    """Return the quoted table name and parent and child group columns of the membership model."""
+    quote_name = connection.ops.quote_name
+    meta = membership_model._meta
+    return (
+        quote_name(meta.db_table),
+        quote_name(meta.get_field("parent_group").column),
+        quote_name(meta.get_field("child_group").column),
+    )
+
+
+def _get_walk_sql(membership_model, anchor_sql, from_column, to_column):
+    table, parent_column, child_column = _get_membership_columns(membership_model)
+    columns = {"parent": parent_column, "child": child_column}
+    return (
+        "WITH RECURSIVE hierarchy (group_id) AS ("
+        "SELECT {to} FROM {table} WHERE {from_} IN ({anchor}) "
+        "UNION "
+        "SELECT m.{to} FROM {table} m INNER JOIN hierarchy h ON m.{from_} = h.group_id"
+        ") SELECT group_id FROM hierarchy"
+    ).format(table=table, anchor=anchor_sql, from_=columns[from_column], to=columns[to_column])
+
+
+def get_ancestors_sql(membership_model, anchor_sql):
+    """Return SQL selecting the pks of all direct and indirect parents of the groups selected by ``anchor_sql``.
+
+    The groups selected by ``anchor_sql`` are only included if they are their own ancestor, i.e., in a cycle.
+    """
+    return _get_walk_sql(membership_model, anchor_sql, "child", "parent")
+
+
+def get_descendants_sql(membership_model, anchor_sql):
+    """Return SQL selecting the pks of all direct and indirect children of the groups selected by ``anchor_sql``.
+
+    The groups selected by ``anchor_sql`` are only included if they are their own descendant, i.e., in a cycle.
+    """
+    return _get_walk_sql(membership_model, anchor_sql, "parent", "child")
+
+
+def _get_paths_sql(membership_model, anchor_sql=None):
+    """Return SQL selecting a (descendant pk, ancestor pk) row for each pair of groups connected by memberships.
+
+    If ``anchor_sql`` is provided, only rows for descendants selected by ``anchor_sql`` are included.
+    """
+    table, parent_column, child_column = _get_membership_columns(membership_model)
+    where = " WHERE {child} IN ({anchor})".format(child=child_column, anchor=anchor_sql) if anchor_sql else ""
+    return (
+        "WITH RECURSIVE paths (descendant_id, ancestor_id) AS ("
+        "SELECT {child}, {parent} FROM {table}{where} "
+        "UNION "
+        "SELECT p.descendant_id, m.{parent} FROM {table} m INNER JOIN paths p ON m.{child} = p.ancestor_id"
+        ") SELECT descendant_id, ancestor_id FROM paths"
+    ).format(table=table, parent=parent_column, child=child_column, where=where)
+
+
+def get_ancestor_pairs_sql(membership_model, anchor_sql):
+    """Return SQL selecting a (descendant pk, ancestor pk) row for each ancestor of the groups selected by
+    ``anchor_sql``.
+
+    Unlike the other functions, this returns two columns. A group selected by ``anchor_sql`` is only paired with
+    itself if it is in a cycle.
+    """
+    return _get_paths_sql(membership_model, anchor_sql)
+
+
+def get_groups_in_cycles_sql(membership_model):
+    """Return SQL selecting the pks of all groups that are direct or indirect members of themselves."""
+    return "SELECT descendant_id FROM ({paths}) cycles WHERE descendant_id = ancestor_id".format(
+        paths=_get_paths_sql(membership_model)
+    )
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Account
+
+
+class Command(BaseCommand):
+    help = "Deactivate Accounts and remove them from all groups on AnVIL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("emails", nargs="*", help="Emails of the Accounts to deactivate.")
+        parser.add_argument(
+            "--file",
+            help="Path to a file with the emails of the Accounts to deactivate, one per line.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="""Number of threads to use for concurrent AnVIL API calls.
+            If not specified, the ANVIL_BULK_WORKERS setting is used.""",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        if workers is not None and workers < 1:
+            raise CommandError("--workers must be a positive integer.")
+        emails = [email.lower() for email in options["emails"]]
+        if options["file"]:
+            with open(options["file"]) as f:
+                emails.extend(line.strip().lower() for line in f if line.strip())
+        if not emails:
+            raise CommandError("Specify at least one email or a --file with emails.")
+        accounts = {account.email: account for account in Account.objects.filter(email__in=emails)}
+        missing = sorted(set(emails) - set(accounts))
+        if missing:
+            raise CommandError("No Account found with email: {}".format(", ".join(missing)))
+        report = Account.bulk_deactivate(accounts.values(), workers=workers)
+        self.stdout.write("Deactivated: {}".format(len(report.deactivated)))
+        self.stdout.write("Already inactive: {}".format(len(report.skipped)))
+        self.stdout.write("Group memberships removed: {}".format(len(report.removed_memberships)))
+        if not report.succeeded:
+            self.stdout.write(self.style.ERROR("Not deactivated: {}".format(len(report.not_deactivated))))
+            for result in report.failed_memberships:
+                self.stdout.write("  {} in {}: {}".format(result.instance.account, result.instance.group, result.error))
+            raise CommandError("Some Accounts could not be removed from all groups and are still active.")
+        self.stdout.write(self.style.SUCCESS("All Accounts deactivated."))
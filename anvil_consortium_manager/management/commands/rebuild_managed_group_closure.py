@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import ManagedGroup, ManagedGroupClosure
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ManagedGroupClosure table from the GroupGroupMemberships in the app."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only check that the ManagedGroupClosure table is consistent with the GroupGroupMemberships in the "
+            "app and that there are no cycles in the group hierarchy, without rebuilding the table. Exits with an "
+            "error if any problems are found.",
+        )
+
+    def handle(self, **options):
+        if options["verify"]:
+            self.stdout.write("Verifying managed group closure... ", ending="")
+            missing, unexpected = ManagedGroupClosure.get_discrepancies()
+            groups_in_cycles = ManagedGroup.get_groups_in_cycles().order_by("name")
+            if missing or unexpected or groups_in_cycles:
+                self.stdout.write(self.style.ERROR("problems found."))
+                self.stdout.write("Missing records: {}".format(len(missing)))
+                self.stdout.write("Unexpected records: {}".format(len(unexpected)))
+                if groups_in_cycles:
+                    self.stdout.write(
+                        "Groups that are members of themselves: {}".format(
+                            ", ".join(group.name for group in groups_in_cycles)
+                        )
+                    )
+                if missing or unexpected:
+                    raise CommandError(
+                        "The managed group closure is out of date. Rerun without --verify to rebuild it."
+                    )
+                raise CommandError("The managed group hierarchy contains cycles.")
+            self.stdout.write(self.style.SUCCESS("ok!"))
+        else:
+            self.stdout.write("Rebuilding managed group closure... ", ending="")
+            ManagedGroupClosure.rebuild()
+            self.stdout.write(self.style.SUCCESS("done ({} records).".format(ManagedGroupClosure.objects.count())))
@@ -0,0 +1,98 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Account, GroupAccountMembership, ManagedGroup
+
+
+class Command(BaseCommand):
+    help = "Add many Accounts to or remove many Accounts from one or more ManagedGroups, on AnVIL and in the app."
+
+    def add_arguments(self, parser):
+        parser.add_argument("emails", nargs="*", help="Emails of the Accounts.")
+        parser.add_argument(
+            "--file",
+            help="Path to a file with the emails of the Accounts, one per line.",
+        )
+        parser.add_argument(
+            "--groups",
+            nargs="+",
+            required=True,
+            help="Names of the ManagedGroups to add the Accounts to or remove them from.",
+        )
+        parser.add_argument(
+            "--role",
+            choices=GroupAccountMembership.RoleChoices.values,
+            default=GroupAccountMembership.RoleChoices.MEMBER,
+            help="Role that the Accounts should have in the groups. Only used when adding Accounts.",
+        )
+        parser.add_argument(
+            "--remove",
+            action="store_true",
+            help="Remove the Accounts from the groups instead of adding them.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="""Number of threads to use for concurrent AnVIL API calls.
+            If not specified, the ANVIL_BULK_WORKERS setting is used.""",
+        )
+
+    def _get_accounts(self, emails):
+        accounts = {account.email: account for account in Account.objects.filter(email__in=emails)}
+        missing = sorted(set(emails) - set(accounts))
+        if missing:
+            raise CommandError("No Account found with email: {}".format(", ".join(missing)))
+        return [accounts[email] for email in dict.fromkeys(emails)]
+
+    def _get_groups(self, names):
+        groups = {group.name: group for group in ManagedGroup.objects.filter(name__in=names)}
+        missing = sorted(set(names) - set(groups))
+        if missing:
+            raise CommandError("No ManagedGroup found with name: {}".format(", ".join(missing)))
+        return [groups[name] for name in dict.fromkeys(names)]
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        if workers is not None and workers < 1:
+            raise CommandError("--workers must be a positive integer.")
+        emails = [email.lower() for email in options["emails"]]
+        if options["file"]:
+            with open(options["file"]) as f:
+                emails.extend(line.strip().lower() for line in f if line.strip())
+        if not emails:
+            raise CommandError("Specify at least one email or a --file with emails.")
+        accounts = self._get_accounts(emails)
+        groups = self._get_groups(options["groups"])
+
+        try:
+            if options["remove"]:
+                existing = GroupAccountMembership.objects.filter(account__in=accounts, group__in=groups)
+                memberships = list(existing.select_related("account", "group"))
+                found = set((membership.account_id, membership.group_id) for membership in memberships)
+                missing = [
+                    "{} is not a member of {}.".format(account, group)
+                    for group in groups
+                    for account in accounts
+                    if (account.pk, group.pk) not in found
+                ]
+                if missing:
+                    raise CommandError("Memberships not found:\n" + "\n".join(missing))
+                results = GroupAccountMembership.anvil_bulk_delete(memberships, workers=workers)
+            else:
+                memberships = [
+                    GroupAccountMembership(account=account, group=group, role=options["role"])
+                    for group in groups
+                    for account in accounts
+                ]
+                results = GroupAccountMembership.anvil_bulk_create(memberships, workers=workers)
+        except ValidationError as e:
+            raise CommandError("Memberships are not valid:\n" + "\n".join(e.messages))
+
+        failed = [result for result in results if not result.succeeded]
+        self.stdout.write("{}: {}".format("Removed" if options["remove"] else "Added", len(results) - len(failed)))
+        if failed:
+            self.stdout.write(self.style.ERROR("Failed: {}".format(len(failed))))
+            for result in failed:
+                self.stdout.write("  {}: {}".format(result.instance, result.error))
+            raise CommandError("Some memberships could not be changed on AnVIL.")
+        self.stdout.write(self.style.SUCCESS("All memberships updated."))
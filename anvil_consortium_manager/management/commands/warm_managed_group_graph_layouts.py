@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import app_settings, graph_layout
+from ...models import ManagedGroup
+
+
+class Command(BaseCommand):
+    help = "Compute and cache the layouts of the managed group graphs shown in the app."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--include-groups",
+            action="store_true",
+            help="Also cache the layout of the graph shown on the detail page of each managed group. Otherwise, only "
+            "the layout of the graph of all groups is cached.",
+        )
+
+    def handle(self, **options):
+        if app_settings.GRAPH_LAYOUT_CACHE is None:
+            raise CommandError("ANVIL_GRAPH_LAYOUT_CACHE is not set, so graph layouts are not cached.")
+        self.stdout.write("Caching layout of all groups... ", ending="")
+        graph_layout.get_layout(ManagedGroup.get_full_graph(), name=graph_layout.FULL_GRAPH_LAYOUT_NAME)
+        self.stdout.write(self.style.SUCCESS("done."))
+        if options["include_groups"]:
+            self.stdout.write("Caching layouts for each group... ", ending="")
+            groups = ManagedGroup.objects.all()
+            for group in groups:
+                graph_layout.get_layout(group.get_graph(), name=graph_layout.get_group_layout_name(group))
+            self.stdout.write(self.style.SUCCESS("done ({} groups).".format(len(groups))))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 19:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anvil_consortium_manager', '0020_historicalworkspace_app_access_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ManagedGroupClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(help_text='Number of group-group memberships in the shortest path from the ancestor to the descendant.')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_closures', to='anvil_consortium_manager.managedgroup')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_closures', to='anvil_consortium_manager.managedgroup')),
+            ],
+            options={
+                'verbose_name': 'managed group closure',
+                'indexes': [models.Index(fields=['descendant', 'ancestor'], name='managed_group_closure_desc')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_managed_group_closure')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+from collections import defaultdict, deque
+
+from django.db import migrations
+
+
+def populate_closure(apps, schema_editor):
+    """Populate the ManagedGroupClosure table from the existing GroupGroupMemberships."""
+    GroupGroupMembership = apps.get_model("anvil_consortium_manager", "GroupGroupMembership")
+    ManagedGroupClosure = apps.get_model("anvil_consortium_manager", "ManagedGroupClosure")
+    parents = defaultdict(list)
+    for parent_id, child_id in GroupGroupMembership.objects.values_list("parent_group_id", "child_group_id"):
+        parents[child_id].append(parent_id)
+    records = []
+    for descendant_id in list(parents):
+        # Breadth-first search so that the shortest path to each ancestor is found first.
+        depths = {}
+        queue = deque([(descendant_id, 0)])
+        while queue:
+            pk, depth = queue.popleft()
+            for parent_id in parents[pk]:
+                if parent_id not in depths and parent_id != descendant_id:
+                    depths[parent_id] = depth + 1
+                    queue.append((parent_id, depth + 1))
+        for ancestor_id, depth in depths.items():
+            records.append(ManagedGroupClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth))
+    ManagedGroupClosure.objects.bulk_create(records)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('anvil_consortium_manager', '0021_managedgroupclosure'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_closure, reverse_code=migrations.RunPython.noop),
+    ]
@@ -1,17 +1,21 @@
 import uuid
+from collections import defaultdict, deque
 
 import networkx as nx
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.mail import send_mail
 from django.db import models, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 from django_extensions.db.models import ActivatorModel, TimeStampedModel
 from simple_history.models import HistoricalRecords, HistoricForeignKey
+from simple_history.utils import bulk_create_with_history
 
-from . import exceptions
+from . import app_settings, bulk, exceptions, group_hierarchy
 from .adapters.account import get_account_adapter
 from .adapters.workspace import workspace_adapter_registry
 from .anvil_api import AnVILAPIClient, AnVILAPIError, AnVILAPIError404
@@ -48,6 +52,24 @@ class AnVILProjectManagerAccess(models.Model):  # noqa: DJ008
         ]
 
 
+def _get_count_subquery(queryset, field):
+    """Return an expression counting the records in ``queryset`` whose ``field`` points to the outer query's row.
+
+    The count is computed with a correlated subquery, so several counts do not multiply each other's joins and do not
+    require a ``GROUP BY`` on the outer query. Rows with no matching records get a count of 0.
+    """
+    counts = queryset.filter(**{field: models.OuterRef("pk")}).order_by().values(field)
+    return Coalesce(models.Subquery(counts.annotate(count=models.Count("pk")).values("count")), 0)
+
+
+class BillingProjectQuerySet(models.QuerySet):
+    """Custom queryset for BillingProjects."""
+
+    def annotate_workspace_counts(self):
+        """Annotate each billing project with its number of workspaces (``n_workspaces``)."""
+        return self.annotate(n_workspaces=_get_count_subquery(Workspace.objects, "billing_project"))
+
+
 class BillingProject(TimeStampedModel):
     """A model to store information about AnVIL billing projects."""
 
@@ -56,6 +78,8 @@ class BillingProject(TimeStampedModel):
     note = models.TextField(blank=True, help_text="Additional notes.")
     history = HistoricalRecords()
 
+    objects = BillingProjectQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -263,6 +287,51 @@ class Account(TimeStampedModel, ActivatorModel):
         self.status = self.INACTIVE_STATUS
         self.save()
 
+    @classmethod
+    def bulk_deactivate(cls, accounts, workers=None):
+        """Deactivate many Accounts at once, removing them from all groups on AnVIL.
+
+        The AnVIL API calls to remove the Accounts from their groups are made concurrently, and a failed call does
+        not stop the others. Memberships that were removed on AnVIL are deleted from the app in one query. Accounts
+        that could not be removed from every group are left active, with only their failed memberships remaining,
+        so that they can be deactivated again once the problem is fixed.
+
+        Args:
+            accounts (iterable): The Accounts to deactivate. Accounts that are already inactive are skipped.
+            workers (int, optional): The maximum number of threads to use for AnVIL API calls. If not provided,
+                ``ANVIL_BULK_WORKERS`` is used.
+
+        Returns:
+            AccountDeactivationReport: The outcome for each Account and each of its memberships.
+        """
+        report = bulk.AccountDeactivationReport()
+        active = []
+        for account in accounts:
+            if account.status == cls.INACTIVE_STATUS:
+                report.skipped.append(account)
+            else:
+                active.append(account)
+        memberships = GroupAccountMembership.objects.filter(account__in=active).select_related("group", "account")
+        report.membership_results = bulk.call_concurrently(
+            GroupAccountMembership.anvil_delete, memberships, workers=workers
+        )
+        failed_accounts = set(result.instance.account_id for result in report.failed_memberships)
+        deactivate_date = timezone.now()
+        with transaction.atomic():
+            GroupAccountMembership.objects.filter(
+                pk__in=[membership.pk for membership in report.removed_memberships]
+            ).delete()
+            for account in active:
+                if account.pk in failed_accounts:
+                    report.not_deactivated.append(account)
+                    continue
+                # Save each account individually so that the change is recorded in its history.
+                account.deactivate_date = deactivate_date
+                account.status = cls.INACTIVE_STATUS
+                account.save()
+                report.deactivated.append(account)
+        return report
+
     def reactivate(self):
         """Set status to reactivated."""
         self.status = self.ACTIVE_STATUS
@@ -294,15 +363,13 @@ class Account(TimeStampedModel, ActivatorModel):
 
     def get_all_groups(self):
         """get a list of all groups that an Account is in, directly and indirectly"""
-        groups = set()
-        group_memberships = self.groupaccountmembership_set.all()
-        for membership in group_memberships:
-            groups.add(membership.group)
-            parents = membership.group.get_all_parents()
-
-            for group in parents:
-                groups.add(group)
-        return groups
+        direct_groups = self.groupaccountmembership_set.values("group")
+        if app_settings.GROUP_HIERARCHY_BACKEND == "cte":
+            direct_sql, direct_params = direct_groups.query.sql_with_params()
+            parents = RawSQL(group_hierarchy.get_ancestors_sql(GroupGroupMembership, direct_sql), direct_params)
+        else:
+            parents = ManagedGroupClosure.objects.filter(descendant__in=direct_groups).values("ancestor")
+        return set(ManagedGroup.objects.filter(models.Q(pk__in=direct_groups) | models.Q(pk__in=parents)))
 
     def unlink_user(self):
         """Unlink the user from this account.
@@ -333,6 +400,17 @@ class AccountUserArchive(TimeStampedModel):
         return "{user} for {account}".format(user=self.user, account=self.account)
 
 
+class ManagedGroupQuerySet(models.QuerySet):
+    """Custom queryset for ManagedGroups."""
+
+    def annotate_membership_counts(self):
+        """Annotate each group with its number of direct member groups (``n_groups``) and accounts (``n_accounts``)."""
+        return self.annotate(
+            n_groups=_get_count_subquery(GroupGroupMembership.objects, "parent_group"),
+            n_accounts=_get_count_subquery(GroupAccountMembership.objects, "group"),
+        )
+
+
 class ManagedGroup(TimeStampedModel):
     """A model to store information about AnVIL Managed Groups."""
 
@@ -352,6 +430,8 @@ class ManagedGroup(TimeStampedModel):
     note = models.TextField(blank=True, help_text="Additional notes.")
     history = HistoricalRecords()
 
+    objects = ManagedGroupQuerySet.as_manager()
+
     def __str__(self):
         return "{name}".format(name=self.name)
 
@@ -369,78 +449,100 @@ class ManagedGroup(TimeStampedModel):
     def get_all_parents(self):
         """Return a queryset of all direct and indirect parents of this group. Includes all grandparents.
 
-        Not optimized.
+        Only one query is needed. Depending on the ``ANVIL_GROUP_HIERARCHY_BACKEND`` setting, this uses either the
+        ManagedGroupClosure table or a recursive query on the GroupGroupMembership table.
         """
-        these_parents = self.get_direct_parents().distinct()
-        parents = these_parents
-        for parent in these_parents:
-            # Chained unions don't work in MariaDB 10.3.
-            # parents = parents.union(parent.get_all_parents())
-            parents = parents | parent.get_all_parents()
-        return parents.distinct()
+        if app_settings.GROUP_HIERARCHY_BACKEND == "cte":
+            sql = group_hierarchy.get_ancestors_sql(GroupGroupMembership, "%s")
+            return ManagedGroup.objects.filter(pk__in=RawSQL(sql, [self.pk])).exclude(pk=self.pk)
+        return ManagedGroup.objects.filter(descendant_closures__descendant=self)
 
     def get_all_children(self):
-        """Return a queryset of all direct and indirect children of this group. Includes all childrenparents.
+        """Return a queryset of all direct and indirect children of this group. Includes all grandchildren.
 
-        Not optimized.
+        Only one query is needed. Depending on the ``ANVIL_GROUP_HIERARCHY_BACKEND`` setting, this uses either the
+        ManagedGroupClosure table or a recursive query on the GroupGroupMembership table.
         """
-        these_children = self.get_direct_children().distinct()
-        children = these_children
-        for child in these_children:
-            # Chained unions don't work in MariaDB 10.3.
-            # children = children.union(child.get_all_children())
-            children = children | child.get_all_children().distinct()
-        return children.distinct()
+        if app_settings.GROUP_HIERARCHY_BACKEND == "cte":
+            sql = group_hierarchy.get_descendants_sql(GroupGroupMembership, "%s")
+            return ManagedGroup.objects.filter(pk__in=RawSQL(sql, [self.pk])).exclude(pk=self.pk)
+        return ManagedGroup.objects.filter(ancestor_closures__ancestor=self)
+
+    @classmethod
+    def get_groups_in_cycles(cls):
+        """Return a queryset of groups that are direct or indirect members of themselves.
+
+        GroupGroupMembership.clean prevents cycles, but they can be introduced by bulk operations or by editing the
+        database directly. This always uses a recursive query on the GroupGroupMembership table, since the
+        ManagedGroupClosure table does not store cycles.
+        """
+        return cls.objects.filter(pk__in=RawSQL(group_hierarchy.get_groups_in_cycles_sql(GroupGroupMembership), []))
 
     def get_anvil_url(self):
         """Return the URL of the group on AnVIL."""
         return "https://app.terra.bio/#groups/{group}".format(group=self.name)
 
-    def _add_parents_to_graph(self, G):
-        parent_memberships = self.parent_memberships.all()
-        for membership in parent_memberships:
-            # Add a node and an edge.
-            if membership.parent_group.name not in G.nodes:
-                G.add_node(
-                    membership.parent_group.name,
-                    n_groups=membership.parent_group.child_memberships.count(),
-                    n_accounts=membership.parent_group.groupaccountmembership_set.count(),
-                )
-            G.add_edge(membership.parent_group.name, self.name, role=membership.role)
-            # Get the parents of that parent.
-            membership.parent_group._add_parents_to_graph(G)
-
-    def _add_children_to_graph(self, G):
-        child_memberships = self.child_memberships.all()
-        for membership in child_memberships:
-            if membership.child_group.name not in G.nodes:
-                G.add_node(
-                    membership.child_group.name,
-                    n_groups=membership.child_group.child_memberships.count(),
-                    n_accounts=membership.child_group.groupaccountmembership_set.count(),
-                )
-            G.add_edge(self.name, membership.child_group.name, role=membership.role)
-            # Get the parents of that parent.
-            membership.child_group._add_children_to_graph(G)
+    def _add_relatives_to_graph(self, G, names, parents, max_depth=None):
+        """Add edges to all parents or all children of this group to the graph, following memberships breadth-first.
+
+        Each level of the hierarchy is fetched in one query, and each group is only expanded once, even if it can be
+        reached through several paths.
 
-    def get_graph(self):
+        Args:
+            G (networkx.DiGraph): The graph to add edges to.
+            names (dict): Group names keyed by pk. Updated with the names of groups that are found.
+            parents (bool): If True, follow memberships up to parents; otherwise, follow memberships down to children.
+            max_depth (int, optional): The number of levels to follow. If None, all levels are followed.
+        """
+        from_field, to_field = ("child_group", "parent_group") if parents else ("parent_group", "child_group")
+        visited = {self.pk}
+        frontier = {self.pk}
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            memberships = GroupGroupMembership.objects.filter(**{from_field + "__in": frontier}).values_list(
+                from_field, to_field, to_field + "__name", "role"
+            )
+            frontier = set()
+            for from_pk, to_pk, to_name, role in memberships:
+                names[to_pk] = to_name
+                if parents:
+                    G.add_edge(to_name, names[from_pk], role=role)
+                else:
+                    G.add_edge(names[from_pk], to_name, role=role)
+                if to_pk not in visited:
+                    visited.add(to_pk)
+                    frontier.add(to_pk)
+
+    def get_graph(self, depth=None):
         """Return a networkx graph of the group structure for this group.
 
-        The graph contains parents and children that can be reached from this group.
+        The graph contains parents and children that can be reached from this group. One query is made for each
+        level of parents and children, plus one query for the node attributes.
+
+        Args:
+            depth (int, optional): The number of levels of parents and children to include. If None, all parents and
+                children are included.
 
         Returns:
             A networkx.DiGraph object representing the group relationships.
         """
         # Set up the graph.
         G = nx.DiGraph()
-        G.add_node(
-            self.name,
-            n_groups=self.child_memberships.count(),
-            n_accounts=self.groupaccountmembership_set.count(),
+        G.add_node(self.name)
+        names = {self.pk: self.name}
+        # Parents and children are traversed separately, so that the graph only contains groups that are reachable by
+        # only going up or only going down from this group.
+        self._add_relatives_to_graph(G, names, parents=True, max_depth=depth)
+        self._add_relatives_to_graph(G, names, parents=False, max_depth=depth)
+        # Add the node attributes for all groups at once.
+        nodes = (
+            ManagedGroup.objects.filter(pk__in=names)
+            .annotate_membership_counts()
+            .values_list("name", "n_groups", "n_accounts")
         )
-        # Needs to be split up into subfunctions or else you get infinite recursion.
-        self._add_parents_to_graph(G)
-        self._add_children_to_graph(G)
+        for name, n_groups, n_accounts in nodes:
+            G.add_node(name, n_groups=n_groups, n_accounts=n_accounts)
         return G
 
     @classmethod
@@ -452,20 +554,14 @@ class ManagedGroup(TimeStampedModel):
         """
         # Build the graph with nx.
         G = nx.DiGraph()
-        # Add nodes to the graph.
-        for node in cls.objects.all():
-            G.add_node(
-                node.name,
-                n_groups=node.child_memberships.count(),
-                n_accounts=node.groupaccountmembership_set.count(),
-            )
+        # Add nodes to the graph, with membership counts computed in the same query.
+        nodes = cls.objects.annotate_membership_counts().values_list("name", "n_groups", "n_accounts")
+        G.add_nodes_from(
+            (name, {"n_groups": n_groups, "n_accounts": n_accounts}) for name, n_groups, n_accounts in nodes
+        )
         # Add edges.
-        for membership in GroupGroupMembership.objects.all():
-            G.add_edge(
-                membership.parent_group.name,
-                membership.child_group.name,
-                role=membership.role,
-            )
+        edges = GroupGroupMembership.objects.values_list("parent_group__name", "child_group__name", "role")
+        G.add_edges_from((parent, child, {"role": role}) for parent, child, role in edges)
         return G
 
     def anvil_exists(self):
@@ -615,6 +711,14 @@ class ManagedGroup(TimeStampedModel):
             return False
 
 
+class WorkspaceQuerySet(models.QuerySet):
+    """Custom queryset for Workspaces."""
+
+    def annotate_sharing_counts(self):
+        """Annotate each workspace with the number of groups it is shared with (``n_sharing_groups``)."""
+        return self.annotate(n_sharing_groups=_get_count_subquery(WorkspaceGroupSharing.objects, "workspace"))
+
+
 class Workspace(TimeStampedModel):
     """A model to store information about AnVIL workspaces."""
 
@@ -673,6 +777,8 @@ class Workspace(TimeStampedModel):
     # Model history.
     history = HistoricalRecords()
 
+    objects = WorkspaceQuerySet.as_manager()
+
     class Meta:
         constraints = [models.UniqueConstraint(fields=["billing_project", "name"], name="unique_workspace")]
 
@@ -884,14 +990,105 @@ class Workspace(TimeStampedModel):
 
         return workspace
 
+    def refresh_from_db(self, *args, **kwargs):
+        """Reload the workspace from the database, and clear the cached authorization domain and sharing groups."""
+        super().refresh_from_db(*args, **kwargs)
+        self._clear_group_pks_cache()
+
+    def _clear_group_pks_cache(self):
+        """Clear the cached authorization domain and sharing group pks.
+
+        This is called by signal receivers when authorization domains or sharing records are added or removed through
+        this instance.
+        """
+        self.__dict__.pop("_authorization_domain_pks", None)
+        self.__dict__.pop("_sharing_group_pks", None)
+
+    @staticmethod
+    def _split_group_pks(groups):
+        """Return a tuple of (managed pks, unmanaged pks) from (pk, is_managed_by_app) tuples."""
+        managed = set()
+        not_managed = set()
+        for pk, is_managed_by_app in groups:
+            (managed if is_managed_by_app else not_managed).add(pk)
+        return managed, not_managed
+
+    def _get_authorization_domain_pks(self):
+        """Return a tuple of the pks of the authorization domains, split by whether the app manages them.
+
+        The pks are fetched in one query (or taken from ``prefetch_related("authorization_domains")``) and cached on
+        the instance. The cache is cleared when the instance is refreshed from the database, when authorization
+        domains are added or removed with ``authorization_domains``, or when a WorkspaceAuthorizationDomain for this
+        instance is saved or deleted.
+        """
+        if "_authorization_domain_pks" not in self.__dict__:
+            if "authorization_domains" in getattr(self, "_prefetched_objects_cache", {}):
+                groups = [(group.pk, group.is_managed_by_app) for group in self.authorization_domains.all()]
+            else:
+                groups = self.authorization_domains.values_list("pk", "is_managed_by_app")
+            self._authorization_domain_pks = self._split_group_pks(groups)
+        return self._authorization_domain_pks
+
+    def _get_sharing_group_pks(self):
+        """Return a tuple of the pks of the groups this workspace is shared with, split by whether the app manages them.
+
+        The pks are fetched in one query (or taken from ``prefetch_related("workspacegroupsharing_set__group")``) and
+        cached on the instance. The cache is cleared when the instance is refreshed from the database or when a
+        WorkspaceGroupSharing for this instance is saved or deleted.
+        """
+        if "_sharing_group_pks" not in self.__dict__:
+            if "workspacegroupsharing_set" in getattr(self, "_prefetched_objects_cache", {}):
+                groups = [
+                    (sharing.group_id, sharing.group.is_managed_by_app)
+                    for sharing in self.workspacegroupsharing_set.all()
+                ]
+            else:
+                groups = self.workspacegroupsharing_set.values_list("group_id", "group__is_managed_by_app")
+            self._sharing_group_pks = self._split_group_pks(groups)
+        return self._sharing_group_pks
+
+    @staticmethod
+    def _get_group_pks(groups):
+        """Return the set of pks of an iterable of ManagedGroups or ManagedGroup pks, or of a ManagedGroup queryset."""
+        if isinstance(groups, models.QuerySet):
+            return set(groups.values_list("pk", flat=True))
+        return set(group.pk if isinstance(group, ManagedGroup) else group for group in groups)
+
+    def _has_groups_in_authorization_domain(self, group_pks):
+        """Check if all authorization domains of this workspace are in ``group_pks``."""
+        managed, not_managed = self._get_authorization_domain_pks()
+        # Check if the groups include all auth domains that are managed by the app.
+        if managed <= group_pks:
+            # Now check if any are not managed by the app - this would be an "unknown" case.
+            if not_managed:
+                raise exceptions.WorkspaceAccessAuthorizationDomainUnknownError(
+                    "At least one auth domain is not managed by the app."
+                )
+            else:
+                return True
+        else:
+            return False
+
+    def _is_shared_with_groups(self, group_pks):
+        """Check if this workspace is shared with any of the groups in ``group_pks``."""
+        managed, not_managed = self._get_sharing_group_pks()
+        if (managed | not_managed) & group_pks:
+            return True
+        else:
+            if not_managed:
+                raise exceptions.WorkspaceAccessSharingUnknownError(
+                    "Workspace is shared with some groups that are not managed by the app."
+                )
+            return False
+
     def has_account_in_authorization_domain(self, account, all_account_groups=None):
         """Check if an account is in the authorization domain(s) for this workspace.
 
         Args:
             account (Account): The account to check.
-            all_account_groups (list): A list of all groups that the account is in (directly and indirectly).
-                If not provided, it will be retrieved from the app, which may be slow. Useful if you have already
-                obtained a queryset of the account's groups.
+            all_account_groups (iterable): All groups that the account is in (directly and indirectly), as
+                ManagedGroup instances or pks. If None, it will be retrieved from the app. Useful if you have already
+                obtained the account's groups. An empty iterable means that the account is not in any groups.
 
         Returns:
             bool: True if the user is in the authorization domain, False otherwise.
@@ -901,34 +1098,19 @@ class Workspace(TimeStampedModel):
         """
         if not isinstance(account, Account):
             raise ValueError("account must be an instance of `Account`.")
-        # Get the groups that are in the authorization domain.
-        auth_domains = self.authorization_domains.all()
-        # Separate into managed by app and not managed by app.
-        groups_managed_by_app = auth_domains.filter(is_managed_by_app=True)
-        groups_not_managed_by_app = auth_domains.filter(is_managed_by_app=False)
         # Get the list of groups that the user is in.
-        if not all_account_groups:
+        if all_account_groups is None:
             all_account_groups = account.get_all_groups()
-        # Check if the user is in any of the groups that are managed by the app.
-        if len(set(groups_managed_by_app).difference(set(all_account_groups))) == 0:
-            # Now check if any are not managed by the app - this would be an "unknown" case.
-            if groups_not_managed_by_app.exists():
-                raise exceptions.WorkspaceAccessAuthorizationDomainUnknownError(
-                    "At least one auth domain is not managed by the app."
-                )
-            else:
-                return True
-        else:
-            return False
+        return self._has_groups_in_authorization_domain(self._get_group_pks(all_account_groups))
 
     def has_group_in_authorization_domain(self, group, all_parent_groups=None):
         """Check if a group is in the authorization domain(s) for this workspace.
 
         Args:
             group (ManagedGroup): The group to check.
-            all_parent_groups (list): A list of all groups that the group is in (directly and indirectly).
-                If not provided, it will be retrieved from the app, which may be slow. Useful if you have already
-                obtained a queryset of the account's groups.
+            all_parent_groups (iterable): All groups that the group is in (directly and indirectly), as ManagedGroup
+                instances or pks. If None, it will be retrieved from the app. Useful if you have already obtained the
+                group's parents. An empty iterable means that the group is not in any groups.
 
         Returns:
             bool: True if the group is in the authorization domain, False otherwise.
@@ -939,31 +1121,19 @@ class Workspace(TimeStampedModel):
         """
         if not isinstance(group, ManagedGroup):
             raise ValueError("group must be an instance of `ManagedGroup`.")
-        # Get the groups that are in the authorization domain.
-        auth_domains = self.authorization_domains.all()
-        # Separate into managed by app and not managed by app.
-        groups_managed_by_app = auth_domains.filter(is_managed_by_app=True)
-        groups_not_managed_by_app = auth_domains.filter(is_managed_by_app=False)
-        # Get the list of groups that the user is in.
-        if not all_parent_groups:
+        # Get the list of groups that the group is in.
+        if all_parent_groups is None:
             all_parent_groups = group.get_all_parents()
-        # Check if the user is in any of the groups that are managed by the app.
-        if len(set(groups_managed_by_app).difference(set(all_parent_groups))) == 0:
-            # Now check if any are not managed by the app - this would be an "unknown" case.
-            if groups_not_managed_by_app.exists():
-                raise exceptions.WorkspaceAccessAuthorizationDomainUnknownError(
-                    "At least one auth domain is not managed by the app."
-                )
-            else:
-                return True
-        else:
-            return False
+        return self._has_groups_in_authorization_domain(self._get_group_pks(all_parent_groups))
 
     def is_shared_with_account(self, account, all_account_groups=None):
         """Check if the workspace is shared with any groups the account is in.
 
         Args:
             account (Account): The account to check.
+            all_account_groups (iterable): All groups that the account is in (directly and indirectly), as
+                ManagedGroup instances or pks. If None, it will be retrieved from the app. An empty iterable means
+                that the account is not in any groups.
 
         Returns:
             bool: True if the user is in the authorization domain, False otherwise.
@@ -973,26 +1143,19 @@ class Workspace(TimeStampedModel):
         """
         if not isinstance(account, Account):
             raise ValueError("account must be an instance of `Account`.")
-        # Get the list of groups that the workspace is shared with.
-        workspace_groups = ManagedGroup.objects.filter(workspacegroupsharing__workspace=self)
         # Get the list of groups that the account is in.
-        if not all_account_groups:
+        if all_account_groups is None:
             all_account_groups = account.get_all_groups()
-        # Check if any of the groups that the workspace is shared with are in the account's groups.
-        if len(set(workspace_groups).intersection(set(all_account_groups))) > 0:
-            return True
-        else:
-            if workspace_groups.filter(is_managed_by_app=False).exists():
-                raise exceptions.WorkspaceAccessSharingUnknownError(
-                    "Workspace is shared with some groups that are not managed by the app."
-                )
-            return False
+        return self._is_shared_with_groups(self._get_group_pks(all_account_groups))
 
     def is_shared_with_group(self, group, all_parent_groups=None):
         """Check if the workspace is shared with any parent groups of the group.
 
         Args:
             group (ManagedGroup): The group to check.
+            all_parent_groups (iterable): All groups that the group is in (directly and indirectly), as ManagedGroup
+                instances or pks. If None, it will be retrieved from the app. An empty iterable means that the group is
+                not in any groups.
 
         Returns:
             bool: True if the group is in the authorization domain, False otherwise.
@@ -1002,29 +1165,23 @@ class Workspace(TimeStampedModel):
         """
         if not isinstance(group, ManagedGroup):
             raise ValueError("group must be an instance of `ManagedGroup`.")
-        # Get the list of groups that the workspace is shared with.
-        workspace_groups = ManagedGroup.objects.filter(workspacegroupsharing__workspace=self)
+        managed, not_managed = self._get_sharing_group_pks()
         # First check if it's shared directly - this is quick.
-        if group in workspace_groups:
+        if group.pk in managed or group.pk in not_managed:
             return True
-        # Otherwise, check if it's shared with any of the parents. The below query can be slow.
-        if not all_parent_groups:
+        # Otherwise, check if it's shared with any of the parents.
+        if all_parent_groups is None:
             all_parent_groups = group.get_all_parents()
-        # Check if any of the groups that the workspace is shared with are in the account's groups.
-        if len(set(workspace_groups).intersection(all_parent_groups)) > 0:
-            return True
-        else:
-            if workspace_groups.filter(is_managed_by_app=False).exists():
-                raise exceptions.WorkspaceAccessSharingUnknownError(
-                    "Workspace is shared with some groups that are not managed by the app."
-                )
-            return False
+        return self._is_shared_with_groups(self._get_group_pks(all_parent_groups))
 
     def is_accessible_by_account(self, account, all_account_groups=None):
         """Check if an account has access to a workspace.
 
         Args:
             account (Account): The account to check.
+            all_account_groups (iterable): All groups that the account is in (directly and indirectly), as
+                ManagedGroup instances or pks. If None, it will be retrieved from the app. An empty iterable means
+                that the account is not in any groups.
 
         Returns:
             bool: True if the account has access, False otherwise.
@@ -1042,8 +1199,9 @@ class Workspace(TimeStampedModel):
         if not self.is_owner:
             raise exceptions.AnVILNotWorkspaceOwnerError("App does not have OWNER access to {}".format(self))
 
-        if not all_account_groups:
+        if all_account_groups is None:
             all_account_groups = account.get_all_groups()
+        all_account_groups = self._get_group_pks(all_account_groups)
         # First check sharing, then check auth domain membership.
         try:
             is_shared = self.is_shared_with_account(account, all_account_groups=all_account_groups)
@@ -1200,6 +1358,180 @@ class GroupGroupMembership(TimeStampedModel, ManagedGroupMembershipRoleChoicesMi
         AnVILAPIClient().remove_user_from_group(self.parent_group.name, self.role.lower(), self.child_group.email)
 
 
+class ManagedGroupClosure(models.Model):
+    """A model to store the transitive closure of the ManagedGroup hierarchy.
+
+    There is one record for each pair of groups where the descendant is a direct or indirect member of the ancestor.
+    Records are updated automatically when a GroupGroupMembership is saved or deleted. Bulk operations that bypass
+    signals (e.g., ``QuerySet.update`` or ``bulk_create``) do not update the records; run the
+    ``rebuild_managed_group_closure`` management command afterwards.
+    """
+
+    ancestor = models.ForeignKey("ManagedGroup", on_delete=models.CASCADE, related_name="descendant_closures")
+    descendant = models.ForeignKey("ManagedGroup", on_delete=models.CASCADE, related_name="ancestor_closures")
+    depth = models.PositiveIntegerField(
+        help_text="Number of group-group memberships in the shortest path from the ancestor to the descendant."
+    )
+
+    class Meta:
+        verbose_name = "managed group closure"
+        constraints = [
+            models.UniqueConstraint(fields=["ancestor", "descendant"], name="unique_managed_group_closure"),
+        ]
+        indexes = [
+            models.Index(fields=["descendant", "ancestor"], name="managed_group_closure_desc"),
+        ]
+
+    def __str__(self):
+        return "{descendant} in {ancestor} (depth {depth})".format(
+            descendant=self.descendant, ancestor=self.ancestor, depth=self.depth
+        )
+
+    @staticmethod
+    def _get_edges(memberships=None):
+        """Return a dictionary mapping group pks to the pks of their direct parents in ``memberships``.
+
+        If ``memberships`` is not provided, all GroupGroupMemberships are used.
+        """
+        if memberships is None:
+            memberships = GroupGroupMembership.objects.all()
+        parents = defaultdict(list)
+        for parent_id, child_id in memberships.values_list("parent_group_id", "child_group_id"):
+            parents[child_id].append(parent_id)
+        return parents
+
+    @staticmethod
+    def _get_ancestor_depths(group_id, parents):
+        """Return a dictionary mapping the pk of each ancestor of a group to its shortest distance from the group."""
+        depths = {}
+        queue = deque([(group_id, 0)])
+        while queue:
+            pk, depth = queue.popleft()
+            for parent_id in parents[pk]:
+                if parent_id not in depths and parent_id != group_id:
+                    depths[parent_id] = depth + 1
+                    queue.append((parent_id, depth + 1))
+        return depths
+
+    @classmethod
+    def compute(cls, groups=None):
+        """Compute the closure records from the GroupGroupMemberships in the app.
+
+        Args:
+            groups (iterable, optional): The pks of the descendant groups to compute records for. If not provided,
+                records are computed for all groups.
+
+        Returns:
+            dict: The depth of each record, keyed by a tuple of (ancestor pk, descendant pk).
+        """
+        parents = cls._get_edges()
+        if groups is None:
+            groups = list(parents)
+        return cls._compute_from_edges(groups, parents)
+
+    @classmethod
+    def _compute_from_edges(cls, groups, parents):
+        closure = {}
+        for descendant_id in groups:
+            for ancestor_id, depth in cls._get_ancestor_depths(descendant_id, parents).items():
+                closure[(ancestor_id, descendant_id)] = depth
+        return closure
+
+    @classmethod
+    def _replace(cls, queryset, closure):
+        """Replace the records in ``queryset`` with the records in ``closure``."""
+        with transaction.atomic():
+            queryset.delete()
+            cls.objects.bulk_create(
+                cls(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth)
+                for (ancestor_id, descendant_id), depth in closure.items()
+            )
+
+    @staticmethod
+    def _get_depths(queryset, field, group_id):
+        """Return a dictionary mapping ``group_id`` and the ``field`` pk of each record in ``queryset`` to its depth."""
+        depths = dict(queryset.values_list(field, "depth"))
+        depths[group_id] = 0
+        return depths
+
+    @classmethod
+    def _apply(cls, queryset, closure):
+        """Make the records in ``queryset`` match ``closure``, only writing the records that changed."""
+        existing = {(x.ancestor_id, x.descendant_id): x for x in queryset}
+        with transaction.atomic():
+            cls.objects.filter(pk__in=[x.pk for key, x in existing.items() if key not in closure]).delete()
+            changed = []
+            for key, depth in closure.items():
+                if key in existing and existing[key].depth != depth:
+                    existing[key].depth = depth
+                    changed.append(existing[key])
+            cls.objects.bulk_update(changed, ["depth"])
+            cls.objects.bulk_create(
+                cls(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth)
+                for (ancestor_id, descendant_id), depth in closure.items()
+                if (ancestor_id, descendant_id) not in existing
+            )
+
+    @classmethod
+    def add_membership(cls, parent_id, child_id):
+        """Update the closure records after a child group is added to a parent group.
+
+        Any new path through the membership runs from an ancestor of the parent to a descendant of the child, so only
+        records for those pairs are created or updated. The depths are read from the existing closure records.
+        """
+        ancestors = cls._get_depths(cls.objects.filter(descendant_id=parent_id), "ancestor_id", parent_id)
+        descendants = cls._get_depths(cls.objects.filter(ancestor_id=child_id), "descendant_id", child_id)
+        queryset = cls.objects.filter(ancestor_id__in=ancestors, descendant_id__in=descendants)
+        closure = {(x.ancestor_id, x.descendant_id): x.depth for x in queryset}
+        for ancestor_id, ancestor_depth in ancestors.items():
+            for descendant_id, descendant_depth in descendants.items():
+                if ancestor_id == descendant_id:
+                    continue
+                depth = ancestor_depth + 1 + descendant_depth
+                if closure.get((ancestor_id, descendant_id), depth) >= depth:
+                    closure[(ancestor_id, descendant_id)] = depth
+        cls._apply(queryset, closure)
+
+    @classmethod
+    def remove_membership(cls, parent_id, child_id):
+        """Update the closure records after a child group is removed from a parent group.
+
+        This should be called after the GroupGroupMembership has been deleted, but before the closure records have
+        been updated. Only paths from an ancestor of the parent to a descendant of the child could have used the
+        membership, so only those records are recomputed, from the memberships of the descendants of the child and
+        their ancestors. Records for pairs that are no longer connected are deleted.
+        """
+        ancestors = cls._get_depths(cls.objects.filter(descendant_id=parent_id), "ancestor_id", parent_id)
+        descendants = cls._get_depths(cls.objects.filter(ancestor_id=child_id), "descendant_id", child_id)
+        groups = set(descendants) | set(
+            cls.objects.filter(descendant_id__in=descendants).values_list("ancestor_id", flat=True)
+        )
+        parents = cls._get_edges(GroupGroupMembership.objects.filter(child_group_id__in=groups))
+        closure = {
+            key: depth for key, depth in cls._compute_from_edges(descendants, parents).items() if key[0] in ancestors
+        }
+        cls._apply(cls.objects.filter(ancestor_id__in=ancestors, descendant_id__in=descendants), closure)
+
+    @classmethod
+    def rebuild(cls):
+        """Delete all closure records and recompute them from the GroupGroupMemberships in the app."""
+        cls._replace(cls.objects.all(), cls.compute())
+
+    @classmethod
+    def get_discrepancies(cls):
+        """Compare the closure records in the app to the records computed from the GroupGroupMemberships.
+
+        Returns:
+            tuple: A tuple of (missing, unexpected), where ``missing`` is a set of (ancestor pk, descendant pk, depth)
+                tuples that should exist but do not, and ``unexpected`` is a set of tuples that exist but should not.
+        """
+        expected = set(
+            (ancestor_id, descendant_id, depth) for (ancestor_id, descendant_id), depth in cls.compute().items()
+        )
+        actual = set(cls.objects.values_list("ancestor_id", "descendant_id", "depth"))
+        return expected - actual, actual - expected
+
+
 class GroupAccountMembership(TimeStampedModel, ManagedGroupMembershipRoleChoicesMixin):
     """A model to store which accounts are in a group."""
 
@@ -1235,6 +1567,103 @@ class GroupAccountMembership(TimeStampedModel, ManagedGroupMembershipRoleChoices
         """Remove the account from the group on AnVIL"""
         AnVILAPIClient().remove_user_from_group(self.group.name, self.role.lower(), self.account.email)
 
+    @classmethod
+    def validate_bulk_create(cls, memberships):
+        """Check that many new memberships can be created, using a fixed number of queries.
+
+        Each membership must be for an active account and a group that is managed by the app, must not already exist
+        in the app, and must not be repeated.
+
+        Args:
+            memberships (list): The unsaved GroupAccountMembership instances, with ``account`` and ``group`` set.
+
+        Raises:
+            ValidationError: One error for each membership that cannot be created.
+        """
+        existing = set(
+            cls.objects.filter(
+                account__in=set(membership.account for membership in memberships),
+                group__in=set(membership.group for membership in memberships),
+            ).values_list("account_id", "group_id")
+        )
+        errors = []
+        seen = set()
+        for membership in memberships:
+            key = (membership.account.pk, membership.group.pk)
+            if membership.account.status != Account.ACTIVE_STATUS:
+                errors.append("{}: Account is inactive.".format(membership))
+            elif not membership.group.is_managed_by_app:
+                errors.append("{}: Group is not managed by the app.".format(membership))
+            elif membership.role not in cls.RoleChoices.values:
+                errors.append("{}: Role is not valid.".format(membership))
+            elif key in existing:
+                errors.append("{}: Account is already a member of this group.".format(membership))
+            elif key in seen:
+                errors.append("{}: Membership is repeated.".format(membership))
+            seen.add(key)
+        if errors:
+            raise ValidationError(errors)
+
+    @classmethod
+    def anvil_bulk_create(cls, memberships, workers=None):
+        """Add many accounts to groups on AnVIL and create the memberships in the app.
+
+        All memberships are validated with ``validate_bulk_create`` before any AnVIL API calls are made. The API calls
+        are then made concurrently, and a failed call does not stop the others. Memberships that were added on AnVIL
+        are created in the app with one ``bulk_create`` query.
+
+        Args:
+            memberships (iterable): The unsaved GroupAccountMembership instances to create.
+            workers (int, optional): The maximum number of threads to use for AnVIL API calls. If not provided,
+                ``ANVIL_BULK_WORKERS`` is used.
+
+        Raises:
+            ValidationError: Any of the memberships cannot be created. No API calls are made.
+
+        Returns:
+            list: A ``BulkResult`` for each membership, in the same order as ``memberships``.
+        """
+        memberships = list(memberships)
+        cls.validate_bulk_create(memberships)
+        results = bulk.call_concurrently(cls.anvil_create, memberships, workers=workers)
+        created = [result.instance for result in results if result.succeeded]
+        if created:
+            bulk_create_with_history(created, cls)
+        return results
+
+    @classmethod
+    def anvil_bulk_delete(cls, memberships, workers=None):
+        """Remove many accounts from groups on AnVIL and delete the memberships from the app.
+
+        The API calls are made concurrently, and a failed call does not stop the others. Memberships that were removed
+        on AnVIL are deleted from the app in one query.
+
+        Args:
+            memberships (iterable): The GroupAccountMembership instances to delete. Their groups must be managed by the
+                app.
+            workers (int, optional): The maximum number of threads to use for AnVIL API calls. If not provided,
+                ``ANVIL_BULK_WORKERS`` is used.
+
+        Raises:
+            ValidationError: Any of the groups are not managed by the app. No API calls are made.
+
+        Returns:
+            list: A ``BulkResult`` for each membership, in the same order as ``memberships``.
+        """
+        if isinstance(memberships, models.QuerySet):
+            memberships = memberships.select_related("account", "group")
+        memberships = list(memberships)
+        errors = [
+            "{}: Group is not managed by the app.".format(membership)
+            for membership in memberships
+            if not membership.group.is_managed_by_app
+        ]
+        if errors:
+            raise ValidationError(errors)
+        results = bulk.call_concurrently(cls.anvil_delete, memberships, workers=workers)
+        cls.objects.filter(pk__in=[result.instance.pk for result in results if result.succeeded]).delete()
+        return results
+
 
 class WorkspaceGroupSharing(TimeStampedModel):
     """A model to store which workspaces have been shared with which groups."""
@@ -1327,20 +1756,26 @@ class WorkspaceGroupSharing(TimeStampedModel):
             },
         )
 
+    def _get_acl_update(self, access=None):
+        """Return the entry for this record in an ``update_workspace_acl`` request.
+
+        Args:
+            access (str, optional): The access level to set. If not provided, ``access`` is used.
+        """
+        return {
+            "email": self.group.email,
+            "accessLevel": access or self.access,
+            "canShare": False,
+            "canCompute": self.can_compute,
+        }
+
     def anvil_create_or_update(self):
         """Create or update the access to ``workspace`` for the ``group`` on AnVIL.
 
         Raises:
             exceptions.AnVILGroupNotFound: The group that the workspace is being shared with does not exist on AnVIL.
         """
-        acl_updates = [
-            {
-                "email": self.group.email,
-                "accessLevel": self.access,
-                "canShare": False,
-                "canCompute": self.can_compute,
-            }
-        ]
+        acl_updates = [self._get_acl_update()]
         response = AnVILAPIClient().update_workspace_acl(
             self.workspace.billing_project.name, self.workspace.name, acl_updates
         )
@@ -1350,13 +1785,82 @@ class WorkspaceGroupSharing(TimeStampedModel):
     def anvil_delete(self):
         """Remove the access to ``workspace`` for the ``group`` on AnVIL."""
 
-        acl_updates = [
-            {
-                "email": self.group.email,
-                "accessLevel": "NO ACCESS",
-                "canShare": False,
-                "canCompute": self.can_compute,
-            }
-        ]
+        acl_updates = [self._get_acl_update(access="NO ACCESS")]
         # It is ok if we try to remove access for a group that doesn't exist on AnVIL.
         AnVILAPIClient().update_workspace_acl(self.workspace.billing_project.name, self.workspace.name, acl_updates)
+
+    @classmethod
+    def _anvil_bulk_update_acl(cls, sharings, access=None, workers=None):
+        """Send the ACL entries for many records to AnVIL, with one request per workspace.
+
+        Returns:
+            list: A tuple of (record, result) for each record, in the same order as ``sharings``, where ``result`` is
+                the ``BulkResult`` of the request for the record's workspace.
+        """
+        if isinstance(sharings, models.QuerySet):
+            sharings = sharings.select_related("workspace__billing_project", "group")
+        sharings = list(sharings)
+        by_workspace = defaultdict(list)
+        for sharing in sharings:
+            by_workspace[sharing.workspace_id].append(sharing)
+
+        def update_workspace(records):
+            workspace = records[0].workspace
+            acl_updates = [record._get_acl_update(access=access) for record in records]
+            return AnVILAPIClient().update_workspace_acl(workspace.billing_project.name, workspace.name, acl_updates)
+
+        workspace_results = bulk.call_concurrently(update_workspace, by_workspace.values(), workers=workers)
+        results = {result.instance[0].workspace_id: result for result in workspace_results}
+        return [(sharing, results[sharing.workspace_id]) for sharing in sharings]
+
+    @classmethod
+    def anvil_bulk_create_or_update(cls, sharings, workers=None):
+        """Create or update the access to workspaces for many groups on AnVIL.
+
+        The records are grouped by workspace, and the access for all groups in a workspace is updated with one
+        request. Requests for different workspaces are made concurrently. A failed request only affects the records for
+        its workspace.
+
+        Args:
+            sharings (QuerySet or list): The WorkspaceGroupSharing records to send to AnVIL.
+            workers (int, optional): The maximum number of threads to use for AnVIL API calls. If not provided,
+                ``ANVIL_BULK_WORKERS`` is used.
+
+        Returns:
+            list: A ``BulkResult`` for each record, in the same order as ``sharings``. The error is the
+                ``AnVILAPIError`` raised by the request for the record's workspace, or ``AnVILGroupNotFound`` if AnVIL
+                reported that the group was not found.
+        """
+        results = []
+        not_found = {}
+        for sharing, result in cls._anvil_bulk_update_acl(sharings, workers=workers):
+            if not result.succeeded:
+                results.append(bulk.BulkResult(sharing, error=result.error))
+                continue
+            # Check the usersNotFound entries of each response once.
+            if sharing.workspace_id not in not_found:
+                entries = result.value.json()["usersNotFound"]
+                not_found[sharing.workspace_id] = set(entry["email"].lower() for entry in entries)
+            if sharing.group.email.lower() in not_found[sharing.workspace_id]:
+                error = exceptions.AnVILGroupNotFound("{} not found on AnVIL".format(sharing.group))
+                results.append(bulk.BulkResult(sharing, error=error))
+            else:
+                results.append(bulk.BulkResult(sharing))
+        return results
+
+    @classmethod
+    def anvil_bulk_delete(cls, sharings, workers=None):
+        """Remove the access to workspaces for many groups on AnVIL, with one request per workspace.
+
+        Args:
+            sharings (QuerySet or list): The WorkspaceGroupSharing records to remove on AnVIL.
+            workers (int, optional): The maximum number of threads to use for AnVIL API calls. If not provided,
+                ``ANVIL_BULK_WORKERS`` is used.
+
+        Returns:
+            list: A ``BulkResult`` for each record, in the same order as ``sharings``.
+        """
+        return [
+            bulk.BulkResult(sharing, error=result.error)
+            for sharing, result in cls._anvil_bulk_update_acl(sharings, access="NO ACCESS", workers=workers)
+        ]
@@ -0,0 +1,41 @@
+"""Signal receivers for the anvil_consortium_manager app."""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (
+    GroupGroupMembership,
+    ManagedGroupClosure,
+    Workspace,
+    WorkspaceAuthorizationDomain,
+    WorkspaceGroupSharing,
+)
+
+
+@receiver(post_save, sender=GroupGroupMembership)
+def add_managed_group_closure(sender, instance, **kwargs):
+    """Update the ManagedGroupClosure records when a GroupGroupMembership is saved."""
+    ManagedGroupClosure.add_membership(instance.parent_group_id, instance.child_group_id)
+
+
+@receiver(post_delete, sender=GroupGroupMembership)
+def remove_managed_group_closure(sender, instance, **kwargs):
+    """Update the ManagedGroupClosure records when a GroupGroupMembership is deleted."""
+    ManagedGroupClosure.remove_membership(instance.parent_group_id, instance.child_group_id)
+
+
+@receiver(post_save, sender=WorkspaceGroupSharing)
+@receiver(post_delete, sender=WorkspaceGroupSharing)
+@receiver(post_save, sender=WorkspaceAuthorizationDomain)
+@receiver(post_delete, sender=WorkspaceAuthorizationDomain)
+def clear_workspace_group_pks_cache(sender, instance, **kwargs):
+    """Clear the cached group pks of the workspace instance that a sharing record or auth domain was saved with."""
+    if sender.workspace.is_cached(instance):
+        instance.workspace._clear_group_pks_cache()
+
+
+@receiver(m2m_changed, sender=Workspace.authorization_domains.through)
+def clear_workspace_authorization_domain_pks_cache(sender, instance, action, reverse, **kwargs):
+    """Clear the cached group pks of a workspace when its authorization domains are changed."""
+    if not reverse and action in ("post_add", "post_remove", "post_clear"):
+        instance._clear_group_pks_cache()
@@ -1,4 +1,5 @@
 import django_tables2 as tables
+from django.db.models import QuerySet
 from django.utils.safestring import mark_safe
 
 from . import models
@@ -47,8 +48,7 @@ class BillingProjectStaffTable(tables.Table):
     number_workspaces = tables.Column(
         verbose_name="Number of workspaces",
         empty_values=(),
-        orderable=False,
-        accessor="workspace_set__count",
+        accessor="n_workspaces",
     )
     has_app_as_user = BooleanIconColumn(show_false_icon=True)
 
@@ -56,6 +56,12 @@ class BillingProjectStaffTable(tables.Table):
         model = models.BillingProject
         fields = ("name", "has_app_as_user")
 
+    def __init__(self, data=None, *args, **kwargs):
+        # Count workspaces in the same query as the billing projects, unless the view has already done so.
+        if isinstance(data, QuerySet) and "n_workspaces" not in data.query.annotations:
+            data = data.annotate_workspace_counts()
+        super().__init__(data, *args, **kwargs)
+
 
 class AccountStaffTable(tables.Table):
     """Class to display a BillingProject table."""
@@ -86,13 +92,11 @@ class ManagedGroupStaffTable(tables.Table):
     number_groups = tables.Column(
         verbose_name="Number of groups",
         # empty_values=(0,),
-        orderable=False,
-        accessor="child_memberships__count",
+        accessor="n_groups",
     )
     number_accounts = tables.Column(
         verbose_name="Number of accounts",
-        orderable=False,
-        accessor="groupaccountmembership_set__count",
+        accessor="n_accounts",
     )
     is_managed_by_app = BooleanIconColumn(show_false_icon=True)
 
@@ -100,6 +104,12 @@ class ManagedGroupStaffTable(tables.Table):
         model = models.ManagedGroup
         fields = ("name", "is_managed_by_app")
 
+    def __init__(self, data=None, *args, **kwargs):
+        # Count members in the same query as the groups, unless the view has already done so.
+        if isinstance(data, QuerySet) and "n_groups" not in data.query.annotations:
+            data = data.annotate_membership_counts()
+        super().__init__(data, *args, **kwargs)
+
     def render_number_groups(self, value, record):
         """Render the number of groups as --- for groups not managed by the app."""
         if not record.is_managed_by_app:
@@ -135,8 +145,7 @@ class WorkspaceStaffTable(tables.Table):
     number_groups = tables.Column(
         verbose_name="Number of groups shared with",
         empty_values=(),
-        orderable=False,
-        accessor="workspacegroupsharing_set__count",
+        accessor="n_sharing_groups",
     )
     created = tables.Column(verbose_name="Date added")
 
@@ -145,8 +154,14 @@ class WorkspaceStaffTable(tables.Table):
         fields = ("name", "billing_project", "workspace_type")
         order_by = ("name",)
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self, data=None, *args, **kwargs):
+        # Count sharing records and fetch billing projects in the same query as the workspaces, unless the view has
+        # already done so.
+        if isinstance(data, QuerySet):
+            if "n_sharing_groups" not in data.query.annotations:
+                data = data.annotate_sharing_counts()
+            data = data.select_related("billing_project")
+        super().__init__(data, *args, **kwargs)
         self.registered_names = workspace_adapter_registry.get_registered_names()
 
     def render_workspace_type(self, record):
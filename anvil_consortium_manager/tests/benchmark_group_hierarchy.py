@@ -0,0 +1,83 @@
+"""Benchmarks for looking up the ManagedGroup hierarchy.
+
+These are not run as part of the regular test suite. To run them, pass this file to pytest directly, e.g.:
+
+    pytest anvil_consortium_manager/tests/benchmark_group_hierarchy.py -s
+
+The size of the synthetic hierarchy can be set with the ``ANVIL_BENCHMARK_SIZE`` (number of groups) and
+``ANVIL_BENCHMARK_DEPTH`` (number of levels) environment variables.
+"""
+
+import os
+import time
+
+from django.test import TestCase, override_settings
+
+from ..models import Account, GroupAccountMembership, GroupGroupMembership, ManagedGroup, ManagedGroupClosure
+
+BENCHMARK_SIZE = int(os.environ.get("ANVIL_BENCHMARK_SIZE", 5000))
+BENCHMARK_DEPTH = int(os.environ.get("ANVIL_BENCHMARK_DEPTH", 10))
+# Number of times to repeat each lookup.
+REPEATS = 20
+
+
+class GroupHierarchyBenchmark(TestCase):
+    """Compare the closure table and recursive query backends on a deep synthetic hierarchy."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Split the groups evenly into levels. Each group is a member of two groups in the level above it.
+        per_level = BENCHMARK_SIZE // BENCHMARK_DEPTH
+        groups = ManagedGroup.objects.bulk_create(
+            [
+                ManagedGroup(name="group-{}-{}".format(level, i), email="group-{}-{}@firecloud.org".format(level, i))
+                for level in range(BENCHMARK_DEPTH)
+                for i in range(per_level)
+            ]
+        )
+        levels = [groups[level * per_level : (level + 1) * per_level] for level in range(BENCHMARK_DEPTH)]
+        GroupGroupMembership.objects.bulk_create(
+            [
+                GroupGroupMembership(parent_group=parent_level[j], child_group=child)
+                for parent_level, child_level in zip(levels[:-1], levels[1:])
+                for i, child in enumerate(child_level)
+                for j in {i, (i + 1) % per_level}
+            ]
+        )
+        # bulk_create does not send signals, so build the closure table explicitly.
+        start = time.perf_counter()
+        ManagedGroupClosure.rebuild()
+        print("\nRebuilt closure for {} groups: {:.2f}s".format(len(groups), time.perf_counter() - start))
+        cls.root = levels[0][0]
+        cls.leaf = levels[-1][0]
+        cls.account = Account.objects.create(email="benchmark@example.com", is_service_account=False)
+        GroupAccountMembership.objects.bulk_create(
+            [GroupAccountMembership(account=cls.account, group=group) for group in levels[-1][:10]]
+        )
+
+    def time_lookups(self, backend):
+        timings = {}
+        with override_settings(ANVIL_GROUP_HIERARCHY_BACKEND=backend):
+            for name, func in (
+                ("get_all_parents", lambda: list(self.leaf.get_all_parents())),
+                ("get_all_children", lambda: list(self.root.get_all_children())),
+                ("get_all_groups", lambda: self.account.get_all_groups()),
+            ):
+                start = time.perf_counter()
+                for _ in range(REPEATS):
+                    result = func()
+                timings[name] = ((time.perf_counter() - start) / REPEATS, len(result))
+        return timings
+
+    def test_compare_backends(self):
+        """Both backends return the same groups; report the time per lookup for each."""
+        closure = self.time_lookups("closure")
+        cte = self.time_lookups("cte")
+        print("\n{} groups in {} levels:".format(BENCHMARK_SIZE, BENCHMARK_DEPTH))
+        for name in closure:
+            print(
+                "  {}: {} groups, closure {:.4f}s, cte {:.4f}s".format(
+                    name, closure[name][1], closure[name][0], cte[name][0]
+                )
+            )
+            self.assertEqual(closure[name][1], cte[name][1])
@@ -163,7 +163,15 @@ CACHES = {
             "MAX_ENTRIES": 1000,  # Maximum number of entries in the cache.
         },
         "TIMEOUT": None,  # Cache entries never expire.
-    }
+    },
+    "graph_layout": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "anvil_graph_layout_cache",
+    },
 }
 
 ANVIL_AUDIT_CACHE = "default"
+ANVIL_GRAPH_LAYOUT_CACHE = "graph_layout"
+
+# Do not retry failed API calls, so that mocked error responses are only requested once.
+ANVIL_API_RETRY = {"max_retries": 0}
@@ -4,7 +4,7 @@ import responses
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 
-from .. import models
+from .. import exceptions, models
 from ..adapters import mixins
 from ..adapters.default import DefaultManagedGroupAdapter, DefaultWorkspaceAdapter
 from . import factories
@@ -430,14 +430,15 @@ class WorkspaceSharingAdapterMixinTest(AnVILAPIMockTestMixin, TestCase):
         workspace = factories.WorkspaceFactory.create(
             billing_project__name="bar", name="foo", workspace_type=self.adapter.get_type()
         )
-        # API response for all permissions.
+        # All groups are shared with in one API call.
         acls = [
             {
-                "email": permission_reader.group_name + "@firecloud.org",
-                "accessLevel": permission_reader.access,
+                "email": permission.group_name + "@firecloud.org",
+                "accessLevel": permission.access,
                 "canShare": False,
-                "canCompute": permission_reader.can_compute,
-            },
+                "canCompute": permission.can_compute,
+            }
+            for permission in [permission_reader, permission_writer, permission_owner]
         ]
         self.anvil_response_mock.add(
             responses.PATCH,
@@ -446,13 +447,49 @@ class WorkspaceSharingAdapterMixinTest(AnVILAPIMockTestMixin, TestCase):
             match=[responses.matchers.json_params_matcher(acls)],
             json={"invitesSent": {}, "usersNotFound": {}, "usersUpdated": acls},
         )
+        # Run the adapter method.
+        with patch.object(self.adapter, "share_permissions", [permission_reader, permission_writer, permission_owner]):
+            self.adapter.after_anvil_create(workspace)
+
+        # Check for WorkspaceGroupSharing.
+        self.assertEqual(models.WorkspaceGroupSharing.objects.count(), 3)
+        sharing = models.WorkspaceGroupSharing.objects.get(group=group_reader)
+        self.assertEqual(sharing.workspace, workspace)
+        self.assertEqual(sharing.group, group_reader)
+        self.assertEqual(sharing.access, permission_reader.access)
+        self.assertEqual(sharing.can_compute, permission_reader.can_compute)
+        sharing = models.WorkspaceGroupSharing.objects.get(group=group_writer)
+        self.assertEqual(sharing.workspace, workspace)
+        self.assertEqual(sharing.group, group_writer)
+        self.assertEqual(sharing.access, permission_writer.access)
+        self.assertEqual(sharing.can_compute, permission_writer.can_compute)
+        sharing = models.WorkspaceGroupSharing.objects.get(group=group_owner)
+        self.assertEqual(sharing.workspace, workspace)
+        self.assertEqual(sharing.group, group_owner)
+        self.assertEqual(sharing.access, permission_owner.access)
+        self.assertEqual(sharing.can_compute, permission_owner.can_compute)
+
+    def test_after_anvil_create_only_changed_sharing_is_sent(self):
+        """Groups that the workspace is already shared with using the same access are not included in the request."""
+        other_group = factories.ManagedGroupFactory.create()
+        other_permission = mixins.WorkspaceSharingPermission(
+            group_name=other_group.name,
+            access=models.WorkspaceGroupSharing.READER,
+            can_compute=False,
+        )
+        workspace = factories.WorkspaceFactory.create(
+            billing_project__name="bar", name="foo", workspace_type=self.adapter.get_type()
+        )
+        factories.WorkspaceGroupSharingFactory.create(
+            workspace=workspace, group=self.group, access=models.WorkspaceGroupSharing.READER, can_compute=False
+        )
         acls = [
             {
-                "email": permission_writer.group_name + "@firecloud.org",
-                "accessLevel": permission_writer.access,
+                "email": other_group.email,
+                "accessLevel": models.WorkspaceGroupSharing.READER,
                 "canShare": False,
-                "canCompute": permission_writer.can_compute,
-            },
+                "canCompute": False,
+            }
         ]
         self.anvil_response_mock.add(
             responses.PATCH,
@@ -461,43 +498,33 @@ class WorkspaceSharingAdapterMixinTest(AnVILAPIMockTestMixin, TestCase):
             match=[responses.matchers.json_params_matcher(acls)],
             json={"invitesSent": {}, "usersNotFound": {}, "usersUpdated": acls},
         )
+        with patch.object(self.adapter, "share_permissions", [self.share_permission, other_permission]):
+            self.adapter.after_anvil_create(workspace)
+        self.assertEqual(models.WorkspaceGroupSharing.objects.count(), 2)
+
+    def test_after_anvil_create_group_not_found_on_anvil(self):
+        """An error is raised if AnVIL reports that a group was not found."""
+        workspace = factories.WorkspaceFactory.create(
+            billing_project__name="bar", name="foo", workspace_type=self.adapter.get_type()
+        )
         acls = [
             {
-                "email": permission_owner.group_name + "@firecloud.org",
-                "accessLevel": permission_owner.access,
+                "email": self.group.email,
+                "accessLevel": models.WorkspaceGroupSharing.READER,
                 "canShare": False,
-                "canCompute": permission_owner.can_compute,
-            },
+                "canCompute": False,
+            }
         ]
         self.anvil_response_mock.add(
             responses.PATCH,
             self.api_client.rawls_entry_point + "/api/workspaces/bar/foo/acl?inviteUsersNotFound=false",
             status=200,
             match=[responses.matchers.json_params_matcher(acls)],
-            json={"invitesSent": {}, "usersNotFound": {}, "usersUpdated": acls},
+            json={"invitesSent": [], "usersNotFound": acls, "usersUpdated": []},
         )
-        # Run the adapter method.
-        with patch.object(self.adapter, "share_permissions", [permission_reader, permission_writer, permission_owner]):
+        with self.assertRaises(exceptions.AnVILGroupNotFound):
             self.adapter.after_anvil_create(workspace)
 
-        # Check for WorkspaceGroupSharing.
-        self.assertEqual(models.WorkspaceGroupSharing.objects.count(), 3)
-        sharing = models.WorkspaceGroupSharing.objects.get(group=group_reader)
-        self.assertEqual(sharing.workspace, workspace)
-        self.assertEqual(sharing.group, group_reader)
-        self.assertEqual(sharing.access, permission_reader.access)
-        self.assertEqual(sharing.can_compute, permission_reader.can_compute)
-        sharing = models.WorkspaceGroupSharing.objects.get(group=group_writer)
-        self.assertEqual(sharing.workspace, workspace)
-        self.assertEqual(sharing.group, group_writer)
-        self.assertEqual(sharing.access, permission_writer.access)
-        self.assertEqual(sharing.can_compute, permission_writer.can_compute)
-        sharing = models.WorkspaceGroupSharing.objects.get(group=group_owner)
-        self.assertEqual(sharing.workspace, workspace)
-        self.assertEqual(sharing.group, group_owner)
-        self.assertEqual(sharing.access, permission_owner.access)
-        self.assertEqual(sharing.can_compute, permission_owner.can_compute)
-
     def test_after_anvil_create_workspace_sharing_fails_validation(self):
         # Workspace sharing object fails validation.
         # This can happen if the access/can_compute combo specified in the permission fails validation.
@@ -806,44 +833,15 @@ class WorkspaceSharingAdapterMixinTest(AnVILAPIMockTestMixin, TestCase):
         workspace = factories.WorkspaceFactory.create(
             billing_project__name="bar", name="foo", workspace_type=self.adapter.get_type()
         )
-        # API response for all permissions.
-        acls = [
-            {
-                "email": permission_reader.group_name + "@firecloud.org",
-                "accessLevel": permission_reader.access,
-                "canShare": False,
-                "canCompute": permission_reader.can_compute,
-            },
-        ]
-        self.anvil_response_mock.add(
-            responses.PATCH,
-            self.api_client.rawls_entry_point + "/api/workspaces/bar/foo/acl?inviteUsersNotFound=false",
-            status=200,
-            match=[responses.matchers.json_params_matcher(acls)],
-            json={"invitesSent": {}, "usersNotFound": {}, "usersUpdated": acls},
-        )
+        # All groups are shared with in one API call.
         acls = [
             {
-                "email": permission_writer.group_name + "@firecloud.org",
-                "accessLevel": permission_writer.access,
-                "canShare": False,
-                "canCompute": permission_writer.can_compute,
-            },
-        ]
-        self.anvil_response_mock.add(
-            responses.PATCH,
-            self.api_client.rawls_entry_point + "/api/workspaces/bar/foo/acl?inviteUsersNotFound=false",
-            status=200,
-            match=[responses.matchers.json_params_matcher(acls)],
-            json={"invitesSent": {}, "usersNotFound": {}, "usersUpdated": acls},
-        )
-        acls = [
-            {
-                "email": permission_owner.group_name + "@firecloud.org",
-                "accessLevel": permission_owner.access,
+                "email": permission.group_name + "@firecloud.org",
+                "accessLevel": permission.access,
                 "canShare": False,
-                "canCompute": permission_owner.can_compute,
-            },
+                "canCompute": permission.can_compute,
+            }
+            for permission in [permission_reader, permission_writer, permission_owner]
         ]
         self.anvil_response_mock.add(
             responses.PATCH,
@@ -0,0 +1,933 @@
+import asyncio
+import inspect
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from email.utils import format_datetime
+from unittest import mock
+
+import requests
+import responses
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import anvil_api
+from .utils import AnVILAPIMockTestMixin
+
+
+class AnVILAPISessionTest(AnVILAPIMockTestMixin, TestCase):
+    """Tests for connection pool and timeout configuration of the AnVILAPISession."""
+
+    def setUp(self):
+        super().setUp()
+        # Create a new session for each test so that settings are read again.
+        self.original_auth_session = anvil_api.AnVILAPIClient.auth_session
+        self.addCleanup(setattr, anvil_api.AnVILAPIClient, "auth_session", self.original_auth_session)
+        anvil_api.AnVILAPIClient.auth_session = None
+
+    def test_default_timeout(self):
+        client = anvil_api.AnVILAPIClient()
+        self.assertEqual(client.auth_session.timeout, (10, 120))
+        url = client.firecloud_entry_point + "/status"
+        self.anvil_response_mock.add(responses.GET, url, status=200)
+        with self.settings(ANVIL_API_READ_TIMEOUT=1):
+            # Settings are only read when the session is created.
+            client.status()
+        self.assertEqual(self.anvil_response_mock.calls[0].request.req_kwargs["timeout"], (10, 120))
+
+    @override_settings(ANVIL_API_CONNECT_TIMEOUT=2, ANVIL_API_READ_TIMEOUT=30)
+    def test_custom_timeout(self):
+        client = anvil_api.AnVILAPIClient()
+        url = client.firecloud_entry_point + "/status"
+        self.anvil_response_mock.add(responses.GET, url, status=200)
+        client.status()
+        self.assertEqual(self.anvil_response_mock.calls[0].request.req_kwargs["timeout"], (2, 30))
+
+    def test_timeout_argument(self):
+        """A timeout passed to a request is used instead of the default."""
+        client = anvil_api.AnVILAPIClient()
+        url = client.firecloud_entry_point + "/status"
+        self.anvil_response_mock.add(responses.GET, url, status=200)
+        client.auth_session.get(url, 200, timeout=5)
+        self.assertEqual(self.anvil_response_mock.calls[0].request.req_kwargs["timeout"], 5)
+
+    def test_entry_point_adapters(self):
+        """Each entry point has its own adapter."""
+        client = anvil_api.AnVILAPIClient()
+        session = client.auth_session
+        self.assertEqual(set(session.entry_point_adapters), {"firecloud", "rawls", "sam"})
+        for name, url in client.get_entry_points().items():
+            with self.subTest(entry_point=name):
+                self.assertIs(session.get_adapter(url + "/foo"), session.entry_point_adapters[name])
+                self.assertEqual(session.entry_point_pool_sizes[name], 10)
+                pool_kw = session.entry_point_adapters[name].poolmanager.connection_pool_kw
+                self.assertEqual(pool_kw["maxsize"], 10)
+                self.assertFalse(pool_kw["block"])
+
+    @override_settings(ANVIL_API_POOL_SIZES={"rawls": 32}, ANVIL_API_POOL_BLOCK=True)
+    def test_custom_pool_sizes(self):
+        session = anvil_api.AnVILAPIClient().auth_session
+        self.assertEqual(session.entry_point_pool_sizes, {"firecloud": 10, "rawls": 32, "sam": 10})
+        self.assertEqual(session.entry_point_adapters["rawls"].poolmanager.connection_pool_kw["maxsize"], 32)
+        self.assertTrue(session.entry_point_adapters["rawls"].poolmanager.connection_pool_kw["block"])
+
+    def test_get_pool_stats_no_requests(self):
+        stats = anvil_api.AnVILAPIClient().get_pool_stats()
+        self.assertEqual(
+            stats,
+            {
+                name: {"pool_maxsize": 10, "num_connections": 0, "num_requests": 0, "idle_connections": 0}
+                for name in ("firecloud", "rawls", "sam")
+            },
+        )
+
+    def test_get_pool_stats_with_pool(self):
+        client = anvil_api.AnVILAPIClient()
+        adapter = client.auth_session.entry_point_adapters["sam"]
+        # Open a pool without making a request.
+        pool = adapter.poolmanager.connection_from_url(client.sam_entry_point)
+        pool.num_requests = 3
+        pool.num_connections = 2
+        stats = client.get_pool_stats()
+        self.assertEqual(stats["sam"]["num_requests"], 3)
+        self.assertEqual(stats["sam"]["num_connections"], 2)
+        self.assertEqual(stats["sam"]["idle_connections"], 0)
+        self.assertEqual(stats["rawls"]["num_requests"], 0)
+
+    def test_get_pool_stats_without_pool_counts(self):
+        """Connection counts are 0 if the connection pools do not provide them."""
+        client = anvil_api.AnVILAPIClient()
+        adapter = client.auth_session.entry_point_adapters["sam"]
+        adapter.poolmanager.pools[object()] = object()
+        stats = client.get_pool_stats()
+        self.assertEqual(
+            stats["sam"], {"pool_maxsize": 10, "num_connections": 0, "num_requests": 0, "idle_connections": 0}
+        )
+
+    def test_get_pool_stats_without_pool_manager(self):
+        """Connection counts are 0 if the adapter does not have a pool manager."""
+        client = anvil_api.AnVILAPIClient()
+        del client.auth_session.entry_point_adapters["sam"].poolmanager
+        stats = client.get_pool_stats()
+        self.assertEqual(
+            stats["sam"], {"pool_maxsize": 10, "num_connections": 0, "num_requests": 0, "idle_connections": 0}
+        )
+
+
+def record_retry(retry_info):
+    """Retry hook used to test importing ``on_retry`` from a dotted path."""
+    record_retry.calls.append(retry_info)
+
+
+record_retry.calls = []
+
+
+class RetryPolicyTest(TestCase):
+    """Tests for the RetryPolicy class."""
+
+    def test_defaults(self):
+        policy = anvil_api.RetryPolicy()
+        self.assertEqual(policy.max_retries, 3)
+        self.assertEqual(policy.status_codes, (429, 500, 502, 503, 504))
+        self.assertEqual(policy.methods, ("GET",))
+        self.assertIsNone(policy.on_retry)
+
+    def test_invalid_max_retries(self):
+        with self.assertRaises(ValueError):
+            anvil_api.RetryPolicy(max_retries=-1)
+
+    def test_methods_uppercase(self):
+        policy = anvil_api.RetryPolicy(methods=["get", "put"])
+        self.assertEqual(policy.methods, ("GET", "PUT"))
+
+    def test_on_retry_dotted_path(self):
+        policy = anvil_api.RetryPolicy(on_retry="anvil_consortium_manager.tests.test_anvil_api.record_retry")
+        self.assertIs(policy.on_retry, record_retry)
+
+    def test_get_delay_exponential_backoff_with_jitter(self):
+        policy = anvil_api.RetryPolicy(backoff_factor=2, max_backoff=10)
+        with mock.patch("random.uniform", side_effect=lambda a, b: b) as mock_uniform:
+            self.assertEqual(policy.get_delay(1), 2)
+            self.assertEqual(policy.get_delay(2), 4)
+            self.assertEqual(policy.get_delay(3), 8)
+            # Capped at max_backoff.
+            self.assertEqual(policy.get_delay(4), 10)
+        mock_uniform.assert_called_with(0, 10)
+        for retry in range(1, 5):
+            delay = policy.get_delay(retry)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(10, 2**retry))
+
+    def test_get_delay_retry_after_seconds(self):
+        policy = anvil_api.RetryPolicy()
+        response = requests.Response()
+        response.headers["Retry-After"] = "7"
+        self.assertEqual(policy.get_delay(1, response=response), 7)
+
+    def test_get_delay_retry_after_date(self):
+        policy = anvil_api.RetryPolicy(max_backoff=60)
+        response = requests.Response()
+        response.headers["Retry-After"] = format_datetime(timezone.now() + timedelta(seconds=30), usegmt=True)
+        delay = policy.get_delay(1, response=response)
+        self.assertGreater(delay, 25)
+        self.assertLessEqual(delay, 30)
+
+    def test_get_delay_retry_after_date_in_past(self):
+        policy = anvil_api.RetryPolicy()
+        response = requests.Response()
+        response.headers["Retry-After"] = format_datetime(timezone.now() - timedelta(seconds=30), usegmt=True)
+        self.assertEqual(policy.get_delay(1, response=response), 0)
+
+    def test_get_delay_retry_after_date_gmt(self):
+        policy = anvil_api.RetryPolicy(max_backoff=60)
+        response = requests.Response()
+        response.headers["Retry-After"] = format_datetime(
+            datetime.now(dt_timezone.utc) + timedelta(seconds=30), usegmt=True
+        )
+        self.assertTrue(response.headers["Retry-After"].endswith("GMT"))
+        delay = policy.get_delay(1, response=response)
+        self.assertGreater(delay, 25)
+        self.assertLessEqual(delay, 30)
+
+    def test_get_delay_retry_after_date_unknown_zone(self):
+        """Dates with a -0000 zone are parsed as naive datetimes and treated as UTC."""
+        policy = anvil_api.RetryPolicy(max_backoff=60)
+        response = requests.Response()
+        retry_at = datetime.now(dt_timezone.utc).replace(tzinfo=None) + timedelta(seconds=30)
+        response.headers["Retry-After"] = format_datetime(retry_at)
+        self.assertTrue(response.headers["Retry-After"].endswith("-0000"))
+        delay = policy.get_delay(1, response=response)
+        self.assertGreater(delay, 25)
+        self.assertLessEqual(delay, 30)
+
+    @override_settings(USE_TZ=False)
+    def test_get_delay_retry_after_date_use_tz_false(self):
+        policy = anvil_api.RetryPolicy(max_backoff=60)
+        response = requests.Response()
+        response.headers["Retry-After"] = format_datetime(
+            datetime.now(dt_timezone.utc) + timedelta(seconds=30), usegmt=True
+        )
+        delay = policy.get_delay(1, response=response)
+        self.assertGreater(delay, 25)
+        self.assertLessEqual(delay, 30)
+
+    def test_get_delay_retry_after_capped(self):
+        """A long Retry-After delay is capped at max_backoff."""
+        policy = anvil_api.RetryPolicy(max_backoff=10)
+        response = requests.Response()
+        response.headers["Retry-After"] = "3600"
+        self.assertEqual(policy.get_delay(1, response=response), 10)
+        response.headers["Retry-After"] = format_datetime(timezone.now() + timedelta(hours=1), usegmt=True)
+        self.assertEqual(policy.get_delay(1, response=response), 10)
+
+    def test_default_limits(self):
+        policy = anvil_api.RetryPolicy()
+        self.assertEqual(policy.max_backoff, 10)
+        self.assertEqual(policy.max_elapsed_time, 30)
+
+    def test_get_delay_retry_after_invalid(self):
+        policy = anvil_api.RetryPolicy(backoff_factor=1)
+        response = requests.Response()
+        response.headers["Retry-After"] = "foo"
+        self.assertLessEqual(policy.get_delay(1, response=response), 1)
+
+    @override_settings(ANVIL_API_RETRY={"max_retries": 5, "methods": ["GET", "PUT"]})
+    def test_from_settings(self):
+        policy = anvil_api.RetryPolicy.from_settings()
+        self.assertEqual(policy.max_retries, 5)
+        self.assertEqual(policy.methods, ("GET", "PUT"))
+        self.assertEqual(policy.status_codes, (429, 500, 502, 503, 504))
+
+
+class AnVILAPISessionRetryTest(AnVILAPIMockTestMixin, TestCase):
+    """Tests for retrying requests in the AnVILAPISession."""
+
+    def setUp(self):
+        super().setUp()
+        self.on_retry = mock.Mock()
+        self.policy = anvil_api.RetryPolicy(max_retries=2, on_retry=self.on_retry)
+        session = self.api_client.auth_session
+        self.addCleanup(setattr, session, "retry_policy", session.retry_policy)
+        session.retry_policy = self.policy
+        sleep_patcher = mock.patch("time.sleep")
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        self.url = self.api_client.sam_entry_point + "/api/groups/v1/test-group"
+
+    def test_get_retried(self):
+        """A GET request is retried after a transient error."""
+        self.anvil_response_mock.add(responses.GET, self.url, status=503, json={"message": "unavailable"})
+        self.anvil_response_mock.add(responses.GET, self.url, status=200, json="test-group@firecloud.org")
+        response = self.api_client.get_group_email("test-group")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+        self.assertEqual(self.mock_sleep.call_count, 1)
+        self.assertEqual(self.on_retry.call_count, 1)
+        retry_info = self.on_retry.call_args[0][0]
+        self.assertEqual(retry_info["method"], "GET")
+        self.assertEqual(retry_info["url"], self.url)
+        self.assertEqual(retry_info["retry"], 1)
+        self.assertEqual(retry_info["status_code"], 503)
+        self.assertIsNone(retry_info["error"])
+
+    def test_retry_logged(self):
+        self.anvil_response_mock.add(responses.GET, self.url, status=429, headers={"Retry-After": "3"})
+        self.anvil_response_mock.add(responses.GET, self.url, status=200, json="test-group@firecloud.org")
+        with self.assertLogs("anvil_consortium_manager.anvil_api", level="WARNING") as logs:
+            self.api_client.get_group_email("test-group")
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].anvil_api_retry["status_code"], 429)
+        self.assertEqual(logs.records[0].anvil_api_retry["delay"], 3)
+        self.mock_sleep.assert_called_once_with(3)
+
+    def test_max_retries(self):
+        """The error is raised once all retries have been made."""
+        self.anvil_response_mock.add(responses.GET, self.url, status=500, json={"message": "error"})
+        with self.assertRaises(anvil_api.AnVILAPIError500):
+            self.api_client.get_group_email("test-group")
+        self.assertEqual(len(self.anvil_response_mock.calls), 3)
+        self.assertEqual(self.mock_sleep.call_count, 2)
+
+    def test_status_code_not_retried(self):
+        self.anvil_response_mock.add(responses.GET, self.url, status=404, json={"message": "not found"})
+        with self.assertRaises(anvil_api.AnVILAPIError404):
+            self.api_client.get_group_email("test-group")
+        self.assertEqual(len(self.anvil_response_mock.calls), 1)
+        self.mock_sleep.assert_not_called()
+
+    def test_custom_status_codes(self):
+        self.policy.status_codes = (404,)
+        self.anvil_response_mock.add(responses.GET, self.url, status=404, json={"message": "not found"})
+        self.anvil_response_mock.add(responses.GET, self.url, status=200, json="test-group@firecloud.org")
+        response = self.api_client.get_group_email("test-group")
+        self.assertEqual(response.status_code, 200)
+
+    def test_max_elapsed_time(self):
+        """A request is not retried if the delay would exceed the maximum elapsed time."""
+        self.policy.max_elapsed_time = 30
+        self.policy.max_backoff = 60
+        self.anvil_response_mock.add(responses.GET, self.url, status=503, headers={"Retry-After": "60"})
+        with self.assertRaises(anvil_api.AnVILAPIError):
+            self.api_client.get_group_email("test-group")
+        self.assertEqual(len(self.anvil_response_mock.calls), 1)
+        self.mock_sleep.assert_not_called()
+
+    def test_connection_error_retried(self):
+        self.anvil_response_mock.add(responses.GET, self.url, body=requests.exceptions.ConnectionError("reset"))
+        self.anvil_response_mock.add(responses.GET, self.url, status=200, json="test-group@firecloud.org")
+        response = self.api_client.get_group_email("test-group")
+        self.assertEqual(response.status_code, 200)
+        retry_info = self.on_retry.call_args[0][0]
+        self.assertIsNone(retry_info["status_code"])
+        self.assertIn("reset", retry_info["error"])
+
+    def test_connection_error_max_retries(self):
+        self.anvil_response_mock.add(responses.GET, self.url, body=requests.exceptions.ConnectionError("reset"))
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.api_client.get_group_email("test-group")
+        self.assertEqual(len(self.anvil_response_mock.calls), 3)
+
+    def test_post_not_retried(self):
+        """Requests that are not safe to repeat are not retried."""
+        self.anvil_response_mock.add(responses.POST, self.url, status=503, json={"message": "unavailable"})
+        with self.assertRaises(anvil_api.AnVILAPIError):
+            self.api_client.create_group("test-group")
+        self.assertEqual(len(self.anvil_response_mock.calls), 1)
+        self.on_retry.assert_not_called()
+
+    def test_post_connection_error_not_retried(self):
+        self.anvil_response_mock.add(responses.POST, self.url, body=requests.exceptions.ConnectionError("reset"))
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.api_client.create_group("test-group")
+        self.assertEqual(len(self.anvil_response_mock.calls), 1)
+
+    def test_retry_false(self):
+        self.anvil_response_mock.add(responses.GET, self.url, status=503, json={"message": "unavailable"})
+        with self.assertRaises(anvil_api.AnVILAPIError):
+            self.api_client.auth_session.get(self.url, 200, retry=False)
+        self.assertEqual(len(self.anvil_response_mock.calls), 1)
+
+    def test_add_user_to_group_retried(self):
+        url = self.url + "/MEMBER/foo@example.com"
+        self.anvil_response_mock.add(responses.PUT, url, status=502)
+        self.anvil_response_mock.add(responses.PUT, url, status=204)
+        self.api_client.add_user_to_group("test-group", "MEMBER", "foo@example.com")
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
+    def test_remove_user_from_group_retried(self):
+        url = self.url + "/MEMBER/foo@example.com"
+        self.anvil_response_mock.add(responses.DELETE, url, status=504)
+        self.anvil_response_mock.add(responses.DELETE, url, status=204)
+        self.api_client.remove_user_from_group("test-group", "MEMBER", "foo@example.com")
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
+    def test_update_workspace_acl_retried(self):
+        url = self.api_client.rawls_entry_point + "/api/workspaces/test-bp/test-ws/acl?inviteUsersNotFound=false"
+        self.anvil_response_mock.add(responses.PATCH, url, status=503)
+        self.anvil_response_mock.add(responses.PATCH, url, status=200, json={"usersUpdated": []})
+        self.api_client.update_workspace_acl("test-bp", "test-ws", [])
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
+    def test_update_workspace_requester_pays_retried(self):
+        url = self.api_client.rawls_entry_point + "/api/workspaces/v2/test-bp/test-ws/settings"
+        self.anvil_response_mock.add(responses.PUT, url, status=503)
+        self.anvil_response_mock.add(responses.PUT, url, status=200, json={})
+        self.api_client.update_workspace_requester_pays("test-bp", "test-ws", True)
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
+    def test_default_policy_from_settings(self):
+        """The test settings disable retries."""
+        original_auth_session = anvil_api.AnVILAPIClient.auth_session
+        self.addCleanup(setattr, anvil_api.AnVILAPIClient, "auth_session", original_auth_session)
+        anvil_api.AnVILAPIClient.auth_session = None
+        self.assertEqual(anvil_api.AnVILAPIClient().auth_session.retry_policy.max_retries, 0)
+
+
+class TokenBucketRateLimiterTest(TestCase):
+    """Tests for the TokenBucketRateLimiter class."""
+
+    def test_default_burst(self):
+        self.assertEqual(anvil_api.TokenBucketRateLimiter(2.5).burst, 3)
+        self.assertEqual(anvil_api.TokenBucketRateLimiter(0.5).burst, 1)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            anvil_api.TokenBucketRateLimiter(0)
+        with self.assertRaises(ValueError):
+            anvil_api.TokenBucketRateLimiter(1, burst=0)
+
+    def test_burst_does_not_wait(self):
+        rate_limiter = anvil_api.TokenBucketRateLimiter(1, burst=3)
+        with mock.patch("time.sleep") as mock_sleep:
+            for _ in range(3):
+                self.assertEqual(rate_limiter.acquire(), 0)
+        mock_sleep.assert_not_called()
+
+    def test_waits_when_empty(self):
+        rate_limiter = anvil_api.TokenBucketRateLimiter(1, burst=1)
+        with mock.patch("time.sleep") as mock_sleep:
+            rate_limiter.acquire()
+            waited = rate_limiter.acquire()
+            # The second waiting request is queued behind the first.
+            waited_2 = rate_limiter.acquire()
+        self.assertGreater(waited, 0.9)
+        self.assertLessEqual(waited, 1)
+        self.assertGreater(waited_2, 1.9)
+        self.assertLessEqual(waited_2, 2)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_shared_across_threads(self):
+        """The rate is enforced across all threads using the same rate limiter."""
+        rate_limiter = anvil_api.TokenBucketRateLimiter(50, burst=1)
+
+        def make_requests():
+            for _ in range(5):
+                rate_limiter.acquire()
+
+        threads = [threading.Thread(target=make_requests) for _ in range(4)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+        # 20 requests at 50 per second, with the first one not waiting.
+        self.assertGreaterEqual(elapsed, 19 / 50 - 0.01)
+
+
+class StopWaiting(Exception):
+    pass
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "rate_limit": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "rate_limit"},
+    }
+)
+class CacheRateLimiterTest(TestCase):
+    """Tests for the CacheRateLimiter class."""
+
+    def setUp(self):
+        super().setUp()
+        # Use a two second window, and start near the beginning of a window.
+        self.rate_limiter = anvil_api.CacheRateLimiter(1, burst=2, cache_alias="rate_limit", key="test")
+        remaining = self.rate_limiter.window - time.time() % self.rate_limiter.window
+        if remaining < 0.5:
+            time.sleep(remaining)
+
+    def test_window(self):
+        self.assertEqual(self.rate_limiter.window, 2)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            anvil_api.CacheRateLimiter(-1)
+        with self.assertRaises(ValueError):
+            anvil_api.CacheRateLimiter(1, burst=1.5)
+
+    def test_burst_does_not_wait(self):
+        with mock.patch("time.sleep") as mock_sleep:
+            self.assertEqual(self.rate_limiter.acquire(), 0)
+            self.assertEqual(self.rate_limiter.acquire(), 0)
+        mock_sleep.assert_not_called()
+
+    def test_waits_for_next_window(self):
+        self.rate_limiter.acquire()
+        self.rate_limiter.acquire()
+        with mock.patch("time.sleep", side_effect=StopWaiting) as mock_sleep:
+            with self.assertRaises(StopWaiting):
+                self.rate_limiter.acquire()
+        delay = mock_sleep.call_args[0][0]
+        self.assertGreater(delay, 0)
+        self.assertLessEqual(delay, 2)
+
+    def test_shared_by_instances(self):
+        """Rate limiters with the same key share the limit, like rate limiters in different processes."""
+        other_rate_limiter = anvil_api.CacheRateLimiter(1, burst=2, cache_alias="rate_limit", key="test")
+        self.rate_limiter.acquire()
+        other_rate_limiter.acquire()
+        with mock.patch("time.sleep", side_effect=StopWaiting):
+            with self.assertRaises(StopWaiting):
+                self.rate_limiter.acquire()
+
+    def test_different_keys(self):
+        other_rate_limiter = anvil_api.CacheRateLimiter(1, burst=2, cache_alias="rate_limit", key="other")
+        self.rate_limiter.acquire()
+        self.rate_limiter.acquire()
+        with mock.patch("time.sleep") as mock_sleep:
+            self.assertEqual(other_rate_limiter.acquire(), 0)
+        mock_sleep.assert_not_called()
+
+    def test_waits_then_proceeds(self):
+        rate_limiter = anvil_api.CacheRateLimiter(20, burst=1, cache_alias="rate_limit", key="fast")
+        rate_limiter.acquire()
+        waited = rate_limiter.acquire()
+        self.assertGreater(waited, 0)
+        self.assertLessEqual(waited, 0.05)
+
+
+class AnVILAPISessionRateLimitTest(AnVILAPIMockTestMixin, TestCase):
+    """Tests for rate limiting requests in the AnVILAPISession."""
+
+    def setUp(self):
+        super().setUp()
+        # Create a new session for each test so that settings are read again.
+        original_auth_session = anvil_api.AnVILAPIClient.auth_session
+        self.addCleanup(setattr, anvil_api.AnVILAPIClient, "auth_session", original_auth_session)
+        anvil_api.AnVILAPIClient.auth_session = None
+
+    def test_no_rate_limits_by_default(self):
+        session = anvil_api.AnVILAPIClient().auth_session
+        self.assertEqual(session.entry_point_rate_limiters, {})
+
+    @override_settings(
+        ANVIL_API_RATE_LIMITS={"sam": {"rate": 5, "burst": 10}, "rawls": {"rate": 2, "cache": "default"}}
+    )
+    def test_rate_limiters_from_settings(self):
+        session = anvil_api.AnVILAPIClient().auth_session
+        self.assertEqual(set(session.entry_point_rate_limiters), {"rawls", "sam"})
+        sam_rate_limiter = session.entry_point_rate_limiters["sam"]
+        self.assertIsInstance(sam_rate_limiter, anvil_api.TokenBucketRateLimiter)
+        self.assertEqual(sam_rate_limiter.rate, 5)
+        self.assertEqual(sam_rate_limiter.burst, 10)
+        rawls_rate_limiter = session.entry_point_rate_limiters["rawls"]
+        self.assertIsInstance(rawls_rate_limiter, anvil_api.CacheRateLimiter)
+        self.assertEqual(rawls_rate_limiter.rate, 2)
+        self.assertEqual(rawls_rate_limiter.cache_alias, "default")
+        self.assertEqual(rawls_rate_limiter.key, "anvil_api_rate_limit:rawls")
+
+    def test_request_uses_entry_point_rate_limiter(self):
+        client = anvil_api.AnVILAPIClient()
+        rate_limiter = mock.Mock()
+        rate_limiter.acquire.return_value = 0
+        client.auth_session.entry_point_rate_limiters["sam"] = rate_limiter
+        self.anvil_response_mock.add(responses.GET, client.sam_entry_point + "/api/groups/v1", status=200, json=[])
+        self.anvil_response_mock.add(responses.GET, client.rawls_entry_point + "/api/workspaces", status=200, json=[])
+        client.get_groups()
+        self.assertEqual(rate_limiter.acquire.call_count, 1)
+        # Requests to other entry points are not limited.
+        client.list_workspaces()
+        self.assertEqual(rate_limiter.acquire.call_count, 1)
+
+    def test_retries_are_rate_limited(self):
+        client = anvil_api.AnVILAPIClient()
+        rate_limiter = mock.Mock()
+        rate_limiter.acquire.return_value = 0
+        client.auth_session.entry_point_rate_limiters["sam"] = rate_limiter
+        client.auth_session.retry_policy = anvil_api.RetryPolicy(max_retries=1)
+        url = client.sam_entry_point + "/api/groups/v1"
+        self.anvil_response_mock.add(responses.GET, url, status=429)
+        self.anvil_response_mock.add(responses.GET, url, status=200, json=[])
+        with mock.patch("time.sleep"):
+            client.get_groups()
+        self.assertEqual(rate_limiter.acquire.call_count, 2)
+
+
+RESPONSE_CACHE_SETTINGS = {
+    "CACHES": {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "api_responses": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "api_responses"},
+    },
+    "ANVIL_API_RESPONSE_CACHE": "api_responses",
+}
+
+
+class ResponseCacheTest(TestCase):
+    """Tests for the ResponseCache class."""
+
+    def test_from_settings_not_set(self):
+        self.assertIsNone(anvil_api.ResponseCache.from_settings())
+
+    @override_settings(**RESPONSE_CACHE_SETTINGS)
+    def test_from_settings(self):
+        response_cache = anvil_api.ResponseCache.from_settings()
+        self.assertEqual(response_cache.cache_alias, "api_responses")
+        self.assertEqual(response_cache.ttls, {"get_billing_projects": 60, "get_groups": 60, "list_workspaces": 60})
+
+    @override_settings(**RESPONSE_CACHE_SETTINGS)
+    def test_get_set(self):
+        response_cache = anvil_api.ResponseCache("api_responses", {"get_groups": 60})
+        self.assertIsNone(response_cache.get("get_groups", "https://example.com/groups"))
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"[]"
+        response_cache.set("get_groups", "https://example.com/groups", response)
+        cached_response = response_cache.get("get_groups", "https://example.com/groups")
+        self.assertEqual(cached_response.status_code, 200)
+        self.assertEqual(cached_response.json(), [])
+        # Different parameters have different keys.
+        self.assertIsNone(response_cache.get("get_groups", "https://example.com/groups", params={"fields": "foo"}))
+
+    @override_settings(**RESPONSE_CACHE_SETTINGS)
+    def test_invalidate(self):
+        response_cache = anvil_api.ResponseCache("api_responses", {"get_groups": 60, "list_workspaces": 60})
+        response = requests.Response()
+        response_cache.set("get_groups", "https://example.com/groups", response)
+        response_cache.set("get_groups", "https://example.com/groups", response, params={"fields": "foo"})
+        response_cache.set("list_workspaces", "https://example.com/workspaces", response)
+        response_cache.invalidate("get_groups")
+        self.assertIsNone(response_cache.get("get_groups", "https://example.com/groups"))
+        self.assertIsNone(response_cache.get("get_groups", "https://example.com/groups", params={"fields": "foo"}))
+        self.assertIsNotNone(response_cache.get("list_workspaces", "https://example.com/workspaces"))
+        # Invalidating again also works.
+        response_cache.set("get_groups", "https://example.com/groups", response)
+        response_cache.invalidate("get_groups")
+        self.assertIsNone(response_cache.get("get_groups", "https://example.com/groups"))
+
+    @override_settings(**RESPONSE_CACHE_SETTINGS)
+    def test_request_not_cached(self):
+        """The request, with its Authorization header, is not stored in the cache."""
+        response_cache = anvil_api.ResponseCache("api_responses", {"get_groups": 60})
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"[]"
+        response.request = requests.Request(
+            "GET", "https://example.com/groups", headers={"Authorization": "Bearer secret-token"}
+        ).prepare()
+        response_cache.set("get_groups", "https://example.com/groups", response)
+        cached_value = caches["api_responses"].get(response_cache._get_key("get_groups", "https://example.com/groups"))
+        self.assertNotIn("request", cached_value)
+        self.assertNotIn("Authorization", cached_value["headers"])
+        self.assertNotIn("secret-token", repr(cached_value))
+        self.assertIsNone(response_cache.get("get_groups", "https://example.com/groups").request)
+
+    @override_settings(**RESPONSE_CACHE_SETTINGS)
+    def test_evicted_version_key(self):
+        """Responses cached before an invalidation are not used again if the version key is evicted."""
+        response_cache = anvil_api.ResponseCache("api_responses", {"get_groups": 60})
+        response = requests.Response()
+        response_cache.set("get_groups", "https://example.com/groups", response)
+        response_cache.invalidate("get_groups")
+        caches["api_responses"].delete(response_cache._get_version_key("get_groups"))
+        self.assertIsNone(response_cache.get("get_groups", "https://example.com/groups"))
+
+    def test_is_cached(self):
+        response_cache = anvil_api.ResponseCache("api_responses", {"get_groups": 60})
+        self.assertTrue(response_cache.is_cached("get_groups"))
+        self.assertFalse(response_cache.is_cached("get_group_members"))
+
+
+@override_settings(**RESPONSE_CACHE_SETTINGS)
+class AnVILAPIClientResponseCacheTest(AnVILAPIMockTestMixin, TestCase):
+    """Tests for caching responses in AnVILAPIClient."""
+
+    def setUp(self):
+        super().setUp()
+        self.groups_url = self.api_client.sam_entry_point + "/api/groups/v1"
+        self.workspaces_url = self.api_client.rawls_entry_point + "/api/workspaces"
+
+    def tearDown(self):
+        super().tearDown()
+        caches["api_responses"].clear()
+
+    def test_not_cached_without_setting(self):
+        with self.settings(ANVIL_API_RESPONSE_CACHE=None):
+            client = anvil_api.AnVILAPIClient()
+            self.assertIsNone(client.response_cache)
+            self.anvil_response_mock.add(responses.GET, self.groups_url, status=200, json=[])
+            client.get_groups()
+            client.get_groups()
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
+    def test_get_groups_cached(self):
+        self.anvil_response_mock.add(responses.GET, self.groups_url, status=200, json=[{"groupName": "foo"}])
+        response_1 = anvil_api.AnVILAPIClient().get_groups()
+        response_2 = anvil_api.AnVILAPIClient().get_groups()
+        self.assertEqual(len(self.anvil_response_mock.calls), 1)
+        self.assertEqual(response_1.json(), response_2.json())
+
+    def test_use_cache_false(self):
+        self.anvil_response_mock.add(responses.GET, self.groups_url, status=200, json=[])
+        anvil_api.AnVILAPIClient().get_groups()
+        anvil_api.AnVILAPIClient(use_cache=False).get_groups()
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
+    def test_list_workspaces_cached_by_fields(self):
+        self.anvil_response_mock.add(responses.GET, self.workspaces_url, status=200, json=[])
+        client = anvil_api.AnVILAPIClient()
+        client.list_workspaces()
+        client.list_workspaces(fields="workspace.name")
+        client.list_workspaces(fields="workspace.name")
+        client.list_workspaces()
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
+    def test_method_not_in_ttls_not_cached(self):
+        url = self.groups_url + "/foo/member"
+        self.anvil_response_mock.add(responses.GET, url, status=200, json=[])
+        client = anvil_api.AnVILAPIClient()
+        client.get_group_members("foo")
+        client.get_group_members("foo")
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
+    @override_settings(ANVIL_API_RESPONSE_CACHE_TTLS={"get_group_members": 60})
+    def test_custom_ttls(self):
+        url = self.groups_url + "/foo/member"
+        self.anvil_response_mock.add(responses.GET, url, status=200, json=[])
+        self.anvil_response_mock.add(responses.GET, self.groups_url, status=200, json=[])
+        client = anvil_api.AnVILAPIClient()
+        client.get_group_members("foo")
+        client.get_group_members("foo")
+        client.get_groups()
+        client.get_groups()
+        self.assertEqual(len(self.anvil_response_mock.calls), 3)
+
+    def test_errors_not_cached(self):
+        self.anvil_response_mock.add(responses.GET, self.groups_url, status=500, json={"message": "error"})
+        self.anvil_response_mock.add(responses.GET, self.groups_url, status=200, json=[])
+        client = anvil_api.AnVILAPIClient()
+        with self.assertRaises(anvil_api.AnVILAPIError500):
+            client.get_groups()
+        client.get_groups()
+        client.get_groups()
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
+    def test_create_group_invalidates_get_groups(self):
+        self.anvil_response_mock.add(responses.GET, self.groups_url, status=200, json=[])
+        self.anvil_response_mock.add(responses.POST, self.groups_url + "/foo", status=201)
+        client = anvil_api.AnVILAPIClient()
+        client.get_groups()
+        client.create_group("foo")
+        client.get_groups()
+        self.assertEqual(len(self.anvil_response_mock.calls), 3)
+
+    def test_failed_write_invalidates(self):
+        """Cached responses are invalidated even if a write fails, since it may have been partially applied."""
+        self.anvil_response_mock.add(responses.GET, self.groups_url, status=200, json=[])
+        self.anvil_response_mock.add(responses.POST, self.groups_url + "/foo", status=500, json={"message": "error"})
+        client = anvil_api.AnVILAPIClient()
+        client.get_groups()
+        with self.assertRaises(anvil_api.AnVILAPIError500):
+            client.create_group("foo")
+        client.get_groups()
+        self.assertEqual(len(self.anvil_response_mock.calls), 3)
+
+    def test_add_user_to_group_invalidates_get_groups(self):
+        self.anvil_response_mock.add(responses.GET, self.groups_url, status=200, json=[])
+        self.anvil_response_mock.add(responses.PUT, self.groups_url + "/foo/member/bar@example.com", status=204)
+        client = anvil_api.AnVILAPIClient()
+        client.get_groups()
+        client.add_user_to_group("foo", "member", "bar@example.com")
+        client.get_groups()
+        self.assertEqual(len(self.anvil_response_mock.calls), 3)
+
+    def test_write_with_use_cache_false_invalidates(self):
+        self.anvil_response_mock.add(responses.GET, self.groups_url, status=200, json=[])
+        self.anvil_response_mock.add(responses.DELETE, self.groups_url + "/foo", status=204)
+        anvil_api.AnVILAPIClient().get_groups()
+        anvil_api.AnVILAPIClient(use_cache=False).delete_group("foo")
+        anvil_api.AnVILAPIClient().get_groups()
+        self.assertEqual(len(self.anvil_response_mock.calls), 3)
+
+    def test_update_workspace_acl_invalidates_list_workspaces(self):
+        self.anvil_response_mock.add(responses.GET, self.workspaces_url, status=200, json=[])
+        self.anvil_response_mock.add(
+            responses.PATCH, self.workspaces_url + "/bp/ws/acl?inviteUsersNotFound=false", status=200, json={}
+        )
+        client = anvil_api.AnVILAPIClient()
+        client.list_workspaces()
+        client.update_workspace_acl("bp", "ws", [])
+        client.list_workspaces()
+        self.assertEqual(len(self.anvil_response_mock.calls), 3)
+
+    def test_create_workspace_invalidates_list_workspaces(self):
+        self.anvil_response_mock.add(responses.GET, self.workspaces_url, status=200, json=[])
+        self.anvil_response_mock.add(responses.POST, self.workspaces_url, status=201, json={})
+        client = anvil_api.AnVILAPIClient()
+        client.list_workspaces()
+        client.create_workspace("bp", "ws")
+        client.list_workspaces()
+        self.assertEqual(len(self.anvil_response_mock.calls), 3)
+
+    def test_write_does_not_invalidate_other_methods(self):
+        self.anvil_response_mock.add(responses.GET, self.workspaces_url, status=200, json=[])
+        self.anvil_response_mock.add(responses.POST, self.groups_url + "/foo", status=201)
+        client = anvil_api.AnVILAPIClient()
+        client.list_workspaces()
+        client.create_group("foo")
+        client.list_workspaces()
+        self.assertEqual(len(self.anvil_response_mock.calls), 2)
+
+
+class AsyncAnVILAPIClientTest(AnVILAPIMockTestMixin, TestCase):
+    """Tests for the AsyncAnVILAPIClient class."""
+
+    def setUp(self):
+        super().setUp()
+        self.async_client = anvil_api.AsyncAnVILAPIClient()
+        self.addCleanup(self.async_client.close)
+
+    def test_method_surface(self):
+        """Every public API method of AnVILAPIClient has a coroutine with the same signature."""
+        # Methods that do not call the API.
+        excluded = ("get_entry_points", "get_pool_stats")
+        for name, method in inspect.getmembers(anvil_api.AnVILAPIClient, inspect.isfunction):
+            if name.startswith("_") or name in excluded:
+                continue
+            with self.subTest(method=name):
+                async_method = getattr(anvil_api.AsyncAnVILAPIClient, name)
+                self.assertTrue(inspect.iscoroutinefunction(async_method))
+                self.assertEqual(inspect.signature(async_method), inspect.signature(method))
+
+    def test_shares_auth_session(self):
+        """The async client uses the shared auth session."""
+        self.assertIs(self.async_client.client.auth_session, anvil_api.AnVILAPIClient.auth_session)
+
+    def test_default_max_concurrency(self):
+        self.assertEqual(self.async_client.max_concurrency, 10)
+
+    def test_invalid_max_concurrency(self):
+        with self.assertRaises(ValueError):
+            anvil_api.AsyncAnVILAPIClient(max_concurrency=0)
+        with self.assertRaises(ValueError):
+            anvil_api.AsyncAnVILAPIClient(max_concurrency="foo")
+
+    async def test_aclose_does_not_block_event_loop(self):
+        """Shutting down the worker threads does not block other coroutines."""
+        client = anvil_api.AsyncAnVILAPIClient()
+        original_shutdown = client._executor.shutdown
+        ticks = []
+
+        def slow_shutdown(**kwargs):
+            time.sleep(0.2)
+            original_shutdown(**kwargs)
+
+        async def tick():
+            for _ in range(5):
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        with mock.patch.object(client._executor, "shutdown", side_effect=slow_shutdown) as mock_shutdown:
+            async with client:
+                ticker = asyncio.ensure_future(tick())
+            self.assertEqual(len(ticks), 5)
+            await ticker
+        mock_shutdown.assert_called_once_with(wait=True)
+        with self.assertRaises(RuntimeError):
+            client._executor.submit(print)
+
+    async def test_get_group_members(self):
+        url = self.api_client.sam_entry_point + "/api/groups/v1/test-group/member"
+        self.anvil_response_mock.add(responses.GET, url, status=200, json=["foo@example.com"])
+        response = await self.async_client.get_group_members("test-group")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), ["foo@example.com"])
+
+    async def test_list_workspaces_fields(self):
+        url = self.api_client.rawls_entry_point + "/api/workspaces"
+        self.anvil_response_mock.add(
+            responses.GET,
+            url,
+            status=200,
+            json=[],
+            match=[responses.matchers.query_param_matcher({"fields": "workspace.name"})],
+        )
+        response = await self.async_client.list_workspaces(fields="workspace.name")
+        self.assertEqual(response.json(), [])
+
+    async def test_update_workspace_acl(self):
+        url = self.api_client.rawls_entry_point + "/api/workspaces/test-bp/test-ws/acl?inviteUsersNotFound=false"
+        acl_updates = [{"email": "foo@example.com", "accessLevel": "READER", "canShare": False, "canCompute": False}]
+        self.anvil_response_mock.add(
+            responses.PATCH,
+            url,
+            status=200,
+            json={"usersUpdated": acl_updates, "usersNotFound": []},
+            match=[responses.matchers.json_params_matcher(acl_updates)],
+        )
+        response = await self.async_client.update_workspace_acl("test-bp", "test-ws", acl_updates)
+        self.assertEqual(response.json()["usersUpdated"], acl_updates)
+
+    async def test_error_mapping(self):
+        """The same AnVILAPIError subclasses are raised as for the synchronous client."""
+        url = self.api_client.sam_entry_point + "/api/groups/v1/test-group"
+        for status_code, exception_class in (
+            (400, anvil_api.AnVILAPIError400),
+            (403, anvil_api.AnVILAPIError403),
+            (404, anvil_api.AnVILAPIError404),
+            (409, anvil_api.AnVILAPIError409),
+            (500, anvil_api.AnVILAPIError500),
+            (502, anvil_api.AnVILAPIError),
+        ):
+            with self.subTest(status_code=status_code):
+                self.anvil_response_mock.add(responses.POST, url, status=status_code, json={"message": "mock message"})
+                with self.assertRaises(exception_class) as e:
+                    await self.async_client.create_group("test-group")
+                self.assertEqual(e.exception.status_code, status_code)
+                self.assertEqual(str(e.exception), "mock message")
+
+    async def test_gather(self):
+        """Results from concurrent requests are returned in order."""
+        group_names = ["group-{}".format(i) for i in range(20)]
+        for group_name in group_names:
+            self.anvil_response_mock.add(
+                responses.GET,
+                self.api_client.sam_entry_point + "/api/groups/v1/" + group_name,
+                status=200,
+                json=group_name + "@firecloud.org",
+            )
+        results = await asyncio.gather(*[self.async_client.get_group_email(x) for x in group_names])
+        self.assertEqual([x.json() for x in results], [x + "@firecloud.org" for x in group_names])
+
+    async def test_max_concurrency(self):
+        """No more than max_concurrency requests are in progress at the same time."""
+        lock = threading.Lock()
+        in_progress = [0]
+        max_in_progress = [0]
+
+        def callback(request):
+            with lock:
+                in_progress[0] += 1
+                max_in_progress[0] = max(max_in_progress[0], in_progress[0])
+            time.sleep(0.05)
+            with lock:
+                in_progress[0] -= 1
+            return (200, {}, "[]")
+
+        url = self.api_client.sam_entry_point + "/api/groups/v1"
+        self.anvil_response_mock.add_callback(responses.GET, url, callback=callback)
+        async with anvil_api.AsyncAnVILAPIClient(max_concurrency=3) as client:
+            await asyncio.gather(*[client.get_groups() for _ in range(12)])
+        self.assertEqual(len(self.anvil_response_mock.calls), 12)
+        self.assertEqual(max_in_progress[0], 3)
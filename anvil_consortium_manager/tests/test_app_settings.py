@@ -22,6 +22,157 @@ class TestAppSettings(TestCase):
         with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_AUDIT_CACHE is required in settings.py"):
             app_settings.AUDIT_CACHE
 
+    def test_audit_workers(self):
+        self.assertEqual(app_settings.AUDIT_WORKERS, 1)
+
+    @override_settings(ANVIL_AUDIT_WORKERS=8)
+    def test_audit_workers_custom(self):
+        self.assertEqual(app_settings.AUDIT_WORKERS, 8)
+
+    @override_settings(ANVIL_AUDIT_WORKERS=0)
+    def test_audit_workers_zero(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_AUDIT_WORKERS must be a positive integer."):
+            app_settings.AUDIT_WORKERS
+
+    def test_bulk_workers(self):
+        self.assertEqual(app_settings.BULK_WORKERS, 1)
+
+    @override_settings(ANVIL_BULK_WORKERS=8)
+    def test_bulk_workers_custom(self):
+        self.assertEqual(app_settings.BULK_WORKERS, 8)
+
+    @override_settings(ANVIL_BULK_WORKERS=0)
+    def test_bulk_workers_zero(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_BULK_WORKERS must be a positive integer."):
+            app_settings.BULK_WORKERS
+
+    def test_api_pool_sizes(self):
+        self.assertEqual(app_settings.API_POOL_SIZES, {"firecloud": 10, "rawls": 10, "sam": 10})
+
+    @override_settings(ANVIL_API_POOL_SIZES={"rawls": 32})
+    def test_api_pool_sizes_custom(self):
+        self.assertEqual(app_settings.API_POOL_SIZES, {"firecloud": 10, "rawls": 32, "sam": 10})
+
+    @override_settings(ANVIL_API_POOL_SIZES={"foo": 32})
+    def test_api_pool_sizes_unknown_entry_point(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_POOL_SIZES keys must be one of"):
+            app_settings.API_POOL_SIZES
+
+    @override_settings(ANVIL_API_POOL_SIZES={"sam": 0})
+    def test_api_pool_sizes_zero(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_POOL_SIZES values must be positive integers."):
+            app_settings.API_POOL_SIZES
+
+    @override_settings(ANVIL_API_POOL_SIZES=10)
+    def test_api_pool_sizes_not_dict(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_POOL_SIZES must be a dictionary."):
+            app_settings.API_POOL_SIZES
+
+    def test_api_pool_block(self):
+        self.assertFalse(app_settings.API_POOL_BLOCK)
+
+    @override_settings(ANVIL_API_POOL_BLOCK=True)
+    def test_api_pool_block_custom(self):
+        self.assertTrue(app_settings.API_POOL_BLOCK)
+
+    def test_api_timeouts(self):
+        self.assertEqual(app_settings.API_CONNECT_TIMEOUT, 10)
+        self.assertEqual(app_settings.API_READ_TIMEOUT, 120)
+
+    @override_settings(ANVIL_API_CONNECT_TIMEOUT=3.5, ANVIL_API_READ_TIMEOUT=30)
+    def test_api_timeouts_custom(self):
+        self.assertEqual(app_settings.API_CONNECT_TIMEOUT, 3.5)
+        self.assertEqual(app_settings.API_READ_TIMEOUT, 30)
+
+    @override_settings(ANVIL_API_CONNECT_TIMEOUT=0, ANVIL_API_READ_TIMEOUT=-1)
+    def test_api_timeouts_invalid(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_CONNECT_TIMEOUT must be a positive number."):
+            app_settings.API_CONNECT_TIMEOUT
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_READ_TIMEOUT must be a positive number."):
+            app_settings.API_READ_TIMEOUT
+
+    def test_api_retry(self):
+        # Set in test settings.
+        self.assertEqual(app_settings.API_RETRY, {"max_retries": 0})
+
+    @override_settings()
+    def test_api_retry_default(self):
+        from django.conf import settings
+
+        del settings.ANVIL_API_RETRY
+        self.assertEqual(app_settings.API_RETRY, {})
+
+    @override_settings(ANVIL_API_RETRY={"max_retries": 5, "status_codes": [429, 503]})
+    def test_api_retry_custom(self):
+        self.assertEqual(app_settings.API_RETRY, {"max_retries": 5, "status_codes": [429, 503]})
+
+    @override_settings(ANVIL_API_RETRY={"foo": 1})
+    def test_api_retry_unknown_key(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_RETRY has unknown keys: foo."):
+            app_settings.API_RETRY
+
+    @override_settings(ANVIL_API_RETRY=3)
+    def test_api_retry_not_dict(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_RETRY must be a dictionary."):
+            app_settings.API_RETRY
+
+    def test_api_rate_limits(self):
+        self.assertEqual(app_settings.API_RATE_LIMITS, {})
+
+    @override_settings(ANVIL_API_RATE_LIMITS={"sam": {"rate": 5}, "rawls": {"rate": 2, "burst": 4, "cache": "default"}})
+    def test_api_rate_limits_custom(self):
+        self.assertEqual(
+            app_settings.API_RATE_LIMITS, {"sam": {"rate": 5}, "rawls": {"rate": 2, "burst": 4, "cache": "default"}}
+        )
+
+    @override_settings(ANVIL_API_RATE_LIMITS=[])
+    def test_api_rate_limits_not_dict(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_RATE_LIMITS must be a dictionary."):
+            app_settings.API_RATE_LIMITS
+
+    @override_settings(ANVIL_API_RATE_LIMITS={"foo": {"rate": 5}})
+    def test_api_rate_limits_unknown_entry_point(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_RATE_LIMITS keys must be one of"):
+            app_settings.API_RATE_LIMITS
+
+    @override_settings(ANVIL_API_RATE_LIMITS={"sam": {"burst": 5}})
+    def test_api_rate_limits_no_rate(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "must be dictionaries with a rate key"):
+            app_settings.API_RATE_LIMITS
+
+    @override_settings(ANVIL_API_RATE_LIMITS={"sam": {"rate": 5, "foo": 1}})
+    def test_api_rate_limits_unknown_option(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_RATE_LIMITS has unknown keys: foo."):
+            app_settings.API_RATE_LIMITS
+
+    def test_api_response_cache(self):
+        self.assertIsNone(app_settings.API_RESPONSE_CACHE)
+
+    @override_settings(ANVIL_API_RESPONSE_CACHE="foo")
+    def test_api_response_cache_custom(self):
+        self.assertEqual(app_settings.API_RESPONSE_CACHE, "foo")
+
+    def test_api_response_cache_ttls(self):
+        self.assertEqual(
+            app_settings.API_RESPONSE_CACHE_TTLS, {"get_billing_projects": 60, "get_groups": 60, "list_workspaces": 60}
+        )
+
+    @override_settings(ANVIL_API_RESPONSE_CACHE_TTLS={"get_workspace_acl": 10})
+    def test_api_response_cache_ttls_custom(self):
+        self.assertEqual(app_settings.API_RESPONSE_CACHE_TTLS, {"get_workspace_acl": 10})
+
+    @override_settings(ANVIL_API_RESPONSE_CACHE_TTLS={"create_group": 10})
+    def test_api_response_cache_ttls_not_cacheable(self):
+        with self.assertRaisesMessage(
+            ImproperlyConfigured, "ANVIL_API_RESPONSE_CACHE_TTLS has methods that cannot be cached: create_group."
+        ):
+            app_settings.API_RESPONSE_CACHE_TTLS
+
+    @override_settings(ANVIL_API_RESPONSE_CACHE_TTLS=60)
+    def test_api_response_cache_ttls_not_dict(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "ANVIL_API_RESPONSE_CACHE_TTLS must be a dictionary."):
+            app_settings.API_RESPONSE_CACHE_TTLS
+
     @override_settings(
         ANVIL_WORKSPACE_ADAPTERS=[
             "anvil_consortium_manager.adapters.default.DefaultWorkspaceAdapter",
@@ -63,3 +214,50 @@ class TestAppSettings(TestCase):
     @override_settings(ANVIL_ACCOUNT_ADAPTER="anvil_consortium_manager.test_app.adapters.TestAccountAdapter")
     def test_account_adapter_custom(self):
         self.assertEqual(app_settings.ACCOUNT_ADAPTER, "anvil_consortium_manager.test_app.adapters.TestAccountAdapter")
+
+    def test_group_hierarchy_backend(self):
+        self.assertEqual(app_settings.GROUP_HIERARCHY_BACKEND, "closure")
+
+    @override_settings(ANVIL_GROUP_HIERARCHY_BACKEND="cte")
+    def test_group_hierarchy_backend_cte(self):
+        self.assertEqual(app_settings.GROUP_HIERARCHY_BACKEND, "cte")
+
+    @override_settings(ANVIL_GROUP_HIERARCHY_BACKEND="foo")
+    def test_group_hierarchy_backend_invalid(self):
+        with self.assertRaisesMessage(
+            ImproperlyConfigured, 'ANVIL_GROUP_HIERARCHY_BACKEND must be "closure" or "cte".'
+        ):
+            app_settings.GROUP_HIERARCHY_BACKEND
+
+    def test_graph_layout_cache(self):
+        # Set in test settings.
+        self.assertEqual(app_settings.GRAPH_LAYOUT_CACHE, "graph_layout")
+
+    @override_settings()
+    def test_graph_layout_cache_default(self):
+        from django.conf import settings
+
+        del settings.ANVIL_GRAPH_LAYOUT_CACHE
+        self.assertIsNone(app_settings.GRAPH_LAYOUT_CACHE)
+
+    @override_settings(ANVIL_GRAPH_LAYOUT_CACHE=None)
+    def test_graph_layout_cache_none(self):
+        self.assertIsNone(app_settings.GRAPH_LAYOUT_CACHE)
+
+    def test_group_visualization_max_groups(self):
+        self.assertEqual(app_settings.GROUP_VISUALIZATION_MAX_GROUPS, 1000)
+
+    @override_settings(ANVIL_GROUP_VISUALIZATION_MAX_GROUPS=50)
+    def test_group_visualization_max_groups_custom(self):
+        self.assertEqual(app_settings.GROUP_VISUALIZATION_MAX_GROUPS, 50)
+
+    @override_settings(ANVIL_GROUP_VISUALIZATION_MAX_GROUPS=None)
+    def test_group_visualization_max_groups_none(self):
+        self.assertIsNone(app_settings.GROUP_VISUALIZATION_MAX_GROUPS)
+
+    @override_settings(ANVIL_GROUP_VISUALIZATION_MAX_GROUPS=0)
+    def test_group_visualization_max_groups_zero(self):
+        with self.assertRaisesMessage(
+            ImproperlyConfigured, "ANVIL_GROUP_VISUALIZATION_MAX_GROUPS must be a positive integer or None."
+        ):
+            app_settings.GROUP_VISUALIZATION_MAX_GROUPS
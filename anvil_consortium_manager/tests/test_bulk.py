@@ -0,0 +1,48 @@
+"""Tests for the `bulk` module."""
+
+import json
+
+from django.test import TestCase, override_settings
+from requests import Response
+
+from .. import bulk
+from ..anvil_api import AnVILAPIError
+
+
+class CallConcurrentlyTest(TestCase):
+    """Tests for the call_concurrently function."""
+
+    def fail_on_odd(self, item):
+        if item % 2:
+            response = Response()
+            response.status_code = 500
+            response._content = json.dumps({"message": "error for {}".format(item)}).encode()
+            raise AnVILAPIError(response)
+
+    def test_no_instances(self):
+        self.assertEqual(bulk.call_concurrently(self.fail_on_odd, []), [])
+
+    def test_records_errors(self):
+        results = bulk.call_concurrently(self.fail_on_odd, [0, 1, 2, 3])
+        self.assertEqual([result.instance for result in results], [0, 1, 2, 3])
+        self.assertEqual([result.succeeded for result in results], [True, False, True, False])
+        self.assertIsNone(results[0].error)
+        self.assertEqual(str(results[1].error), "error for 1")
+
+    def test_workers(self):
+        """Results are in the same order as the instances when using multiple threads."""
+        results = bulk.call_concurrently(self.fail_on_odd, range(10), workers=4)
+        self.assertEqual([result.instance for result in results], list(range(10)))
+        self.assertEqual([result.succeeded for result in results], [True, False] * 5)
+
+    @override_settings(ANVIL_BULK_WORKERS=4)
+    def test_workers_from_setting(self):
+        results = bulk.call_concurrently(self.fail_on_odd, range(10))
+        self.assertEqual([result.succeeded for result in results], [True, False] * 5)
+
+    def test_other_exceptions_are_raised(self):
+        def func(item):
+            raise ValueError("not an API error")
+
+        with self.assertRaises(ValueError):
+            bulk.call_concurrently(func, [1, 2], workers=2)
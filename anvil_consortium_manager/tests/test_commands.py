@@ -1,11 +1,19 @@
 """Tests for management commands in `anvil_consortium_manager`."""
 
+import tempfile
 from io import StringIO
 from unittest import skipUnless
 
+import responses
 from django.conf import settings
+from django.core.cache import caches
 from django.core.management import CommandError, call_command
-from django.test import TransactionTestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .. import graph_layout
+from ..models import GroupAccountMembership, ManagedGroup, ManagedGroupClosure
+from . import factories
+from .utils import AnVILAPIMockTestMixin
 
 
 class ConvertMariaDbUUIDFieldsTest(TransactionTestCase):
@@ -35,3 +43,261 @@ class ConvertMariaDbUUIDFieldsTest(TransactionTestCase):
             # Calling with models=["foo"] does not throw an exception.
             call_command("convert_mariadb_uuid_fields", "--models=foo", stdout=out)
         self.assertIn("invalid choice", str(e.exception))
+
+
+class RebuildManagedGroupClosureTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent = factories.ManagedGroupFactory.create()
+        self.child = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=self.parent, child_group=self.child)
+
+    def test_rebuild(self):
+        ManagedGroupClosure.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_managed_group_closure", stdout=out)
+        self.assertIn("done (1 records)", out.getvalue())
+        closure = ManagedGroupClosure.objects.get()
+        self.assertEqual(closure.ancestor, self.parent)
+        self.assertEqual(closure.descendant, self.child)
+        self.assertEqual(closure.depth, 1)
+
+    def test_verify_ok(self):
+        out = StringIO()
+        call_command("rebuild_managed_group_closure", "--verify", stdout=out)
+        self.assertIn("ok!", out.getvalue())
+
+    def test_verify_problems(self):
+        ManagedGroupClosure.objects.all().delete()
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("rebuild_managed_group_closure", "--verify", stdout=out)
+        self.assertIn("problems found", out.getvalue())
+        self.assertIn("Missing records: 1", out.getvalue())
+        # The closure was not rebuilt.
+        self.assertEqual(ManagedGroupClosure.objects.count(), 0)
+
+    def test_verify_cycle(self):
+        factories.GroupGroupMembershipFactory.create(parent_group=self.child, child_group=self.parent)
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "cycles"):
+            call_command("rebuild_managed_group_closure", "--verify", stdout=out)
+        self.assertIn("problems found", out.getvalue())
+        self.assertIn(
+            "Groups that are members of themselves: {}".format(", ".join(sorted([self.parent.name, self.child.name]))),
+            out.getvalue(),
+        )
+
+
+class DeactivateAccountsTest(AnVILAPIMockTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.account = factories.AccountFactory.create()
+        self.membership = factories.GroupAccountMembershipFactory.create(account=self.account)
+
+    def add_remove_response(self, status=204):
+        url = (
+            self.api_client.sam_entry_point
+            + "/api/groups/v1/"
+            + self.membership.group.name
+            + "/member/"
+            + self.account.email
+        )
+        kwargs = {} if status == 204 else {"json": {"message": "api error"}}
+        self.anvil_response_mock.add(responses.DELETE, url, status=status, **kwargs)
+
+    def test_deactivate(self):
+        self.add_remove_response()
+        out = StringIO()
+        call_command("deactivate_accounts", self.account.email, stdout=out)
+        self.assertIn("Deactivated: 1", out.getvalue())
+        self.assertIn("Group memberships removed: 1", out.getvalue())
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.status, self.account.INACTIVE_STATUS)
+        self.assertEqual(GroupAccountMembership.objects.count(), 0)
+
+    def test_file(self):
+        self.add_remove_response()
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+            f.write("\n{}\n".format(self.account.email.upper()))
+            f.flush()
+            call_command("deactivate_accounts", "--file", f.name, "--workers", "2", stdout=StringIO())
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.status, self.account.INACTIVE_STATUS)
+
+    def test_api_error(self):
+        self.add_remove_response(status=500)
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "still active"):
+            call_command("deactivate_accounts", self.account.email, stdout=out)
+        self.assertIn("Not deactivated: 1", out.getvalue())
+        self.assertIn("api error", out.getvalue())
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.status, self.account.ACTIVE_STATUS)
+        self.assertEqual(GroupAccountMembership.objects.count(), 1)
+
+    def test_unknown_email(self):
+        with self.assertRaisesMessage(CommandError, "foo@example.com"):
+            call_command("deactivate_accounts", self.account.email, "foo@example.com", stdout=StringIO())
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.status, self.account.ACTIVE_STATUS)
+
+    def test_no_emails(self):
+        with self.assertRaises(CommandError):
+            call_command("deactivate_accounts", stdout=StringIO())
+
+    def test_invalid_workers(self):
+        with self.assertRaisesMessage(CommandError, "--workers must be a positive integer."):
+            call_command("deactivate_accounts", self.account.email, "--workers", "0", stdout=StringIO())
+
+
+class UpdateGroupAccountMembershipsTest(AnVILAPIMockTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.groups = factories.ManagedGroupFactory.create_batch(2)
+        self.accounts = factories.AccountFactory.create_batch(2)
+
+    def add_response(self, method, group, account, role="member", status=204):
+        url = self.api_client.sam_entry_point + "/api/groups/v1/" + group.name + "/" + role + "/" + account.email
+        kwargs = {} if status == 204 else {"json": {"message": "api error"}}
+        self.anvil_response_mock.add(method, url, status=status, **kwargs)
+
+    def test_add(self):
+        for group in self.groups:
+            for account in self.accounts:
+                self.add_response(responses.PUT, group, account)
+        out = StringIO()
+        call_command(
+            "update_group_account_memberships",
+            *[account.email for account in self.accounts],
+            "--groups",
+            *[group.name for group in self.groups],
+            "--workers",
+            "2",
+            stdout=out,
+        )
+        self.assertIn("Added: 4", out.getvalue())
+        self.assertEqual(GroupAccountMembership.objects.count(), 4)
+
+    def test_add_admin_from_file(self):
+        self.add_response(responses.PUT, self.groups[0], self.accounts[0], role="admin")
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+            f.write("{}\n\n".format(self.accounts[0].email))
+            f.flush()
+            call_command(
+                "update_group_account_memberships",
+                "--file",
+                f.name,
+                "--groups",
+                self.groups[0].name,
+                "--role",
+                "ADMIN",
+                stdout=StringIO(),
+            )
+        membership = GroupAccountMembership.objects.get()
+        self.assertEqual(membership.role, GroupAccountMembership.RoleChoices.ADMIN)
+
+    def test_add_api_error(self):
+        self.add_response(responses.PUT, self.groups[0], self.accounts[0])
+        self.add_response(responses.PUT, self.groups[0], self.accounts[1], status=500)
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "could not be changed on AnVIL"):
+            call_command(
+                "update_group_account_memberships",
+                *[account.email for account in self.accounts],
+                "--groups",
+                self.groups[0].name,
+                stdout=out,
+            )
+        self.assertIn("Failed: 1", out.getvalue())
+        self.assertEqual(GroupAccountMembership.objects.get().account, self.accounts[0])
+
+    def test_add_invalid(self):
+        """No API calls are made if any membership is invalid."""
+        factories.GroupAccountMembershipFactory.create(group=self.groups[0], account=self.accounts[0])
+        with self.assertRaisesMessage(CommandError, "already a member"):
+            call_command(
+                "update_group_account_memberships",
+                self.accounts[0].email,
+                "--groups",
+                self.groups[0].name,
+                stdout=StringIO(),
+            )
+
+    def test_remove(self):
+        for account in self.accounts:
+            factories.GroupAccountMembershipFactory.create(group=self.groups[0], account=account)
+            self.add_response(responses.DELETE, self.groups[0], account)
+        out = StringIO()
+        call_command(
+            "update_group_account_memberships",
+            *[account.email for account in self.accounts],
+            "--groups",
+            self.groups[0].name,
+            "--remove",
+            stdout=out,
+        )
+        self.assertIn("Removed: 2", out.getvalue())
+        self.assertEqual(GroupAccountMembership.objects.count(), 0)
+
+    def test_remove_not_a_member(self):
+        with self.assertRaisesMessage(CommandError, "is not a member of"):
+            call_command(
+                "update_group_account_memberships",
+                self.accounts[0].email,
+                "--groups",
+                self.groups[0].name,
+                "--remove",
+                stdout=StringIO(),
+            )
+
+    def test_unknown_group(self):
+        with self.assertRaisesMessage(CommandError, "No ManagedGroup found with name: foo"):
+            call_command(
+                "update_group_account_memberships", self.accounts[0].email, "--groups", "foo", stdout=StringIO()
+            )
+
+    def test_unknown_email(self):
+        with self.assertRaisesMessage(CommandError, "foo@example.com"):
+            call_command(
+                "update_group_account_memberships",
+                "foo@example.com",
+                "--groups",
+                self.groups[0].name,
+                stdout=StringIO(),
+            )
+
+
+class WarmManagedGroupGraphLayoutsTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        caches["graph_layout"].clear()
+        self.parent = factories.ManagedGroupFactory.create()
+        self.child = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=self.parent, child_group=self.child)
+
+    def get_cache_key(self, G):
+        return "{}:{}".format(graph_layout.CACHE_KEY_PREFIX, graph_layout.get_graph_fingerprint(G))
+
+    def test_full_graph(self):
+        factories.ManagedGroupFactory.create()
+        out = StringIO()
+        call_command("warm_managed_group_graph_layouts", stdout=out)
+        self.assertIn("done.", out.getvalue())
+        self.assertIsNotNone(caches["graph_layout"].get(self.get_cache_key(ManagedGroup.get_full_graph())))
+        # Layouts for individual groups are not cached.
+        self.assertIsNone(caches["graph_layout"].get(self.get_cache_key(self.parent.get_graph())))
+
+    def test_include_groups(self):
+        other_group = factories.ManagedGroupFactory.create()
+        out = StringIO()
+        call_command("warm_managed_group_graph_layouts", "--include-groups", stdout=out)
+        self.assertIn("done (3 groups).", out.getvalue())
+        self.assertIsNotNone(caches["graph_layout"].get(self.get_cache_key(ManagedGroup.get_full_graph())))
+        self.assertIsNotNone(caches["graph_layout"].get(self.get_cache_key(self.parent.get_graph())))
+        self.assertIsNotNone(caches["graph_layout"].get(self.get_cache_key(other_group.get_graph())))
+
+    @override_settings(ANVIL_GRAPH_LAYOUT_CACHE=None)
+    def test_no_cache(self):
+        with self.assertRaises(CommandError):
+            call_command("warm_managed_group_graph_layouts", stdout=StringIO())
@@ -1,6 +1,7 @@
 """Test forms for the anvil_consortium_manager app."""
 
 from django.core.exceptions import NON_FIELD_ERRORS
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 
 from .. import forms, models
@@ -175,6 +176,55 @@ class AccountUpdateFormTest(TestCase):
         self.assertTrue(form.is_valid())
 
 
+class AccountBulkDeactivateFormTest(TestCase):
+    """Tests for the AccountBulkDeactivateForm class."""
+
+    form_class = forms.AccountBulkDeactivateForm
+
+    def test_valid_one_email(self):
+        """Form is valid with one existing email."""
+        account = factories.AccountFactory.create()
+        form = self.form_class(data={"emails": account.email})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["emails"], [account])
+
+    def test_valid_two_emails(self):
+        """Form is valid with two emails, and keeps the order in which they were entered."""
+        account_1 = factories.AccountFactory.create()
+        account_2 = factories.AccountFactory.create()
+        form = self.form_class(data={"emails": "{}\n{}".format(account_2.email, account_1.email)})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["emails"], [account_2, account_1])
+
+    def test_valid_blank_lines_duplicates_and_case(self):
+        """Blank lines and duplicate emails are ignored, and emails are case-insensitive."""
+        account = factories.AccountFactory.create()
+        form = self.form_class(data={"emails": "\n  {}  \n\n{}\n".format(account.email, account.email.upper())})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["emails"], [account])
+
+    def test_invalid_missing_emails(self):
+        """Form is invalid when emails is not entered."""
+        form = self.form_class(data={})
+        self.assertFalse(form.is_valid())
+        self.assertIn("emails", form.errors)
+
+    def test_invalid_only_blank_lines(self):
+        """Form is invalid when emails only has blank lines."""
+        form = self.form_class(data={"emails": "\n  \n"})
+        self.assertFalse(form.is_valid())
+        self.assertIn("emails", form.errors)
+
+    def test_invalid_account_does_not_exist(self):
+        """Form is invalid when an email does not match an Account, and lists the missing emails."""
+        account = factories.AccountFactory.create()
+        form = self.form_class(data={"emails": "{}\nfoo@example.com".format(account.email)})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.errors["emails"]), 1)
+        self.assertIn("foo@example.com", form.errors["emails"][0])
+        self.assertNotIn(account.email, form.errors["emails"][0])
+
+
 class UserEmailEntryFormTest(TestCase):
     """Tests for the UserEmailEntryForm class."""
 
@@ -290,6 +340,43 @@ class ManagedGroupCreateFormTest(TestCase):
         self.assertIn("already exists", form.errors["name"][0])
 
 
+class ManagedGroupVisualizationFormTest(TestCase):
+    """Tests for the ManagedGroupVisualizationForm class."""
+
+    form_class = forms.ManagedGroupVisualizationForm
+
+    def setUp(self):
+        super().setUp()
+        self.group = factories.ManagedGroupFactory.create()
+
+    def test_valid(self):
+        """Form is valid with a group and no depth."""
+        form = self.form_class(data={"group": self.group.pk})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["group"], self.group)
+        self.assertIsNone(form.cleaned_data["depth"])
+
+    def test_valid_depth(self):
+        """Form is valid with a group and a depth."""
+        form = self.form_class(data={"group": self.group.pk, "depth": 2})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["depth"], 2)
+
+    def test_invalid_missing_group(self):
+        """Form is invalid when missing group."""
+        form = self.form_class(data={"depth": 2})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.errors), 1)
+        self.assertIn("group", form.errors)
+
+    def test_invalid_depth(self):
+        """Form is invalid when depth is less than one."""
+        form = self.form_class(data={"group": self.group.pk, "depth": 0})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.errors), 1)
+        self.assertIn("depth", form.errors)
+
+
 class ManagedGroupUpdateFormTest(TestCase):
     """Tests for the ManagedGroupUpdateForm class."""
 
@@ -944,6 +1031,113 @@ class GroupAccountMembershipFormTest(TestCase):
         self.assertNotIn(inactive_account, form.fields["account"].queryset)
 
 
+class GroupAccountMembershipBulkFormTest(TestCase):
+    """Tests for the GroupAccountMembershipBulkForm class."""
+
+    form_class = forms.GroupAccountMembershipBulkForm
+
+    def setUp(self):
+        super().setUp()
+        self.groups = factories.ManagedGroupFactory.create_batch(2)
+        self.accounts = factories.AccountFactory.create_batch(3)
+
+    def get_form_data(self, **kwargs):
+        data = {
+            "action": self.form_class.ADD,
+            "groups": [group.pk for group in self.groups],
+            "role": models.GroupAccountMembership.RoleChoices.MEMBER,
+            "emails": "\n".join(account.email for account in self.accounts),
+        }
+        data.update(kwargs)
+        return data
+
+    def test_valid_add(self):
+        """Form is valid and builds one new membership for each account and group."""
+        form = self.form_class(data=self.get_form_data())
+        self.assertTrue(form.is_valid())
+        memberships = form.cleaned_data["memberships"]
+        self.assertEqual(len(memberships), 6)
+        self.assertTrue(all(membership.pk is None for membership in memberships))
+        self.assertEqual(
+            set((membership.account, membership.group) for membership in memberships),
+            set((account, group) for account in self.accounts for group in self.groups),
+        )
+
+    def test_valid_add_admin(self):
+        form = self.form_class(data=self.get_form_data(role=models.GroupAccountMembership.RoleChoices.ADMIN))
+        self.assertTrue(form.is_valid())
+        for membership in form.cleaned_data["memberships"]:
+            self.assertEqual(membership.role, models.GroupAccountMembership.RoleChoices.ADMIN)
+
+    def test_valid_csv_file(self):
+        """Emails can be read from the "email" column of a CSV file."""
+        content = "name,email\nfoo,{}\nbar,{}\n".format(self.accounts[0].email, self.accounts[1].email)
+        csv_file = SimpleUploadedFile("accounts.csv", content.encode())
+        form = self.form_class(data=self.get_form_data(emails=""), files={"csv_file": csv_file})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(len(form.cleaned_data["memberships"]), 4)
+
+    def test_invalid_csv_file_without_email_column(self):
+        csv_file = SimpleUploadedFile("accounts.csv", b"name\nfoo\n")
+        form = self.form_class(data=self.get_form_data(emails=""), files={"csv_file": csv_file})
+        self.assertFalse(form.is_valid())
+        self.assertIn("csv_file", form.errors)
+
+    def test_invalid_no_emails(self):
+        form = self.form_class(data=self.get_form_data(emails=""))
+        self.assertFalse(form.is_valid())
+        self.assertIn("emails", form.errors)
+
+    def test_invalid_unknown_email(self):
+        form = self.form_class(data=self.get_form_data(emails="foo@example.com"))
+        self.assertFalse(form.is_valid())
+        self.assertIn("foo@example.com", form.errors["emails"][0])
+
+    def test_invalid_missing_groups(self):
+        form = self.form_class(data=self.get_form_data(groups=[]))
+        self.assertFalse(form.is_valid())
+        self.assertIn("groups", form.errors)
+
+    def test_invalid_group_not_managed_by_app(self):
+        group = factories.ManagedGroupFactory.create(is_managed_by_app=False)
+        form = self.form_class(data=self.get_form_data(groups=[group.pk]))
+        self.assertFalse(form.is_valid())
+        self.assertIn("groups", form.errors)
+
+    def test_invalid_add_already_exists(self):
+        """Form is invalid when adding an account to a group that it is already in."""
+        factories.GroupAccountMembershipFactory.create(account=self.accounts[0], group=self.groups[0])
+        form = self.form_class(data=self.get_form_data())
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.non_field_errors()), 1)
+        self.assertIn("already a member", form.non_field_errors()[0])
+
+    def test_invalid_add_inactive_account(self):
+        self.accounts[0].status = models.Account.INACTIVE_STATUS
+        self.accounts[0].save()
+        form = self.form_class(data=self.get_form_data())
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.non_field_errors()), 2)
+
+    def test_valid_remove(self):
+        """Form is valid and returns the existing memberships when removing accounts."""
+        existing = [
+            factories.GroupAccountMembershipFactory.create(account=account, group=group)
+            for group in self.groups
+            for account in self.accounts
+        ]
+        form = self.form_class(data=self.get_form_data(action=self.form_class.REMOVE))
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["memberships"], existing)
+
+    def test_invalid_remove_not_a_member(self):
+        factories.GroupAccountMembershipFactory.create(account=self.accounts[0], group=self.groups[0])
+        form = self.form_class(data=self.get_form_data(action=self.form_class.REMOVE, emails=self.accounts[0].email))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.non_field_errors()), 1)
+        self.assertIn("is not a member of", form.non_field_errors()[0])
+
+
 class WorkspaceGroupSharingFormTest(TestCase):
     """Tests for the WorkspaceGroupSharingForm class."""
 
@@ -0,0 +1,192 @@
+"""Tests for the `graph_layout` module."""
+
+from unittest.mock import patch
+
+import networkx as nx
+from django.core.cache import caches
+from django.test import override_settings
+
+from .. import graph_layout
+from . import factories
+from .utils import TestCase
+
+
+class GetGraphFingerprintTest(TestCase):
+    def test_same_graph(self):
+        G1 = nx.DiGraph([("a", "b"), ("b", "c")])
+        G2 = nx.DiGraph([("b", "c"), ("a", "b")])
+        self.assertEqual(graph_layout.get_graph_fingerprint(G1), graph_layout.get_graph_fingerprint(G2))
+
+    def test_different_edges(self):
+        G1 = nx.DiGraph([("a", "b"), ("b", "c")])
+        G2 = nx.DiGraph([("a", "b"), ("a", "c")])
+        self.assertNotEqual(graph_layout.get_graph_fingerprint(G1), graph_layout.get_graph_fingerprint(G2))
+
+    def test_different_nodes(self):
+        G1 = nx.DiGraph([("a", "b")])
+        G2 = nx.DiGraph([("a", "b")])
+        G2.add_node("c")
+        self.assertNotEqual(graph_layout.get_graph_fingerprint(G1), graph_layout.get_graph_fingerprint(G2))
+
+    def test_edge_direction(self):
+        G1 = nx.DiGraph([("a", "b")])
+        G2 = nx.DiGraph([("b", "a")])
+        self.assertNotEqual(graph_layout.get_graph_fingerprint(G1), graph_layout.get_graph_fingerprint(G2))
+
+    def test_node_names_are_separated(self):
+        G1 = nx.DiGraph()
+        G1.add_nodes_from(["ab", "c"])
+        G2 = nx.DiGraph()
+        G2.add_nodes_from(["a", "bc"])
+        self.assertNotEqual(graph_layout.get_graph_fingerprint(G1), graph_layout.get_graph_fingerprint(G2))
+
+
+class GetLayoutTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        caches["graph_layout"].clear()
+
+    def test_layout(self):
+        G = nx.DiGraph([("a", "b"), ("b", "c")])
+        layout = graph_layout.get_layout(G)
+        self.assertEqual(set(layout), {"a", "b", "c"})
+        for x, y in layout.values():
+            self.assertIsInstance(x, float)
+            self.assertIsInstance(y, float)
+
+    def test_empty_graph(self):
+        self.assertEqual(graph_layout.get_layout(nx.DiGraph()), {})
+
+    def test_cached(self):
+        G = nx.DiGraph([("a", "b"), ("b", "c")])
+        layout = graph_layout.get_layout(G)
+        with patch.object(graph_layout, "compute_layout") as compute_layout:
+            self.assertEqual(graph_layout.get_layout(nx.DiGraph([("b", "c"), ("a", "b")])), layout)
+        compute_layout.assert_not_called()
+
+    def test_recomputed_when_graph_changes(self):
+        graph_layout.get_layout(nx.DiGraph([("a", "b")]))
+        with patch.object(graph_layout, "compute_layout", return_value={}) as compute_layout:
+            graph_layout.get_layout(nx.DiGraph([("a", "b"), ("b", "c")]))
+        compute_layout.assert_called_once()
+
+    def test_timeout(self):
+        G = nx.DiGraph([("a", "b")])
+        with patch.object(caches["graph_layout"], "set") as cache_set:
+            graph_layout.get_layout(G)
+        cache_set.assert_called_once()
+        self.assertEqual(cache_set.call_args.kwargs["timeout"], graph_layout.CACHE_TIMEOUT)
+
+    @override_settings(ANVIL_GRAPH_LAYOUT_CACHE=None)
+    def test_no_cache(self):
+        G = nx.DiGraph([("a", "b")])
+        graph_layout.get_layout(G)
+        with patch.object(graph_layout, "compute_layout", return_value={}) as compute_layout:
+            graph_layout.get_layout(G)
+        compute_layout.assert_called_once()
+
+
+class GetAffectedNodesTest(TestCase):
+    def test_no_changes(self):
+        G = nx.DiGraph([("a", "b"), ("b", "c")])
+        self.assertEqual(graph_layout.get_affected_nodes(G, [("a", "b"), ("b", "c")]), set())
+
+    def test_added_edge(self):
+        G = nx.DiGraph([("a", "b"), ("b", "c"), ("c", "d"), ("x", "y")])
+        affected = graph_layout.get_affected_nodes(G, [("a", "b"), ("b", "c"), ("x", "y")])
+        self.assertEqual(affected, {"b", "c", "d"})
+
+    def test_removed_edge(self):
+        G = nx.DiGraph([("a", "b"), ("x", "y")])
+        G.add_node("c")
+        affected = graph_layout.get_affected_nodes(G, [("a", "b"), ("b", "c"), ("x", "y")])
+        self.assertEqual(affected, {"a", "b", "c"})
+
+    def test_removed_node(self):
+        G = nx.DiGraph([("a", "b")])
+        affected = graph_layout.get_affected_nodes(G, [["a", "b"], ["b", "c"]])
+        self.assertEqual(affected, {"a", "b"})
+
+
+class ComputeIncrementalLayoutTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.previous_edges = [("root", "a"), ("root", "b"), ("a", "a1"), ("b", "b1"), ("x", "y")]
+        G = nx.DiGraph(self.previous_edges)
+        self.previous_layout = graph_layout.compute_layout(G)
+
+    def test_unaffected_nodes_are_fixed(self):
+        G = nx.DiGraph(self.previous_edges + [("b1", "new")])
+        layout = graph_layout.compute_incremental_layout(G, self.previous_layout, self.previous_edges, seed=1)
+        self.assertEqual(set(layout), set(G.nodes))
+        for node in ("root", "a", "a1", "x", "y"):
+            self.assertEqual(layout[node], self.previous_layout[node])
+        for x, y in layout.values():
+            self.assertIsInstance(x, float)
+            self.assertIsInstance(y, float)
+
+    def test_removed_node(self):
+        edges = [edge for edge in self.previous_edges if edge != ("x", "y")]
+        G = nx.DiGraph(edges)
+        G.add_node("x")
+        layout = graph_layout.compute_incremental_layout(G, self.previous_layout, self.previous_edges, seed=1)
+        self.assertEqual(set(layout), set(G.nodes))
+        for node in ("root", "a", "b", "a1", "b1"):
+            self.assertEqual(layout[node], self.previous_layout[node])
+
+    def test_new_nodes_with_same_neighbor_do_not_overlap(self):
+        G = nx.DiGraph(self.previous_edges + [("b1", "new1"), ("b1", "new2")])
+        layout = graph_layout.compute_incremental_layout(G, self.previous_layout, self.previous_edges, seed=1)
+        self.assertNotEqual(layout["new1"], layout["new2"])
+
+    def test_no_nodes_in_previous_layout(self):
+        G = nx.DiGraph([("c", "d")])
+        with patch.object(graph_layout, "compute_layout", return_value={}) as compute_layout:
+            graph_layout.compute_incremental_layout(G, self.previous_layout, self.previous_edges)
+        compute_layout.assert_called_once_with(G)
+
+
+class GetLayoutWithNameTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        caches["graph_layout"].clear()
+
+    def test_uses_previous_layout(self):
+        G1 = nx.DiGraph([("a", "b"), ("x", "y")])
+        layout1 = graph_layout.get_layout(G1, name="test")
+        G2 = nx.DiGraph([("a", "b"), ("x", "y"), ("b", "c")])
+        with patch.object(graph_layout, "compute_layout") as compute_layout:
+            layout2 = graph_layout.get_layout(G2, name="test")
+        compute_layout.assert_not_called()
+        self.assertEqual(layout2["x"], layout1["x"])
+        self.assertEqual(layout2["y"], layout1["y"])
+        # The new layout is cached and becomes the previous layout.
+        self.assertEqual(graph_layout.get_layout(G2), layout2)
+        self.assertEqual(caches["graph_layout"].get("anvil_graph_layout:last:test")["layout"], layout2)
+
+    def test_replaced_layout_is_deleted(self):
+        G1 = nx.DiGraph([("a", "b")])
+        G2 = nx.DiGraph([("a", "b"), ("b", "c")])
+        graph_layout.get_layout(G1, name="test")
+        key1 = "anvil_graph_layout:" + graph_layout.get_graph_fingerprint(G1)
+        self.assertIsNotNone(caches["graph_layout"].get(key1))
+        graph_layout.get_layout(G2, name="test")
+        self.assertIsNone(caches["graph_layout"].get(key1))
+        self.assertIsNotNone(caches["graph_layout"].get("anvil_graph_layout:" + graph_layout.get_graph_fingerprint(G2)))
+
+    def test_different_names(self):
+        graph_layout.get_layout(nx.DiGraph([("a", "b")]), name="test")
+        with patch.object(graph_layout, "compute_layout", return_value={}) as compute_layout:
+            graph_layout.get_layout(nx.DiGraph([("a", "b"), ("b", "c")]), name="other")
+        compute_layout.assert_called_once()
+
+    def test_without_name(self):
+        graph_layout.get_layout(nx.DiGraph([("a", "b")]))
+        with patch.object(graph_layout, "compute_layout", return_value={}) as compute_layout:
+            graph_layout.get_layout(nx.DiGraph([("a", "b"), ("b", "c")]))
+        compute_layout.assert_called_once()
+
+    def test_get_group_layout_name(self):
+        group = factories.ManagedGroupFactory.create()
+        self.assertEqual(graph_layout.get_group_layout_name(group), "group-{}".format(group.pk))
+        self.assertEqual(graph_layout.get_group_layout_name(group, depth=2), "group-{}-depth-2".format(group.pk))
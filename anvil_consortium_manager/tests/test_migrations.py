@@ -24,3 +24,30 @@ class PopulateManagedGroupEmailTest(MigratorTestCase):
             ManagedGroup.objects.get(name="AnotherGroup").email,
             "anothergroup@firecloud.org",
         )
+
+
+class PopulateManagedGroupClosureTest(MigratorTestCase):
+    """Tests for the populate_managed_group_closure migration."""
+
+    migrate_from = ("anvil_consortium_manager", "0021_managedgroupclosure")
+    migrate_to = ("anvil_consortium_manager", "0022_populate_managed_group_closure")
+
+    def prepare(self):
+        """Prepare some data before the migration."""
+        ManagedGroup = self.old_state.apps.get_model("anvil_consortium_manager", "ManagedGroup")
+        GroupGroupMembership = self.old_state.apps.get_model("anvil_consortium_manager", "GroupGroupMembership")
+        grandparent = ManagedGroup.objects.create(name="grandparent", email="grandparent@firecloud.org")
+        parent = ManagedGroup.objects.create(name="parent", email="parent@firecloud.org")
+        child = ManagedGroup.objects.create(name="child", email="child@firecloud.org")
+        ManagedGroup.objects.create(name="other", email="other@firecloud.org")
+        GroupGroupMembership.objects.create(parent_group=grandparent, child_group=parent)
+        GroupGroupMembership.objects.create(parent_group=parent, child_group=child)
+        GroupGroupMembership.objects.create(parent_group=grandparent, child_group=child)
+
+    def test_migration_0022(self):
+        """Run the test."""
+        ManagedGroupClosure = self.new_state.apps.get_model("anvil_consortium_manager", "ManagedGroupClosure")
+        self.assertEqual(
+            set(ManagedGroupClosure.objects.values_list("ancestor__name", "descendant__name", "depth")),
+            {("grandparent", "parent", 1), ("parent", "child", 1), ("grandparent", "child", 1)},
+        )
@@ -1,4 +1,5 @@
 import datetime
+import random
 import time
 from unittest import skip
 from unittest.mock import patch
@@ -7,8 +8,10 @@ import networkx as nx
 from django.contrib.auth import get_user_model
 from django.core import mail
 from django.core.exceptions import NON_FIELD_ERRORS, ObjectDoesNotExist, ValidationError
+from django.db.models import F
 from django.db.models.deletion import ProtectedError
 from django.db.utils import IntegrityError
+from django.test import override_settings
 from django.utils import timezone
 from freezegun import freeze_time
 
@@ -22,6 +25,7 @@ from ..models import (
     GroupAccountMembership,
     GroupGroupMembership,
     ManagedGroup,
+    ManagedGroupClosure,
     UserEmailEntry,
     Workspace,
     WorkspaceAuthorizationDomain,
@@ -96,6 +100,16 @@ class BillingProjectTest(TestCase):
             instance.save()
 
 
+class BillingProjectQuerySetTest(TestCase):
+    def test_annotate_workspace_counts(self):
+        billing_project = factories.BillingProjectFactory.create()
+        other_billing_project = factories.BillingProjectFactory.create()
+        factories.WorkspaceFactory.create_batch(2, billing_project=billing_project)
+        billing_projects = BillingProject.objects.annotate_workspace_counts()
+        self.assertEqual(billing_projects.get(pk=billing_project.pk).n_workspaces, 2)
+        self.assertEqual(billing_projects.get(pk=other_billing_project.pk).n_workspaces, 0)
+
+
 class UserEmailEntryTest(TestCase):
     """Tests for the UserEmailEntry model."""
 
@@ -482,6 +496,17 @@ class AccountTest(TestCase):
         self.assertEqual(len(groups), 1)
         self.assertIn(parent, groups)
 
+    def test_get_all_groups_num_queries(self):
+        """Only one query is needed, regardless of the depth of the hierarchy."""
+        account = factories.AccountFactory.create()
+        groups = factories.ManagedGroupFactory.create_batch(5)
+        for parent, child in zip(groups[:-1], groups[1:]):
+            factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        factories.GroupAccountMembershipFactory.create(group=groups[-1], account=account)
+        with self.assertNumQueries(1):
+            all_groups = account.get_all_groups()
+        self.assertEqual(all_groups, set(groups))
+
     def test_unlink_user(self):
         """The unlink_user method removes the user and verified_email_entry."""
         account = factories.AccountFactory.create(verified=True)
@@ -1057,6 +1082,20 @@ class ManagedGroupTest(TestCase):
         self.assertIsInstance(group.get_anvil_url(), str)
 
 
+class ManagedGroupQuerySetTest(TestCase):
+    def test_annotate_membership_counts(self):
+        parent = factories.ManagedGroupFactory.create()
+        child = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent)
+        factories.GroupAccountMembershipFactory.create_batch(3, group=parent)
+        groups = ManagedGroup.objects.annotate_membership_counts()
+        self.assertEqual(groups.get(pk=parent.pk).n_groups, 2)
+        self.assertEqual(groups.get(pk=parent.pk).n_accounts, 3)
+        self.assertEqual(groups.get(pk=child.pk).n_groups, 0)
+        self.assertEqual(groups.get(pk=child.pk).n_accounts, 0)
+
+
 class ManagedGroupGraphTest(TestCase):
     def test_get_full_graph(self):
         groups = factories.ManagedGroupFactory.create_batch(5)
@@ -1082,6 +1121,31 @@ class ManagedGroupGraphTest(TestCase):
         self.assertIn((grandparent_group.name, parent_group_2.name), G.edges)
         self.assertIn((parent_group_1.name, child_group_1.name), G.edges)
 
+    def test_get_full_graph_node_attributes(self):
+        parent = factories.ManagedGroupFactory.create()
+        child = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        factories.GroupAccountMembershipFactory.create_batch(2, group=parent)
+        factories.GroupAccountMembershipFactory.create(group=child)
+        G = ManagedGroup.get_full_graph()
+        self.assertEqual(G.nodes[parent.name], {"n_groups": 1, "n_accounts": 2})
+        self.assertEqual(G.nodes[child.name], {"n_groups": 0, "n_accounts": 1})
+        self.assertEqual(G.edges[parent.name, child.name], {"role": GroupGroupMembership.RoleChoices.MEMBER})
+
+    def test_get_full_graph_num_queries(self):
+        """The number of queries does not depend on the number of groups."""
+        groups = ManagedGroup.objects.bulk_create(
+            [ManagedGroup(name="group-{}".format(i), email="group-{}@firecloud.org".format(i)) for i in range(5000)]
+        )
+        GroupGroupMembership.objects.bulk_create(
+            [GroupGroupMembership(parent_group=groups[i // 2], child_group=groups[i]) for i in range(1, 5000)]
+        )
+        with self.assertNumQueries(2):
+            G = ManagedGroup.get_full_graph()
+        self.assertEqual(len(G.nodes), 5000)
+        self.assertEqual(len(G.edges), 4999)
+        self.assertEqual(G.nodes["group-1"], {"n_groups": 2, "n_accounts": 0})
+
     def test_get_graph(self):
         groups = factories.ManagedGroupFactory.create_batch(5)
         grandparent_group = groups[0]
@@ -1103,6 +1167,93 @@ class ManagedGroupGraphTest(TestCase):
         self.assertIn((grandparent_group.name, parent_group_1.name), G.edges)
         self.assertIn((parent_group_1.name, child_group_1.name), G.edges)
 
+    def test_get_graph_node_attributes(self):
+        parent = factories.ManagedGroupFactory.create()
+        child = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        factories.GroupAccountMembershipFactory.create_batch(2, group=child)
+        G = child.get_graph()
+        self.assertEqual(G.nodes[parent.name], {"n_groups": 1, "n_accounts": 0})
+        self.assertEqual(G.nodes[child.name], {"n_groups": 0, "n_accounts": 2})
+        self.assertEqual(G.edges[parent.name, child.name], {"role": GroupGroupMembership.RoleChoices.MEMBER})
+
+    def test_get_graph_no_relatives(self):
+        group = factories.ManagedGroupFactory.create()
+        G = group.get_graph()
+        self.assertEqual(list(G.nodes), [group.name])
+        self.assertEqual(G.nodes[group.name], {"n_groups": 0, "n_accounts": 0})
+
+    def test_get_graph_excludes_siblings(self):
+        """Other children of a parent group are not included."""
+        parent = factories.ManagedGroupFactory.create()
+        group = factories.ManagedGroupFactory.create()
+        sibling = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=group)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=sibling)
+        G = group.get_graph()
+        self.assertEqual(set(G.nodes), {parent.name, group.name})
+
+    def create_diamonds(self, n_levels):
+        """Create a chain of diamonds, where each level has two groups that are members of both groups above it.
+
+        There are 2**n_levels paths from the top group to the bottom group.
+        """
+        top = factories.ManagedGroupFactory.create(name="top")
+        above = [top]
+        for level in range(n_levels):
+            below = [factories.ManagedGroupFactory.create(name="level-{}-{}".format(level, i)) for i in range(2)]
+            for parent in above:
+                for child in below:
+                    factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+            above = below
+        bottom = factories.ManagedGroupFactory.create(name="bottom")
+        for parent in above:
+            factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=bottom)
+        return top, bottom
+
+    def test_get_graph_diamonds(self):
+        """Groups reachable through many paths are only expanded once."""
+        n_levels = 20
+        top, bottom = self.create_diamonds(n_levels)
+        # One query per level of children, one to find that the bottom group has no children, one to find that the
+        # top group has no parents, and one for the node attributes.
+        with self.assertNumQueries(n_levels + 4):
+            G = top.get_graph()
+        self.assertEqual(len(G.nodes), 2 * n_levels + 2)
+        self.assertEqual(len(G.edges), 4 * n_levels)
+        with self.assertNumQueries(n_levels + 4):
+            G = bottom.get_graph()
+        self.assertEqual(len(G.nodes), 2 * n_levels + 2)
+
+    def test_get_graph_depth(self):
+        """Only the requested number of levels of parents and children are included."""
+        top, bottom = self.create_diamonds(5)
+        with self.assertNumQueries(4):
+            G = top.get_graph(depth=2)
+        self.assertEqual(set(G.nodes), {"top", "level-0-0", "level-0-1", "level-1-0", "level-1-1"})
+        self.assertEqual(len(G.edges), 6)
+        group = ManagedGroup.objects.get(name="level-2-0")
+        with self.assertNumQueries(3):
+            G = group.get_graph(depth=1)
+        self.assertEqual(set(G.nodes), {"level-1-0", "level-1-1", "level-2-0", "level-3-0", "level-3-1"})
+        self.assertEqual(len(G.edges), 4)
+        # Node attributes are counts of all members, not just those in the graph.
+        self.assertEqual(G.nodes["level-3-0"], {"n_groups": 2, "n_accounts": 0})
+
+    def test_get_graph_wide_fan_out(self):
+        """Children at the same level are fetched in one query."""
+        parent = ManagedGroup.objects.create(name="parent", email="parent@firecloud.org")
+        children = ManagedGroup.objects.bulk_create(
+            [ManagedGroup(name="child-{}".format(i), email="child-{}@firecloud.org".format(i)) for i in range(1000)]
+        )
+        GroupGroupMembership.objects.bulk_create(
+            [GroupGroupMembership(parent_group=parent, child_group=child) for child in children]
+        )
+        with self.assertNumQueries(4):
+            G = parent.get_graph()
+        self.assertEqual(len(G.nodes), 1001)
+        self.assertEqual(G.nodes["parent"], {"n_groups": 1000, "n_accounts": 0})
+
 
 class WorkspaceTest(TestCase):
     """Tests for the Workspace model that do not make AnVIL API calls."""
@@ -1431,6 +1582,18 @@ class WorkspaceTest(TestCase):
         self.assertFalse(instance.has_access)
 
 
+class WorkspaceQuerySetTest(TestCase):
+    def test_annotate_sharing_counts(self):
+        workspace = factories.WorkspaceFactory.create()
+        other_workspace = factories.WorkspaceFactory.create()
+        factories.WorkspaceGroupSharingFactory.create_batch(3, workspace=workspace)
+        # Authorization domains are not counted.
+        factories.WorkspaceAuthorizationDomainFactory.create(workspace=workspace)
+        workspaces = Workspace.objects.annotate_sharing_counts()
+        self.assertEqual(workspaces.get(pk=workspace.pk).n_sharing_groups, 3)
+        self.assertEqual(workspaces.get(pk=other_workspace.pk).n_sharing_groups, 0)
+
+
 class WorkspaceDataTest(TestCase):
     """Tests for the WorkspaceData models (default and base)."""
 
@@ -1676,6 +1839,289 @@ class GroupGroupMembershipTest(TestCase):
             instance.clean()
 
 
+class ManagedGroupClosureTest(TestCase):
+    def get_closure(self):
+        return set(ManagedGroupClosure.objects.values_list("ancestor__name", "descendant__name", "depth"))
+
+    def test_str_method(self):
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        instance = ManagedGroupClosure.objects.get()
+        self.assertEqual(str(instance), "child in parent (depth 1)")
+
+    def test_no_memberships(self):
+        factories.ManagedGroupFactory.create_batch(2)
+        self.assertEqual(ManagedGroupClosure.objects.count(), 0)
+
+    def test_created_with_membership(self):
+        grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        self.assertEqual(self.get_closure(), {("grandparent", "parent", 1)})
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        self.assertEqual(
+            self.get_closure(),
+            {("grandparent", "parent", 1), ("parent", "child", 1), ("grandparent", "child", 2)},
+        )
+
+    def test_child_with_descendants_added(self):
+        """Descendants of the child group are linked to the new ancestors."""
+        grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        self.assertEqual(
+            self.get_closure(),
+            {("grandparent", "parent", 1), ("parent", "child", 1), ("grandparent", "child", 2)},
+        )
+
+    def test_depth_is_shortest_path(self):
+        grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=child)
+        self.assertEqual(
+            self.get_closure(),
+            {("grandparent", "parent", 1), ("parent", "child", 1), ("grandparent", "child", 1)},
+        )
+
+    def test_membership_deleted(self):
+        grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        membership = factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        membership.delete()
+        self.assertEqual(self.get_closure(), {("parent", "child", 1)})
+
+    def test_membership_deleted_other_path_remains(self):
+        """Records are kept if there is another path between the groups."""
+        grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        membership = factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=child)
+        membership.delete()
+        self.assertEqual(self.get_closure(), {("grandparent", "parent", 1), ("grandparent", "child", 1)})
+
+    def test_membership_added_shorter_path(self):
+        """The depth of existing records is updated when a shorter path is added."""
+        groups = factories.ManagedGroupFactory.create_batch(4)
+        for parent, child in zip(groups[:-1], groups[1:]):
+            factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        self.assertEqual(ManagedGroupClosure.objects.get(ancestor=groups[0], descendant=groups[3]).depth, 3)
+        factories.GroupGroupMembershipFactory.create(parent_group=groups[0], child_group=groups[2])
+        self.assertEqual(ManagedGroupClosure.objects.get(ancestor=groups[0], descendant=groups[2]).depth, 1)
+        self.assertEqual(ManagedGroupClosure.objects.get(ancestor=groups[0], descendant=groups[3]).depth, 2)
+        self.assertEqual(ManagedGroupClosure.get_discrepancies(), (set(), set()))
+
+    def test_membership_deleted_longer_path_remains(self):
+        """The depth of existing records is updated when the shortest path is removed."""
+        groups = factories.ManagedGroupFactory.create_batch(4)
+        for parent, child in zip(groups[:-1], groups[1:]):
+            factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        membership = factories.GroupGroupMembershipFactory.create(parent_group=groups[0], child_group=groups[2])
+        membership.delete()
+        self.assertEqual(ManagedGroupClosure.objects.get(ancestor=groups[0], descendant=groups[2]).depth, 2)
+        self.assertEqual(ManagedGroupClosure.objects.get(ancestor=groups[0], descendant=groups[3]).depth, 3)
+        self.assertEqual(ManagedGroupClosure.get_discrepancies(), (set(), set()))
+
+    def test_membership_deleted_diamond(self):
+        """Records are kept for descendants that are still connected through another parent."""
+        top = factories.ManagedGroupFactory.create(name="top")
+        left = factories.ManagedGroupFactory.create(name="left")
+        right = factories.ManagedGroupFactory.create(name="right")
+        bottom = factories.ManagedGroupFactory.create(name="bottom")
+        membership = factories.GroupGroupMembershipFactory.create(parent_group=top, child_group=left)
+        factories.GroupGroupMembershipFactory.create(parent_group=top, child_group=right)
+        factories.GroupGroupMembershipFactory.create(parent_group=left, child_group=bottom)
+        factories.GroupGroupMembershipFactory.create(parent_group=right, child_group=bottom)
+        membership.delete()
+        self.assertEqual(
+            self.get_closure(),
+            {("top", "right", 1), ("left", "bottom", 1), ("right", "bottom", 1), ("top", "bottom", 2)},
+        )
+
+    def test_cycle(self):
+        """Records are maintained for groups that are members of themselves, without self-referencing records."""
+        groups = factories.ManagedGroupFactory.create_batch(3)
+        factories.GroupGroupMembershipFactory.create(parent_group=groups[0], child_group=groups[1])
+        factories.GroupGroupMembershipFactory.create(parent_group=groups[1], child_group=groups[2])
+        membership = factories.GroupGroupMembershipFactory.create(parent_group=groups[2], child_group=groups[0])
+        self.assertEqual(ManagedGroupClosure.objects.count(), 6)
+        self.assertFalse(ManagedGroupClosure.objects.filter(ancestor=F("descendant")).exists())
+        self.assertEqual(ManagedGroupClosure.get_discrepancies(), (set(), set()))
+        membership.delete()
+        self.assertEqual(ManagedGroupClosure.objects.count(), 3)
+        self.assertEqual(ManagedGroupClosure.get_discrepancies(), (set(), set()))
+
+    def test_random_memberships(self):
+        """Records match a full rebuild after memberships are added and deleted in any order."""
+        rng = random.Random(1234)
+        groups = factories.ManagedGroupFactory.create_batch(8)
+        memberships = {}
+        for i in range(60):
+            parent, child = rng.sample(groups, 2)
+            if (parent, child) in memberships:
+                memberships.pop((parent, child)).delete()
+            else:
+                memberships[(parent, child)] = factories.GroupGroupMembershipFactory.create(
+                    parent_group=parent, child_group=child
+                )
+            self.assertEqual(ManagedGroupClosure.get_discrepancies(), (set(), set()), msg="step {}".format(i))
+
+    def test_unaffected_records_not_rewritten(self):
+        """Records that do not involve the added or removed membership are left in place."""
+        grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        other = factories.ManagedGroupFactory.create(name="other")
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        pks = set(ManagedGroupClosure.objects.values_list("pk", flat=True))
+        membership = factories.GroupGroupMembershipFactory.create(parent_group=other, child_group=parent)
+        self.assertTrue(pks <= set(ManagedGroupClosure.objects.values_list("pk", flat=True)))
+        membership.delete()
+        self.assertEqual(set(ManagedGroupClosure.objects.values_list("pk", flat=True)), pks)
+
+    def test_parent_group_deleted(self):
+        """Records are removed when the parent group is deleted and its memberships cascade."""
+        grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        grandparent.delete()
+        self.assertEqual(self.get_closure(), {("parent", "child", 1)})
+
+    def test_queryset_delete(self):
+        grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        GroupGroupMembership.objects.filter(parent_group=grandparent).delete()
+        self.assertEqual(self.get_closure(), {("parent", "child", 1)})
+
+    def test_get_all_parents_num_queries(self):
+        groups = factories.ManagedGroupFactory.create_batch(5)
+        for parent, child in zip(groups[:-1], groups[1:]):
+            factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        with self.assertNumQueries(1):
+            parents = list(groups[-1].get_all_parents())
+        self.assertEqual(set(parents), set(groups[:-1]))
+        with self.assertNumQueries(1):
+            children = list(groups[0].get_all_children())
+        self.assertEqual(set(children), set(groups[1:]))
+
+    def test_rebuild(self):
+        grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        expected = self.get_closure()
+        ManagedGroupClosure.objects.all().delete()
+        ManagedGroupClosure.rebuild()
+        self.assertEqual(self.get_closure(), expected)
+
+    def test_get_discrepancies_none(self):
+        parent = factories.ManagedGroupFactory.create()
+        child = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        self.assertEqual(ManagedGroupClosure.get_discrepancies(), (set(), set()))
+
+    def test_get_discrepancies_missing(self):
+        parent = factories.ManagedGroupFactory.create()
+        child = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        ManagedGroupClosure.objects.all().delete()
+        self.assertEqual(ManagedGroupClosure.get_discrepancies(), ({(parent.pk, child.pk, 1)}, set()))
+
+    def test_get_discrepancies_unexpected(self):
+        parent = factories.ManagedGroupFactory.create()
+        child = factories.ManagedGroupFactory.create()
+        ManagedGroupClosure.objects.create(ancestor=parent, descendant=child, depth=1)
+        self.assertEqual(ManagedGroupClosure.get_discrepancies(), (set(), {(parent.pk, child.pk, 1)}))
+
+    def test_unique(self):
+        parent = factories.ManagedGroupFactory.create()
+        child = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        with self.assertRaises(IntegrityError):
+            ManagedGroupClosure.objects.create(ancestor=parent, descendant=child, depth=2)
+
+
+@override_settings(ANVIL_GROUP_HIERARCHY_BACKEND="cte")
+class ManagedGroupHierarchyCTETest(TestCase):
+    """Tests for looking up the ManagedGroup hierarchy with recursive queries."""
+
+    def setUp(self):
+        super().setUp()
+        # grandparent -> parent -> child, with a direct grandparent -> child membership as well.
+        self.grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        self.parent = factories.ManagedGroupFactory.create(name="parent")
+        self.child = factories.ManagedGroupFactory.create(name="child")
+        self.other_group = factories.ManagedGroupFactory.create(name="other")
+        factories.GroupGroupMembershipFactory.create(parent_group=self.grandparent, child_group=self.parent)
+        factories.GroupGroupMembershipFactory.create(parent_group=self.parent, child_group=self.child)
+        factories.GroupGroupMembershipFactory.create(parent_group=self.grandparent, child_group=self.child)
+        # Make sure that the closure table is not used.
+        ManagedGroupClosure.objects.all().delete()
+
+    def test_get_all_parents(self):
+        self.assertQuerySetEqual(self.child.get_all_parents(), [self.grandparent, self.parent], ordered=False)
+        self.assertQuerySetEqual(self.parent.get_all_parents(), [self.grandparent], ordered=False)
+        self.assertEqual(self.grandparent.get_all_parents().count(), 0)
+        self.assertEqual(self.other_group.get_all_parents().count(), 0)
+
+    def test_get_all_children(self):
+        self.assertQuerySetEqual(self.grandparent.get_all_children(), [self.parent, self.child], ordered=False)
+        self.assertQuerySetEqual(self.parent.get_all_children(), [self.child], ordered=False)
+        self.assertEqual(self.child.get_all_children().count(), 0)
+        self.assertEqual(self.other_group.get_all_children().count(), 0)
+
+    def test_get_all_parents_num_queries(self):
+        with self.assertNumQueries(1):
+            parents = list(self.child.get_all_parents())
+        self.assertEqual(len(parents), 2)
+
+    def test_get_all_groups(self):
+        account = factories.AccountFactory.create()
+        factories.GroupAccountMembershipFactory.create(group=self.child, account=account)
+        factories.GroupAccountMembershipFactory.create(group=self.parent, account=account)
+        with self.assertNumQueries(1):
+            groups = account.get_all_groups()
+        self.assertEqual(groups, {self.grandparent, self.parent, self.child})
+
+    def test_get_all_groups_no_groups(self):
+        account = factories.AccountFactory.create()
+        self.assertEqual(account.get_all_groups(), set())
+
+    def test_cycle(self):
+        """Queries terminate if there is a cycle, and do not include the group itself."""
+        factories.GroupGroupMembershipFactory.create(parent_group=self.child, child_group=self.grandparent)
+        self.assertQuerySetEqual(self.child.get_all_parents(), [self.grandparent, self.parent], ordered=False)
+        self.assertQuerySetEqual(self.child.get_all_children(), [self.grandparent, self.parent], ordered=False)
+
+    def test_get_groups_in_cycles(self):
+        self.assertEqual(ManagedGroup.get_groups_in_cycles().count(), 0)
+        factories.GroupGroupMembershipFactory.create(parent_group=self.child, child_group=self.parent)
+        self.assertQuerySetEqual(ManagedGroup.get_groups_in_cycles(), [self.parent, self.child], ordered=False)
+
+    @override_settings(ANVIL_GROUP_HIERARCHY_BACKEND="closure")
+    def test_get_groups_in_cycles_closure_backend(self):
+        """Cycles are detected with a recursive query regardless of the backend setting."""
+        factories.GroupGroupMembershipFactory.create(parent_group=self.child, child_group=self.parent)
+        self.assertQuerySetEqual(ManagedGroup.get_groups_in_cycles(), [self.parent, self.child], ordered=False)
+
+
 class GroupAccountMembershipTest(TestCase):
     def test_model_saving(self):
         """Creation using the model constructor and .save() works."""
@@ -2162,6 +2608,73 @@ class WorkspaceMethodHasAccountInAuthorizationDomainsTest(TestCase):
             auth_domain.workspace.has_account_in_authorization_domain(account, all_account_groups=other_groups)
         )
 
+    def test_all_account_groups_as_pks(self):
+        """all_account_groups can be a set of group pks."""
+        auth_domain = factories.WorkspaceAuthorizationDomainFactory.create()
+        account = factories.AccountFactory.create()
+        workspace = auth_domain.workspace
+        self.assertTrue(
+            workspace.has_account_in_authorization_domain(account, all_account_groups={auth_domain.group.pk})
+        )
+        self.assertFalse(workspace.has_account_in_authorization_domain(account, all_account_groups=set()))
+
+    def test_all_account_groups_as_queryset(self):
+        """all_account_groups can be a queryset of groups."""
+        auth_domain = factories.WorkspaceAuthorizationDomainFactory.create()
+        account = factories.AccountFactory.create()
+        groups = ManagedGroup.objects.filter(pk=auth_domain.group.pk)
+        self.assertTrue(auth_domain.workspace.has_account_in_authorization_domain(account, all_account_groups=groups))
+
+    def test_auth_domains_cached(self):
+        """Authorization domains are only fetched once per instance."""
+        auth_domain = factories.WorkspaceAuthorizationDomainFactory.create()
+        account = factories.AccountFactory.create()
+        workspace = Workspace.objects.get(pk=auth_domain.workspace.pk)
+        with self.assertNumQueries(1):
+            workspace.has_account_in_authorization_domain(account, all_account_groups=set())
+        with self.assertNumQueries(0):
+            workspace.has_account_in_authorization_domain(account, all_account_groups=set())
+
+    def test_auth_domains_prefetched(self):
+        """Prefetched authorization domains are used."""
+        auth_domain = factories.WorkspaceAuthorizationDomainFactory.create()
+        account = factories.AccountFactory.create()
+        workspace = Workspace.objects.prefetch_related("authorization_domains").get(pk=auth_domain.workspace.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                workspace.has_account_in_authorization_domain(account, all_account_groups={auth_domain.group.pk})
+            )
+
+    def test_refresh_from_db_clears_cache(self):
+        """Authorization domains added after the first check are found after refresh_from_db."""
+        workspace = factories.WorkspaceFactory.create()
+        account = factories.AccountFactory.create()
+        self.assertTrue(workspace.has_account_in_authorization_domain(account, all_account_groups=set()))
+        factories.WorkspaceAuthorizationDomainFactory.create(workspace=workspace)
+        workspace.refresh_from_db()
+        self.assertFalse(workspace.has_account_in_authorization_domain(account, all_account_groups=set()))
+
+    def test_authorization_domains_add_clears_cache(self):
+        """Authorization domains added with authorization_domains.add are found without refresh_from_db."""
+        workspace = factories.WorkspaceFactory.create()
+        group = factories.ManagedGroupFactory.create()
+        account = factories.AccountFactory.create()
+        self.assertTrue(workspace.has_account_in_authorization_domain(account, all_account_groups=set()))
+        workspace.authorization_domains.add(group)
+        self.assertFalse(workspace.has_account_in_authorization_domain(account, all_account_groups=set()))
+        workspace.authorization_domains.remove(group)
+        self.assertTrue(workspace.has_account_in_authorization_domain(account, all_account_groups=set()))
+
+    def test_auth_domain_saved_and_deleted_clears_cache(self):
+        """Authorization domains saved or deleted for the same instance are found without refresh_from_db."""
+        workspace = factories.WorkspaceFactory.create()
+        account = factories.AccountFactory.create()
+        self.assertTrue(workspace.has_account_in_authorization_domain(account, all_account_groups=set()))
+        auth_domain = factories.WorkspaceAuthorizationDomainFactory.create(workspace=workspace)
+        self.assertFalse(workspace.has_account_in_authorization_domain(account, all_account_groups=set()))
+        auth_domain.delete()
+        self.assertTrue(workspace.has_account_in_authorization_domain(account, all_account_groups=set()))
+
 
 class WorkspaceMethodHasGroupInAuthorizationDomainsTest(TestCase):
     """Tests for the Workspace.has_group_in_authorization_domain method."""
@@ -2505,6 +3018,60 @@ class WorkspaceMethodIsSharedWithAccountTest(TestCase):
         other_groups = factories.ManagedGroupFactory.create_batch(2)
         self.assertFalse(workspace.is_shared_with_account(account, all_account_groups=other_groups))
 
+    def test_all_account_groups_as_pks(self):
+        """all_account_groups can be a set of group pks."""
+        sharing = factories.WorkspaceGroupSharingFactory.create()
+        account = factories.AccountFactory.create()
+        self.assertTrue(sharing.workspace.is_shared_with_account(account, all_account_groups={sharing.group.pk}))
+        self.assertFalse(sharing.workspace.is_shared_with_account(account, all_account_groups=set()))
+
+    def test_sharing_cached(self):
+        """Sharing groups are only fetched once per instance."""
+        sharing = factories.WorkspaceGroupSharingFactory.create()
+        account = factories.AccountFactory.create()
+        workspace = Workspace.objects.get(pk=sharing.workspace.pk)
+        with self.assertNumQueries(1):
+            workspace.is_shared_with_account(account, all_account_groups=set())
+        with self.assertNumQueries(0):
+            workspace.is_shared_with_account(account, all_account_groups=set())
+
+    def test_sharing_prefetched(self):
+        """Prefetched sharing records are used."""
+        sharing = factories.WorkspaceGroupSharingFactory.create()
+        account = factories.AccountFactory.create()
+        workspace = Workspace.objects.prefetch_related("workspacegroupsharing_set__group").get(pk=sharing.workspace.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(workspace.is_shared_with_account(account, all_account_groups={sharing.group.pk}))
+
+    def test_refresh_from_db_clears_cache(self):
+        """Sharing records added after the first check are found after refresh_from_db."""
+        workspace = factories.WorkspaceFactory.create()
+        group = factories.ManagedGroupFactory.create()
+        account = factories.AccountFactory.create()
+        self.assertFalse(workspace.is_shared_with_account(account, all_account_groups={group.pk}))
+        factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=group)
+        workspace.refresh_from_db()
+        self.assertTrue(workspace.is_shared_with_account(account, all_account_groups={group.pk}))
+
+    def test_sharing_saved_and_deleted_clears_cache(self):
+        """Sharing records saved or deleted for the same instance are found without refresh_from_db."""
+        workspace = factories.WorkspaceFactory.create()
+        group = factories.ManagedGroupFactory.create()
+        account = factories.AccountFactory.create()
+        self.assertFalse(workspace.is_shared_with_account(account, all_account_groups={group.pk}))
+        sharing = factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=group)
+        self.assertTrue(workspace.is_shared_with_account(account, all_account_groups={group.pk}))
+        sharing.delete()
+        self.assertFalse(workspace.is_shared_with_account(account, all_account_groups={group.pk}))
+
+    def test_empty_all_account_groups(self):
+        """An empty all_account_groups means that the account is not in any groups."""
+        sharing = factories.WorkspaceGroupSharingFactory.create()
+        account = factories.AccountFactory.create()
+        factories.GroupAccountMembershipFactory.create(account=account, group=sharing.group)
+        self.assertTrue(sharing.workspace.is_shared_with_account(account))
+        self.assertFalse(sharing.workspace.is_shared_with_account(account, all_account_groups=[]))
+
 
 class WorkspaceMethodIsSharedWithGroupTest(TestCase):
     """Tests for the Workspace.is_shared method."""
@@ -3001,3 +3568,16 @@ class WorkspaceMethodIsAccessibleByAccount(TestCase):
         with self.assertRaises(exceptions.AnVILNotWorkspaceOwnerError) as e:
             workspace.is_accessible_by_account(account)
         self.assertIn("App does not have OWNER access to {}".format(workspace), str(e.exception))
+
+    def test_num_queries_after_first_check(self):
+        """Checking access again for another account does not query the workspace's groups again."""
+        workspace = factories.WorkspaceFactory.create()
+        auth_domain = factories.WorkspaceAuthorizationDomainFactory.create(workspace=workspace)
+        factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=auth_domain.group)
+        account_1 = factories.AccountFactory.create()
+        account_2 = factories.AccountFactory.create()
+        workspace = Workspace.objects.get(pk=workspace.pk)
+        with self.assertNumQueries(2):
+            self.assertTrue(workspace.is_accessible_by_account(account_1, all_account_groups={auth_domain.group.pk}))
+        with self.assertNumQueries(0):
+            self.assertFalse(workspace.is_accessible_by_account(account_2, all_account_groups=set()))
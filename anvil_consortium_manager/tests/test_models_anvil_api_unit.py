@@ -1,6 +1,8 @@
 import responses
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
 
 from .. import anvil_api, exceptions, models
@@ -299,6 +301,119 @@ class AccountAnVILAPIMockTest(AnVILAPIMockTestMixin, TestCase):
         self.assertEqual(self.object.status, self.object.ACTIVE_STATUS)
 
 
+class AccountBulkDeactivateAnVILAPIMockTest(AnVILAPIMockTestMixin, TestCase):
+    """Tests for the Account.bulk_deactivate method."""
+
+    def get_api_remove_from_group_url(self, group_name, email):
+        return self.api_client.sam_entry_point + "/api/groups/v1/" + group_name + "/member/" + email
+
+    def add_remove_response(self, membership, status=204):
+        kwargs = {} if status == 204 else {"json": {"message": "api error"}}
+        self.anvil_response_mock.add(
+            responses.DELETE,
+            self.get_api_remove_from_group_url(membership.group.name, membership.account.email),
+            status=status,
+            **kwargs,
+        )
+
+    def test_no_accounts(self):
+        report = models.Account.bulk_deactivate([])
+        self.assertEqual(report.deactivated, [])
+        self.assertEqual(report.membership_results, [])
+        self.assertTrue(report.succeeded)
+
+    def test_no_groups(self):
+        """Accounts that are not in any groups are deactivated without API calls."""
+        accounts = factories.AccountFactory.create_batch(2)
+        report = models.Account.bulk_deactivate(models.Account.objects.all())
+        self.assertEqual(set(report.deactivated), set(accounts))
+        for account in accounts:
+            account.refresh_from_db()
+            self.assertEqual(account.status, account.INACTIVE_STATUS)
+            self.assertIsNotNone(account.deactivate_date)
+
+    def test_two_accounts_two_groups(self):
+        """All memberships are removed and all accounts are deactivated."""
+        accounts = factories.AccountFactory.create_batch(2)
+        groups = factories.ManagedGroupFactory.create_batch(2)
+        memberships = [
+            factories.GroupAccountMembershipFactory.create(account=account, group=group)
+            for account in accounts
+            for group in groups
+        ]
+        for membership in memberships:
+            self.add_remove_response(membership)
+        report = models.Account.bulk_deactivate(accounts)
+        self.assertEqual(report.deactivated, accounts)
+        self.assertEqual(report.not_deactivated, [])
+        self.assertEqual(set(report.removed_memberships), set(memberships))
+        self.assertEqual(report.failed_memberships, [])
+        self.assertTrue(report.succeeded)
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 0)
+        for account in accounts:
+            account.refresh_from_db()
+            self.assertEqual(account.status, account.INACTIVE_STATUS)
+            # History is added.
+            self.assertEqual(account.history.latest().history_type, "~")
+
+    def test_api_failure(self):
+        """Accounts with a failed removal stay active, and other accounts are still deactivated."""
+        account_1 = factories.AccountFactory.create()
+        account_2 = factories.AccountFactory.create()
+        membership_1 = factories.GroupAccountMembershipFactory.create(account=account_1)
+        membership_2 = factories.GroupAccountMembershipFactory.create(account=account_1)
+        membership_3 = factories.GroupAccountMembershipFactory.create(account=account_2)
+        self.add_remove_response(membership_1)
+        self.add_remove_response(membership_2, status=409)
+        self.add_remove_response(membership_3)
+        report = models.Account.bulk_deactivate([account_1, account_2])
+        self.assertEqual(report.deactivated, [account_2])
+        self.assertEqual(report.not_deactivated, [account_1])
+        self.assertFalse(report.succeeded)
+        self.assertEqual(set(report.removed_memberships), set([membership_1, membership_3]))
+        self.assertEqual(len(report.failed_memberships), 1)
+        self.assertEqual(report.failed_memberships[0].instance, membership_2)
+        self.assertIsInstance(report.failed_memberships[0].error, anvil_api.AnVILAPIError)
+        # Only the failed membership is left in the app.
+        self.assertEqual(list(models.GroupAccountMembership.objects.all()), [membership_2])
+        account_1.refresh_from_db()
+        self.assertEqual(account_1.status, account_1.ACTIVE_STATUS)
+        account_2.refresh_from_db()
+        self.assertEqual(account_2.status, account_2.INACTIVE_STATUS)
+
+    def test_already_inactive(self):
+        """Inactive accounts are skipped and their memberships are not removed."""
+        account = factories.AccountFactory.create(status=models.Account.INACTIVE_STATUS)
+        factories.GroupAccountMembershipFactory.create(account=account)
+        report = models.Account.bulk_deactivate([account])
+        self.assertEqual(report.skipped, [account])
+        self.assertEqual(report.deactivated, [])
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 1)
+
+    def test_workers(self):
+        """API calls can be made with multiple threads."""
+        accounts = factories.AccountFactory.create_batch(3)
+        for account in accounts:
+            membership = factories.GroupAccountMembershipFactory.create(account=account)
+            self.add_remove_response(membership)
+        report = models.Account.bulk_deactivate(accounts, workers=3)
+        self.assertEqual(report.deactivated, accounts)
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 0)
+
+    def test_one_delete_query(self):
+        """Memberships for all accounts are deleted from the app in one query."""
+        accounts = factories.AccountFactory.create_batch(2)
+        for account in accounts:
+            for membership in factories.GroupAccountMembershipFactory.create_batch(3, account=account):
+                self.add_remove_response(membership)
+        table = models.GroupAccountMembership._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            models.Account.bulk_deactivate(accounts)
+        deletes = [q["sql"] for q in queries if q["sql"].startswith("DELETE") and table in q["sql"]]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 0)
+
+
 class ManagedGroupAnVILAPIMockTest(AnVILAPIMockTestMixin, TestCase):
     def setUp(self, *args, **kwargs):
         super().setUp()
@@ -3794,6 +3909,148 @@ class GroupAccountMembershipAnVILAPIMockTest(AnVILAPIMockTestMixin, TestCase):
             self.object.anvil_delete()
 
 
+class GroupAccountMembershipBulkAnVILAPIMockTest(AnVILAPIMockTestMixin, TestCase):
+    """Tests for the GroupAccountMembership bulk methods."""
+
+    def get_api_url(self, membership):
+        return (
+            self.api_client.sam_entry_point
+            + "/api/groups/v1/"
+            + membership.group.name
+            + "/"
+            + membership.role.lower()
+            + "/"
+            + membership.account.email
+        )
+
+    def add_response(self, method, membership, status=204):
+        kwargs = {} if status == 204 else {"json": {"message": "api error"}}
+        self.anvil_response_mock.add(method, self.get_api_url(membership), status=status, **kwargs)
+
+    def build_memberships(self, n_accounts, n_groups, role=models.GroupAccountMembership.RoleChoices.MEMBER):
+        accounts = factories.AccountFactory.create_batch(n_accounts)
+        groups = factories.ManagedGroupFactory.create_batch(n_groups)
+        return [
+            models.GroupAccountMembership(account=account, group=group, role=role)
+            for group in groups
+            for account in accounts
+        ]
+
+    def test_create(self):
+        memberships = self.build_memberships(2, 2)
+        for membership in memberships:
+            self.add_response(responses.PUT, membership)
+        results = models.GroupAccountMembership.anvil_bulk_create(memberships)
+        self.assertEqual([result.instance for result in results], memberships)
+        self.assertTrue(all(result.succeeded for result in results))
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 4)
+        # History is added.
+        self.assertEqual(models.GroupAccountMembership.history.count(), 4)
+
+    def test_create_admin(self):
+        memberships = self.build_memberships(1, 1, role=models.GroupAccountMembership.RoleChoices.ADMIN)
+        self.add_response(responses.PUT, memberships[0])
+        models.GroupAccountMembership.anvil_bulk_create(memberships)
+        membership = models.GroupAccountMembership.objects.get()
+        self.assertEqual(membership.role, models.GroupAccountMembership.RoleChoices.ADMIN)
+
+    def test_create_workers(self):
+        memberships = self.build_memberships(3, 2)
+        for membership in memberships:
+            self.add_response(responses.PUT, membership)
+        results = models.GroupAccountMembership.anvil_bulk_create(memberships, workers=4)
+        self.assertEqual([result.instance for result in results], memberships)
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 6)
+
+    def test_create_api_error(self):
+        """Only memberships that were added on AnVIL are created in the app."""
+        memberships = self.build_memberships(2, 1)
+        self.add_response(responses.PUT, memberships[0], status=500)
+        self.add_response(responses.PUT, memberships[1])
+        results = models.GroupAccountMembership.anvil_bulk_create(memberships)
+        self.assertIsInstance(results[0].error, anvil_api.AnVILAPIError500)
+        self.assertTrue(results[1].succeeded)
+        membership = models.GroupAccountMembership.objects.get()
+        self.assertEqual(membership.account, memberships[1].account)
+
+    def test_create_one_insert_query(self):
+        """Memberships are created in the app with one query."""
+        memberships = self.build_memberships(3, 2)
+        for membership in memberships:
+            self.add_response(responses.PUT, membership)
+        table = models.GroupAccountMembership._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            models.GroupAccountMembership.anvil_bulk_create(memberships)
+        inserts = [q["sql"] for q in queries if q["sql"].startswith("INSERT") and '"{}"'.format(table) in q["sql"]]
+        self.assertEqual(len(inserts), 1)
+
+    def test_create_validation_error_no_api_calls(self):
+        """No API calls are made if any membership is invalid."""
+        memberships = self.build_memberships(2, 1)
+        memberships[1].account.status = models.Account.INACTIVE_STATUS
+        memberships[1].account.save()
+        with self.assertRaises(ValidationError) as e:
+            models.GroupAccountMembership.anvil_bulk_create(memberships)
+        self.assertEqual(len(e.exception.messages), 1)
+        self.assertIn("inactive", e.exception.messages[0])
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 0)
+
+    def test_validate_group_not_managed_by_app(self):
+        memberships = self.build_memberships(1, 1)
+        memberships[0].group.is_managed_by_app = False
+        with self.assertRaisesMessage(ValidationError, "not managed by the app"):
+            models.GroupAccountMembership.validate_bulk_create(memberships)
+
+    def test_validate_already_exists(self):
+        memberships = self.build_memberships(2, 1)
+        factories.GroupAccountMembershipFactory.create(account=memberships[0].account, group=memberships[0].group)
+        with self.assertRaises(ValidationError) as e:
+            models.GroupAccountMembership.validate_bulk_create(memberships)
+        self.assertEqual(len(e.exception.messages), 1)
+        self.assertIn("already a member", e.exception.messages[0])
+
+    def test_validate_repeated(self):
+        memberships = self.build_memberships(1, 1)
+        memberships.append(models.GroupAccountMembership(account=memberships[0].account, group=memberships[0].group))
+        with self.assertRaisesMessage(ValidationError, "repeated"):
+            models.GroupAccountMembership.validate_bulk_create(memberships)
+
+    def test_validate_invalid_role(self):
+        memberships = self.build_memberships(1, 1, role="foo")
+        with self.assertRaisesMessage(ValidationError, "Role is not valid"):
+            models.GroupAccountMembership.validate_bulk_create(memberships)
+
+    def test_validate_num_queries(self):
+        memberships = self.build_memberships(5, 3)
+        with self.assertNumQueries(1):
+            models.GroupAccountMembership.validate_bulk_create(memberships)
+
+    def test_delete(self):
+        memberships = factories.GroupAccountMembershipFactory.create_batch(3)
+        for membership in memberships:
+            self.add_response(responses.DELETE, membership)
+        results = models.GroupAccountMembership.anvil_bulk_delete(models.GroupAccountMembership.objects.order_by("pk"))
+        self.assertEqual([result.instance for result in results], memberships)
+        self.assertTrue(all(result.succeeded for result in results))
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 0)
+
+    def test_delete_api_error(self):
+        """Only memberships that were removed on AnVIL are deleted from the app."""
+        memberships = factories.GroupAccountMembershipFactory.create_batch(2)
+        self.add_response(responses.DELETE, memberships[0])
+        self.add_response(responses.DELETE, memberships[1], status=500)
+        results = models.GroupAccountMembership.anvil_bulk_delete(memberships)
+        self.assertTrue(results[0].succeeded)
+        self.assertFalse(results[1].succeeded)
+        self.assertEqual(list(models.GroupAccountMembership.objects.all()), [memberships[1]])
+
+    def test_delete_group_not_managed_by_app(self):
+        membership = factories.GroupAccountMembershipFactory.create(group__is_managed_by_app=False)
+        with self.assertRaisesMessage(ValidationError, "not managed by the app"):
+            models.GroupAccountMembership.anvil_bulk_delete([membership])
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 1)
+
+
 class WorkspaceGroupSharingAnVILAPIMockTest(AnVILAPIMockTestMixin, TestCase):
     def setUp(self, *args, **kwargs):
         super().setUp()
@@ -3989,3 +4246,102 @@ class WorkspaceGroupSharingAnVILAPIMockTest(AnVILAPIMockTestMixin, TestCase):
         )
         with self.assertRaises(anvil_api.AnVILAPIError):
             self.object.anvil_delete()
+
+
+class WorkspaceGroupSharingBulkAnVILAPIMockTest(AnVILAPIMockTestMixin, TestCase):
+    """Tests for the WorkspaceGroupSharing.anvil_bulk_create_or_update and anvil_bulk_delete methods."""
+
+    def setUp(self):
+        super().setUp()
+        self.workspace_1 = factories.WorkspaceFactory.create(billing_project__name="bp", name="ws-1")
+        self.workspace_2 = factories.WorkspaceFactory.create(billing_project__name="bp", name="ws-2")
+
+    def get_api_url(self, workspace):
+        return (
+            self.api_client.rawls_entry_point
+            + "/api/workspaces/bp/"
+            + workspace.name
+            + "/acl?inviteUsersNotFound=false"
+        )
+
+    def get_acl_updates(self, sharings, access=None):
+        return [
+            {
+                "email": sharing.group.email,
+                "accessLevel": access or sharing.access,
+                "canShare": False,
+                "canCompute": sharing.can_compute,
+            }
+            for sharing in sharings
+        ]
+
+    def add_response(self, workspace, acl_updates, users_not_found=[], status=200):
+        if status == 200:
+            body = {"invitesSent": [], "usersNotFound": users_not_found, "usersUpdated": acl_updates}
+        else:
+            body = {"message": "api error"}
+        self.anvil_response_mock.add(
+            responses.PATCH,
+            self.get_api_url(workspace),
+            status=status,
+            match=[responses.matchers.json_params_matcher(acl_updates)],
+            json=body,
+        )
+
+    def test_create_or_update_no_records(self):
+        self.assertEqual(models.WorkspaceGroupSharing.anvil_bulk_create_or_update([]), [])
+
+    def test_create_or_update_one_request_per_workspace(self):
+        """All groups for a workspace are updated in one request."""
+        sharings_1 = factories.WorkspaceGroupSharingFactory.create_batch(3, workspace=self.workspace_1)
+        sharings_2 = factories.WorkspaceGroupSharingFactory.create_batch(2, workspace=self.workspace_2)
+        self.add_response(self.workspace_1, self.get_acl_updates(sharings_1))
+        self.add_response(self.workspace_2, self.get_acl_updates(sharings_2))
+        sharings = [sharings_1[0], sharings_2[0], sharings_1[1], sharings_2[1], sharings_1[2]]
+        results = models.WorkspaceGroupSharing.anvil_bulk_create_or_update(sharings)
+        self.assertEqual([result.instance for result in results], sharings)
+        self.assertTrue(all(result.succeeded for result in results))
+
+    def test_create_or_update_queryset(self):
+        """A queryset can be passed, and workspaces and groups are loaded with it."""
+        factories.WorkspaceGroupSharingFactory.create_batch(3, workspace=self.workspace_1)
+        queryset = models.WorkspaceGroupSharing.objects.order_by("pk")
+        self.add_response(self.workspace_1, self.get_acl_updates(queryset))
+        with self.assertNumQueries(1):
+            results = models.WorkspaceGroupSharing.anvil_bulk_create_or_update(queryset)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result.succeeded for result in results))
+
+    def test_create_or_update_group_not_found(self):
+        """Only the records whose group is in usersNotFound have an error."""
+        sharings = factories.WorkspaceGroupSharingFactory.create_batch(2, workspace=self.workspace_1)
+        acl_updates = self.get_acl_updates(sharings)
+        self.add_response(self.workspace_1, acl_updates, users_not_found=[acl_updates[1]])
+        results = models.WorkspaceGroupSharing.anvil_bulk_create_or_update(sharings)
+        self.assertTrue(results[0].succeeded)
+        self.assertFalse(results[1].succeeded)
+        self.assertIsInstance(results[1].error, exceptions.AnVILGroupNotFound)
+
+    def test_create_or_update_api_error(self):
+        """A failed request only affects the records for its workspace."""
+        sharing_1 = factories.WorkspaceGroupSharingFactory.create(workspace=self.workspace_1)
+        sharing_2 = factories.WorkspaceGroupSharingFactory.create(workspace=self.workspace_2)
+        self.add_response(self.workspace_1, self.get_acl_updates([sharing_1]), status=500)
+        self.add_response(self.workspace_2, self.get_acl_updates([sharing_2]))
+        results = models.WorkspaceGroupSharing.anvil_bulk_create_or_update([sharing_1, sharing_2], workers=2)
+        self.assertIsInstance(results[0].error, anvil_api.AnVILAPIError500)
+        self.assertTrue(results[1].succeeded)
+
+    def test_delete(self):
+        """Access is removed for all groups in a workspace in one request."""
+        sharings = factories.WorkspaceGroupSharingFactory.create_batch(2, workspace=self.workspace_1)
+        self.add_response(self.workspace_1, self.get_acl_updates(sharings, access="NO ACCESS"))
+        results = models.WorkspaceGroupSharing.anvil_bulk_delete(sharings)
+        self.assertEqual([result.instance for result in results], sharings)
+        self.assertTrue(all(result.succeeded for result in results))
+
+    def test_delete_api_error(self):
+        sharing = factories.WorkspaceGroupSharingFactory.create(workspace=self.workspace_1)
+        self.add_response(self.workspace_1, self.get_acl_updates([sharing], access="NO ACCESS"), status=500)
+        results = models.WorkspaceGroupSharing.anvil_bulk_delete([sharing])
+        self.assertIsInstance(results[0].error, anvil_api.AnVILAPIError500)
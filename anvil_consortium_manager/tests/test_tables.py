@@ -95,6 +95,28 @@ class BillingProjectStaffTableTest(TestCase):
         self.assertEqual(table.rows[1].get_cell("number_workspaces"), 1)
         self.assertEqual(table.rows[2].get_cell("number_workspaces"), 2)
 
+    def test_number_of_workspaces_annotated_queryset(self):
+        billing_project = self.model_factory.create()
+        factories.WorkspaceFactory.create_batch(2, billing_project=billing_project)
+        table = self.table_class(self.model.objects.annotate_workspace_counts())
+        self.assertEqual(table.rows[0].get_cell("number_workspaces"), 2)
+
+    def test_order_by_number_of_workspaces(self):
+        billing_project_1 = self.model_factory.create(name="a")
+        billing_project_2 = self.model_factory.create(name="b")
+        factories.WorkspaceFactory.create_batch(2, billing_project=billing_project_1)
+        factories.WorkspaceFactory.create_batch(1, billing_project=billing_project_2)
+        table = self.table_class(self.model.objects.all(), order_by="number_workspaces")
+        self.assertEqual(list(table.data), [billing_project_2, billing_project_1])
+
+    def test_num_queries(self):
+        """Rendering the table does not make one query per row."""
+        for billing_project in self.model_factory.create_batch(5):
+            factories.WorkspaceFactory.create(billing_project=billing_project)
+        table = self.table_class(self.model.objects.all())
+        with self.assertNumQueries(1):
+            list(table.as_values())
+
 
 class AccountStaffTableTest(TestCase):
     model = models.Account
@@ -208,6 +230,27 @@ class ManagedGroupStaffTableTest(TestCase):
         self.assertEqual(table.rows[1].get_cell("number_accounts"), 1)
         self.assertEqual(table.rows[2].get_cell("number_accounts"), 2)
 
+    def test_order_by_number_of_groups_and_accounts(self):
+        group_1 = self.model_factory.create(name="a")
+        group_2 = self.model_factory.create(name="b")
+        factories.GroupGroupMembershipFactory.create_batch(2, parent_group=group_1)
+        factories.GroupAccountMembershipFactory.create_batch(2, group=group_2)
+        table = self.table_class(self.model.objects.filter(pk__in=[group_1.pk, group_2.pk]), order_by="number_groups")
+        self.assertEqual(list(table.data), [group_2, group_1])
+        table = self.table_class(
+            self.model.objects.filter(pk__in=[group_1.pk, group_2.pk]), order_by="-number_accounts"
+        )
+        self.assertEqual(list(table.data), [group_2, group_1])
+
+    def test_num_queries(self):
+        """Rendering the table does not make one query per row."""
+        for group in self.model_factory.create_batch(5):
+            factories.GroupGroupMembershipFactory.create(parent_group=group)
+            factories.GroupAccountMembershipFactory.create(group=group)
+        table = self.table_class(self.model.objects.all())
+        with self.assertNumQueries(1):
+            list(table.as_values())
+
     def test_number_of_groups_not_managed_by_app(self):
         """Table displays a --- for number of groups if the group is not managed by the app."""
         group = self.model_factory.create(is_managed_by_app=False)
@@ -254,6 +297,21 @@ class WorkspaceStaffTableTest(TestCase):
         self.assertEqual(table.rows[1].get_cell("number_groups"), 1)
         self.assertEqual(table.rows[2].get_cell("number_groups"), 2)
 
+    def test_order_by_number_of_groups(self):
+        instance_1 = self.model_factory.create(name="a")
+        instance_2 = self.model_factory.create(name="b")
+        factories.WorkspaceGroupSharingFactory.create_batch(2, workspace=instance_1)
+        table = self.table_class(self.model.objects.all(), order_by="number_groups")
+        self.assertEqual(list(table.data), [instance_2, instance_1])
+
+    def test_num_queries(self):
+        """Rendering the table does not make one query per row."""
+        for workspace in self.model_factory.create_batch(5):
+            factories.WorkspaceGroupSharingFactory.create(workspace=workspace)
+        table = self.table_class(self.model.objects.all())
+        with self.assertNumQueries(1):
+            list(table.as_values())
+
     def test_workspace_type_display(self):
         """workspace_type field shows the name of the workspace in the adapter."""
         workspace_type = DefaultWorkspaceAdapter().get_type()
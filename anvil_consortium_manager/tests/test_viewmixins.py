@@ -1,5 +1,6 @@
 from unittest.mock import patch
 
+import numpy as np
 from django.core.exceptions import ImproperlyConfigured
 from django.test import RequestFactory, TestCase
 
@@ -18,6 +19,19 @@ class ManagedGroupGraphMixinTest(TestCase):
         with self.assertRaises(NotImplementedError):
             viewmixins.ManagedGroupGraphMixin().get_graph()
 
+    def test_get_edge_coordinates(self):
+        positions = np.array([[0.0, 1.0], [2.0, 3.0], [4.0, 5.0]])
+        edges = np.array([[0, 1], [2, 0]])
+        x, y = viewmixins.ManagedGroupGraphMixin._get_edge_coordinates(positions, edges)
+        np.testing.assert_array_equal(x, [0.0, 2.0, np.nan, 4.0, 0.0, np.nan])
+        np.testing.assert_array_equal(y, [1.0, 3.0, np.nan, 5.0, 1.0, np.nan])
+
+    def test_get_edge_coordinates_no_edges(self):
+        positions = np.array([[0.0, 1.0]])
+        x, y = viewmixins.ManagedGroupGraphMixin._get_edge_coordinates(positions, np.empty((0, 2), dtype=int))
+        self.assertEqual(len(x), 0)
+        self.assertEqual(len(y), 0)
+
 
 class RegisteredWorkspaceAdaptersMixinTest(TestCase):
     """Tests for the RegisteredWorkspaceAdaptersMixin class."""
@@ -12,11 +12,13 @@ from django.contrib.messages import get_messages
 from django.contrib.sites.models import Site
 from django.core import mail
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.db import connection
 from django.forms import BaseInlineFormSet, HiddenInput
 from django.http.response import Http404
 from django.shortcuts import resolve_url
 from django.template.loader import render_to_string
 from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from faker import Faker
@@ -931,6 +933,21 @@ class BillingProjectListTest(TestCase):
         """Return the view being tested."""
         return views.BillingProjectList.as_view()
 
+    def test_num_queries_does_not_depend_on_number_of_rows(self):
+        """The number of queries is the same regardless of how many rows are in the table."""
+        request = self.factory.get(self.get_url())
+        request.user = self.user
+        factories.WorkspaceFactory.create()
+        # Make a request first so that the user's permissions are cached.
+        self.get_view()(request).render()
+        with CaptureQueriesContext(connection) as small:
+            self.get_view()(request).render()
+        for billing_project in factories.BillingProjectFactory.create_batch(5):
+            factories.WorkspaceFactory.create(billing_project=billing_project)
+        with CaptureQueriesContext(connection) as large:
+            self.get_view()(request).render()
+        self.assertEqual(len(large), len(small))
+
     def test_view_redirect_not_logged_in(self):
         "View redirects to login view when user is not logged in."
         # Need a client for redirects.
@@ -1174,6 +1191,71 @@ class AccountDetailTest(TestCase):
         """Return the view being tested."""
         return views.AccountDetail.as_view()
 
+    def test_workspace_access_num_queries_does_not_depend_on_number_of_workspaces(self):
+        """Checking access to each workspace does not make queries for each workspace."""
+        account = factories.AccountFactory.create()
+        group = factories.ManagedGroupFactory.create()
+        factories.GroupAccountMembershipFactory.create(account=account, group=group)
+        factories.WorkspaceGroupSharingFactory.create(group=group)
+        request = self.factory.get(self.get_url(account.uuid))
+        request.user = self.user
+        # Make a request first so that the user's permissions are cached.
+        self.get_view()(request, uuid=account.uuid)
+        with CaptureQueriesContext(connection) as small:
+            self.get_view()(request, uuid=account.uuid)
+        for workspace in factories.WorkspaceFactory.create_batch(5):
+            factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=group)
+            factories.WorkspaceAuthorizationDomainFactory.create(workspace=workspace, group=group)
+        factories.WorkspaceGroupSharingFactory.create(group__is_managed_by_app=False)
+        with CaptureQueriesContext(connection) as large:
+            response = self.get_view()(request, uuid=account.uuid)
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(len(response.context_data["accessible_workspace_table"].rows), 6)
+        self.assertEqual(len(response.context_data["unknown_access_workspace_table"].rows), 1)
+
+    def create_workspace_access_fixture(self, account, n):
+        """Create ``n`` groups that the account is in and workspaces with each kind of access for each group."""
+        parent = None
+        for i in range(n):
+            # A chain of groups, with the account in the bottom group.
+            group = factories.ManagedGroupFactory.create()
+            if parent:
+                factories.GroupGroupMembershipFactory.create(parent_group=group, child_group=parent)
+            else:
+                factories.GroupAccountMembershipFactory.create(account=account, group=group)
+            parent = group
+            # Accessible workspace.
+            factories.WorkspaceGroupSharingFactory.create(group=group)
+            # Accessible workspace with an auth domain.
+            workspace = factories.WorkspaceFactory.create()
+            factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=group)
+            factories.WorkspaceAuthorizationDomainFactory.create(workspace=workspace, group=group)
+            # Workspace shared with an unmanaged group.
+            factories.WorkspaceGroupSharingFactory.create(group__is_managed_by_app=False)
+            # Workspace with an unmanaged auth domain.
+            workspace = factories.WorkspaceFactory.create()
+            factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=group)
+            factories.WorkspaceAuthorizationDomainFactory.create(workspace=workspace, group__is_managed_by_app=False)
+            # Workspace not owned by the app.
+            factories.WorkspaceGroupSharingFactory.create(
+                workspace__app_access=models.Workspace.AppAccessChoices.LIMITED, group=group
+            )
+
+    def test_num_queries(self):
+        """The page makes a fixed number of queries, regardless of how many groups and workspaces the account has."""
+        account = factories.AccountFactory.create(verified=True)
+        self.create_workspace_access_fixture(account, 50)
+        request = self.factory.get(self.get_url(account.uuid))
+        request.user = self.user
+        # Make a request first so that the user's permissions are cached.
+        self.get_view()(request, uuid=account.uuid).render()
+        with self.assertNumQueries(13):
+            response = self.get_view()(request, uuid=account.uuid)
+            response.render()
+        self.assertEqual(len(response.context_data["group_table"].rows), 1)
+        self.assertEqual(len(response.context_data["accessible_workspace_table"].rows), 100)
+        self.assertEqual(len(response.context_data["unknown_access_workspace_table"].rows), 150)
+
     def test_view_redirect_not_logged_in(self):
         "View redirects to login view when user is not logged in."
         # Need a client for redirects.
@@ -4304,6 +4386,148 @@ class AccountDeactivateTest(AnVILAPIMockTestMixin, TestCase):
         self.assertEqual(views.AccountDeactivate.message_already_inactive, str(messages[0]))
 
 
+class AccountBulkDeactivateTest(AnVILAPIMockTestMixin, TestCase):
+    def setUp(self):
+        """Set up test class."""
+        super().setUp()
+        self.factory = RequestFactory()
+        # Create a user with both view and edit permissions.
+        self.user = User.objects.create_user(username="test", password="test")
+        self.user.user_permissions.add(
+            Permission.objects.get(codename=models.AnVILProjectManagerAccess.STAFF_VIEW_PERMISSION_CODENAME)
+        )
+        self.user.user_permissions.add(
+            Permission.objects.get(codename=models.AnVILProjectManagerAccess.STAFF_EDIT_PERMISSION_CODENAME)
+        )
+
+    def get_url(self, *args):
+        """Get the url for the view being tested."""
+        return reverse("anvil_consortium_manager:accounts:bulk_deactivate", args=args)
+
+    def get_view(self):
+        """Return the view being tested."""
+        return views.AccountBulkDeactivate.as_view()
+
+    def get_api_remove_from_group_url(self, group_name, account_email):
+        return self.api_client.sam_entry_point + "/api/groups/v1/" + group_name + "/member/" + account_email
+
+    def test_view_redirect_not_logged_in(self):
+        "View redirects to login view when user is not logged in."
+        response = self.client.get(self.get_url())
+        self.assertRedirects(response, resolve_url(settings.LOGIN_URL) + "?next=" + self.get_url())
+
+    def test_status_code_with_user_permission(self):
+        """Returns successful response code."""
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, 200)
+
+    def test_access_with_view_permission(self):
+        """Raises permission denied if user has only view permission."""
+        user_with_view_perm = User.objects.create_user(username="test-other", password="test-other")
+        user_with_view_perm.user_permissions.add(
+            Permission.objects.get(codename=models.AnVILProjectManagerAccess.STAFF_VIEW_PERMISSION_CODENAME)
+        )
+        request = self.factory.get(self.get_url())
+        request.user = user_with_view_perm
+        with self.assertRaises(PermissionDenied):
+            self.get_view()(request)
+
+    def test_access_without_user_permission(self):
+        """Raises permission denied if user has no permissions."""
+        user_no_perms = User.objects.create_user(username="test-none", password="test-none")
+        request = self.factory.get(self.get_url())
+        request.user = user_no_perms
+        with self.assertRaises(PermissionDenied):
+            self.get_view()(request)
+
+    def test_has_form_in_context(self):
+        """Response includes a form."""
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertIn("form", response.context_data)
+        self.assertIsInstance(response.context_data["form"], forms.AccountBulkDeactivateForm)
+        self.assertNotIn("report", response.context_data)
+
+    def test_deactivates_accounts(self):
+        """Posting valid data deactivates the accounts and removes them from their groups."""
+        accounts = factories.AccountFactory.create_batch(2)
+        for account in accounts:
+            membership = factories.GroupAccountMembershipFactory.create(account=account)
+            self.anvil_response_mock.add(
+                responses.DELETE,
+                self.get_api_remove_from_group_url(membership.group.name, account.email),
+                status=204,
+            )
+        self.client.force_login(self.user)
+        response = self.client.post(self.get_url(), {"emails": "\n".join(account.email for account in accounts)})
+        self.assertEqual(response.status_code, 200)
+        report = response.context_data["report"]
+        self.assertEqual(report.deactivated, accounts)
+        self.assertEqual(len(report.removed_memberships), 2)
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 0)
+        for account in accounts:
+            account.refresh_from_db()
+            self.assertEqual(account.status, account.INACTIVE_STATUS)
+            self.assertTrue(account.deactivate_date)
+        messages = [str(m.message) for m in get_messages(response.wsgi_request)]
+        self.assertEqual(messages, [views.AccountBulkDeactivate.success_message.format(n=2)])
+
+    def test_api_error(self):
+        """Accounts with a failed removal stay active, and the error is shown."""
+        account_1 = factories.AccountFactory.create()
+        account_2 = factories.AccountFactory.create()
+        membership_1 = factories.GroupAccountMembershipFactory.create(account=account_1)
+        membership_2 = factories.GroupAccountMembershipFactory.create(account=account_2)
+        self.anvil_response_mock.add(
+            responses.DELETE,
+            self.get_api_remove_from_group_url(membership_1.group.name, account_1.email),
+            status=204,
+        )
+        self.anvil_response_mock.add(
+            responses.DELETE,
+            self.get_api_remove_from_group_url(membership_2.group.name, account_2.email),
+            status=500,
+            json={"message": "group removal test error"},
+        )
+        self.client.force_login(self.user)
+        response = self.client.post(self.get_url(), {"emails": "{}\n{}".format(account_1.email, account_2.email)})
+        self.assertEqual(response.status_code, 200)
+        report = response.context_data["report"]
+        self.assertEqual(report.deactivated, [account_1])
+        self.assertEqual(report.not_deactivated, [account_2])
+        self.assertContains(response, "group removal test error")
+        account_2.refresh_from_db()
+        self.assertEqual(account_2.status, account_2.ACTIVE_STATUS)
+        self.assertEqual(list(models.GroupAccountMembership.objects.all()), [membership_2])
+        messages = [str(m.message) for m in get_messages(response.wsgi_request)]
+        self.assertEqual(len(messages), 2)
+        self.assertIn(views.AccountBulkDeactivate.message_error_removing_from_groups.format(n=1), messages)
+
+    def test_already_inactive(self):
+        """Inactive accounts are skipped with a message."""
+        account = factories.AccountFactory.create(status=models.Account.INACTIVE_STATUS)
+        factories.GroupAccountMembershipFactory.create(account=account)
+        self.client.force_login(self.user)
+        response = self.client.post(self.get_url(), {"emails": account.email})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context_data["report"].skipped, [account])
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 1)
+        messages = [str(m.message) for m in get_messages(response.wsgi_request)]
+        self.assertEqual(messages, [views.AccountBulkDeactivate.message_already_inactive.format(n=1)])
+
+    def test_invalid_email(self):
+        """No accounts are deactivated if an email does not match an Account."""
+        account = factories.AccountFactory.create()
+        self.client.force_login(self.user)
+        response = self.client.post(self.get_url(), {"emails": "{}\nfoo@example.com".format(account.email)})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context_data["form"].is_valid())
+        self.assertNotIn("report", response.context_data)
+        account.refresh_from_db()
+        self.assertEqual(account.status, account.ACTIVE_STATUS)
+
+
 class AccountReactivateTest(AnVILAPIMockTestMixin, TestCase):
     def setUp(self):
         """Set up test class."""
@@ -5970,6 +6194,22 @@ class ManagedGroupListTest(TestCase):
         """Return the view being tested."""
         return views.ManagedGroupList.as_view()
 
+    def test_num_queries_does_not_depend_on_number_of_rows(self):
+        """The number of queries is the same regardless of how many rows are in the table."""
+        request = self.factory.get(self.get_url())
+        request.user = self.user
+        factories.GroupGroupMembershipFactory.create()
+        # Make a request first so that the user's permissions are cached.
+        self.get_view()(request).render()
+        with CaptureQueriesContext(connection) as small:
+            self.get_view()(request).render()
+        for group in factories.ManagedGroupFactory.create_batch(5):
+            factories.GroupGroupMembershipFactory.create(parent_group=group)
+            factories.GroupAccountMembershipFactory.create(group=group)
+        with CaptureQueriesContext(connection) as large:
+            self.get_view()(request).render()
+        self.assertEqual(len(large), len(small))
+
     def test_view_redirect_not_logged_in(self):
         "View redirects to login view when user is not logged in."
         # Need a client for redirects.
@@ -6675,6 +6915,40 @@ class ManagedGroupVisualizationTest(TestCase):
         with self.assertRaises(PermissionDenied):
             views.ManagedGroupVisualization.as_view()(request)
 
+    def test_layout_is_stable_when_a_group_is_added(self):
+        """Groups that are not affected by a new membership keep their position."""
+        parent = factories.ManagedGroupFactory.create()
+        other_parent = factories.ManagedGroupFactory.create()
+        other_child = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=other_parent, child_group=other_child)
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        layout = response.context_data["view"].graph_layout
+        factories.GroupGroupMembershipFactory.create(parent_group=parent)
+        response = self.client.get(self.get_url())
+        new_layout = response.context_data["view"].graph_layout
+        self.assertEqual(new_layout[other_parent.name], layout[other_parent.name])
+        self.assertEqual(new_layout[other_child.name], layout[other_child.name])
+
+    def test_num_queries_does_not_depend_on_number_of_groups(self):
+        """The number of queries is the same regardless of how many groups there are."""
+        request = self.factory.get(self.get_url())
+        request.user = self.user
+        parent = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent)
+        # Make a request first so that the user's permissions and the graph layout are cached.
+        views.ManagedGroupVisualization.as_view()(request).render()
+        with CaptureQueriesContext(connection) as small:
+            views.ManagedGroupVisualization.as_view()(request).render()
+        for child in factories.ManagedGroupFactory.create_batch(10):
+            factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+            factories.GroupAccountMembershipFactory.create(group=child)
+        # Make another request so that the layout of the changed graph is cached.
+        views.ManagedGroupVisualization.as_view()(request).render()
+        with CaptureQueriesContext(connection) as large:
+            views.ManagedGroupVisualization.as_view()(request).render()
+        self.assertEqual(len(large), len(small))
+
     def test_view_status_code_with_existing_object_not_managed(self):
         """Returns a successful status code for an existing object pk."""
         self.client.force_login(self.user)
@@ -6719,6 +6993,215 @@ class ManagedGroupVisualizationTest(TestCase):
         response = self.client.get(self.get_url())
         self.assertIn("graph", response.context_data)
 
+    def test_form_in_context(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertIn("form", response.context_data)
+        self.assertIsInstance(response.context_data["form"], forms.ManagedGroupVisualizationForm)
+        self.assertFalse(response.context_data["form"].is_bound)
+
+    def test_group_neighborhood(self):
+        """Only groups within the selected depth of the selected group are shown."""
+        grandparent = factories.ManagedGroupFactory.create()
+        parent = factories.ManagedGroupFactory.create()
+        group = factories.ManagedGroupFactory.create()
+        child = factories.ManagedGroupFactory.create()
+        grandchild = factories.ManagedGroupFactory.create()
+        other_group = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=group)
+        factories.GroupGroupMembershipFactory.create(parent_group=group, child_group=child)
+        factories.GroupGroupMembershipFactory.create(parent_group=child, child_group=grandchild)
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url(), {"group": group.pk, "depth": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.context_data["view"].graph.nodes), {parent.name, group.name, child.name})
+        response = self.client.get(self.get_url(), {"group": group.pk})
+        self.assertEqual(response.status_code, 200)
+        nodes = set(response.context_data["view"].graph.nodes)
+        self.assertEqual(nodes, {grandparent.name, parent.name, group.name, child.name, grandchild.name})
+        self.assertNotIn(other_group.name, nodes)
+
+    def test_invalid_group(self):
+        """No groups are shown if the selected group does not exist."""
+        factories.ManagedGroupFactory.create()
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url(), {"group": 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context_data["form"].is_valid())
+        self.assertIn("group", response.context_data["form"].errors)
+        self.assertEqual(len(response.context_data["view"].graph), 0)
+
+    def test_invalid_depth(self):
+        group = factories.ManagedGroupFactory.create()
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url(), {"group": group.pk, "depth": 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("depth", response.context_data["form"].errors)
+        self.assertEqual(len(response.context_data["view"].graph), 0)
+
+    def test_too_many_groups_in_context(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertIn("too_many_groups", response.context_data)
+        self.assertFalse(response.context_data["too_many_groups"])
+
+    @override_settings(ANVIL_GROUP_VISUALIZATION_MAX_GROUPS=2)
+    def test_too_many_groups(self):
+        """No groups are shown by default if there are more groups than the maximum."""
+        factories.ManagedGroupFactory.create_batch(3)
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context_data["too_many_groups"])
+        self.assertEqual(len(response.context_data["view"].graph), 0)
+        self.assertContains(response, "There are too many groups to show at once.")
+
+    @override_settings(ANVIL_GROUP_VISUALIZATION_MAX_GROUPS=2)
+    def test_too_many_groups_does_not_replace_full_graph_layout(self):
+        """The stored layout of all groups is not replaced when too many groups are shown."""
+        factories.ManagedGroupFactory.create_batch(3)
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertIsNone(response.context_data["view"].get_graph_layout_name())
+
+    @override_settings(ANVIL_GROUP_VISUALIZATION_MAX_GROUPS=2)
+    def test_number_of_groups_equal_to_max(self):
+        """All groups are shown if there are exactly the maximum number of groups."""
+        groups = factories.ManagedGroupFactory.create_batch(2)
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertFalse(response.context_data["too_many_groups"])
+        self.assertEqual(set(response.context_data["view"].graph.nodes), {group.name for group in groups})
+        self.assertNotContains(response, "There are too many groups to show at once.")
+
+    @override_settings(ANVIL_GROUP_VISUALIZATION_MAX_GROUPS=2)
+    def test_too_many_groups_with_selected_group(self):
+        """The groups around a selected group are shown even if there are more groups than the maximum."""
+        parent = factories.ManagedGroupFactory.create()
+        group = factories.ManagedGroupFactory.create()
+        factories.ManagedGroupFactory.create_batch(2)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=group)
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url(), {"group": group.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context_data["too_many_groups"])
+        self.assertEqual(set(response.context_data["view"].graph.nodes), {parent.name, group.name})
+
+    @override_settings(ANVIL_GROUP_VISUALIZATION_MAX_GROUPS=None)
+    def test_max_groups_none(self):
+        """All groups are shown if there is no maximum."""
+        groups = factories.ManagedGroupFactory.create_batch(3)
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertFalse(response.context_data["too_many_groups"])
+        self.assertEqual(set(response.context_data["view"].graph.nodes), {group.name for group in groups})
+
+
+class ManagedGroupVisualizationDataTest(TestCase):
+    def setUp(self):
+        """Set up test class."""
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.user.user_permissions.add(
+            Permission.objects.get(codename=models.AnVILProjectManagerAccess.STAFF_VIEW_PERMISSION_CODENAME)
+        )
+
+    def get_url(self, *args):
+        """Get the url for the view being tested."""
+        return reverse("anvil_consortium_manager:managed_groups:visualization_data", args=args)
+
+    def test_view_redirect_not_logged_in(self):
+        "View redirects to login view when user is not logged in."
+        response = self.client.get(self.get_url())
+        self.assertRedirects(response, resolve_url(settings.LOGIN_URL) + "?next=" + self.get_url())
+
+    def test_access_with_limited_view_permission(self):
+        """Raises permission denied if user has limited view permission."""
+        user = User.objects.create_user(username="test-limited", password="test-limited")
+        user.user_permissions.add(
+            Permission.objects.get(codename=models.AnVILProjectManagerAccess.VIEW_PERMISSION_CODENAME)
+        )
+        request = self.factory.get(self.get_url())
+        request.user = user
+        with self.assertRaises(PermissionDenied):
+            views.ManagedGroupVisualizationData.as_view()(request)
+
+    def test_no_groups(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"nodes": [], "n_groups": [], "n_accounts": [], "x": [], "y": [], "edges": {"MEMBER": [], "ADMIN": []}},
+        )
+
+    def test_all_groups(self):
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        child = factories.ManagedGroupFactory.create(name="child")
+        admin = factories.ManagedGroupFactory.create(name="admin")
+        factories.ManagedGroupFactory.create(name="other")
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        factories.GroupGroupMembershipFactory.create(
+            parent_group=parent, child_group=admin, role=models.GroupGroupMembership.RoleChoices.ADMIN
+        )
+        factories.GroupAccountMembershipFactory.create(group=child)
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        nodes = data["nodes"]
+        self.assertEqual(set(nodes), {"parent", "child", "admin", "other"})
+        self.assertEqual(data["n_groups"][nodes.index("parent")], 2)
+        self.assertEqual(data["n_accounts"][nodes.index("child")], 1)
+        self.assertEqual(len(data["x"]), 4)
+        self.assertEqual(len(data["y"]), 4)
+        self.assertEqual(data["edges"]["MEMBER"], [nodes.index("parent"), nodes.index("child")])
+        self.assertEqual(data["edges"]["ADMIN"], [nodes.index("parent"), nodes.index("admin")])
+
+    @override_settings(ANVIL_GROUP_VISUALIZATION_MAX_GROUPS=1)
+    def test_all_groups_more_than_max_groups(self):
+        """All groups are returned regardless of ANVIL_GROUP_VISUALIZATION_MAX_GROUPS."""
+        factories.ManagedGroupFactory.create(name="g1")
+        factories.ManagedGroupFactory.create(name="g2")
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["nodes"]), {"g1", "g2"})
+
+    def test_group_neighborhood(self):
+        grandparent = factories.ManagedGroupFactory.create(name="grandparent")
+        parent = factories.ManagedGroupFactory.create(name="parent")
+        group = factories.ManagedGroupFactory.create(name="group")
+        factories.ManagedGroupFactory.create(name="other")
+        factories.GroupGroupMembershipFactory.create(parent_group=grandparent, child_group=parent)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=group)
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url(), {"group": group.pk, "depth": 1})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(set(data["nodes"]), {"parent", "group"})
+        self.assertEqual(data["edges"]["MEMBER"], [data["nodes"].index("parent"), data["nodes"].index("group")])
+
+    def test_layout_matches_visualization(self):
+        """The layout is the same as the one used by the ManagedGroupVisualization view."""
+        parent = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("anvil_consortium_manager:managed_groups:visualization"))
+        layout = response.context_data["view"].graph_layout
+        data = self.client.get(self.get_url()).json()
+        for node, x, y in zip(data["nodes"], data["x"], data["y"]):
+            self.assertEqual((x, y), layout[node])
+
+    def test_invalid(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url(), {"group": 0, "depth": "foo"})
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["errors"]
+        self.assertIn("group", errors)
+        self.assertIn("depth", errors)
+
 
 class WorkspaceLandingPageTest(TestCase):
     def setUp(self):
@@ -13483,6 +13966,21 @@ class WorkspaceListTest(TestCase):
         """Return the view being tested."""
         return views.WorkspaceList.as_view()
 
+    def test_num_queries_does_not_depend_on_number_of_rows(self):
+        """The number of queries is the same regardless of how many rows are in the table."""
+        request = self.factory.get(self.get_url())
+        request.user = self.staff_view_user
+        factories.WorkspaceGroupSharingFactory.create()
+        # Make a request first so that the user's permissions are cached.
+        self.get_view()(request).render()
+        with CaptureQueriesContext(connection) as small:
+            self.get_view()(request).render()
+        for workspace in factories.WorkspaceFactory.create_batch(5):
+            factories.WorkspaceGroupSharingFactory.create(workspace=workspace)
+        with CaptureQueriesContext(connection) as large:
+            self.get_view()(request).render()
+        self.assertEqual(len(large), len(small))
+
     def test_view_redirect_not_logged_in(self):
         "View redirects to login view when user is not logged in."
         # Need a client for redirects.
@@ -13652,6 +14150,21 @@ class WorkspaceListByTypeTest(TestCase):
         """Return the view being tested."""
         return views.WorkspaceListByType.as_view()
 
+    def test_num_queries_does_not_depend_on_number_of_rows(self):
+        """The number of queries is the same regardless of how many rows are in the table."""
+        request = self.factory.get(self.get_url(self.workspace_type))
+        request.user = self.staff_view_user
+        factories.WorkspaceGroupSharingFactory.create(workspace__workspace_type=self.workspace_type)
+        # Make a request first so that the user's permissions are cached.
+        self.get_view()(request, workspace_type=self.workspace_type).render()
+        with CaptureQueriesContext(connection) as small:
+            self.get_view()(request, workspace_type=self.workspace_type).render()
+        for workspace in factories.WorkspaceFactory.create_batch(5, workspace_type=self.workspace_type):
+            factories.WorkspaceGroupSharingFactory.create(workspace=workspace)
+        with CaptureQueriesContext(connection) as large:
+            self.get_view()(request, workspace_type=self.workspace_type).render()
+        self.assertEqual(len(large), len(small))
+
     def test_view_redirect_not_logged_in(self):
         "View redirects to login view when user is not logged in."
         # Need a client for redirects.
@@ -17322,6 +17835,169 @@ class GroupAccountMembershipDetailTest(TestCase):
         self.assertContains(response, html)
 
 
+class GroupAccountMembershipBulkUpdateTest(AnVILAPIMockTestMixin, TestCase):
+    def setUp(self):
+        """Set up test class."""
+        super().setUp()
+        self.factory = RequestFactory()
+        # Create a user with both view and edit permissions.
+        self.user = User.objects.create_user(username="test", password="test")
+        self.user.user_permissions.add(
+            Permission.objects.get(codename=models.AnVILProjectManagerAccess.STAFF_VIEW_PERMISSION_CODENAME)
+        )
+        self.user.user_permissions.add(
+            Permission.objects.get(codename=models.AnVILProjectManagerAccess.STAFF_EDIT_PERMISSION_CODENAME)
+        )
+
+    def get_url(self, *args):
+        """Get the url for the view being tested."""
+        return reverse("anvil_consortium_manager:group_account_membership:bulk", args=args)
+
+    def get_view(self):
+        """Return the view being tested."""
+        return views.GroupAccountMembershipBulkUpdate.as_view()
+
+    def get_api_url(self, group_name, role, account_email):
+        return self.api_client.sam_entry_point + "/api/groups/v1/" + group_name + "/" + role + "/" + account_email
+
+    def test_view_redirect_not_logged_in(self):
+        "View redirects to login view when user is not logged in."
+        response = self.client.get(self.get_url())
+        self.assertRedirects(response, resolve_url(settings.LOGIN_URL) + "?next=" + self.get_url())
+
+    def test_status_code_with_user_permission(self):
+        """Returns successful response code."""
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, 200)
+
+    def test_access_with_view_permission(self):
+        """Raises permission denied if user has only view permission."""
+        user_with_view_perm = User.objects.create_user(username="test-other", password="test-other")
+        user_with_view_perm.user_permissions.add(
+            Permission.objects.get(codename=models.AnVILProjectManagerAccess.STAFF_VIEW_PERMISSION_CODENAME)
+        )
+        request = self.factory.get(self.get_url())
+        request.user = user_with_view_perm
+        with self.assertRaises(PermissionDenied):
+            self.get_view()(request)
+
+    def test_access_without_user_permission(self):
+        """Raises permission denied if user has no permissions."""
+        user_no_perms = User.objects.create_user(username="test-none", password="test-none")
+        request = self.factory.get(self.get_url())
+        request.user = user_no_perms
+        with self.assertRaises(PermissionDenied):
+            self.get_view()(request)
+
+    def test_has_form_in_context(self):
+        """Response includes a form."""
+        self.client.force_login(self.user)
+        response = self.client.get(self.get_url())
+        self.assertIsInstance(response.context_data["form"], forms.GroupAccountMembershipBulkForm)
+        self.assertNotIn("results", response.context_data)
+
+    def test_add(self):
+        """Posting valid data adds the accounts to the groups on AnVIL and in the app."""
+        groups = factories.ManagedGroupFactory.create_batch(2)
+        accounts = factories.AccountFactory.create_batch(2)
+        for group in groups:
+            for account in accounts:
+                self.anvil_response_mock.add(
+                    responses.PUT, self.get_api_url(group.name, "member", account.email), status=204
+                )
+        self.client.force_login(self.user)
+        response = self.client.post(
+            self.get_url(),
+            {
+                "action": "add",
+                "groups": [group.pk for group in groups],
+                "role": models.GroupAccountMembership.RoleChoices.MEMBER,
+                "emails": "\n".join(account.email for account in accounts),
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context_data["results"]), 4)
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 4)
+        messages = [str(m.message) for m in get_messages(response.wsgi_request)]
+        self.assertEqual(messages, [views.GroupAccountMembershipBulkUpdate.success_message_add.format(n=4)])
+
+    def test_add_api_error(self):
+        """Memberships that fail on AnVIL are reported and not created."""
+        group = factories.ManagedGroupFactory.create()
+        accounts = factories.AccountFactory.create_batch(2)
+        self.anvil_response_mock.add(
+            responses.PUT, self.get_api_url(group.name, "member", accounts[0].email), status=204
+        )
+        self.anvil_response_mock.add(
+            responses.PUT,
+            self.get_api_url(group.name, "member", accounts[1].email),
+            status=500,
+            json={"message": "membership test error"},
+        )
+        self.client.force_login(self.user)
+        response = self.client.post(
+            self.get_url(),
+            {
+                "action": "add",
+                "groups": [group.pk],
+                "role": models.GroupAccountMembership.RoleChoices.MEMBER,
+                "emails": "\n".join(account.email for account in accounts),
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "membership test error")
+        self.assertEqual(models.GroupAccountMembership.objects.get().account, accounts[0])
+        messages = [str(m.message) for m in get_messages(response.wsgi_request)]
+        self.assertEqual(len(messages), 2)
+        self.assertIn(views.GroupAccountMembershipBulkUpdate.message_api_errors.format(n=1), messages)
+
+    def test_add_invalid_no_api_calls(self):
+        """No API calls are made if any membership is invalid."""
+        group = factories.ManagedGroupFactory.create()
+        accounts = factories.AccountFactory.create_batch(2)
+        factories.GroupAccountMembershipFactory.create(group=group, account=accounts[0])
+        self.client.force_login(self.user)
+        response = self.client.post(
+            self.get_url(),
+            {
+                "action": "add",
+                "groups": [group.pk],
+                "role": models.GroupAccountMembership.RoleChoices.MEMBER,
+                "emails": "\n".join(account.email for account in accounts),
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context_data["form"].is_valid())
+        self.assertNotIn("results", response.context_data)
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 1)
+
+    def test_remove(self):
+        """Posting valid data removes the accounts from the groups on AnVIL and in the app."""
+        memberships = factories.GroupAccountMembershipFactory.create_batch(2, group__name="test-group")
+        group = memberships[0].group
+        factories.GroupAccountMembershipFactory.create(group=group)
+        for membership in memberships:
+            self.anvil_response_mock.add(
+                responses.DELETE, self.get_api_url(group.name, "member", membership.account.email), status=204
+            )
+        self.client.force_login(self.user)
+        response = self.client.post(
+            self.get_url(),
+            {
+                "action": "remove",
+                "groups": [group.pk],
+                "role": models.GroupAccountMembership.RoleChoices.MEMBER,
+                "emails": "\n".join(membership.account.email for membership in memberships),
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context_data["results"]), 2)
+        self.assertEqual(models.GroupAccountMembership.objects.count(), 1)
+        messages = [str(m.message) for m in get_messages(response.wsgi_request)]
+        self.assertEqual(messages, [views.GroupAccountMembershipBulkUpdate.success_message_remove.format(n=2)])
+
+
 class GroupAccountMembershipCreateTest(AnVILAPIMockTestMixin, TestCase):
     api_success_code = 204
 
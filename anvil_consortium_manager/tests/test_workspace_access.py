@@ -0,0 +1,218 @@
+"""Tests for the `workspace_access` module."""
+
+from django.test import override_settings
+
+from .. import exceptions
+from ..models import Account, ManagedGroupClosure, Workspace, WorkspaceGroupSharing
+from ..workspace_access import WorkspaceAccessEvaluator
+from . import factories
+from .utils import TestCase
+
+
+class WorkspaceAccessEvaluatorTest(TestCase):
+    """Tests for the WorkspaceAccessEvaluator class."""
+
+    def get_expected_access(self, account, workspace):
+        """Return the access for one pair as computed by Workspace.is_accessible_by_account."""
+        try:
+            return workspace.is_accessible_by_account(account)
+        except (exceptions.AnVILNotWorkspaceOwnerError, exceptions.WorkspaceAccessUnknownError) as e:
+            return e
+
+    def assertAccessEqual(self, access, expected):
+        """Assert that two access values are equal, comparing exceptions by type and message."""
+        if isinstance(expected, Exception):
+            self.assertIs(type(access), type(expected))
+            self.assertEqual(str(access), str(expected))
+        else:
+            self.assertIs(access, expected)
+
+    def test_no_accounts_or_workspaces(self):
+        self.assertEqual(WorkspaceAccessEvaluator().evaluate(), {})
+
+    def test_not_shared(self):
+        account = factories.AccountFactory.create()
+        workspace = factories.WorkspaceFactory.create()
+        access = WorkspaceAccessEvaluator().evaluate()
+        self.assertEqual(access, {(account.pk, workspace.pk): False})
+
+    def test_shared_with_account_group(self):
+        account = factories.AccountFactory.create()
+        workspace = factories.WorkspaceFactory.create()
+        group = factories.ManagedGroupFactory.create()
+        factories.GroupAccountMembershipFactory.create(account=account, group=group)
+        factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=group)
+        access = WorkspaceAccessEvaluator().evaluate()
+        self.assertEqual(access, {(account.pk, workspace.pk): True})
+
+    def test_shared_with_parent_group(self):
+        account = factories.AccountFactory.create()
+        workspace = factories.WorkspaceFactory.create()
+        parent = factories.ManagedGroupFactory.create()
+        child = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        factories.GroupAccountMembershipFactory.create(account=account, group=child)
+        factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=parent)
+        access = WorkspaceAccessEvaluator().evaluate()
+        self.assertEqual(access, {(account.pk, workspace.pk): True})
+
+    def test_not_owner(self):
+        account = factories.AccountFactory.create()
+        workspace = factories.WorkspaceFactory.create(app_access=Workspace.AppAccessChoices.LIMITED)
+        access = WorkspaceAccessEvaluator().evaluate()
+        self.assertIsInstance(access[(account.pk, workspace.pk)], exceptions.AnVILNotWorkspaceOwnerError)
+
+    def test_matches_is_accessible_by_account(self):
+        """The evaluator gives the same answer as is_accessible_by_account for all combinations."""
+        managed_group = factories.ManagedGroupFactory.create()
+        other_managed_group = factories.ManagedGroupFactory.create()
+        unmanaged_group = factories.ManagedGroupFactory.create(is_managed_by_app=False)
+        parent_group = factories.ManagedGroupFactory.create()
+        factories.GroupGroupMembershipFactory.create(parent_group=parent_group, child_group=managed_group)
+        groups = [managed_group, other_managed_group, unmanaged_group, parent_group]
+        # Accounts in different combinations of groups.
+        accounts = [
+            factories.AccountFactory.create(),
+            factories.AccountFactory.create(),
+            factories.AccountFactory.create(),
+            factories.AccountFactory.create(),
+        ]
+        factories.GroupAccountMembershipFactory.create(account=accounts[1], group=managed_group)
+        factories.GroupAccountMembershipFactory.create(account=accounts[2], group=other_managed_group)
+        factories.GroupAccountMembershipFactory.create(account=accounts[3], group=managed_group)
+        factories.GroupAccountMembershipFactory.create(account=accounts[3], group=unmanaged_group)
+        # Workspaces with each combination of sharing and auth domains.
+        for app_access in (Workspace.AppAccessChoices.OWNER, Workspace.AppAccessChoices.LIMITED):
+            for shared_with in [[]] + [[group] for group in groups] + [[other_managed_group, unmanaged_group]]:
+                for auth_domains in [[], [parent_group], [other_managed_group], [unmanaged_group]]:
+                    workspace = factories.WorkspaceFactory.create(app_access=app_access)
+                    for group in shared_with:
+                        factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=group)
+                    for group in auth_domains:
+                        factories.WorkspaceAuthorizationDomainFactory.create(workspace=workspace, group=group)
+        access = WorkspaceAccessEvaluator().evaluate()
+        self.assertEqual(len(access), len(accounts) * Workspace.objects.count())
+        for account in Account.objects.all():
+            for workspace in Workspace.objects.all():
+                with self.subTest(account=account, workspace=workspace):
+                    self.assertAccessEqual(
+                        access[(account.pk, workspace.pk)], self.get_expected_access(account, workspace)
+                    )
+        # Make sure all possible states were checked.
+        states = set(value if isinstance(value, bool) else type(value) for value in access.values())
+        self.assertEqual(
+            states,
+            {
+                True,
+                False,
+                exceptions.AnVILNotWorkspaceOwnerError,
+                exceptions.WorkspaceAccessUnknownError,
+                exceptions.WorkspaceAccessSharingUnknownError,
+                exceptions.WorkspaceAccessAuthorizationDomainUnknownError,
+            },
+        )
+
+    def test_subset_of_accounts_and_workspaces(self):
+        group = factories.ManagedGroupFactory.create()
+        account = factories.AccountFactory.create()
+        other_account = factories.AccountFactory.create()
+        workspace = factories.WorkspaceFactory.create()
+        other_workspace = factories.WorkspaceFactory.create()
+        factories.GroupAccountMembershipFactory.create(account=account, group=group)
+        factories.GroupAccountMembershipFactory.create(account=other_account, group=group)
+        factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=group)
+        factories.WorkspaceGroupSharingFactory.create(workspace=other_workspace, group=group)
+        evaluator = WorkspaceAccessEvaluator(
+            accounts=Account.objects.filter(pk=account.pk), workspaces=Workspace.objects.filter(pk=workspace.pk)
+        )
+        self.assertEqual(evaluator.evaluate(), {(account.pk, workspace.pk): True})
+
+    def test_evaluate_account(self):
+        group = factories.ManagedGroupFactory.create()
+        account = factories.AccountFactory.create()
+        workspace = factories.WorkspaceFactory.create()
+        other_workspace = factories.WorkspaceFactory.create()
+        factories.GroupAccountMembershipFactory.create(account=account, group=group)
+        factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=group)
+        evaluator = WorkspaceAccessEvaluator()
+        self.assertEqual(evaluator.evaluate_account(account), {workspace.pk: True, other_workspace.pk: False})
+
+    def test_account_groups(self):
+        """Uses account_groups if specified instead of looking up the groups of each account."""
+        group = factories.ManagedGroupFactory.create()
+        other_group = factories.ManagedGroupFactory.create()
+        account = factories.AccountFactory.create()
+        workspace = factories.WorkspaceFactory.create()
+        factories.GroupAccountMembershipFactory.create(account=account, group=group)
+        factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=group)
+        with self.assertNumQueries(5):
+            evaluator = WorkspaceAccessEvaluator(account_groups={account.pk: {other_group.pk}})
+        self.assertEqual(evaluator.evaluate(), {(account.pk, workspace.pk): False})
+        evaluator = WorkspaceAccessEvaluator(account_groups={account.pk: {group.pk}})
+        self.assertEqual(evaluator.evaluate(), {(account.pk, workspace.pk): True})
+
+    def test_iter_evaluate(self):
+        accounts = factories.AccountFactory.create_batch(2)
+        workspace = factories.WorkspaceFactory.create()
+        results = list(WorkspaceAccessEvaluator().iter_evaluate())
+        self.assertEqual(results, [(accounts[0], {workspace.pk: False}), (accounts[1], {workspace.pk: False})])
+
+    def test_get_sharing_level(self):
+        account = factories.AccountFactory.create()
+        workspace = factories.WorkspaceFactory.create()
+        reader_group = factories.ManagedGroupFactory.create()
+        writer_group = factories.ManagedGroupFactory.create()
+        other_group = factories.ManagedGroupFactory.create()
+        factories.GroupAccountMembershipFactory.create(account=account, group=reader_group)
+        factories.GroupAccountMembershipFactory.create(account=account, group=writer_group)
+        factories.WorkspaceGroupSharingFactory.create(
+            workspace=workspace, group=reader_group, access=WorkspaceGroupSharing.READER
+        )
+        factories.WorkspaceGroupSharingFactory.create(
+            workspace=workspace, group=writer_group, access=WorkspaceGroupSharing.WRITER, can_compute=True
+        )
+        factories.WorkspaceGroupSharingFactory.create(
+            workspace=workspace, group=other_group, access=WorkspaceGroupSharing.OWNER
+        )
+        evaluator = WorkspaceAccessEvaluator()
+        self.assertEqual(evaluator.get_sharing_level(account, workspace), (WorkspaceGroupSharing.WRITER, True))
+
+    def test_get_sharing_level_not_shared(self):
+        account = factories.AccountFactory.create()
+        workspace = factories.WorkspaceFactory.create()
+        evaluator = WorkspaceAccessEvaluator()
+        self.assertEqual(evaluator.get_sharing_level(account, workspace), (None, False))
+
+    def test_num_queries(self):
+        """The number of queries does not depend on the number of accounts or workspaces."""
+        groups = factories.ManagedGroupFactory.create_batch(3)
+        factories.GroupGroupMembershipFactory.create(parent_group=groups[0], child_group=groups[1])
+        for account in factories.AccountFactory.create_batch(5):
+            factories.GroupAccountMembershipFactory.create(account=account, group=groups[1])
+        for workspace in factories.WorkspaceFactory.create_batch(5):
+            factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=groups[0])
+            factories.WorkspaceAuthorizationDomainFactory.create(workspace=workspace, group=groups[2])
+        with self.assertNumQueries(7):
+            access = WorkspaceAccessEvaluator().evaluate()
+        self.assertEqual(len(access), 25)
+
+
+@override_settings(ANVIL_GROUP_HIERARCHY_BACKEND="cte")
+class WorkspaceAccessEvaluatorCTETest(WorkspaceAccessEvaluatorTest):
+    """Tests for the WorkspaceAccessEvaluator class with the recursive query group hierarchy backend."""
+
+    def test_does_not_use_closure(self):
+        account = factories.AccountFactory.create()
+        parent = factories.ManagedGroupFactory.create()
+        child = factories.ManagedGroupFactory.create()
+        factories.GroupAccountMembershipFactory.create(account=account, group=child)
+        factories.GroupGroupMembershipFactory.create(parent_group=parent, child_group=child)
+        workspace = factories.WorkspaceFactory.create()
+        factories.WorkspaceGroupSharingFactory.create(workspace=workspace, group=parent)
+        ManagedGroupClosure.objects.all().delete()
+        self.assertIs(WorkspaceAccessEvaluator().evaluate()[(account.pk, workspace.pk)], True)
+
+    def test_no_accounts_selected(self):
+        factories.WorkspaceGroupSharingFactory.create()
+        evaluator = WorkspaceAccessEvaluator(accounts=Account.objects.none())
+        self.assertEqual(evaluator.evaluate(), {})
@@ -33,6 +33,11 @@ account_patterns = (
             views.AccountDeactivate.as_view(),
             name="deactivate",
         ),
+        path(
+            "bulk_deactivate/",
+            views.AccountBulkDeactivate.as_view(),
+            name="bulk_deactivate",
+        ),
         path(
             "<uuid:uuid>/reactivate/",
             views.AccountReactivate.as_view(),
@@ -135,6 +140,11 @@ managed_group_patterns = (
             views.ManagedGroupVisualization.as_view(),
             name="visualization",
         ),
+        path(
+            "visualization/data/",
+            views.ManagedGroupVisualizationData.as_view(),
+            name="visualization_data",
+        ),
         path("<slug:slug>/", views.ManagedGroupDetail.as_view(), name="detail"),
         path("<slug:slug>/delete", views.ManagedGroupDelete.as_view(), name="delete"),
         path("<slug:parent_group_slug>/member_groups/", include(member_group_patterns)),
@@ -259,6 +269,7 @@ group_account_membership_patterns = (
     [
         # Note: these URLs will be removed and/or reworked in the future.
         path("new/", views.GroupAccountMembershipCreate.as_view(), name="new"),
+        path("bulk/", views.GroupAccountMembershipBulkUpdate.as_view(), name="bulk"),
         path("all/", views.GroupAccountMembershipList.as_view(), name="list"),
         path(
             "active/",
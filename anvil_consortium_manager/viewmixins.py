@@ -1,6 +1,3 @@
-import math
-
-import networkx as nx
 import numpy as np
 import plotly
 import plotly.graph_objects as go
@@ -11,7 +8,7 @@ from django.utils.translation import gettext_lazy as _
 from django.views.generic.base import ContextMixin
 from django.views.generic.detail import SingleObjectMixin
 
-from . import models
+from . import graph_layout, models
 from .adapters.account import get_account_adapter
 from .adapters.managed_group import get_managed_group_adapter
 from .adapters.workspace import workspace_adapter_registry
@@ -51,13 +48,66 @@ class ManagedGroupGraphMixin:
         """Return a graph of the group structure."""
         raise NotImplementedError("You must override get_graph.")
 
+    graph_layout_name = None
+    """Name under which the last layout of the graph is stored, so that later layouts stay close to it."""
+
+    def get_graph_layout_name(self):
+        """Return the name under which the last layout of the graph is stored."""
+        return self.graph_layout_name
+
     def layout_graph(self):
-        """Lay out the nodes in the graph."""
-        # Networkx layout that requires graphviz:
-        # self.graph_layout = nx.drawing.nx_agraph.graphviz_layout(self.graph, prog="neato")
-        # Networkx layout that requires scipy:
-        # self.graph_layout = nx.kamada_kawai_layout(self.graph)
-        self.graph_layout = nx.spring_layout(self.graph)
+        """Lay out the nodes in the graph, using a cached layout if the graph has not changed."""
+        self.graph_layout = graph_layout.get_layout(self.graph, name=self.get_graph_layout_name())
+
+    @staticmethod
+    def _get_edge_coordinates(positions, edges):
+        """Return arrays of x and y coordinates to draw edges as a single line trace.
+
+        Args:
+            positions (numpy.ndarray): An (n_nodes, 2) array of node positions.
+            edges (numpy.ndarray): An (n_edges, 2) array of the indices of the start and end node of each edge.
+
+        Returns:
+            tuple: Arrays of x and y coordinates, with the start and end of each edge followed by a NaN gap.
+        """
+        coordinates = np.full((len(edges), 3, 2), np.nan)
+        coordinates[:, 0] = positions[edges[:, 0]]
+        coordinates[:, 1] = positions[edges[:, 1]]
+        coordinates = coordinates.reshape(-1, 2)
+        return coordinates[:, 0], coordinates[:, 1]
+
+    def _get_graph_arrays(self):
+        """Return the nodes of the graph with their positions, and the edges of each role as arrays of node indices.
+
+        Returns:
+            tuple: A tuple of (nodes, positions, edges), where ``nodes`` is a list of node names, ``positions`` is an
+                (n_nodes, 2) array of node positions, and ``edges`` is a dictionary of (n_edges, 2) arrays of the
+                indices of the parent and child of each edge, keyed by role.
+        """
+        nodes = list(self.graph.nodes)
+        node_index = {node: i for i, node in enumerate(nodes)}
+        positions = np.array([self.graph_layout[node] for node in nodes], dtype=float).reshape(-1, 2)
+        edges = {role: [] for role in models.GroupGroupMembership.RoleChoices.values}
+        for u, v, e in self.graph.edges(data=True):
+            edges[e["role"]].append((node_index[u], node_index[v]))
+        edges = {role: np.array(role_edges, dtype=int).reshape(-1, 2) for role, role_edges in edges.items()}
+        return nodes, positions, edges
+
+    def get_graph_data(self):
+        """Return the graph and its layout as compact arrays that can be serialized to JSON.
+
+        Nodes are identified by their index in the ``nodes`` array. The edges for each role are a flat array of
+        parent and child indices, i.e., ``[parent_0, child_0, parent_1, child_1, ...]``.
+        """
+        nodes, positions, edges = self._get_graph_arrays()
+        return {
+            "nodes": nodes,
+            "n_groups": [self.graph.nodes[node]["n_groups"] for node in nodes],
+            "n_accounts": [self.graph.nodes[node]["n_accounts"] for node in nodes],
+            "x": positions[:, 0].tolist(),
+            "y": positions[:, 1].tolist(),
+            "edges": {role: role_edges.ravel().tolist() for role, role_edges in edges.items()},
+        }
 
     def plot_graph(self):
         """Create a plotly figure of the graph."""
@@ -82,40 +132,23 @@ class ManagedGroupGraphMixin:
         fig = go.Figure(layout=layout)
 
         if self.graph:
-            # Group nodes as points.
-            node_x = []
-            node_y = []
-            node_labels = []
-            node_annotations = []
-            node_color = []
-            for node, d in self.graph.nodes(data=True):
-                x, y = self.graph_layout[node]
-                node_x.append(x)
-                node_y.append(y)
-                node_labels.append(
-                    node + "<br>Number of groups: {}<br>Number of accounts: {}".format(d["n_groups"], d["n_accounts"])
-                )
-                node_annotations.append(
-                    go.layout.Annotation(
-                        dict(
-                            x=x,
-                            y=y,
-                            xref="x",
-                            yref="y",
-                            text=node,
-                            arrowhead=0,
-                            arrowcolor="#ccc",
-                        )
-                    )
-                )
-                node_color.append(math.log10(max(1, d["n_groups"] + d["n_accounts"])))
+            # Group nodes as points, labeled with the group name.
+            nodes, positions, edges = self._get_graph_arrays()
+            node_data = [self.graph.nodes[node] for node in nodes]
+            node_labels = [
+                node + "<br>Number of groups: {}<br>Number of accounts: {}".format(d["n_groups"], d["n_accounts"])
+                for node, d in zip(nodes, node_data)
+            ]
+            n_members = np.array([d["n_groups"] + d["n_accounts"] for d in node_data])
+            node_color = np.log10(np.maximum(1, n_members))
 
             node_trace = go.Scatter(
-                x=node_x,
-                y=node_y,
-                mode="markers",
+                x=positions[:, 0],
+                y=positions[:, 1],
+                mode="markers+text",
                 hoverinfo="text",
-                text=node_labels,
+                text=nodes,
+                hovertext=node_labels,
                 textposition="top center",
                 marker=dict(
                     color=node_color,
@@ -143,27 +176,13 @@ class ManagedGroupGraphMixin:
             fig.add_trace(node_trace)
 
             # Group memberships as lines.
-            edge_x_member = []
-            edge_y_member = []
-            edge_x_admin = []
-            edge_y_admin = []
-            for u, v, e in self.graph.edges(data=True):
-                # Ignore direction.
-                x1, y1 = self.graph_layout[v]
-                x0, y0 = self.graph_layout[u]
-                if e["role"] == models.GroupGroupMembership.RoleChoices.MEMBER:
-                    edge_x = edge_x_member
-                    edge_y = edge_y_member
-                elif e["role"] == models.GroupGroupMembership.RoleChoices.ADMIN:
-                    edge_x = edge_x_admin
-                    edge_y = edge_y_admin
-                    # Reverse order so arrows go from child to parent instead of parent to child.
-                edge_x.append(x1)
-                edge_x.append(x0)
-                edge_x.append(None)
-                edge_y.append(y1)
-                edge_y.append(y0)
-                edge_y.append(None)
+            # Start each line at the child so arrows go from child to parent instead of parent to child.
+            edge_x_member, edge_y_member = self._get_edge_coordinates(
+                positions, edges[models.GroupGroupMembership.RoleChoices.MEMBER][:, ::-1]
+            )
+            edge_x_admin, edge_y_admin = self._get_edge_coordinates(
+                positions, edges[models.GroupGroupMembership.RoleChoices.ADMIN][:, ::-1]
+            )
 
             # Member relationships.
             edge_trace_member = go.Scatter(
@@ -197,9 +216,7 @@ class ManagedGroupGraphMixin:
             )
             fig.add_trace(edge_trace_admin)
 
-            # Add group names as annotations.
             fig.update_layout(
-                {"annotations": node_annotations},
                 margin=dict(l=20, r=20, t=50, b=20),
                 plot_bgcolor="#eee",
             )
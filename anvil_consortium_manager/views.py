@@ -1,5 +1,6 @@
 import logging
 
+import networkx as nx
 from dal import autocomplete
 from django.conf import settings
 from django.contrib import messages
@@ -9,7 +10,7 @@ from django.core.mail import mail_admins
 from django.db import transaction
 from django.db.models import ProtectedError, Q, RestrictedError
 from django.forms import Form, HiddenInput, inlineformset_factory
-from django.http import Http404, HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
@@ -19,11 +20,24 @@ from django.views.generic.detail import SingleObjectMixin
 from django_filters.views import FilterView
 from django_tables2 import SingleTableMixin, SingleTableView
 
-from . import __version__, anvil_api, auth, exceptions, filters, forms, models, tables, viewmixins
+from . import (
+    __version__,
+    anvil_api,
+    app_settings,
+    auth,
+    exceptions,
+    filters,
+    forms,
+    graph_layout,
+    models,
+    tables,
+    viewmixins,
+)
 from .adapters.account import get_account_adapter
 from .adapters.workspace import workspace_adapter_registry
 from .anvil_api import AnVILAPIClient, AnVILAPIError
 from .tokens import account_verification_token
+from .workspace_access import WorkspaceAccessEvaluator
 
 logger = logging.getLogger(__name__)
 
@@ -157,6 +171,9 @@ class BillingProjectList(auth.AnVILConsortiumManagerStaffViewRequired, SingleTab
 
     filterset_class = filters.BillingProjectListFilter
 
+    def get_queryset(self):
+        return super().get_queryset().annotate_workspace_counts()
+
 
 class BillingProjectAutocomplete(auth.AnVILConsortiumManagerStaffViewRequired, autocomplete.Select2QuerySetView):
     """View to provide autocompletion for BillingProjects. Only billing project where the app is a user are included."""
@@ -193,55 +210,70 @@ class AccountDetail(
         except AttributeError:
             context["user_detail_link"] = None
         context["group_table"] = tables.GroupAccountMembershipStaffTable(
-            self.object.groupaccountmembership_set.all(),
+            self.object.groupaccountmembership_set.select_related("group", "account"),
             exclude=["account", "is_service_account"],
         )
 
         all_account_groups = self.object.get_all_groups()
 
-        # Get a list of all workspaces.
-        # For each workspace, check if it's accessible to the account.
-        # Put unknown workspaces into their own array.
+        # Get a list of all workspaces that are shared with the account's groups or with groups not managed by the
+        # app. Check whether each one is accessible to the account with an evaluator, which loads everything else it
+        # needs in a fixed number of queries. Put unknown workspaces into their own array.
+        workspaces = (
+            models.Workspace.objects.filter(
+                Q(workspacegroupsharing__group__in=all_account_groups)
+                | Q(workspacegroupsharing__group__is_managed_by_app=False)
+            )
+            .distinct()
+            .select_related("billing_project")
+        )
+        evaluator = WorkspaceAccessEvaluator(
+            accounts=models.Account.objects.filter(pk=self.object.pk),
+            workspaces=workspaces,
+            account_groups={self.object.pk: {group.pk for group in all_account_groups}},
+        )
+        access = evaluator.evaluate_account(self.object)
         accessible_workspaces = []
         unknown_workspaces = []
-        for workspace in models.Workspace.objects.filter(
-            Q(workspacegroupsharing__group__in=all_account_groups)
-            | Q(workspacegroupsharing__group__is_managed_by_app=False)
-        ):
-            try:
-                if workspace.is_accessible_by_account(self.object, all_account_groups=all_account_groups):
-                    accessible_workspaces.append(workspace)
-                else:
-                    pass
+        for workspace in evaluator.workspaces:
+            workspace_access = access[workspace.pk]
+            if workspace_access is True:
+                accessible_workspaces.append(workspace)
+            elif workspace_access is False:
+                pass
             # Determine why access is not known, and add fields to be used in the table later.
-            except exceptions.AnVILNotWorkspaceOwnerError:
+            elif isinstance(workspace_access, exceptions.AnVILNotWorkspaceOwnerError):
                 # This means that the app can't determine workspace access because the account is not the owner.
                 workspace.sharing_known = None
                 workspace.auth_domain_known = None
                 workspace.owned_by_app = False
                 unknown_workspaces.append(workspace)
-            except exceptions.WorkspaceAccessSharingUnknownError:
+            elif isinstance(workspace_access, exceptions.WorkspaceAccessSharingUnknownError):
                 # This means that the app can't determine workspace access due to sharing.
                 workspace.sharing_known = False
                 workspace.auth_domain_known = True
                 workspace.owned_by_app = True
                 unknown_workspaces.append(workspace)
-            except exceptions.WorkspaceAccessAuthorizationDomainUnknownError:
+            elif isinstance(workspace_access, exceptions.WorkspaceAccessAuthorizationDomainUnknownError):
                 # This means that the app can't determine workspace access due to auth domain membership.
                 workspace.sharing_known = True
                 workspace.auth_domain_known = False
                 workspace.owned_by_app = True
                 unknown_workspaces.append(workspace)
-            except exceptions.WorkspaceAccessUnknownError:
+            else:
                 workspace.sharing_known = False
                 workspace.auth_domain_known = False
                 workspace.owned_by_app = True
                 unknown_workspaces.append(workspace)
         # Accessible
-        accessible_sharing = models.WorkspaceGroupSharing.objects.filter(
-            workspace__in=accessible_workspaces,
-            group__in=all_account_groups,
-        ).order_by("workspace", "group")
+        accessible_sharing = (
+            models.WorkspaceGroupSharing.objects.filter(
+                workspace__in=accessible_workspaces,
+                group__in=all_account_groups,
+            )
+            .select_related("workspace__billing_project", "group")
+            .order_by("workspace", "group")
+        )
         context["accessible_workspace_table"] = tables.WorkspaceGroupSharingStaffTable(accessible_sharing)
 
         # List of workspaces with unknown access.
@@ -644,6 +676,33 @@ class AccountDeactivate(
             return HttpResponseRedirect(self.get_success_url())
 
 
+class AccountBulkDeactivate(auth.AnVILConsortiumManagerStaffEditRequired, FormView):
+    """Deactivate many accounts at once and remove them from all groups on AnVIL."""
+
+    form_class = forms.AccountBulkDeactivateForm
+    template_name = "anvil_consortium_manager/account_bulk_deactivate.html"
+    success_message = "Successfully deactivated {n} Account(s) in app."
+    message_error_removing_from_groups = (
+        "Error removing {n} Account(s) from groups; these Accounts are still active. Manually verify their group "
+        "memberships on AnVIL."
+    )
+    message_already_inactive = "Skipped {n} Account(s) that were already inactive."
+
+    def form_valid(self, form):
+        """Deactivate the selected accounts and show the outcome for each account and membership."""
+        report = models.Account.bulk_deactivate(form.cleaned_data["emails"])
+        if report.deactivated:
+            messages.success(self.request, self.success_message.format(n=len(report.deactivated)))
+        if report.not_deactivated:
+            msg = self.message_error_removing_from_groups.format(n=len(report.not_deactivated))
+            messages.add_message(self.request, messages.ERROR, msg)
+        if report.skipped:
+            msg = self.message_already_inactive.format(n=len(report.skipped))
+            messages.add_message(self.request, messages.WARNING, msg)
+        # Render the report instead of redirecting, so that the outcome for each account is shown.
+        return self.render_to_response(self.get_context_data(form=form, report=report))
+
+
 class AccountReactivate(
     auth.AnVILConsortiumManagerStaffEditRequired,
     SuccessMessageMixin,
@@ -805,6 +864,9 @@ class ManagedGroupDetail(
     def get_graph(self):
         self.graph = self.object.get_graph()
 
+    def get_graph_layout_name(self):
+        return graph_layout.get_group_layout_name(self.object)
+
     def plot_graph(self):
         fig = super().plot_graph()
         # Replot this group in a different color.
@@ -916,6 +978,9 @@ class ManagedGroupList(
 
     filterset_class = filters.ManagedGroupListFilter
 
+    def get_queryset(self):
+        return super().get_queryset().annotate_membership_counts()
+
     def get_table_class(self):
         """Use the adapter to get the table class."""
         return self.adapter.get_list_table_class()
@@ -926,13 +991,63 @@ class ManagedGroupVisualization(
     viewmixins.ManagedGroupGraphMixin,
     TemplateView,
 ):
-    """Display a visualization of all group relationships."""
+    """Display a visualization of all group relationships.
+
+    If a group is selected with the ``group`` (and optionally ``depth``) query parameters, only the groups around that
+    group are shown. If no group is selected and there are more than ``ANVIL_GROUP_VISUALIZATION_MAX_GROUPS`` groups,
+    no groups are shown until one is selected."""
 
     template_name = "anvil_consortium_manager/managedgroup_visualization.html"
+    graph_layout_name = graph_layout.FULL_GRAPH_LAYOUT_NAME
+    too_many_groups = False
+
+    def get_max_groups(self):
+        """Return the maximum number of groups to show when no group is selected, or None for no limit."""
+        return app_settings.GROUP_VISUALIZATION_MAX_GROUPS
 
     def get_graph(self):
-        G = models.ManagedGroup.get_full_graph()
-        self.graph = G
+        self.form = forms.ManagedGroupVisualizationForm(self.request.GET or None)
+        if not self.form.is_bound:
+            max_groups = self.get_max_groups()
+            if max_groups is not None and models.ManagedGroup.objects.count() > max_groups:
+                self.too_many_groups = True
+                self.graph = nx.DiGraph()
+                # Do not replace the stored layout of the full graph with an empty layout.
+                self.graph_layout_name = None
+            else:
+                self.graph = models.ManagedGroup.get_full_graph()
+        elif self.form.is_valid():
+            group = self.form.cleaned_data["group"]
+            depth = self.form.cleaned_data["depth"]
+            self.graph = group.get_graph(depth=depth)
+            self.graph_layout_name = graph_layout.get_group_layout_name(group, depth=depth)
+        else:
+            self.graph = nx.DiGraph()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["form"] = self.form
+        context["too_many_groups"] = self.too_many_groups
+        return context
+
+
+class ManagedGroupVisualizationData(ManagedGroupVisualization):
+    """Return the graph shown by the ManagedGroupVisualization view as JSON.
+
+    The response contains the nodes, their layout, and the edges of the graph as compact arrays (see
+    ``ManagedGroupGraphMixin.get_graph_data``). Use the ``group`` and ``depth`` query parameters to load the graph
+    around one group at a time instead of the graph of all groups. The graph of all groups is always returned when no
+    group is selected, regardless of ``ANVIL_GROUP_VISUALIZATION_MAX_GROUPS``."""
+
+    def get_max_groups(self):
+        return None
+
+    def get(self, request, *args, **kwargs):
+        self.get_graph()
+        if self.form.errors:
+            return JsonResponse({"errors": self.form.errors}, status=400)
+        self.layout_graph()
+        return JsonResponse(self.get_graph_data())
 
 
 class ManagedGroupDelete(auth.AnVILConsortiumManagerStaffEditRequired, SuccessMessageMixin, DeleteView):
@@ -1769,6 +1884,9 @@ class WorkspaceList(auth.AnVILConsortiumManagerViewRequired, SingleTableMixin, F
     template_name = "anvil_consortium_manager/workspace_list.html"
     filterset_class = filters.WorkspaceListFilter
 
+    def get_queryset(self):
+        return super().get_queryset().select_related("billing_project").annotate_sharing_counts()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["workspace_type_display_name"] = "All workspace"
@@ -1798,7 +1916,11 @@ class WorkspaceListByType(
     filterset_class = filters.WorkspaceListFilter
 
     def get_queryset(self):
-        return self.model.objects.filter(workspace_type=self.adapter.get_type())
+        return (
+            self.model.objects.filter(workspace_type=self.adapter.get_type())
+            .select_related("billing_project")
+            .annotate_sharing_counts()
+        )
 
     def get_table_class(self):
         """Use the adapter to get the table class."""
@@ -2283,6 +2405,33 @@ class GroupAccountMembershipCreate(auth.AnVILConsortiumManagerStaffEditRequired,
         return super().form_valid(form)
 
 
+class GroupAccountMembershipBulkUpdate(auth.AnVILConsortiumManagerStaffEditRequired, FormView):
+    """Add many accounts to or remove many accounts from one or more groups, on AnVIL and in the app."""
+
+    form_class = forms.GroupAccountMembershipBulkForm
+    template_name = "anvil_consortium_manager/groupaccountmembership_bulk_form.html"
+    success_message_add = "Successfully added {n} account membership(s)."
+    success_message_remove = "Successfully removed {n} account membership(s)."
+    message_api_errors = "{n} membership(s) could not be changed on AnVIL; see the results below."
+
+    def form_valid(self, form):
+        """Make the AnVIL API calls for all memberships and show the outcome for each membership."""
+        memberships = form.cleaned_data["memberships"]
+        if form.cleaned_data["action"] == form.ADD:
+            results = models.GroupAccountMembership.anvil_bulk_create(memberships)
+            success_message = self.success_message_add
+        else:
+            results = models.GroupAccountMembership.anvil_bulk_delete(memberships)
+            success_message = self.success_message_remove
+        n_failed = len([result for result in results if not result.succeeded])
+        if n_failed < len(results):
+            messages.success(self.request, success_message.format(n=len(results) - n_failed))
+        if n_failed:
+            messages.add_message(self.request, messages.ERROR, self.message_api_errors.format(n=n_failed))
+        # Render the results instead of redirecting, so that the outcome for each membership is shown.
+        return self.render_to_response(self.get_context_data(form=form, results=results))
+
+
 class GroupAccountMembershipCreateByGroup(GroupAccountMembershipCreate):
     """View to create a new GroupAccountMembership for the group specified in the url."""
 
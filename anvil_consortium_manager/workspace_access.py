@@ -0,0 +1,258 @@
+"""Evaluate workspace access for many accounts and workspaces at once."""
+
+from collections import defaultdict
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from . import app_settings, exceptions, group_hierarchy
+from .models import (
+    Account,
+    GroupAccountMembership,
+    GroupGroupMembership,
+    ManagedGroup,
+    ManagedGroupClosure,
+    Workspace,
+    WorkspaceAuthorizationDomain,
+    WorkspaceGroupSharing,
+)
+
+ACCESS_RANKS = {
+    WorkspaceGroupSharing.READER: 0,
+    WorkspaceGroupSharing.WRITER: 1,
+    WorkspaceGroupSharing.OWNER: 2,
+}
+"""Rank of each ``WorkspaceGroupSharing`` access level, from least to most access."""
+
+
+def _get_ancestor_pairs(groups):
+    """Return a list of (descendant pk, ancestor pk) tuples for all ancestors of the groups selected by ``groups``.
+
+    This uses the backend set by ``ANVIL_GROUP_HIERARCHY_BACKEND``.
+    """
+    if app_settings.GROUP_HIERARCHY_BACKEND == "cte":
+        try:
+            sql, params = groups.query.sql_with_params()
+        except EmptyResultSet:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(group_hierarchy.get_ancestor_pairs_sql(GroupGroupMembership, sql), params)
+            return cursor.fetchall()
+    return list(ManagedGroupClosure.objects.filter(descendant__in=groups).values_list("descendant_id", "ancestor_id"))
+
+
+def _get_ancestors(groups):
+    """Return a subquery selecting the pks of all ancestors of the groups selected by ``groups``.
+
+    This uses the backend set by ``ANVIL_GROUP_HIERARCHY_BACKEND``.
+    """
+    if app_settings.GROUP_HIERARCHY_BACKEND == "cte":
+        try:
+            sql, params = groups.query.sql_with_params()
+        except EmptyResultSet:
+            # ``groups`` cannot select any rows, so neither can a subquery of their ancestors.
+            return groups
+        return RawSQL(group_hierarchy.get_ancestors_sql(GroupGroupMembership, sql), params)
+    return ManagedGroupClosure.objects.filter(descendant__in=groups).values("ancestor")
+
+
+class WorkspaceAccessEvaluator:
+    """Compute whether each of a set of accounts can access each of a set of workspaces.
+
+    This gives the same answers as ``Workspace.is_accessible_by_account`` for every pair, but loads the groups,
+    sharing records and authorization domains it needs in a fixed number of queries instead of several queries per
+    pair.
+
+    The access for each pair is either ``True``, ``False``, or the exception that ``is_accessible_by_account`` would
+    raise for that pair (``AnVILNotWorkspaceOwnerError`` or one of the ``WorkspaceAccessUnknownError`` exceptions).
+
+    The ancestors of each account's groups are looked up with the backend set by ``ANVIL_GROUP_HIERARCHY_BACKEND``.
+
+    Example::
+
+        evaluator = WorkspaceAccessEvaluator(accounts=Account.objects.filter(status=Account.ACTIVE_STATUS))
+        access = evaluator.evaluate()
+        access[(account.pk, workspace.pk)]
+    """
+
+    def __init__(self, accounts=None, workspaces=None, account_groups=None):
+        """Load the data needed to evaluate access.
+
+        Args:
+            accounts (QuerySet, optional): The Accounts to evaluate. If not provided, all Accounts are used.
+            workspaces (QuerySet, optional): The Workspaces to evaluate. If not provided, all Workspaces are used.
+            account_groups (dict, optional): The pks of all groups that each account is in (directly and
+                indirectly), keyed by account pk, if they are already known. It must include every account being
+                evaluated. If not provided, the groups are looked up.
+        """
+        if accounts is None:
+            accounts = Account.objects.all()
+        if workspaces is None:
+            workspaces = Workspace.objects.all()
+        self.accounts = list(accounts)
+        self.workspaces = list(workspaces)
+
+        # Groups that each account is in, directly or indirectly.
+        if account_groups is not None:
+            self.account_groups = {account.pk: set(account_groups[account.pk]) for account in self.accounts}
+        else:
+            self.account_groups = self._get_account_groups(accounts)
+
+        unmanaged_groups = set(ManagedGroup.objects.filter(is_managed_by_app=False).values_list("pk", flat=True))
+
+        # Groups that each workspace is shared with.
+        self.workspaces_by_shared_group = defaultdict(set)
+        self.workspaces_with_unmanaged_sharing = set()
+        self.shared_groups = defaultdict(dict)
+        sharing = self._filter(WorkspaceGroupSharing.objects, "workspace", workspaces)
+        for workspace_id, group_id, access, can_compute in sharing.values_list(
+            "workspace_id", "group_id", "access", "can_compute"
+        ):
+            self.shared_groups[workspace_id][group_id] = (access, can_compute)
+            self.workspaces_by_shared_group[group_id].add(workspace_id)
+            if group_id in unmanaged_groups:
+                self.workspaces_with_unmanaged_sharing.add(workspace_id)
+
+        # Authorization domains of each workspace.
+        self.managed_auth_domains = defaultdict(set)
+        self.workspaces_with_unmanaged_auth_domains = set()
+        auth_domains = self._filter(WorkspaceAuthorizationDomain.objects, "workspace", workspaces)
+        for workspace_id, group_id in auth_domains.values_list("workspace_id", "group_id"):
+            if group_id in unmanaged_groups:
+                self.workspaces_with_unmanaged_auth_domains.add(workspace_id)
+            else:
+                self.managed_auth_domains[workspace_id].add(group_id)
+
+        self.workspaces_by_pk = {workspace.pk: workspace for workspace in self.workspaces}
+        self.workspaces_not_owned = set(workspace.pk for workspace in self.workspaces if not workspace.is_owner)
+
+    def _get_account_groups(self, accounts):
+        """Return the pks of all groups that each account is in, directly or indirectly, keyed by account pk."""
+        memberships = self._filter(GroupAccountMembership.objects, "account", accounts)
+        direct_groups = defaultdict(set)
+        for account_id, group_id in memberships.values_list("account_id", "group_id"):
+            direct_groups[account_id].add(group_id)
+        parents = defaultdict(set)
+        for descendant_id, ancestor_id in _get_ancestor_pairs(memberships.values("group")):
+            parents[descendant_id].add(ancestor_id)
+        account_groups = {}
+        for account in self.accounts:
+            groups = set(direct_groups[account.pk])
+            for group_id in direct_groups[account.pk]:
+                groups.update(parents[group_id])
+            account_groups[account.pk] = groups
+        return account_groups
+
+    @staticmethod
+    def _filter(queryset, field, objects):
+        """Restrict ``queryset`` to records related to ``objects``, using a subquery if ``objects`` is filtered."""
+        if objects.query.where:
+            return queryset.filter(**{field + "__in": objects})
+        return queryset
+
+    def _get_sharing(self, workspace_id, groups):
+        """Return True or False, or a WorkspaceAccessSharingUnknownError, like ``Workspace.is_shared_with_account``."""
+        if self.shared_groups[workspace_id].keys() & groups:
+            return True
+        if workspace_id in self.workspaces_with_unmanaged_sharing:
+            return exceptions.WorkspaceAccessSharingUnknownError(
+                "Workspace is shared with some groups that are not managed by the app."
+            )
+        return False
+
+    def _get_auth_domain(self, workspace_id, groups):
+        """Return True or False, or a WorkspaceAccessAuthorizationDomainUnknownError, like
+        ``Workspace.has_account_in_authorization_domain``."""
+        if not self.managed_auth_domains[workspace_id] <= groups:
+            return False
+        if workspace_id in self.workspaces_with_unmanaged_auth_domains:
+            return exceptions.WorkspaceAccessAuthorizationDomainUnknownError(
+                "At least one auth domain is not managed by the app."
+            )
+        return True
+
+    def _get_access(self, account, workspace_id, groups):
+        """Return the access for one pair, following the same logic as ``Workspace.is_accessible_by_account``."""
+        if workspace_id in self.workspaces_not_owned:
+            return exceptions.AnVILNotWorkspaceOwnerError(
+                "App does not have OWNER access to {}".format(self.workspaces_by_pk[workspace_id])
+            )
+        is_shared = self._get_sharing(workspace_id, groups)
+        if is_shared is False:
+            return False
+        in_auth_domain = self._get_auth_domain(workspace_id, groups)
+        if isinstance(is_shared, Exception):
+            if isinstance(in_auth_domain, Exception):
+                return exceptions.WorkspaceAccessUnknownError(
+                    "Workspace sharing and auth domain status is unknown for {}.".format(account)
+                )
+            if in_auth_domain is False:
+                return False
+            return is_shared
+        return in_auth_domain
+
+    def get_sharing_level(self, account, workspace):
+        """Return the highest access level and compute permission granted by sharing the workspace with the account.
+
+        Only sharing records with groups that the account is in are considered. This does not take authorization
+        domains into account; use ``evaluate_account`` or ``evaluate`` to check whether the account has access at all.
+
+        Args:
+            account (Account): One of the accounts passed to the evaluator.
+            workspace (Workspace): One of the workspaces passed to the evaluator.
+
+        Returns:
+            tuple: A tuple of (access, can_compute), where access is one of the ``WorkspaceGroupSharing`` access
+                constants or None if the workspace is not shared with any of the account's groups.
+        """
+        groups = self.account_groups[account.pk]
+        access = None
+        can_compute = False
+        for group_id, (group_access, group_can_compute) in self.shared_groups[workspace.pk].items():
+            if group_id in groups:
+                if access is None or ACCESS_RANKS[group_access] > ACCESS_RANKS[access]:
+                    access = group_access
+                can_compute = can_compute or group_can_compute
+        return access, can_compute
+
+    def evaluate_account(self, account):
+        """Return the access of one account to each workspace.
+
+        Args:
+            account (Account): One of the accounts passed to the evaluator.
+
+        Returns:
+            dict: The access to each workspace, keyed by workspace pk.
+        """
+        groups = self.account_groups[account.pk]
+        access = dict.fromkeys(self.workspaces_by_pk, False)
+        # Only workspaces shared with one of the account's groups or with an unmanaged group, or that the app does not
+        # own, can have an answer other than False.
+        candidates = self.workspaces_with_unmanaged_sharing | self.workspaces_not_owned
+        for group_id in groups:
+            candidates.update(self.workspaces_by_shared_group.get(group_id, ()))
+        for workspace_id in candidates:
+            access[workspace_id] = self._get_access(account, workspace_id, groups)
+        return access
+
+    def iter_evaluate(self):
+        """Yield a tuple of (account, access) for each account, where access is as returned by ``evaluate_account``.
+
+        Use this instead of ``evaluate`` to avoid holding the access for all pairs in memory at once.
+        """
+        for account in self.accounts:
+            yield account, self.evaluate_account(account)
+
+    def evaluate(self):
+        """Return the access of each account to each workspace.
+
+        Returns:
+            dict: The access for each pair, keyed by a tuple of (account pk, workspace pk). Each value is ``True``,
+                ``False``, or the exception that ``Workspace.is_accessible_by_account`` would raise.
+        """
+        results = {}
+        for account, access in self.iter_evaluate():
+            for workspace_id, value in access.items():
+                results[(account.pk, workspace_id)] = value
+        return results
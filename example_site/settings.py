@@ -202,6 +202,11 @@ CACHES = {
         },
         "TIMEOUT": None,  # Cache entries never expire.
     },
+    # Layouts of managed group graphs are stored in their own cache so that they do not evict audit results.
+    "anvil_graph_layout_cache": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "anvil_graph_layout_cache",
+    },
 }
 
 # django-crispy-forms
@@ -251,3 +256,4 @@ ANVIL_WORKSPACE_ADAPTERS = [
 
 # Specify the name of the cache set above.
 ANVIL_AUDIT_CACHE = "anvil_audit_cache"
+ANVIL_GRAPH_LAYOUT_CACHE = "anvil_graph_layout_cache"